@@ -0,0 +1,159 @@
+from thor.constants import Constants as c
+from thor.orbits.universal_propagate import calcChi
+from thor.orbits.universal_propagate import propagateUniversal
+from thor.orbits.aberrations import addLightTime
+from thor.orbits.stumpff import calcStumpff
+from numba import jit
+import numba
+import numpy as np
+import pandas as pd
+import time
+import os
+
+MU = c.MU
+C = c.C
+
+
+@jit(["f8[:,:](f8[:,:], f8[:], f8[:], f8, i8, f8)"], nopython=True, cache=True)
+def propagateUniversalSerial(orbits, t0, t1, mu, max_iter, tol):
+    # Previous propagation path: one Newton solve per (orbit, epoch) pair in
+    # a serial loop, with states collected in a list
+    new_orbits = []
+    sqrt_mu = np.sqrt(mu)
+    for i in range(orbits.shape[0]):
+        for j, t in enumerate(t1):
+            dt = t - t0[i]
+            chi = calcChi(orbits[i, :], dt, mu=mu, max_iter=max_iter, tol=tol)
+            r = orbits[i, :3]
+            v = orbits[i, 3:]
+            v_mag = np.linalg.norm(v)
+            r_mag = np.linalg.norm(r)
+            chi2 = chi**2
+            alpha = -v_mag**2 / mu + 2 / r_mag
+            c0, c1, c2, c3, c4, c5 = calcStumpff(alpha * chi2)
+            f = 1 - chi**2 / r_mag * c2
+            g = dt - 1 / sqrt_mu * chi**3 * c3
+            r_new = f * r + g * v
+            r_new_mag = np.linalg.norm(r_new)
+            f_dot = sqrt_mu / (r_mag * r_new_mag) * (alpha * chi**3 * c3 - chi)
+            g_dot = 1 - chi2 / r_new_mag * c2
+            v_new = f_dot * r + g_dot * v
+            new_orbits.append([i, t, r_new[0], r_new[1], r_new[2], v_new[0], v_new[1], v_new[2]])
+    return np.array(new_orbits)
+
+
+@jit(["Tuple((f8[:,:], f8[:]))(f8[:,:], f8[:], f8[:,:], f8, f8, i8, f8)"], nopython=True, cache=True)
+def addLightTimeSerial(orbits, t0, observer_positions, lt_tol, mu, max_iter, tol):
+    # Previous light time path: each iteration calls the full propagator
+    corrected_orbits = np.zeros((len(orbits), 6))
+    lts = np.zeros(len(orbits))
+    for i in range(len(orbits)):
+        orbit_i = orbits[i:i+1, :]
+        dlt = 1e30
+        lt_i = 1e30
+        while dlt > lt_tol:
+            rho = np.linalg.norm(orbit_i[:, :3] - observer_positions[i:i+1, :])
+            lt = rho / C
+            dlt = np.abs(lt - lt_i)
+            orbit = propagateUniversalSerial(orbits[i:i+1, :], t0[i:i+1], t0[i:i+1] - lt, mu, max_iter, tol)
+            orbit_i = orbit[:, 2:]
+            lt_i = lt
+        corrected_orbits[i, :] = orbit[0, 2:]
+        lts[i] = lt
+    return corrected_orbits, lts
+
+
+def make_orbits(num_orbits, seed=42):
+    # Roughly circular main-belt-like orbits with some scatter in speed and inclination
+    rng = np.random.default_rng(seed)
+    r = rng.uniform(1.5, 4.0, num_orbits)
+    theta = rng.uniform(0, 2 * np.pi, num_orbits)
+    v = np.sqrt(MU / r) * rng.uniform(0.8, 1.2, num_orbits)
+    orbits = np.zeros((num_orbits, 6))
+    orbits[:, 0] = r * np.cos(theta)
+    orbits[:, 1] = r * np.sin(theta)
+    orbits[:, 2] = rng.normal(0, 0.1, num_orbits)
+    orbits[:, 3] = -v * np.sin(theta)
+    orbits[:, 4] = v * np.cos(theta)
+    orbits[:, 5] = rng.normal(0, 0.001, num_orbits)
+    return orbits
+
+
+def warm_numba_jit():
+    orbits = make_orbits(2)
+    t0 = np.full(2, 59000.0)
+    t1 = np.array([59001.0])
+    propagateUniversal(orbits, t0, t1, MU, 100, 1e-14)
+    propagateUniversalSerial(orbits, t0, t1, MU, 100, 1e-14)
+    addLightTime(orbits, t0, orbits[:, :3] * 0.5, 1e-10, MU, 1000, 1e-15)
+    addLightTimeSerial(orbits, t0, orbits[:, :3] * 0.5, 1e-10, MU, 1000, 1e-15)
+
+
+def timeit(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    end = time.perf_counter()
+    return result, end - start
+
+
+def run(num_orbits, num_epochs, num_threads):
+    numba.set_num_threads(num_threads)
+    orbits = make_orbits(num_orbits)
+    t0 = np.full(num_orbits, 59000.0)
+    t1 = 59000.0 + np.linspace(-30, 30, num_epochs)
+
+    propagated_serial, runtime_serial = timeit(
+        propagateUniversalSerial, orbits, t0, t1, MU, 100, 1e-14
+    )
+    propagated, runtime = timeit(
+        propagateUniversal, orbits, t0, t1, MU, 100, 1e-14
+    )
+
+    # Light time correction for each propagated state from a
+    # stationary observer at 1 au
+    states = propagated[:, 2:].copy()
+    observer_positions = np.zeros((len(states), 3))
+    observer_positions[:, 0] = 1.0
+    (_, lts_serial), runtime_lt_serial = timeit(
+        addLightTimeSerial, states, propagated[:, 1].copy(), observer_positions, 1e-10, MU, 1000, 1e-15
+    )
+    (_, lts), runtime_lt = timeit(
+        addLightTime, states, propagated[:, 1].copy(), observer_positions, 1e-10, MU, 1000, 1e-15
+    )
+
+    tags = {
+        "n_orbits": str(num_orbits),
+        "n_epochs": str(num_epochs),
+        "n_threads": str(num_threads),
+        "runtime_propagate_serial": f"{runtime_serial:.6f}",
+        "runtime_propagate": f"{runtime:.6f}",
+        "runtime_light_time_serial": f"{runtime_lt_serial:.6f}",
+        "runtime_light_time": f"{runtime_lt:.6f}",
+        "max_state_diff": f"{np.abs(propagated - propagated_serial).max():.3e}",
+        "max_light_time_diff": f"{np.abs(lts - lts_serial).max():.3e}",
+    }
+
+    msg = "\t".join(f"{k}={v}" for k, v in tags.items())
+    print(msg)
+
+    return tags
+
+
+if __name__ == "__main__":
+    print("warming numba")
+    warm_numba_jit()
+
+    runs = []
+    run_id = int(time.time())
+    print(f"running benchmarks\tid={run_id}")
+    os.makedirs(f"results/{run_id}")
+    max_threads = numba.config.NUMBA_NUM_THREADS
+    for num_orbits in (10, 100, 1000, 10000):
+        for num_epochs in (1, 10, 100):
+            for num_threads in sorted({1, max_threads}):
+                tags = run(num_orbits, num_epochs, num_threads)
+                runs.append(tags)
+    tag_df = pd.DataFrame(runs)
+    summary_csv = f"results/{run_id}/summary.csv"
+    tag_df.to_csv(summary_csv)
+    print(f"all benchmarks complete, metadata written to {summary_csv}")
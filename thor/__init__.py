@@ -9,6 +9,7 @@ from .coordinates import *
 from .projections import *
 from .orbit import *
 from .cell import *
+from .observations import *
 from .plotting import *
 from .data_processing import *
 from .main import *
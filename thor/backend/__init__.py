@@ -1,3 +1,4 @@
+from .cache import *
 from .backend import *
 from .mjolnir import *
 from .pyoorb import *
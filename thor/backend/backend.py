@@ -1,12 +1,13 @@
 import os
 import copy
+import hashlib
 import logging
+import numpy as np
 import pandas as pd
-import multiprocessing as mp
 
 from ..orbit import TestOrbit
 from ..utils import Timeout
-from ..utils import _initWorker
+from ..utils import getExecutor
 from ..utils import _checkParallel
 
 os.environ["OPENBLAS_NUM_THREADS"] = "1"
@@ -75,8 +76,16 @@ class Backend:
         self.__dict__.update(kwargs)
         self.name = name
         self.is_setup = False
+        self.cache = None
         return
 
+    def __getstate__(self):
+        # An ephemeris cache (see `~thor.backend.EphemerisCache`) stays with the
+        # process that owns the backend and is not copied to workers
+        state = self.__dict__.copy()
+        state["cache"] = None
+        return state
+
     def setup(self):
         return
 
@@ -114,7 +123,7 @@ class Backend:
         num_jobs : int, optional
             Number of jobs to launch.
         parallel_backend : str, optional
-            Which parallelization backend to use {'ray', 'mp'}. Defaults to using Python's multiprocessing
+            Which parallelization backend to use {'ray', 'mp', 'cf'}. Defaults to using Python's multiprocessing
             module ('mp').
 
         Returns
@@ -149,11 +158,8 @@ class Backend:
                     p.append(propagation_worker_ray.remote(o, t, b))
                 propagated_dfs = ray.get(p)
 
-            else: # parallel_backend == "mp"
-                p = mp.Pool(
-                    processes=num_workers,
-                    initializer=_initWorker,
-                )
+            else: # parallel_backend in ["mp", "cf"]
+                p = getExecutor(num_workers, parallel_backend)
 
                 propagated_dfs = p.starmap(
                     propagation_worker,
@@ -163,7 +169,6 @@ class Backend:
                         backend_duplicated,
                     )
                 )
-                p.close()
 
             propagated = pd.concat(propagated_dfs)
             propagated.reset_index(
@@ -204,6 +209,9 @@ class Backend:
         Generate ephemerides for each orbit in orbits as observed by each observer
         in observers.
 
+        If the backend's cache attribute has been set to an `~thor.backend.EphemerisCache`, only orbits
+        whose ephemerides are not in the cache (for every observer) are sent to the backend.
+
         Parameters
         ----------
         orbits : `~thor.orbits.orbits.Orbits`
@@ -217,7 +225,7 @@ class Backend:
         num_jobs : int, optional
             Number of jobs to launch.
         parallel_backend : str, optional
-            Which parallelization backend to use {'ray', 'mp'}. Defaults to using Python's multiprocessing
+            Which parallelization backend to use {'ray', 'mp', 'cf'}. Defaults to using Python's multiprocessing
             module ('mp').
 
         Returns
@@ -230,53 +238,21 @@ class Backend:
                 RA : Right Ascension in decimal degrees.
                 Dec : Declination in decimal degrees.
         """
-        parallel, num_workers = _checkParallel(num_jobs, parallel_backend)
-        if parallel:
-            orbits_split = orbits.split(chunk_size)
-            observers_duplicated = [copy.deepcopy(observers) for i in range(len(orbits_split))]
-            backend_duplicated = [copy.deepcopy(self) for i in range(len(orbits_split))]
-
-            if parallel_backend == "ray":
-                import ray
-                if not ray.is_initialized():
-                    ray.init(address="auto")
-
-                ephemeris_worker_ray = ray.remote(ephemeris_worker)
-                ephemeris_worker_ray.options(
-                    num_returns=1,
-                    num_cpus=1
-                )
-
-                p = []
-                for o, t, b in zip(orbits_split, observers_duplicated, backend_duplicated):
-                    p.append(ephemeris_worker_ray.remote(o, t, b))
-                ephemeris_dfs = ray.get(p)
-
-            else: # parallel_backend == "mp"
-                p = mp.Pool(
-                    processes=num_workers,
-                    initializer=_initWorker,
-                )
-
-                ephemeris_dfs = p.starmap(
-                    ephemeris_worker,
-                    zip(
-                        orbits_split,
-                        observers_duplicated,
-                        backend_duplicated,
-                    )
-                )
-                p.close()
-
-            ephemeris = pd.concat(ephemeris_dfs)
-            ephemeris.reset_index(
-                drop=True,
-                inplace=True
+        if self.cache is not None:
+            ephemeris = self._generateEphemerisCached(
+                orbits,
+                observers,
+                chunk_size=chunk_size,
+                num_jobs=num_jobs,
+                parallel_backend=parallel_backend
             )
         else:
-            ephemeris = self._generateEphemeris(
+            ephemeris = self._computeEphemeris(
                 orbits,
-                observers
+                observers,
+                chunk_size=chunk_size,
+                num_jobs=num_jobs,
+                parallel_backend=parallel_backend
             )
 
         if test_orbit is not None:
@@ -291,9 +267,13 @@ class Backend:
             test_orbit_ephemeris_grouped = test_orbit_ephemeris.groupby(by=["observatory_code", "mjd_utc"])
             test_orbit_ephemeris_split = [test_orbit_ephemeris_grouped.get_group(g) for g in test_orbit_ephemeris_grouped.groups]
 
-            if num_jobs > 1:
+            parallel, num_workers = _checkParallel(num_jobs, parallel_backend)
+            if parallel:
 
                 if parallel_backend == "ray":
+                    import ray
+                    if not ray.is_initialized():
+                        ray.init(address="auto")
 
                     projectEphemeris_worker_ray = ray.remote(projectEphemeris_worker)
                     projectEphemeris_worker_ray = projectEphemeris_worker_ray.options(
@@ -306,11 +286,8 @@ class Backend:
                         p.append(projectEphemeris_worker_ray.remote(e, te))
                     ephemeris_dfs = ray.get(p)
 
-                else: # parallel_backend == "mp"
-                    p = mp.Pool(
-                        processes=num_workers,
-                        initializer=_initWorker,
-                    )
+                else: # parallel_backend in ["mp", "cf"]
+                    p = getExecutor(num_workers, parallel_backend)
 
                     ephemeris_dfs = p.starmap(
                         projectEphemeris_worker,
@@ -319,7 +296,6 @@ class Backend:
                             test_orbit_ephemeris_split
                         )
                     )
-                    p.close()
 
             else:
                 ephemeris_dfs = []
@@ -340,6 +316,179 @@ class Backend:
         )
         return ephemeris
 
+    def _computeEphemeris(
+            self,
+            orbits,
+            observers,
+            chunk_size=100,
+            num_jobs=1,
+            parallel_backend="mp"
+        ):
+        """
+        Generate ephemerides for each orbit in orbits as observed by each observer
+        in observers, splitting the orbits into chunks if num_jobs > 1.
+
+        See `generateEphemeris` for a description of the parameters.
+        """
+        parallel, num_workers = _checkParallel(num_jobs, parallel_backend)
+        if parallel:
+            orbits_split = orbits.split(chunk_size)
+            observers_duplicated = [copy.deepcopy(observers) for i in range(len(orbits_split))]
+            backend_duplicated = [copy.deepcopy(self) for i in range(len(orbits_split))]
+
+            if parallel_backend == "ray":
+                import ray
+                if not ray.is_initialized():
+                    ray.init(address="auto")
+
+                ephemeris_worker_ray = ray.remote(ephemeris_worker)
+                ephemeris_worker_ray.options(
+                    num_returns=1,
+                    num_cpus=1
+                )
+
+                p = []
+                for o, t, b in zip(orbits_split, observers_duplicated, backend_duplicated):
+                    p.append(ephemeris_worker_ray.remote(o, t, b))
+                ephemeris_dfs = ray.get(p)
+
+            else: # parallel_backend in ["mp", "cf"]
+                p = getExecutor(num_workers, parallel_backend)
+
+                ephemeris_dfs = p.starmap(
+                    ephemeris_worker,
+                    zip(
+                        orbits_split,
+                        observers_duplicated,
+                        backend_duplicated,
+                    )
+                )
+
+            ephemeris = pd.concat(ephemeris_dfs)
+            ephemeris.reset_index(
+                drop=True,
+                inplace=True
+            )
+        else:
+            ephemeris = self._generateEphemeris(
+                orbits,
+                observers
+            )
+
+        return ephemeris
+
+    def _ephemerisKeys(self, orbits, observers):
+        """
+        Calculate the ephemeris cache key of each orbit and observer: a hash of the
+        backend's configuration, the orbit's state, epoch and magnitude parameters, and the
+        observatory code and observation times.
+
+        Parameters
+        ----------
+        orbits : `~thor.orbits.orbits.Orbits`
+            Orbits for which to generate ephemerides.
+        observers : dict
+            A dictionary with observatory codes as keys and observation_times (`~astropy.time.core.Time`) as values.
+
+        Returns
+        -------
+        keys : `~numpy.ndarray` (N, M)
+            Cache keys for each orbit and each observer.
+        """
+        config = sorted(
+            (k, repr(v)) for k, v in self.__dict__.items() if k not in ["cache", "is_setup"]
+        )
+        config_hash = hashlib.blake2b(repr(config).encode(), digest_size=16)
+
+        epochs = orbits.epochs.tdb
+        H = orbits.H if orbits.H is not None else np.full(orbits.num_orbits, np.NaN)
+        G = orbits.G if orbits.G is not None else np.full(orbits.num_orbits, np.NaN)
+        orbit_data = np.ascontiguousarray(
+            np.hstack([
+                orbits.cartesian,
+                np.column_stack([epochs.jd1, epochs.jd2, H, G])
+            ]),
+            dtype=np.float64
+        )
+
+        keys = np.empty((orbits.num_orbits, len(observers)), dtype=object)
+        for j, (observatory_code, observation_times) in enumerate(observers.items()):
+            observer_hash = config_hash.copy()
+            observer_hash.update(str(observatory_code).encode())
+            observer_hash.update(np.ascontiguousarray(observation_times.utc.jd1, dtype=np.float64).tobytes())
+            observer_hash.update(np.ascontiguousarray(observation_times.utc.jd2, dtype=np.float64).tobytes())
+            for i in range(orbits.num_orbits):
+                h = observer_hash.copy()
+                h.update(orbit_data[i].tobytes())
+                keys[i, j] = h.hexdigest()
+
+        return keys
+
+    def _generateEphemerisCached(
+            self,
+            orbits,
+            observers,
+            chunk_size=100,
+            num_jobs=1,
+            parallel_backend="mp"
+        ):
+        """
+        Generate ephemerides using the backend's cache: orbits whose ephemerides
+        are cached for every observer are not sent to the backend.
+
+        See `generateEphemeris` for a description of the parameters.
+        """
+        observatory_codes = list(observers.keys())
+        keys = self._ephemerisKeys(orbits, observers)
+        ephemerides = np.empty(keys.shape, dtype=object)
+        cached = np.zeros(keys.shape, dtype=bool)
+        for i in range(keys.shape[0]):
+            for j in range(keys.shape[1]):
+                ephemerides[i, j] = self.cache.get(keys[i, j])
+                cached[i, j] = ephemerides[i, j] is not None
+
+        missing = np.where(~cached.all(axis=1))[0]
+        if len(missing) > 0:
+            # Use the positions of the orbits as their IDs so that orbits
+            # with duplicate IDs are kept apart
+            orbits_missing = orbits.__class__(
+                orbits.cartesian[missing],
+                orbits.epochs[missing],
+                ids=missing.astype(str),
+                H=orbits.H[missing] if orbits.H is not None else None,
+                G=orbits.G[missing] if orbits.G is not None else None,
+            )
+            ephemeris_missing = self._computeEphemeris(
+                orbits_missing,
+                observers,
+                chunk_size=chunk_size,
+                num_jobs=num_jobs,
+                parallel_backend=parallel_backend
+            )
+
+            if len(ephemeris_missing) > 0:
+                columns = [col for col in ephemeris_missing.columns if col != "orbit_id"]
+                for (orbit_id, observatory_code), ephemeris_i in ephemeris_missing.groupby(by=["orbit_id", "observatory_code"], sort=False):
+                    i = int(orbit_id)
+                    j = observatory_codes.index(observatory_code)
+                    ephemerides[i, j] = ephemeris_i[columns].reset_index(drop=True)
+                    self.cache.put(keys[i, j], ephemerides[i, j])
+
+        ids = []
+        ephemeris_dfs = []
+        for i in range(keys.shape[0]):
+            for j in range(keys.shape[1]):
+                if ephemerides[i, j] is not None:
+                    ids.append(np.full(len(ephemerides[i, j]), orbits.ids[i]))
+                    ephemeris_dfs.append(ephemerides[i, j])
+
+        if len(ephemeris_dfs) == 0:
+            return pd.DataFrame()
+
+        ephemeris = pd.concat(ephemeris_dfs, ignore_index=True)
+        ephemeris.insert(0, "orbit_id", np.concatenate(ids))
+        return ephemeris
+
     def _orbitDetermination(self):
         err = (
             "This backend does not have orbit determination implemented."
@@ -370,7 +519,7 @@ class Backend:
         num_jobs : int, optional
             Number of jobs to launch.
         parallel_backend : str, optional
-            Which parallelization backend to use {'ray', 'mp'}. Defaults to using Python's multiprocessing
+            Which parallelization backend to use {'ray', 'mp', 'cf'}. Defaults to using Python's multiprocessing
             module ('mp').
         """
         unique_objs = observations["obj_id"].unique()
@@ -394,11 +543,8 @@ class Backend:
                 od.append(orbitDetermination_worker_ray.remote(o, b))
             od_orbits_dfs = ray.get(od)
 
-        else: # parallel_backend == "mp"
-            p = mp.Pool(
-                processes=num_workers,
-                initializer=_initWorker,
-            )
+        else: # parallel_backend in ["mp", "cf"]
+            p = getExecutor(num_workers, parallel_backend)
 
             od_orbits_dfs = p.starmap(
                 orbitDetermination_worker,
@@ -407,7 +553,6 @@ class Backend:
                     backend_duplicated,
                 )
             )
-            p.close()
 
         od_orbits = pd.concat(od_orbits_dfs, ignore_index=True)
         return od_orbits
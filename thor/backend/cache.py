@@ -0,0 +1,165 @@
+import os
+import logging
+import pandas as pd
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "EphemerisCache"
+]
+
+CACHE_MAX_BYTES = 256 * 1024**2
+
+class EphemerisCache:
+    """
+    EphemerisCache: Stores ephemerides generated by a backend so that identical
+    requests (the same backend configuration, orbit and observer) are not sent to the backend again.
+
+    Entries are kept in memory up to a budget of max_bytes, the least recently used entries are evicted
+    first. If a directory is given, every entry is also written to disk and entries that are not in
+    memory (evicted entries, or entries written by other processes or previous runs) are read
+    from disk.
+
+    A cache can be shared by several backends, keys include each backend's configuration. A cache
+    is not sent to worker processes, lookups are made by the process that owns the backend.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Memory budget in bytes.
+    directory : str, optional
+        Directory in which to store entries on disk.
+
+    Attributes
+    ----------
+    hits : int
+        Number of lookups found in the cache (in memory or on disk).
+    disk_hits : int
+        Number of lookups found on disk.
+    misses : int
+        Number of lookups not found in the cache.
+    evictions : int
+        Number of entries evicted from memory.
+    num_bytes : int
+        Memory used by entries in bytes.
+    """
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        self._entries = OrderedDict()
+        self.num_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        return
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        rep = (
+            "EphemerisCache: {} entries ({} bytes)\n"
+            "Hits: {} (disk: {})\n"
+            "Misses: {}\n"
+            "Evictions: {}\n"
+        )
+        return rep.format(len(self), self.num_bytes, self.hits, self.disk_hits, self.misses, self.evictions)
+
+    def _path(self, key):
+        return os.path.join(self.directory, "{}.pkl".format(key))
+
+    def _insert(self, key, ephemeris):
+        size = int(ephemeris.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self.num_bytes -= self._entries.pop(key)[1]
+
+        while self.num_bytes + size > self.max_bytes:
+            _, (_, size_evicted) = self._entries.popitem(last=False)
+            self.num_bytes -= size_evicted
+            self.evictions += 1
+
+        self._entries[key] = (ephemeris, size)
+        self.num_bytes += size
+        return
+
+    def get(self, key):
+        """
+        Look up an entry.
+
+        Parameters
+        ----------
+        key : str
+            Key of the entry.
+
+        Returns
+        -------
+        ephemeris : `~pandas.DataFrame` or None
+            Cached ephemeris (should not be modified), None if the key is not in the cache.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+        if self.directory is not None:
+            path = self._path(key)
+            if os.path.exists(path):
+                ephemeris = pd.read_pickle(path)
+                self._insert(key, ephemeris)
+                self.hits += 1
+                self.disk_hits += 1
+                return ephemeris
+
+        self.misses += 1
+        return None
+
+    def put(self, key, ephemeris):
+        """
+        Add an entry.
+
+        Parameters
+        ----------
+        key : str
+            Key of the entry.
+        ephemeris : `~pandas.DataFrame`
+            Ephemeris to cache (should not be modified after it has been added).
+
+        Returns
+        -------
+        None
+        """
+        self._insert(key, ephemeris)
+
+        if self.directory is not None:
+            # Write to a temporary file first so that other processes
+            # never read a partially written entry
+            path = self._path(key)
+            path_temp = "{}.{}.tmp".format(path, os.getpid())
+            ephemeris.to_pickle(path_temp)
+            os.replace(path_temp, path)
+        return
+
+    def clear(self):
+        """
+        Remove all entries from memory and reset the counters. Entries
+        on disk are kept.
+
+        Returns
+        -------
+        None
+        """
+        self._entries = OrderedDict()
+        self.num_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        return
@@ -1,13 +1,16 @@
 import os
 import time
 import json
+import queue
 import shutil
 import tempfile
 import warnings
 import subprocess
 import numpy as np
+import concurrent.futures as cf
 import pandas as pd
 from astropy.time import Time
+from multiprocessing.util import Finalize
 
 from ..utils import writeToADES
 from .backend import Backend
@@ -15,8 +18,65 @@ from .backend import Backend
 FINDORB_CONFIG = {
     "config_file" : os.path.join(os.path.dirname(__file__), "data", "environ.dat"),
     "remove_files" : True,
+    "num_processes" : 1,
 }
 
+# Files find_orb writes to ~/.find_orb when processing observations
+FINDORB_OUTPUT_FILES = [
+    "elements.txt",
+    "guide.txt",
+    "mpc_fmt.txt",
+    "observe.txt",
+    "residual.txt",
+    "total.json",
+    "vectors.txt",
+    "covar.txt",
+    "covar.json",
+    "debug.txt",
+    "elements.json",
+    "elem_short.json",
+    "combined.json"
+]
+
+# Work environments (temporary home directories with a copy of ~/.find_orb) that are
+# not in use, keyed by the ID of the process that created them. Creating a work environment
+# copies find_orb's configuration files so each process keeps its environments and reuses them
+# for every subsequent call
+WORK_ENVIRONMENTS = {}
+
+def _cleanWorkEnvironments():
+    """
+    Remove the work environments created by this process.
+    """
+    for temp_dir, env in WORK_ENVIRONMENTS.pop(os.getpid(), []):
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return
+
+def _resetWorkEnvironment(temp_dir):
+    """
+    Remove the files a find_orb call left in a work environment so that
+    they are not picked up by the next call.
+
+    Parameters
+    ----------
+    temp_dir : str
+        Path to the work environment's home directory.
+    """
+    for file_name in FINDORB_OUTPUT_FILES:
+        file_path = os.path.join(temp_dir, ".find_orb", file_name)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    for file_name in os.listdir(temp_dir):
+        if file_name == ".find_orb":
+            continue
+        file_path = os.path.join(temp_dir, file_name)
+        if os.path.isdir(file_path) and not os.path.islink(file_path):
+            shutil.rmtree(file_path, ignore_errors=True)
+        else:
+            os.remove(file_path)
+    return
+
 class FINDORB(Backend):
 
     def __init__(self, **kwargs):
@@ -75,18 +135,7 @@ class FINDORB(Backend):
             os.path.expanduser("~/.find_orb"),
             os.path.join(temp_dir, ".find_orb"),
             ignore=shutil.ignore_patterns(
-                "elements.txt",
-                "guide.txt",
-                "mpc_fmt.txt",
-                "observe.txt",
-                "residual.txt",
-                "total.json",
-                "vectors.txt",
-                "covar.txt",
-                "debug.txt",
-                "elements.json",
-                "elem_short.json",
-                "combined.json",
+                *FINDORB_OUTPUT_FILES,
                 "linux_p1550p2650.430t",
                 "asteroid_ephemeris.txt"
             )
@@ -112,6 +161,98 @@ class FINDORB(Backend):
         env["HOME"] = temp_dir
         return env
 
+    def _acquireWorkEnvironment(self):
+        """
+        Get a work environment that is not in use, creating one if
+        this process has none available.
+
+        Returns
+        -------
+        temp_dir : str
+            Path to the work environment's home directory.
+        env : dict
+            Environment variables with which to run find_orb.
+        """
+        pid = os.getpid()
+        if pid not in WORK_ENVIRONMENTS:
+            # Worker processes of a multiprocessing or concurrent.futures pool leave through os._exit and
+            # never run atexit handlers, multiprocessing's finalizers run on exit in the workers and in
+            # the main process alike
+            Finalize(None, _cleanWorkEnvironments, exitpriority=0)
+
+        available = WORK_ENVIRONMENTS.setdefault(pid, [])
+        if len(available) > 0:
+            return available.pop()
+
+        temp_dir = tempfile.mkdtemp(prefix="thor_findorb_")
+        env = self._setWorkEnvironment(temp_dir)
+        return temp_dir, env
+
+    def _releaseWorkEnvironment(self, work_environment):
+        """
+        Return a work environment so that it can be reused. Files left
+        by previous find_orb calls are removed first.
+
+        Parameters
+        ----------
+        work_environment : tuple
+            Work environment returned by `_acquireWorkEnvironment`.
+        """
+        _resetWorkEnvironment(work_environment[0])
+        WORK_ENVIRONMENTS.setdefault(os.getpid(), []).append(work_environment)
+        return
+
+    def _runCalls(self, calls, capture_output=True):
+        """
+        Run find_orb once for each call. Up to num_processes calls run concurrently,
+        each one in its own work environment so that concurrent processes do not write to
+        the same ~/.find_orb/ directory.
+
+        Parameters
+        ----------
+        calls : list of lists
+            Arguments of each call.
+        capture_output : bool, optional
+            Capture the standard output and standard error of each call.
+
+        Returns
+        -------
+        rets : list of `~subprocess.CompletedProcess`
+            Completed process of each call.
+        """
+        num_processes = max(min(self.num_processes, len(calls)), 1)
+        work_environments = queue.Queue()
+        for i in range(num_processes):
+            work_environments.put(self._acquireWorkEnvironment())
+
+        def run(call):
+            temp_dir, env = work_environments.get()
+            try:
+                ret = subprocess.run(
+                    call,
+                    shell=False,
+                    env=env,
+                    cwd=temp_dir,
+                    check=False,
+                    capture_output=capture_output
+                )
+            finally:
+                _resetWorkEnvironment(temp_dir)
+                work_environments.put((temp_dir, env))
+            return ret
+
+        try:
+            if num_processes > 1:
+                with cf.ThreadPoolExecutor(max_workers=num_processes) as executor:
+                    rets = list(executor.map(run, calls))
+            else:
+                rets = [run(call) for call in calls]
+        finally:
+            while not work_environments.empty():
+                self._releaseWorkEnvironment(work_environments.get())
+
+        return rets
+
     def _propagateOrbits(self, orbits, t1):
         """
 
@@ -120,11 +261,6 @@ class FINDORB(Backend):
         propagated_dfs = []
         with tempfile.TemporaryDirectory() as temp_dir:
 
-            # Set this environment's home directory to the temporary directory
-            # to prevent bugs with multiple processes writing to the ~/.find_orb/
-            # directory
-            env = self._setWorkEnvironment(temp_dir)
-
             # Write the desired times out to a file that find_orb understands
             times_in_file = os.path.join(temp_dir, "times_prop.in")
             self._writeTimes(
@@ -133,6 +269,8 @@ class FINDORB(Backend):
                 "tt"
             )
 
+            calls = []
+            vectors_txts = []
             for i in range(orbits.num_orbits):
 
                 orbit_id = orbits.ids[i]
@@ -145,7 +283,6 @@ class FINDORB(Backend):
                     ",".join(orbits.cartesian[i].astype("str"))
                 )
 
-                # Run fo
                 call = [
                     "fo",
                     "-o",
@@ -163,14 +300,13 @@ class FINDORB(Backend):
                     self.config_file,
                     "EPHEM_STEP_SIZE=t{}".format(times_in_file)
                 ]
-                ret = subprocess.run(
-                    call,
-                    shell=False,
-                    env=env,
-                    cwd=temp_dir,
-                    check=False,
-                    capture_output=True
-                )
+                calls.append(call)
+                vectors_txts.append(vectors_txt)
+
+            # Run fo
+            rets = self._runCalls(calls)
+
+            for i, (call, ret, vectors_txt) in enumerate(zip(calls, rets, vectors_txts)):
 
                 if (ret.returncode != 0):
                     warning = (
@@ -219,15 +355,12 @@ class FINDORB(Backend):
         ephemeris_dfs = []
         with tempfile.TemporaryDirectory() as temp_dir:
 
-            # Set this environment's home directory to the temporary directory
-            # to prevent bugs with multiple processes writing to the ~/.find_orb/
-            # directory
-            env = self._setWorkEnvironment(temp_dir)
-
+            calls = []
+            outputs = []
             for observatory_code, observation_times in observers.items():
 
                 # Write the desired times out to a file that find_orb understands
-                times_in_file = os.path.join(temp_dir, "times_eph.in")
+                times_in_file = os.path.join(temp_dir, "times_eph_{}.in".format(observatory_code))
                 self._writeTimes(
                     times_in_file,
                     observation_times.tt,
@@ -288,34 +421,31 @@ class FINDORB(Backend):
                         "JSON_SHORT_ELEMENTS={}".format(os.path.join(temp_dir, "short%p.json")),
                         "JSON_COMBINED_NAME={}".format(os.path.join(temp_dir, "com%p_%c.json"))
                     ]
+                    calls.append(call)
+                    outputs.append((i, observatory_code, columns, ephemeris_txt))
 
-                    ret = subprocess.run(
-                        call,
-                        shell=False,
-                        env=env,
-                        cwd=temp_dir,
-                        check=False,
-                        capture_output=False
-                    )
+            self._runCalls(calls, capture_output=False)
 
-                    if (os.path.exists(ephemeris_txt)):
-                        ephemeris = pd.read_csv(
-                            ephemeris_txt,
-                            header=0,
-                            delim_whitespace=True,
-                            names=columns,
-                            float_precision="round_trip"
+            for i, observatory_code, columns, ephemeris_txt in outputs:
 
-                        )
-                        ephemeris["orbit_id"] = [i for _ in range(len(ephemeris))]
-                        ephemeris["observatory_code"] = [observatory_code for _ in range(len(ephemeris))]
+                if (os.path.exists(ephemeris_txt)):
+                    ephemeris = pd.read_csv(
+                        ephemeris_txt,
+                        header=0,
+                        delim_whitespace=True,
+                        names=columns,
+                        float_precision="round_trip"
 
-                    else:
-                        ephemeris = pd.DataFrame(
-                            columns=[["orbit_id", "observatory_code"] + columns]
-                        )
+                    )
+                    ephemeris["orbit_id"] = [i for _ in range(len(ephemeris))]
+                    ephemeris["observatory_code"] = [observatory_code for _ in range(len(ephemeris))]
 
-                    ephemeris_dfs.append(ephemeris)
+                else:
+                    ephemeris = pd.DataFrame(
+                        columns=[["orbit_id", "observatory_code"] + columns]
+                    )
+
+                ephemeris_dfs.append(ephemeris)
 
         # Combine ephemeris data frames and sort by orbit ID,
         # observatory code and observation time, then reset the
@@ -409,14 +539,11 @@ class FINDORB(Backend):
             _observations.loc[:, "astCat"] = "None"
 
 
-        for i, obj_id in enumerate(_observations[id_col].unique()):
-
-            with tempfile.TemporaryDirectory() as temp_dir:
+        with tempfile.TemporaryDirectory() as temp_dir:
 
-                # Set this environment's home directory to the temporary directory
-                # to prevent bugs with multiple processes writing to the ~/.find_orb/
-                # directory
-                env = self._setWorkEnvironment(temp_dir)
+            calls = []
+            outputs = []
+            for i, obj_id in enumerate(_observations[id_col].unique()):
 
                 # If you give fo a string for a numbered object it will typically append brackets
                 # automatically which makes retrieving the object's orbit a little more tedious so by making sure
@@ -452,15 +579,12 @@ class FINDORB(Backend):
                     "-D",
                     self.config_file,
                 ]
+                calls.append(call)
+                outputs.append((obj_id, obj_id_i, object_observations, out_dir))
 
-                ret = subprocess.run(
-                    call,
-                    shell=False,
-                    env=env,
-                    cwd=temp_dir,
-                    check=False,
-                    capture_output=True
-                )
+            rets = self._runCalls(calls)
+
+            for ret, (obj_id, obj_id_i, object_observations, out_dir) in zip(rets, outputs):
 
                 covar_json = os.path.join(out_dir, "covar.json")
                 if (os.path.exists(covar_json)) and ret.returncode == 0:
@@ -10,6 +10,8 @@ from ..utils import _checkTime
 from ..orbits import propagateUniversal
 from ..orbits import generateEphemerisUniversal
 from ..orbits import shiftOrbitsOrigin
+from ..orbits import propagateNBody
+from ..orbits.universal_ephemeris import _generateEphemerisFromStates
 from ..observatories import getObserverState
 from .backend import Backend
 
@@ -21,11 +23,44 @@ MJOLNIR_CONFIG = {
     "stellar_aberration" : False,
     "mu" : MU,
     "max_iter" : 1000,
-    "tol" : 1e-16
+    "tol" : 1e-16,
+    "dynamical_model" : "2",
+    "nbody_tol" : 1e-13
 }
 
 class MJOLNIR(Backend):
+    """
+    MJOLNIR: THOR's native backend.
 
+    With the 2-body dynamical model orbits are propagated with the universal anomaly formalism
+    (`~thor.orbits.propagateUniversal`). With the N-body dynamical model orbits are integrated
+    as test particles attracted by the Sun and the major planets (`~thor.orbits.propagateNBody`),
+    the positions of the planets are evaluated from state tables in use (see
+    `~thor.orbits.useStateTables`) or fit to states queried from SPICE. Ephemerides are
+    generated by integrating each orbit once through the observation times of every observatory.
+
+    Parameters
+    ----------
+    origin : {'heliocenter', 'barycenter'}, optional
+        Origin about which 2-body propagation is done. N-body integration is always
+        done in the barycentric frame.
+    light_time : bool, optional
+        Correct ephemerides for light travel time.
+    lt_tol : float, optional
+        Calculate light travel time to within this value in days.
+    stellar_aberration : bool, optional
+        Correct ephemerides for stellar aberration.
+    mu : float, optional
+        Gravitational parameter (GM) of the Sun in units of AU**3 / d**2.
+    max_iter : int, optional
+        Maximum number of iterations over which to converge the universal anomaly.
+    tol : float, optional
+        Numerical tolerance to which to compute the universal anomaly.
+    dynamical_model : {'2', 'N'}, optional
+        Propagate using 2 or N-body dynamics.
+    nbody_tol : float, optional
+        Relative and absolute error tolerance of each N-body integration step.
+    """
     def __init__(self, **kwargs):
         # Make sure only the correct kwargs
         # are passed to the constructor
@@ -40,6 +75,12 @@ class MJOLNIR(Backend):
             if k not in kwargs:
                 kwargs[k] = MJOLNIR_CONFIG[k]
 
+        if kwargs["dynamical_model"] not in ["2", "N"]:
+            err = (
+                "dynamical_model should be one of {'2', 'N'}"
+            )
+            raise ValueError(err)
+
         super().__init__(name="Mjolnir", **kwargs)
         return
 
@@ -52,46 +93,58 @@ class MJOLNIR(Backend):
         t0_tdb = orbits.epochs.tdb.mjd
         t1_tdb = t1.tdb.mjd
 
-        if self.origin == "barycenter":
-            # Shift orbits to barycenter
-            orbits_ = shiftOrbitsOrigin(
+        if self.dynamical_model == "N":
+            # Orbits are integrated in the barycentric frame and
+            # returned with heliocentric origin
+            propagated = propagateNBody(
                 orbits.cartesian,
-                orbits.epochs,
-                origin_in="heliocenter",
-                origin_out="barycenter"
+                t0_tdb,
+                t1_tdb,
+                mu=self.mu,
+                tol=self.nbody_tol
             )
 
-        elif self.origin == "heliocenter":
-            orbits_ = orbits.cartesian
-
         else:
-            err = (
-                "origin should be one of {'heliocenter', 'barycenter'}"
-            )
-            raise ValueError(err)
+            if self.origin == "barycenter":
+                # Shift orbits to barycenter
+                orbits_ = shiftOrbitsOrigin(
+                    orbits.cartesian,
+                    orbits.epochs,
+                    origin_in="heliocenter",
+                    origin_out="barycenter"
+                )
 
-        propagated = propagateUniversal(
-            orbits_,
-            t0_tdb,
-            t1_tdb,
-            mu=self.mu,
-            max_iter=self.max_iter,
-            tol=self.tol
-        )
+            elif self.origin == "heliocenter":
+                orbits_ = orbits.cartesian
 
-        if self.origin == "barycenter":
-            t1_tdb_stacked = Time(
-                propagated[:, 1],
-                scale="tdb",
-                format="mjd"
-            )
-            propagated[:, 2:] = shiftOrbitsOrigin(
-                propagated[:, 2:],
-                t1_tdb_stacked,
-                origin_in="barycenter",
-                origin_out="heliocenter"
+            else:
+                err = (
+                    "origin should be one of {'heliocenter', 'barycenter'}"
+                )
+                raise ValueError(err)
+
+            propagated = propagateUniversal(
+                orbits_,
+                t0_tdb,
+                t1_tdb,
+                mu=self.mu,
+                max_iter=self.max_iter,
+                tol=self.tol
             )
 
+            if self.origin == "barycenter":
+                t1_tdb_stacked = Time(
+                    propagated[:, 1],
+                    scale="tdb",
+                    format="mjd"
+                )
+                propagated[:, 2:] = shiftOrbitsOrigin(
+                    propagated[:, 2:],
+                    t1_tdb_stacked,
+                    origin_in="barycenter",
+                    origin_out="heliocenter"
+                )
+
         propagated = pd.DataFrame(
             propagated,
             columns=[
@@ -114,55 +167,67 @@ class MJOLNIR(Backend):
 
     def _generateEphemeris(self, orbits, observers):
 
-        observer_states_list = []
+        # Check that the observation times are astropy time objects
         for observatory_code, observation_times in observers.items():
-            # Check that the observation times are astropy time objects
             _checkTime(
                 observation_times,
                 "observation_times for observatory {}".format(observatory_code)
             )
 
-            # Get the observer state for observation times and append to list
-            observer_states = getObserverState(
-                [observatory_code],
-                observation_times
+        if self.dynamical_model == "N":
+            # Integrate each orbit once through the observation times of every observatory
+            # (light travel time is corrected for with 2-body propagation)
+            observation_times_tdb = np.concatenate([
+                observation_times.tdb.mjd for observation_times in observers.values()
+            ])
+            propagated = propagateNBody(
+                orbits.cartesian,
+                orbits.epochs.tdb.mjd,
+                observation_times_tdb,
+                mu=self.mu,
+                tol=self.nbody_tol
             )
-            observer_states_list.append(observer_states)
-
-        # Concatenate the dataframes
-        observer_states = pd.concat(observer_states_list)
-        observer_states.reset_index(
-            inplace=True,
-            drop=True
-        )
+            propagated = propagated.reshape(len(orbits), len(observation_times_tdb), 8)
 
         ephemeris_dfs = []
-        for observatory_code in observer_states["observatory_code"].unique():
+        offset = 0
+        for observatory_code, observation_times in observers.items():
+            # Get the observer state vectors for observation times
+            observer_selected = getObserverState(
+                [observatory_code],
+                observation_times,
+                as_numpy=True
+            )
 
-            observer_selected = observer_states[observer_states["observatory_code"].isin([observatory_code])]
-            observation_times = observers[observatory_code]
+            # Generate ephemeris for each orbit
+            if self.dynamical_model == "N":
+                ephemeris = _generateEphemerisFromStates(
+                    propagated[:, offset:offset + len(observation_times)].reshape(-1, 8),
+                    len(orbits),
+                    observer_selected,
+                    observation_times,
+                    light_time=self.light_time,
+                    lt_tol=self.lt_tol,
+                    stellar_aberration=self.stellar_aberration,
+                    mu=self.mu,
+                    max_iter=self.max_iter,
+                    tol=self.tol
+                )
+                offset += len(observation_times)
 
-            # Grab observer state vectors
-            cols = ["obs_x", "obs_y", "obs_z"]
-            velocity_cols =  ["obs_vx", "obs_vy", "obs_vz"]
-            if set(velocity_cols).intersection(set(observer_selected.columns)) == set(velocity_cols):
-                observer_selected = observer_selected[cols + velocity_cols].values
             else:
-                observer_selected = observer_selected[cols].values
-
-            # Generate ephemeris for each orbit
-            ephemeris = generateEphemerisUniversal(
-                orbits.cartesian,
-                orbits.epochs,
-                observer_selected,
-                observation_times,
-                light_time=self.light_time,
-                lt_tol=self.lt_tol,
-                stellar_aberration=self.stellar_aberration,
-                mu=self.mu,
-                max_iter=self.max_iter,
-                tol=self.tol
-            )
+                ephemeris = generateEphemerisUniversal(
+                    orbits.cartesian,
+                    orbits.epochs,
+                    observer_selected,
+                    observation_times,
+                    light_time=self.light_time,
+                    lt_tol=self.lt_tol,
+                    stellar_aberration=self.stellar_aberration,
+                    mu=self.mu,
+                    max_iter=self.max_iter,
+                    tol=self.tol
+                )
 
             ephemeris["observatory_code"] = [observatory_code for i in range(len(ephemeris))]
             ephemeris_dfs.append(ephemeris)
@@ -6,6 +6,9 @@ import pandas as pd
 from astropy.time import Time
 
 from ..utils import _checkTime
+from ..utils import getExecutor
+from ..utils import _checkParallel
+from ..utils import yieldChunks
 from .backend import Backend
 
 PYOORB_CONFIG = {
@@ -13,6 +16,42 @@ PYOORB_CONFIG = {
     "ephemeris_file" : "de430.dat"
 }
 
+def propagationChain_worker(orbits_pyoorb, epochs_pyoorb, backend):
+    """
+    Propagate orbits through a chain of epochs, each propagation starts
+    from the states at the previous epoch in the chain.
+
+    Parameters
+    ----------
+    orbits_pyoorb : `~numpy.ndarray` (N, 12)
+        Orbits in the format expected by PYOORB.
+    epochs_pyoorb : `~numpy.ndarray` (M, 2)
+        Epochs in the format expected by PYOORB, ordered away from the orbits' epoch.
+    backend : `~thor.backend.PYOORB`
+        Backend whose dynamical model to use.
+
+    Returns
+    -------
+    states : `~numpy.ndarray` (N, M, 6)
+        Propagated orbits at each epoch in the chain.
+    """
+    if not backend.is_setup:
+        backend.setup()
+
+    states = np.empty((len(orbits_pyoorb), len(epochs_pyoorb), 6))
+    orbits_pyoorb_i = np.asfortranarray(orbits_pyoorb)
+    for j, epoch in enumerate(epochs_pyoorb):
+        orbits_pyoorb_i, err = oo.pyoorb.oorb_propagation(
+            in_orbits=orbits_pyoorb_i,
+            in_epoch=epoch,
+            in_dynmodel=backend.dynamical_model
+        )
+        if err != 0:
+            warnings.warn("PYOORB returned error code: {}".format(err))
+        states[:, j, :] = orbits_pyoorb_i[:, 1:7]
+
+    return states
+
 class PYOORB(Backend):
 
     def __init__(self, **kwargs):
@@ -33,13 +72,23 @@ class PYOORB(Backend):
 
         return
 
+    def __getstate__(self):
+        # PYOORB is initialized per process: a worker receiving a copy of this
+        # backend has to initialize it again with this backend's ephemeris file
+        state = super().__getstate__()
+        state["is_setup"] = False
+        return state
+
     def setup(self):
         """
         Initialize PYOORB with the designated JPL ephemeris file.
 
         """
-        if "THOR_PYOORB" in os.environ.keys() and os.environ["THOR_PYOORB"] == "True":
-            pass
+        pid = os.getpid()
+        var_name = f"THOR_PYOORB_pid{pid}"
+
+        if os.environ.get(var_name) == self.ephemeris_file:
+            self.is_setup = True
         else:
             if os.environ.get("OORB_DATA") == None:
                 os.environ["OORB_DATA"] = os.path.join(os.environ["CONDA_PREFIX"], "share/openorb")
@@ -47,7 +96,7 @@ class PYOORB(Backend):
             ephfile = os.path.join(os.getenv('OORB_DATA'), self.ephemeris_file)
             err = oo.pyoorb.oorb_init(ephfile)
             if err == 0:
-                os.environ["THOR_PYOORB"] = "True"
+                os.environ[var_name] = self.ephemeris_file
                 self.is_setup = True
             else:
                 warnings.warn("PYOORB returned error code: {}".format(err))
@@ -212,56 +261,42 @@ class PYOORB(Backend):
         epochs_pyoorb = np.array(list(np.vstack([epochs, time_scale]).T), dtype=np.double, order='F')
         return epochs_pyoorb
 
-    def _propagateOrbits(self, orbits, t1):
+    def propagateStates(
+            self,
+            orbits,
+            t1,
+            chunk_size=100,
+            num_jobs=1,
+            parallel_backend="mp"
+        ):
         """
-        Propagate orbits using PYOORB.
+        Propagate each orbit in orbits to each time in t1 using PYOORB.
+
+        The unique epochs in t1 are sorted and, for each group of orbits whose epochs fall between the same
+        pair of epochs in t1, split into a forward chain (epochs at or after the orbits' epochs) and a backward
+        chain (epochs before them).
+        Along a chain each propagation starts from the previous epoch's states, while chains (and chunks
+        of orbits) are independent of each other and are distributed across workers.
 
         Parameters
         ----------
-        orbits : `~numpy.ndarray` (N, 6)
-            Orbits to propagate. See orbit_type for expected input format.
-        t0 : `~numpy.ndarray` (N)
-            Epoch in MJD at which the orbits are defined.
-        t1 : `~numpy.ndarray` (N)
-            Epoch in MJD to which to propagate the orbits.
-        orbit_type : {'cartesian', 'keplerian', 'cometary'}, optional
-            Heliocentric ecliptic J2000 orbital element representation of the provided orbits
-            If 'cartesian':
-                x : x-position [AU]
-                y : y-position [AU]
-                z : z-position [AU]
-                vx : x-velocity [AU per day]
-                vy : y-velocity [AU per day]
-                vz : z-velocity [AU per day]
-            If 'keplerian':
-                a : semi-major axis [AU]
-                e : eccentricity [degrees]
-                i : inclination [degrees]
-                Omega : longitude of the ascending node [degrees]
-                omega : argument of periapsis [degrees]
-                M0 : mean anomaly [degrees]
-            If 'cometary':
-                p : perihelion distance [AU]
-                e : eccentricity [degrees]
-                i : inclination [degrees]
-                Omega : longitude of the ascending node [degrees]
-                omega : argument of periapsis [degrees]
-                T0 : time of perihelion passage [degrees]
-        time_scale : {'UTC', 'UT1', 'TT', 'TAI'}, optional
-            Time scale of the MJD epochs.
-        magnitude : float or `~numpy.ndarray` (N), optional
-            Absolute H-magnitude or M1 magnitude.
-        slope : float or `~numpy.ndarray` (N), optional
-            Photometric slope parameter G or K1.
-        dynamical_model : {'N', '2'}, optional
-            Propagate using N or 2-body dynamics.
-        ephemeris_file : str, optional
-            Which JPL ephemeris file to use with PYOORB.
+        orbits : `~thor.orbits.orbits.Orbits`
+            Orbits to propagate.
+        t1 : `~astropy.time.core.Time` (M)
+            Times to which to propagate each orbit.
+        chunk_size : int, optional
+            Number of orbits to send to each job.
+        num_jobs : int, optional
+            Number of jobs to launch.
+        parallel_backend : str, optional
+            Which parallelization backend to use {'ray', 'mp', 'cf'}. Defaults to using Python's multiprocessing
+            module ('mp').
 
         Returns
         -------
-        propagated : `~pandas.DataFrame`
-            Orbits at new epochs.
+        states : `~numpy.ndarray` (N, M, 6)
+            Heliocentric ecliptic J2000 cartesian states of each orbit at each
+            time in t1 (in the same order as t1) in units of au and au per day.
         """
         if not self.is_setup:
             self.setup()
@@ -276,22 +311,84 @@ class PYOORB(Backend):
             orbits.G
         )
 
-        # Convert epochs into PYOORB format
-        epochs_pyoorb = self._configureEpochs(t1.tt.mjd, "TT")
-
-        # Propagate orbits to each epoch and append to list
-        # of new states
-        states = []
-        orbits_pyoorb_i = orbits_pyoorb.copy()
-        for epoch in epochs_pyoorb:
-            orbits_pyoorb_i, err = oo.pyoorb.oorb_propagation(
-                in_orbits=orbits_pyoorb_i,
-                in_epoch=epoch,
-                in_dynmodel=self.dynamical_model
-            )
-            states.append(orbits_pyoorb_i)
+        # Convert the sorted unique epochs into PYOORB format
+        epochs, inverse = np.unique(t1.tt.mjd, return_inverse=True)
+        epochs_pyoorb = self._configureEpochs(epochs, "TT")
+
+        # The chains of an orbit only depend on where its epoch falls among the epochs in t1, so
+        # orbits whose epochs fall between the same pair of epochs share their chains (PYOORB propagates
+        # each orbit from its own epoch to the first epoch of a chain)
+        splits = np.searchsorted(epochs, orbits_pyoorb[:, 8])
+        tasks = []
+        for split in np.unique(splits):
+            orbit_indices = np.where(splits == split)[0]
+            chains = [
+                np.arange(split, len(epochs)),
+                np.arange(split - 1, -1, -1)
+            ]
+            for orbit_indices_chunk in yieldChunks(orbit_indices, chunk_size):
+                for chain in chains:
+                    if len(chain) > 0:
+                        tasks.append((orbit_indices_chunk, chain))
+
+        parallel, num_workers = _checkParallel(num_jobs, parallel_backend)
+        if parallel:
+            if parallel_backend == "ray":
+                import ray
+                if not ray.is_initialized():
+                    ray.init(address="auto")
+
+                propagationChain_worker_ray = ray.remote(propagationChain_worker)
+                propagationChain_worker_ray = propagationChain_worker_ray.options(
+                    num_returns=1,
+                    num_cpus=1
+                )
+
+                p = []
+                for orbit_indices, chain in tasks:
+                    p.append(propagationChain_worker_ray.remote(orbits_pyoorb[orbit_indices], epochs_pyoorb[chain], self))
+                chain_states = ray.get(p)
+
+            else: # parallel_backend in ["mp", "cf"]
+                p = getExecutor(num_workers, parallel_backend)
+
+                chain_states = p.starmap(
+                    propagationChain_worker,
+                    [(orbits_pyoorb[orbit_indices], epochs_pyoorb[chain], self) for orbit_indices, chain in tasks]
+                )
+
+        else:
+            chain_states = [
+                propagationChain_worker(orbits_pyoorb[orbit_indices], epochs_pyoorb[chain], self)
+                for orbit_indices, chain in tasks
+            ]
+
+        states = np.empty((orbits.num_orbits, len(epochs), 6))
+        for (orbit_indices, chain), states_i in zip(tasks, chain_states):
+            states[orbit_indices[:, np.newaxis], chain] = states_i
+
+        # Expand the unique epochs back to t1's order (and duplicates)
+        if not np.array_equal(inverse, np.arange(len(epochs))):
+            states = states[:, inverse.ravel()]
+
+        return states
+
+    def _propagateOrbits(self, orbits, t1):
+        """
+        Propagate orbits using PYOORB.
+
+        Parameters
+        ----------
+        orbits : `~thor.orbits.orbits.Orbits`
+            Orbits to propagate.
+        t1 : `~astropy.time.core.Time` (M)
+            Times to which to propagate each orbit.
 
-        # Convert list of new states into a pandas data frame
+        Returns
+        -------
+        propagated : `~pandas.DataFrame`
+            Orbits at new epochs.
+        """
         if orbits.orbit_type == "cartesian":
             elements = ["x", "y", "z", "vx", "vy", "vz"]
         elif orbits.orbit_type == "keplerian":
@@ -301,49 +398,24 @@ class PYOORB(Backend):
         else:
             raise ValueError("orbit_type should be one of {'cartesian', 'keplerian', 'cometary'}")
 
-        # Create pandas data frame
-        columns = [
-            "orbit_id",
-            *elements,
-            "orbit_type",
-            "epoch_mjd",
-            "time_scale",
-            "H/M1",
-            "G/K1"
-        ]
-        propagated = pd.DataFrame(
-            np.concatenate(states),
-            columns=columns
+        # Propagate all orbits in a single forward and a single
+        # backward chain (per orbit epoch)
+        states = self.propagateStates(
+            orbits,
+            t1,
+            chunk_size=orbits.num_orbits,
         )
-        propagated["orbit_id"] = propagated["orbit_id"].astype(int)
 
-        # Convert output epochs to TDB
-        epochs = Time(
-            propagated["epoch_mjd"].values,
-            format="mjd",
-            scale="tt"
-        )
-        propagated["epoch_mjd_tdb"] = epochs.tdb.value
-
-        # Drop PYOORB specific columns (may want to consider this option later on.)
-        propagated.drop(
-            columns=[
-                "epoch_mjd",
-                "orbit_type",
-                "time_scale",
-                "H/M1",
-                "G/K1"
-            ],
-            inplace=True
-        )
-
-        # Re-order columns and sort
-        propagated = propagated[["orbit_id", "epoch_mjd_tdb"] + elements]
-        propagated.sort_values(
-            by=["orbit_id", "epoch_mjd_tdb"],
-            inplace=True,
-            ignore_index=True
+        # Sort by orbit and then by epoch
+        num_orbits, num_times = states.shape[:2]
+        epochs = t1.tdb.mjd
+        order = np.argsort(epochs, kind="stable")
+        propagated = pd.DataFrame(
+            states[:, order].reshape(-1, 6),
+            columns=elements
         )
+        propagated.insert(0, "orbit_id", np.repeat(np.arange(num_orbits), num_times))
+        propagated.insert(1, "epoch_mjd_tdb", np.tile(epochs[order], num_orbits))
 
         if orbits.ids is not None:
             propagated["orbit_id"] = orbits.ids[propagated["orbit_id"].values]
@@ -0,0 +1,44 @@
+import pytest
+import numpy as np
+from astropy.time import Time
+
+from ...orbits import Orbits
+from ..mjolnir import MJOLNIR
+
+def test_Backend_generateEphemeris_testOrbit_parallel():
+    rng = np.random.default_rng(42)
+    states = np.zeros((6, 6))
+    states[:, 0] = rng.uniform(2.0, 3.0, 6)
+    states[:, 4] = np.sqrt(0.0002959122082855911 / states[:, 0])
+    orbits = Orbits(
+        states,
+        Time(np.full(6, 59000.0), scale="tdb", format="mjd"),
+    )
+    observers = {
+        "I11" : Time(59000 + np.arange(5), scale="utc", format="mjd"),
+        "F51" : Time(59000.5 + np.arange(3), scale="utc", format="mjd"),
+    }
+
+    # Projecting ephemerides into a test orbit's frame is not yet implemented by
+    # TestOrbit.applyToEphemeris: the serial and parallel paths should both reach the
+    # projection and raise the same error
+    backend = MJOLNIR()
+    with pytest.raises(NotImplementedError):
+        backend.generateEphemeris(
+            orbits,
+            observers,
+            test_orbit=orbits[0:1],
+            num_jobs=1
+        )
+
+    for parallel_backend in ["mp", "cf"]:
+        with pytest.raises(NotImplementedError):
+            backend.generateEphemeris(
+                orbits,
+                observers,
+                test_orbit=orbits[0:1],
+                chunk_size=2,
+                num_jobs=2,
+                parallel_backend=parallel_backend
+            )
+    return
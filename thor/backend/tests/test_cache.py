@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from astropy.time import Time
+
+from ...orbits import Orbits
+from ..mjolnir import MJOLNIR
+from ..cache import EphemerisCache
+
+def createEphemeris(num_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "observatory_code" : "I11",
+        "mjd_utc" : 59000 + np.arange(num_rows),
+        "RA_deg" : rng.uniform(0, 360, num_rows),
+        "Dec_deg" : rng.uniform(-90, 90, num_rows),
+    })
+
+def test_EphemerisCache():
+    ephemeris = createEphemeris(10)
+    size = ephemeris.memory_usage(index=True, deep=True).sum()
+
+    # Room for two entries
+    cache = EphemerisCache(max_bytes=int(2.5 * size))
+    assert cache.get("a") is None
+    cache.put("a", ephemeris)
+    cache.put("b", ephemeris)
+    assert cache.get("a") is ephemeris
+
+    # b is the least recently used entry and should be evicted
+    cache.put("c", ephemeris)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is ephemeris
+    assert cache.get("c") is ephemeris
+    assert cache.hits == 3
+    assert cache.misses == 2
+    assert cache.evictions == 1
+    assert cache.num_bytes == 2 * size
+
+    # Entries larger than the memory budget are not kept in memory
+    cache.put("d", createEphemeris(100))
+    assert cache.get("d") is None
+    assert len(cache) == 2
+
+def test_EphemerisCache_directory(tmp_path):
+    ephemeris = createEphemeris(10)
+    size = ephemeris.memory_usage(index=True, deep=True).sum()
+
+    cache = EphemerisCache(max_bytes=int(1.5 * size), directory=str(tmp_path))
+    cache.put("a", ephemeris)
+    cache.put("b", ephemeris)
+    assert len(cache) == 1
+
+    # The evicted entry should be read from disk
+    pd.testing.assert_frame_equal(cache.get("a"), ephemeris)
+    assert cache.disk_hits == 1
+
+    # As should entries written by another cache (another process or a previous run)
+    cache_new = EphemerisCache(directory=str(tmp_path))
+    pd.testing.assert_frame_equal(cache_new.get("b"), ephemeris)
+    assert cache_new.hits == 1
+    assert cache_new.disk_hits == 1
+    assert cache_new.get("c") is None
+
+def test_Backend_cache():
+    rng = np.random.default_rng(42)
+    states = np.zeros((4, 6))
+    states[:, 0] = rng.uniform(2.0, 3.0, 4)
+    states[:, 4] = np.sqrt(0.0002959122082855911 / states[:, 0])
+    orbits = Orbits(
+        states,
+        Time(np.full(4, 59000.0), scale="tdb", format="mjd"),
+        ids=["a", "b", "b", "c"]
+    )
+    observers = {
+        "I11" : Time(59000 + np.arange(5), scale="utc", format="mjd"),
+        "F51" : Time(59000.5 + np.arange(3), scale="utc", format="mjd"),
+    }
+
+    backend = MJOLNIR()
+    ephemeris = backend.generateEphemeris(orbits, observers)
+
+    backend_cached = MJOLNIR()
+    backend_cached.cache = EphemerisCache()
+    ephemeris_cached = backend_cached.generateEphemeris(orbits, observers)
+    pd.testing.assert_frame_equal(ephemeris_cached, ephemeris)
+    assert backend_cached.cache.misses == 8
+    assert len(backend_cached.cache) == 8
+
+    # Only the new orbit should be sent to the backend
+    states_new = np.vstack([states, states[:1] * 1.1])
+    orbits_new = Orbits(
+        states_new,
+        Time(np.full(5, 59000.0), scale="tdb", format="mjd"),
+    )
+    ephemeris_new = backend_cached.generateEphemeris(orbits_new, observers)
+    pd.testing.assert_frame_equal(ephemeris_new, backend.generateEphemeris(orbits_new, observers))
+    assert backend_cached.cache.hits == 8
+    assert backend_cached.cache.misses == 10
+
+    # A backend with a different configuration should not find the cached ephemerides
+    backend_lt = MJOLNIR(light_time=False)
+    backend_lt.cache = backend_cached.cache
+    backend_lt.generateEphemeris(orbits, observers)
+    assert backend_cached.cache.hits == 8
+    assert backend_cached.cache.misses == 18
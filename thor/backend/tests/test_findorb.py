@@ -0,0 +1,67 @@
+import os
+import multiprocessing as mp
+
+from ..findorb import FINDORB_OUTPUT_FILES
+from ..findorb import FINDORB
+
+def createFindOrbHome(home):
+    # A home directory with a minimal ~/.find_orb: a configuration file, the
+    # DE 430 ephemeris file and the outputs of a previous find_orb run
+    find_orb_dir = os.path.join(home, ".find_orb")
+    os.makedirs(find_orb_dir)
+    for file_name in ["environ.dat", "linux_p1550p2650.430t"] + FINDORB_OUTPUT_FILES:
+        with open(os.path.join(find_orb_dir, file_name), "w") as f:
+            f.write("\n")
+    return
+
+def useWorkEnvironment():
+    backend = FINDORB()
+    temp_dir, env = backend._acquireWorkEnvironment()
+    backend._releaseWorkEnvironment((temp_dir, env))
+    return temp_dir
+
+def test_FINDORB_workEnvironment(tmp_path, monkeypatch):
+    home = str(tmp_path)
+    createFindOrbHome(home)
+    monkeypatch.setenv("HOME", home)
+
+    backend = FINDORB()
+    temp_dir, env = backend._acquireWorkEnvironment()
+    assert env["HOME"] == temp_dir
+    assert os.path.exists(os.path.join(temp_dir, ".find_orb", "environ.dat"))
+    assert os.path.islink(os.path.join(temp_dir, ".find_orb", "linux_p1550p2650.430t"))
+    for file_name in FINDORB_OUTPUT_FILES:
+        assert not os.path.exists(os.path.join(temp_dir, ".find_orb", file_name))
+
+    # Simulate the outputs of a find_orb call
+    for file_name in FINDORB_OUTPUT_FILES:
+        with open(os.path.join(temp_dir, ".find_orb", file_name), "w") as f:
+            f.write("\n")
+    os.makedirs(os.path.join(temp_dir, "od_o00000000"))
+
+    # Released work environments are reused without the previous call's outputs
+    backend._releaseWorkEnvironment((temp_dir, env))
+    temp_dir_reused, env_reused = backend._acquireWorkEnvironment()
+    assert temp_dir_reused == temp_dir
+    assert sorted(os.listdir(temp_dir)) == [".find_orb"]
+    assert sorted(os.listdir(os.path.join(temp_dir, ".find_orb"))) == ["environ.dat", "linux_p1550p2650.430t"]
+
+    backend._releaseWorkEnvironment((temp_dir_reused, env_reused))
+    return
+
+def test_FINDORB_workEnvironment_pool(tmp_path, monkeypatch):
+    home = str(tmp_path)
+    createFindOrbHome(home)
+    monkeypatch.setenv("HOME", home)
+
+    # Work environments created by pool workers should be removed when the workers exit (workers
+    # are spawned in the same way as those of `~thor.utils.getExecutor`)
+    pool = mp.get_context("spawn").Pool(processes=2)
+    temp_dirs = pool.starmap(useWorkEnvironment, [() for i in range(4)])
+    pool.close()
+    pool.join()
+
+    assert len(temp_dirs) == 4
+    for temp_dir in temp_dirs:
+        assert not os.path.exists(temp_dir)
+    return
@@ -1,8 +1,22 @@
 import numpy as np
 from astropy import units as u
 from astropy.coordinates import SkyCoord
+from scipy.spatial import cKDTree
 
-__all__ = ["Cell"]
+__all__ = [
+    "Cell",
+    "ExposureIndex"
+]
+
+def _calcUnitVectors(coords):
+    # Convert RA and Dec in degrees to unit vectors
+    ra = np.radians(coords[:, 0])
+    dec = np.radians(coords[:, 1])
+    return np.vstack([
+        np.cos(dec) * np.cos(ra),
+        np.cos(dec) * np.sin(ra),
+        np.sin(dec)
+    ]).T
 
 class Cell:
     """
@@ -60,4 +74,296 @@ class Cell:
         keep = obs_ids[np.where(distance <= np.sqrt(self.area / np.pi))[0]]
 
         self.observations = exp_observations[exp_observations["obs_id"].isin(keep)].copy()
-        return
\ No newline at end of file
+        return
+
+class ExposureIndex:
+    """
+    ExposureIndex: Spatial index of observations grouped by exposure. Built once
+    from a set of observations and then queried for the observations within a circular
+    region (cone) of a single exposure.
+
+    Observations are sorted by observatory code and observation time so that each
+    exposure occupies a contiguous block of rows. Each exposure's observations are converted to
+    unit vectors and a KD-tree is built (lazily, the first time the exposure is queried)
+    so that cone searches do not need to scan every observation in the exposure.
+
+    Parameters
+    ----------
+    observations : `~pandas.DataFrame`
+        Data frame containing observations with at minimum the following columns:
+        observation ID, exposure time in MJD, RA in degrees, Dec in degrees and the
+        observatory code.
+    tol : float, optional
+        Tolerance in units of days used when matching a time to an exposure.
+        [Default = 0.00001]
+    sort : bool, optional
+        Sort the observations by observatory code and observation time. If False, the observations
+        must already be sorted (with a default index) and are used as given rather than copied.
+
+    Returns
+    -------
+    None
+    """
+    def __init__(self, observations, tol=0.00001, sort=True):
+        if sort:
+            self.observations = observations.sort_values(
+                by=["observatory_code", "mjd_utc"],
+                kind="mergesort",
+                ignore_index=True
+            )
+        else:
+            self.observations = observations
+        self.tol = tol
+
+        codes = self.observations["observatory_code"].values
+        times = self.observations["mjd_utc"].values
+
+        # Find the row offsets at which each exposure starts
+        new_exposure = np.ones(len(self.observations), dtype=bool)
+        new_exposure[1:] = (codes[1:] != codes[:-1]) | (times[1:] != times[:-1])
+        starts = np.where(new_exposure)[0]
+        self.offsets = np.concatenate([starts, [len(self.observations)]])
+        self.exposure_codes = codes[starts]
+        self.exposure_times = times[starts]
+
+        # Map each observatory code to its block of exposures (sorted by time)
+        new_code = np.ones(len(starts), dtype=bool)
+        new_code[1:] = self.exposure_codes[1:] != self.exposure_codes[:-1]
+        code_starts = np.where(new_code)[0]
+        code_ends = np.concatenate([code_starts[1:], [len(starts)]])
+        self._code_ranges = {
+            code : (start, end) for code, start, end in zip(self.exposure_codes[code_starts], code_starts, code_ends)
+        }
+
+        self.unit_vectors = _calcUnitVectors(self.observations[["RA_deg", "Dec_deg"]].values)
+
+        self._trees = [None for i in range(len(starts))]
+        self._footprints = None
+        return
+
+    def __len__(self):
+        return len(self.observations)
+
+    def _getTree(self, i):
+        if self._trees[i] is None:
+            self._trees[i] = cKDTree(self.unit_vectors[self.offsets[i]:self.offsets[i + 1]])
+        return self._trees[i]
+
+    def buildTrees(self):
+        """
+        Build the KD-tree of every exposure. Trees are otherwise built lazily, building them
+        up front means copies of the index sent to workers do not need to rebuild them.
+
+        Returns
+        -------
+        None
+        """
+        for i in range(len(self._trees)):
+            self._getTree(i)
+        return
+
+    def findExposure(self, observatory_code, mjd_utc):
+        """
+        Find the exposure taken by observatory_code at mjd_utc.
+
+        Parameters
+        ----------
+        observatory_code : str
+            MPC observatory code.
+        mjd_utc : float
+            Exposure time in units of MJD.
+
+        Returns
+        -------
+        exposure : int
+            Index of the exposure, -1 if no exposure was found within
+            self.tol of mjd_utc.
+        """
+        if observatory_code not in self._code_ranges:
+            return -1
+
+        start, end = self._code_ranges[observatory_code]
+        i = start + np.searchsorted(self.exposure_times[start:end], mjd_utc - self.tol, side="left")
+        if i < end and self.exposure_times[i] <= mjd_utc + self.tol:
+            return i
+        return -1
+
+    def findExposures(self, observatory_codes, mjd_utc):
+        """
+        Find the exposures taken by each of observatory_codes at each of mjd_utc.
+
+        Parameters
+        ----------
+        observatory_codes : `~numpy.ndarray` (N)
+            MPC observatory codes.
+        mjd_utc : `~numpy.ndarray` (N)
+            Exposure times in units of MJD.
+
+        Returns
+        -------
+        exposures : `~numpy.ndarray` (N)
+            Index of each exposure, -1 if no exposure was found within
+            self.tol of mjd_utc.
+        """
+        observatory_codes = np.asarray(observatory_codes)
+        mjd_utc = np.asarray(mjd_utc, dtype=float)
+        exposures = np.full(len(mjd_utc), -1, dtype=int)
+        for code in np.unique(observatory_codes):
+            if code not in self._code_ranges:
+                continue
+
+            queries = np.where(observatory_codes == code)[0]
+            start, end = self._code_ranges[code]
+            i = start + np.searchsorted(self.exposure_times[start:end], mjd_utc[queries] - self.tol, side="left")
+            i_ = np.minimum(i, end - 1)
+            found = (i < end) & (self.exposure_times[i_] <= mjd_utc[queries] + self.tol)
+            exposures[queries[found]] = i[found]
+
+        return exposures
+
+    def calcFootprints(self, mask=None):
+        """
+        Calculate a circular footprint on the sky for each exposure: the mean direction
+        of the exposure's observations and the angular distance from it to the furthest observation.
+
+        Parameters
+        ----------
+        mask : `~numpy.ndarray` (N), optional
+            Boolean array with the same length as self.observations. Observations
+            for which the mask is False are not included in the footprints.
+
+        Returns
+        -------
+        centers : `~numpy.ndarray` (M, 3)
+            Unit vector of the center of each exposure's footprint.
+        radii : `~numpy.ndarray` (M)
+            Radius of each exposure's footprint in degrees, -1 if an exposure
+            has no observations.
+        """
+        if mask is None and self._footprints is not None:
+            return self._footprints
+
+        starts = self.offsets[:-1]
+        if len(starts) == 0:
+            return np.empty((0, 3)), np.empty(0)
+
+        weights = np.ones(len(self)) if mask is None else mask.astype(float)
+        sums = np.add.reduceat(self.unit_vectors * weights[:, np.newaxis], starts, axis=0)
+        norms = np.linalg.norm(sums, axis=1)
+        centers = sums / np.where(norms > 0, norms, 1)[:, np.newaxis]
+
+        exposures = np.repeat(np.arange(len(starts)), np.diff(self.offsets))
+        cos_distances = np.sum(self.unit_vectors * centers[exposures], axis=1)
+        distances = np.degrees(np.arccos(np.clip(cos_distances, -1, 1)))
+        distances[weights == 0] = -1
+        radii = np.maximum.reduceat(distances, starts)
+
+        if mask is None:
+            self._footprints = (centers, radii)
+        return centers, radii
+
+    def query(self, observatory_code, mjd_utc, center, radius, mask=None):
+        """
+        Find the observations within radius degrees of center in the
+        exposure taken by observatory_code at mjd_utc.
+
+        Parameters
+        ----------
+        observatory_code : str
+            MPC observatory code.
+        mjd_utc : float
+            Exposure time in units of MJD.
+        center : `~numpy.ndarray` (2)
+            RA and Dec of the center of the cone in degrees.
+        radius : float
+            Radius of the cone in degrees.
+        mask : `~numpy.ndarray` (N), optional
+            Boolean array with the same length as self.observations. Observations
+            for which the mask is False are never returned.
+
+        Returns
+        -------
+        indices : `~numpy.ndarray`
+            Sorted row indices into self.observations of the observations inside the cone.
+        """
+        i = self.findExposure(observatory_code, mjd_utc)
+        if i == -1:
+            return np.empty(0, dtype=int)
+
+        start = self.offsets[i]
+        center_vector = _calcUnitVectors(np.atleast_2d(center))[0]
+        # Convert the angular radius to a chord length between unit vectors
+        chord = 2 * np.sin(np.radians(radius) / 2)
+        indices = np.array(self._getTree(i).query_ball_point(center_vector, chord), dtype=int)
+        indices.sort()
+        indices += start
+
+        if mask is not None:
+            indices = indices[mask[indices]]
+        return indices
+
+    def queryBulk(self, observatory_codes, mjd_utc, coords, radius, mask=None):
+        """
+        Find the observations within radius degrees of each of a set of positions (for example
+        the predicted positions of many orbits). Positions are grouped by exposure
+        and each exposure's KD-tree is queried once with all the positions that fall on it.
+
+        Parameters
+        ----------
+        observatory_codes : `~numpy.ndarray` (N)
+            MPC observatory code of each position.
+        mjd_utc : `~numpy.ndarray` (N)
+            Exposure time of each position in units of MJD.
+        coords : `~numpy.ndarray` (N, 2)
+            RA and Dec of each position in degrees.
+        radius : float
+            Radius of the cone in degrees.
+        mask : `~numpy.ndarray` (M), optional
+            Boolean array with the same length as self.observations. Observations
+            for which the mask is False are never returned.
+
+        Returns
+        -------
+        query_indices : `~numpy.ndarray` (K)
+            Index of the position in each matched pair.
+        indices : `~numpy.ndarray` (K)
+            Row index into self.observations of the observation in each matched pair.
+        distances : `~numpy.ndarray` (K)
+            Angular distance between the position and the observation in degrees.
+        """
+        observatory_codes = np.asarray(observatory_codes)
+        mjd_utc = np.asarray(mjd_utc, dtype=float)
+        vectors = _calcUnitVectors(np.asarray(coords, dtype=float).reshape(-1, 2))
+        chord = 2 * np.sin(np.radians(radius) / 2)
+
+        query_indices = [np.empty(0, dtype=int)]
+        indices = [np.empty(0, dtype=int)]
+        for code in np.unique(observatory_codes):
+            queries_code = np.where(observatory_codes == code)[0]
+            times, inverse = np.unique(mjd_utc[queries_code], return_inverse=True)
+            queries_code = queries_code[np.argsort(inverse, kind="mergesort")]
+            splits = np.cumsum(np.bincount(inverse))[:-1]
+
+            for mjd_utc_i, queries in zip(times, np.split(queries_code, splits)):
+                i = self.findExposure(code, mjd_utc_i)
+                if i == -1:
+                    continue
+
+                neighbors = self._getTree(i).query_ball_point(vectors[queries], chord)
+                num_neighbors = np.array([len(n) for n in neighbors], dtype=int)
+                if num_neighbors.sum() == 0:
+                    continue
+
+                query_indices.append(np.repeat(queries, num_neighbors))
+                indices.append(np.concatenate(neighbors).astype(int) + self.offsets[i])
+
+        query_indices = np.concatenate(query_indices)
+        indices = np.concatenate(indices)
+        if mask is not None:
+            keep = mask[indices]
+            query_indices = query_indices[keep]
+            indices = indices[keep]
+
+        chords = np.linalg.norm(vectors[query_indices] - self.unit_vectors[indices], axis=1)
+        distances = np.degrees(2 * np.arcsin(np.minimum(chords / 2, 1.0)))
+        return query_indices, indices, distances
@@ -96,6 +96,98 @@ def filter_clusters_by_length(clusters, dt, min_samples, min_arc_length):
     return filtered_clusters
 
 
+def find_clusters_velocities(
+        x,
+        y,
+        dt,
+        vx,
+        vy,
+        eps,
+        min_samples,
+        min_arc_length,
+        alg="hotspot_2d"
+    ):
+    """
+    Find all clusters for a block of velocities. For each velocity (vx[i], vy[i])
+    the points are shifted by (x - vx[i] * dt, y - vy[i] * dt) and clustered. Clusters
+    are then filtered on the same conditions as `filter_clusters_by_length`.
+
+    Clusters from every velocity are returned in a compact form: members are stored
+    in a single flat array and each cluster's members are delimited by offsets into
+    that array.
+
+    Parameters
+    ----------
+    x : `~numpy.ndarray' (N)
+        Projection space x coordinate.
+    y : `~numpy.ndarray' (N)
+        Projection space y coordinate.
+    dt : `~numpy.ndarray' (N)
+        Change in time from the 0th exposure in units of MJD.
+    vx : `~numpy.ndarray' (M)
+        Projection space x velocities.
+    vy : `~numpy.ndarray' (M)
+        Projection space y velocities.
+    eps: float
+        The minimum distance between two points to be
+        used to establish that they are in the same cluster.
+    min_samples: int
+        The minumum number of points in a cluster.
+    min_arc_length: float
+        Minimum arc length in units of days for a cluster to be accepted.
+    alg: str
+        Algorithm to use. Can be "dbscan" or "hotspot_2d".
+
+    Returns
+    -------
+    velocity_ids : `~numpy.ndarray' (K)
+        Index into vx and vy of the velocity at which each cluster was found.
+    offsets : `~numpy.ndarray' (K + 1)
+        Offsets into members: the members of cluster k are
+        members[offsets[k]:offsets[k + 1]].
+    members : `~numpy.ndarray' (L)
+        Indexes into x, y and dt of every cluster member.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    dt = np.ascontiguousarray(dt, dtype=np.float64)
+    vx = np.ascontiguousarray(vx, dtype=np.float64)
+    vy = np.ascontiguousarray(vy, dtype=np.float64)
+
+    if len(x) == 0:
+        return (
+            np.empty(0, dtype=np.int64),
+            np.zeros(1, dtype=np.int64),
+            np.empty(0, dtype=np.int64)
+        )
+
+    if alg == "hotspot_2d":
+        return _hotspot_velocity_block(
+            x, y, dt, vx, vy, eps, min_samples, min_arc_length
+        )
+    elif alg == "dbscan":
+        velocity_ids = []
+        clusters = []
+        for i, (vxi, vyi) in enumerate(zip(vx, vy)):
+            points = np.stack((x - vxi * dt, y - vyi * dt), 1)
+            clusters_i = find_clusters(points, eps, min_samples, alg=alg)
+            clusters_i = filter_clusters_by_length(
+                clusters_i, dt, min_samples, min_arc_length
+            )
+            velocity_ids += [i for _ in range(len(clusters_i))]
+            clusters += clusters_i
+
+        offsets = np.zeros(len(clusters) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(c) for c in clusters])
+        if len(clusters) > 0:
+            members = np.concatenate(clusters).astype(np.int64)
+        else:
+            members = np.empty(0, dtype=np.int64)
+        return np.array(velocity_ids, dtype=np.int64), offsets, members
+    else:
+        raise NotImplementedError(f"algorithm '{alg}' is not implemented")
+
+
 def _find_clusters_hotspots_2d(points, eps, min_samples):
     """
     This algorithm works by quantizing points into a grid, with a resolution of
@@ -198,6 +290,87 @@ def _hotspot_multilabel(points, eps, min_samples):
     return final_labels
 
 
+@numba.njit
+def _hotspot_velocity_block(x, y, dt, vx, vy, eps, min_samples, min_arc_length):
+    """
+    Run the hotspot2d algorithm once per velocity in (vx, vy), reusing a single
+    buffer of shifted points. Clusters that pass the length and arc length
+    filters are appended to flat output arrays so that nothing ragged needs to
+    be returned to Python.
+    """
+    n = x.shape[0]
+    points = np.empty((2, n), dtype=np.float64)
+
+    velocity_ids = np.empty(16, dtype=np.int64)
+    offsets = np.zeros(17, dtype=np.int64)
+    members = np.empty(16 * max(min_samples, 1), dtype=np.int64)
+    n_clusters = 0
+    n_members = 0
+
+    for i in range(vx.shape[0]):
+        for j in range(n):
+            points[0, j] = x[j] - vx[i] * dt[j]
+            points[1, j] = y[j] - vy[i] * dt[j]
+
+        labels = _hotspot_multilabel(points, eps, min_samples)
+
+        # A stable sort keeps the members of each cluster in ascending order
+        order = np.argsort(labels, kind="mergesort")
+        start = 0
+        while start < n:
+            label = labels[order[start]]
+            end = start + 1
+            while end < n and labels[order[end]] == label:
+                end += 1
+
+            if label != -1:
+                cluster = order[start:end]
+                if _is_valid_cluster(cluster, dt, min_samples, min_arc_length):
+                    num_obs = end - start
+                    if n_clusters == velocity_ids.shape[0]:
+                        velocity_ids = _extend_1d_array(velocity_ids, velocity_ids.shape[0] * 2)
+                        offsets = _extend_1d_array(offsets, velocity_ids.shape[0] + 1)
+                    while n_members + num_obs > members.shape[0]:
+                        members = _extend_1d_array(members, members.shape[0] * 2)
+
+                    for k in range(num_obs):
+                        members[n_members + k] = cluster[k]
+                    n_members += num_obs
+                    velocity_ids[n_clusters] = i
+                    n_clusters += 1
+                    offsets[n_clusters] = n_members
+
+            start = end
+
+    return velocity_ids[:n_clusters], offsets[:n_clusters + 1], members[:n_members]
+
+
+@numba.njit
+def _is_valid_cluster(cluster, dt, min_samples, min_arc_length):
+    """
+    Numba equivalent of the conditions in filter_clusters_by_length for a single
+    cluster.
+    """
+    num_obs = cluster.shape[0]
+    if num_obs < min_samples:
+        return False
+
+    dt_in_cluster = np.sort(dt[cluster])
+    for i in range(1, num_obs):
+        if dt_in_cluster[i] == dt_in_cluster[i - 1]:
+            return False
+
+    return (dt_in_cluster[-1] - dt_in_cluster[0]) >= min_arc_length
+
+
+@numba.njit
+def _extend_1d_array(src, new_size):
+    dst = np.zeros(new_size, dtype=src.dtype)
+    for i in range(src.shape[0]):
+        dst[i] = src[i]
+    return dst
+
+
 @numba.njit(parallel=False)
 def _adjust_labels(labels, new_minimum):
     """
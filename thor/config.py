@@ -42,6 +42,7 @@ DEFAULT_CLUSTER_LINK_CONFIG = {
     "min_arc_length" : MIN_ARC_LENGTH,
     "num_jobs" : NUM_JOBS,
     "alg" : "hotspot_2d",
+    "chunk_size" : 1000,
     "parallel_backend" : PARALLEL_BACKEND
 }
 
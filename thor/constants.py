@@ -3,6 +3,7 @@ import numpy as np
 __all__ = [
     "KM_P_AU",
     "S_P_DAY",
+    "JD_J2000",
     "Constants",
     "DE43X",
     "DE44X",
@@ -12,6 +13,8 @@ __all__ = [
 KM_P_AU = 149597870.700
 # seconds in a day
 S_P_DAY = 86400.0
+# Julian date (TDB) of the J2000 epoch
+JD_J2000 = 2451545.0
 
 class _Constants:
 
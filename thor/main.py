@@ -6,14 +6,14 @@ import logging
 import shutil
 import numpy as np
 import pandas as pd
-import multiprocessing as mp
 from functools import partial
 from astropy.time import Time
 
 from .config import Config
 from .config import Configuration
-from .clusters import find_clusters, filter_clusters_by_length
-from .cell import Cell
+from .clusters import find_clusters, filter_clusters_by_length, find_clusters_velocities
+from .cell import ExposureIndex
+from .observations import ObservationStore
 from .orbit import TestOrbit
 from .orbits import Orbits
 from .orbits import generateEphemeris
@@ -21,8 +21,10 @@ from .orbits import initialOrbitDetermination
 from .orbits import differentialCorrection
 from .orbits import mergeAndExtendOrbits
 from .observatories import getObserverState
-from .utils import _initWorker
+from .utils import getExecutor
 from .utils import _checkParallel
+from .utils import yieldChunks
+from .utils import calcChunkSize
 
 os.environ['OPENBLAS_NUM_THREADS'] = '1'
 os.environ['MKL_NUM_THREADS'] = '1'
@@ -36,47 +38,45 @@ __all__ = [
     "clusterVelocity_worker",
     "clusterAndLink",
     "runTHOROrbit",
+    "runTHOROrbit_worker",
     "runTHOR",
 ]
 
-def rangeAndShift_worker(observations, ephemeris, cell_area=10):
+def rangeAndShift_worker(observations, ephemeris):
+    """
+    Transform and project observations gathered within a single exposure's cell into the frame
+    of motion of the test orbit.
+
+    Parameters
+    ----------
+    observations : `~pandas.DataFrame`
+        Observations within the cell (including the observer's heliocentric position).
+    ephemeris : `~pandas.DataFrame`
+        The test orbit's ephemeris at the time of the exposure.
 
+    Returns
+    -------
+    projected_observations : `~pandas.DataFrame`
+        Observations with columns containing projected coordinates.
+    """
     assert len(observations["mjd_utc"].unique()) == 1
     assert len(ephemeris["mjd_utc"].unique()) == 1
     assert observations["mjd_utc"].unique()[0] == ephemeris["mjd_utc"].unique()[0]
     observation_time = observations["mjd_utc"].unique()[0]
 
-    # Create Cell centered on the sky-plane location of the
-    # test orbit
-    cell = Cell(
-        ephemeris[["RA_deg", "Dec_deg"]].values[0],
-        observation_time,
-        area=cell_area,
+    # Create test orbit with state of orbit at visit time
+    test_orbit = TestOrbit(
+        ephemeris[["obj_x", "obj_y", "obj_z", "obj_vx", "obj_vy", "obj_vz"]].values[0],
+        observation_time
     )
 
-    # Grab observations within cell
-    cell.getObservations(observations)
-
-    if len(cell.observations) != 0:
-
-        # Create test orbit with state of orbit at visit time
-        test_orbit = TestOrbit(
-            ephemeris[["obj_x", "obj_y", "obj_z", "obj_vx", "obj_vy", "obj_vz"]].values[0],
-            observation_time
-        )
-
-        # Prepare rotation matrices
-        test_orbit.prepare()
-
-        # Apply rotation matrices and transform observations into the orbit's
-        # frame of motion.
-        test_orbit.applyToObservations(cell.observations)
-
-        projected_observations = cell.observations
-
-    else:
+    # Prepare rotation matrices
+    test_orbit.prepare()
 
-        projected_observations = pd.DataFrame()
+    # Apply rotation matrices and transform observations into the orbit's
+    # frame of motion.
+    projected_observations = observations.copy()
+    test_orbit.applyToObservations(projected_observations)
 
     return projected_observations
 
@@ -152,7 +152,6 @@ def clusterVelocity(
 def clusterVelocity_worker(
         vx,
         vy,
-        obs_ids=None,
         x=None,
         y=None,
         dt=None,
@@ -162,22 +161,30 @@ def clusterVelocity_worker(
         alg=None
     ):
     """
-    Helper function to multiprocess clustering.
+    Helper function to multiprocess clustering. Clusters a block
+    of velocities in a single call.
 
+    Returns
+    -------
+    velocity_ids : `~numpy.ndarray' (K)
+        Index into vx and vy of the velocity at which each cluster was found.
+    offsets : `~numpy.ndarray' (K + 1)
+        Offsets into members delimiting each cluster.
+    members : `~numpy.ndarray' (L)
+        Indexes into x, y and dt of every cluster member.
     """
-    cluster_ids = clusterVelocity(
-        obs_ids,
+    velocity_ids, offsets, members = find_clusters_velocities(
         x,
         y,
         dt,
         vx,
         vy,
-        eps=eps,
-        min_obs=min_obs,
-        min_arc_length=min_arc_length,
+        eps,
+        min_obs,
+        min_arc_length,
         alg=alg
     )
-    return cluster_ids
+    return velocity_ids, offsets, members
 
 def rangeAndShift(
         observations,
@@ -185,6 +192,7 @@ def rangeAndShift(
         cell_area=10,
         backend="PYOORB",
         backend_kwargs={},
+        exposure_index=None,
         num_jobs=1,
         parallel_backend="mp"
     ):
@@ -195,7 +203,7 @@ def rangeAndShift(
 
     Parameters
     ----------
-    observations : `~pandas.DataFrame`
+    observations : {`~pandas.DataFrame`, `~thor.observations.ObservationStore`}
         DataFrame containing preprocessed observations.
             Should contain the following columns:
                 obs_id : observation IDs
@@ -204,6 +212,8 @@ def rangeAndShift(
                 RA_sigma_deg : 1-sigma uncertainty for Right Ascension in degrees.
                 Dec_sigma_deg : 1-sigma uncertainty for Declination in degrees.
                 observatory_code : MPC observatory code
+        If an ObservationStore is given, observations that have already been linked
+        are ignored.
     orbit : `~numpy.ndarray` (6)
         Orbit to propagate. If backend is 'THOR', then these orbits must be expressed
         as heliocentric ecliptic cartesian elements. If backend is 'PYOORB' orbits may be
@@ -216,10 +226,14 @@ def rangeAndShift(
     backend_kwargs : dict, optional
         Settings and additional parameters to pass to selected
         backend.
+    exposure_index : `~thor.cell.ExposureIndex`, optional
+        Spatial index built from a superset of observations (for example, all preprocessed observations
+        when running many test orbits). Only observations that are also in observations are gathered.
+        If None, an index is built from observations.
     num_jobs : int, optional
         Number of jobs to launch.
     parallel_backend : str, optional
-        Which parallelization backend to use {'ray', 'mp'}. Defaults to using Python's multiprocessing
+        Which parallelization backend to use {'ray', 'mp', 'cf'}. Defaults to using Python's multiprocessing
         module ('mp').
 
     Returns
@@ -233,12 +247,29 @@ def rangeAndShift(
     logger.info("Assuming r = {} au".format(orbit.cartesian[0, :3]))
     logger.info("Assuming v = {} au per day".format(orbit.cartesian[0, 3:]))
 
+    if isinstance(observations, ObservationStore):
+        exposure_index = observations.exposure_index
+        mask = ~observations.linked
+    elif exposure_index is None:
+        exposure_index = ExposureIndex(observations)
+        mask = None
+    else:
+        mask = exposure_index.observations["obs_id"].isin(observations["obs_id"].values).values
+
+    # Only exposures which contain (unmasked) observations are needed
+    if mask is None:
+        exposures = np.ones(len(exposure_index.exposure_times), dtype=bool)
+    else:
+        exposures = np.logical_or.reduceat(mask, exposure_index.offsets[:-1]) if len(mask) > 0 else np.zeros(0, dtype=bool)
+    exposure_codes = exposure_index.exposure_codes[exposures]
+    exposure_times = exposure_index.exposure_times[exposures]
+
     # Build observers dictionary: keys are observatory codes with exposure times (as astropy.time objects)
     # as values
     observers = {}
-    for code in observations["observatory_code"].unique():
+    for code in np.unique(exposure_codes):
         observers[code] = Time(
-            observations[observations["observatory_code"].isin([code])]["mjd_utc"].unique(),
+            exposure_times[exposure_codes == code],
             format="mjd",
             scale="utc"
         )
@@ -276,21 +307,32 @@ def rangeAndShift(
     velocity_cols = []
     if backend != "PYOORB":
         velocity_cols = ["obs_vx", "obs_vy", "obs_vz"]
+    observer_cols = ["obs_x", "obs_y", "obs_z"] + velocity_cols
+
+    # At each exposure gather the observations within a circular region of size cell_area
+    # centered on the sky-plane location of the test orbit
+    radius = np.sqrt(cell_area / np.pi)
+    observations_split = []
+    ephemeris_split = []
+    for i in range(len(ephemeris)):
+        ephemeris_i = ephemeris.iloc[i:i + 1]
+        observatory_code, mjd_utc = ephemeris_i[["observatory_code", "mjd_utc"]].values[0]
+        indices = exposure_index.query(
+            observatory_code,
+            mjd_utc,
+            ephemeris_i[["RA_deg", "Dec_deg"]].values[0],
+            radius,
+            mask=mask
+        )
+        if len(indices) == 0:
+            continue
 
-    observations = observations.merge(
-        ephemeris[["mjd_utc", "observatory_code", "obs_x", "obs_y", "obs_z"] + velocity_cols],
-        left_on=["mjd_utc", "observatory_code"],
-        right_on=["mjd_utc", "observatory_code"]
-    )
-
-    # Split the observations into a single dataframe per unique observatory code and observation time
-    # Basically split the observations into groups of unique exposures
-    observations_grouped = observations.groupby(by=["observatory_code", "mjd_utc"])
-    observations_split = [observations_grouped.get_group(g) for g in observations_grouped.groups]
+        observations_i = exposure_index.observations.iloc[indices].copy()
+        for col in observer_cols:
+            observations_i[col] = ephemeris_i[col].values[0]
 
-    # Do the same for the test orbit's ephemerides
-    ephemeris_grouped = ephemeris.groupby(by=["observatory_code", "mjd_utc"])
-    ephemeris_split = [ephemeris_grouped.get_group(g) for g in ephemeris_grouped.groups]
+        observations_split.append(observations_i)
+        ephemeris_split.append(ephemeris_i)
 
     parallel, num_workers = _checkParallel(num_jobs, parallel_backend)
     if parallel:
@@ -310,41 +352,32 @@ def rangeAndShift(
                 p.append(
                     rangeAndShift_worker_ray.remote(
                         observations_i,
-                        ephemeris_i,
-                        cell_area=cell_area
+                        ephemeris_i
                     )
                 )
             projected_dfs = ray.get(p)
 
-        else: # parallel_backend == "mp"
-            p = mp.Pool(
-                processes=num_workers,
-                initializer=_initWorker,
-            )
+        else: # parallel_backend in ["mp", "cf"]
+            p = getExecutor(num_workers, parallel_backend)
             projected_dfs = p.starmap(
-                partial(
-                    rangeAndShift_worker,
-                    cell_area=cell_area
-                ),
+                rangeAndShift_worker,
                 zip(
                     observations_split,
                     ephemeris_split,
                 )
             )
-            p.close()
 
     else:
         projected_dfs = []
         for observations_i, ephemeris_i in zip(observations_split, ephemeris_split):
             projected_df = rangeAndShift_worker(
                 observations_i,
-                ephemeris_i,
-                cell_area=cell_area
+                ephemeris_i
             )
             projected_dfs.append(projected_df)
 
-    projected_observations = pd.concat(projected_dfs)
-    if len(projected_observations) > 0:
+    if len(projected_dfs) > 0:
+        projected_observations = pd.concat(projected_dfs)
         projected_observations.sort_values(by=["mjd_utc", "observatory_code"], inplace=True)
         projected_observations.reset_index(inplace=True, drop=True)
     else:
@@ -374,6 +407,7 @@ def clusterAndLink(
         min_obs=5,
         min_arc_length=1.0,
         alg="dbscan",
+        chunk_size=1000,
         num_jobs=1,
         parallel_backend="mp"
     ):
@@ -423,10 +457,13 @@ def clusterAndLink(
         [Default = 5]
     alg: str
         Algorithm to use. Can be "dbscan" or "hotspot_2d".
+    chunk_size : int, optional
+        Maximum number of velocities to send to each job. Each job clusters
+        its block of velocities in a single call.
     num_jobs : int, optional
         Number of jobs to launch.
     parallel_backend : str, optional
-        Which parallelization backend to use {'ray', 'mp'}. Defaults to using Python's multiprocessing
+        Which parallelization backend to use {'ray', 'mp', 'cf'}. Defaults to using Python's multiprocessing
         module ('mp').
 
     Returns
@@ -517,9 +554,17 @@ def clusterAndLink(
     logger.info("Max sample distance: {}".format(eps))
     logger.info("Minimum samples: {}".format(min_obs))
 
-    possible_clusters = []
+    num_velocities = len(vxx)
+    vxx = np.asarray(vxx, dtype=np.float64)
+    vyy = np.asarray(vyy, dtype=np.float64)
+
     parallel, num_workers = _checkParallel(num_jobs, parallel_backend)
     if parallel:
+        # Send blocks of up to chunk_size velocities to each worker so that the
+        # per-task overhead is paid once per block rather than once per velocity
+        chunk_size_ = calcChunkSize(num_velocities, num_workers, chunk_size, min_chunk_size=1)
+        velocity_offsets = np.arange(0, num_velocities, chunk_size_)
+
         if parallel_backend == "ray":
             import ray
             if not ray.is_initialized():
@@ -533,18 +578,16 @@ def clusterAndLink(
 
             # Put all arrays (which can be large) in ray's
             # local object store ahead of time
-            obs_ids_oid = ray.put(obs_ids)
             theta_x_oid = ray.put(theta_x)
             theta_y_oid = ray.put(theta_y)
             dt_oid = ray.put(dt)
 
             p = []
-            for vxi, vyi in zip(vxx, vyy):
+            for vxi, vyi in zip(yieldChunks(vxx, chunk_size_), yieldChunks(vyy, chunk_size_)):
                 p.append(
                     clusterVelocity_worker_ray.remote(
                         vxi,
                         vyi,
-                        obs_ids=obs_ids_oid,
                         x=theta_x_oid,
                         y=theta_y_oid,
                         dt=dt_oid,
@@ -554,18 +597,14 @@ def clusterAndLink(
                         alg=alg
                     )
                 )
-            possible_clusters = ray.get(p)
+            results = ray.get(p)
 
-        else: # parallel_backend == "mp"
+        else: # parallel_backend in ["mp", "cf"]
 
-            p = mp.Pool(
-                processes=num_workers,
-                initializer=_initWorker
-            )
-            possible_clusters = p.starmap(
+            p = getExecutor(num_workers, parallel_backend)
+            results = p.starmap(
                 partial(
                     clusterVelocity_worker,
-                    obs_ids=obs_ids,
                     x=theta_x,
                     y=theta_y,
                     dt=dt,
@@ -574,118 +613,84 @@ def clusterAndLink(
                     min_arc_length=min_arc_length,
                     alg=alg
                 ),
-                zip(vxx, vyy)
+                zip(
+                    yieldChunks(vxx, chunk_size_),
+                    yieldChunks(vyy, chunk_size_)
+                )
             )
-            p.close()
+
+        # Velocity IDs returned by each worker are relative to its block
+        velocity_ids = np.concatenate([r[0] + o for r, o in zip(results, velocity_offsets)])
+        members = np.concatenate([r[2] for r in results])
+        cluster_sizes = np.concatenate([np.diff(r[1]) for r in results])
+        offsets = np.zeros(len(cluster_sizes) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(cluster_sizes)
 
     else:
-        possible_clusters = []
-        for vxi, vyi in zip(vxx, vyy):
-            possible_clusters.append(
-                clusterVelocity(
-                    obs_ids,
-                    theta_x,
-                    theta_y,
-                    dt,
-                    vxi,
-                    vyi,
-                    eps=eps,
-                    min_obs=min_obs,
-                    min_arc_length=min_arc_length,
-                    alg=alg
-                )
-            )
+        velocity_ids, offsets, members = clusterVelocity_worker(
+            vxx,
+            vyy,
+            x=theta_x,
+            y=theta_y,
+            dt=dt,
+            eps=eps,
+            min_obs=min_obs,
+            min_arc_length=min_arc_length,
+            alg=alg
+        )
+
     time_end_cluster = time.time()
     logger.info("Clustering completed in {:.3f} seconds.".format(time_end_cluster - time_start_cluster))
 
     logger.info("Restructuring clusters...")
     time_start_restr = time.time()
 
-    possible_clusters = pd.DataFrame({"clusters": possible_clusters})
-
-    # Remove empty clusters
-    possible_clusters = possible_clusters[~possible_clusters["clusters"].isna()]
-
-    if len(possible_clusters) != 0:
-        ### The following code is a little messy, its a lot of pandas dataframe manipulation.
-        ### I have tried doing an overhaul wherein the clusters and cluster_members dataframe are created per
-        ### velocity combination in the clusterVelocity function. However, this adds an overhead in that function
-        ### of ~ 1ms. So clustering 90,000 velocities takes 90 seconds longer which on small datasets is problematic.
-        ### On large datasets, the effect is not as pronounced because the below code takes a while to run due to
-        ### in-memory pandas dataframe restructuring.
-
-        # Make DataFrame with cluster velocities so we can figure out which
-        # velocities yielded clusters, add names to index so we can enable the join
-        cluster_velocities = pd.DataFrame({"vtheta_x": vxx, "vtheta_y": vyy})
-        cluster_velocities.index.set_names("velocity_id", inplace=True)
-
-        # Split lists of cluster ids into one column per cluster for each different velocity
-        # then stack the result
-        possible_clusters = pd.DataFrame(
-            possible_clusters["clusters"].values.tolist(),
-            index=possible_clusters.index
-        )
-        possible_clusters = pd.DataFrame(possible_clusters.stack())
-        possible_clusters.rename(
-            columns={0: "obs_ids"},
-            inplace=True
-        )
-        possible_clusters = pd.DataFrame(possible_clusters["obs_ids"].values.tolist(), index=possible_clusters.index)
-
-        # Drop duplicate clusters
-        possible_clusters.drop_duplicates(inplace=True)
-
-        # Set index names
-        possible_clusters.index.set_names(["velocity_id", "cluster_id"], inplace=True)
-
-        # Reset index
-        possible_clusters.reset_index(
-            "cluster_id",
-            drop=True,
-            inplace=True
-        )
-        possible_clusters["cluster_id"] = [str(uuid.uuid4().hex) for i in range(len(possible_clusters))]
-
-        # Make clusters DataFrame
-        clusters = possible_clusters.join(cluster_velocities)
-        clusters.reset_index(drop=True, inplace=True)
-        clusters = clusters[["cluster_id", "vtheta_x", "vtheta_y"]]
-
-        # Make cluster_members DataFrame
-        cluster_members = possible_clusters.reset_index(drop=True).copy()
-        cluster_members.index = cluster_members["cluster_id"]
-        cluster_members.drop("cluster_id", axis=1, inplace=True)
-        cluster_members = pd.DataFrame(cluster_members.stack())
-        cluster_members.rename(columns={0: "obs_id"}, inplace=True)
-        cluster_members.reset_index(inplace=True)
-        cluster_members.drop("level_1", axis=1, inplace=True)
-
-        # Calculate arc length and add it to the clusters dataframe
-        cluster_members_time = cluster_members.merge(
-            observations[["obs_id", "mjd_utc"]],
-            on="obs_id",
-            how="left"
-        )
-        clusters_time = cluster_members_time.groupby(
-            by=["cluster_id"])["mjd_utc"].apply(lambda x: x.max() - x.min()).to_frame()
-        clusters_time.reset_index(
-            inplace=True
-        )
-        clusters_time.rename(
-            columns={"mjd_utc" : "arc_length"},
-            inplace=True
-        )
-        clusters = clusters.merge(
-            clusters_time[["cluster_id", "arc_length"]],
-            on="cluster_id",
-            how="left",
-        )
+    if len(velocity_ids) != 0:
+        # Clusters are stored in CSR form: the members of cluster k are
+        # members[offsets[k]:offsets[k + 1]] and were found at velocity velocity_ids[k]
+        starts = offsets[:-1]
+        num_obs = np.diff(offsets)
+        cluster_index = np.repeat(np.arange(len(velocity_ids)), num_obs)
+
+        # Drop duplicate clusters: hash each member set by summing a pair of random 64-bit
+        # keys assigned to each observation (the sum does not depend on the order of the members),
+        # and keep the first cluster found with each (num_obs, hash) signature
+        rng = np.random.default_rng(seed=len(obs_ids))
+        keys = rng.integers(0, 2**64, size=(2, len(obs_ids)), dtype=np.uint64)
+        signatures = np.vstack([
+            num_obs.astype(np.uint64),
+            np.add.reduceat(keys[0][members], starts),
+            np.add.reduceat(keys[1][members], starts),
+        ])
+        _, first = np.unique(signatures, axis=1, return_index=True)
+        keep = np.zeros(len(velocity_ids), dtype=bool)
+        keep[first] = True
+
+        # Calculate arc length of each cluster
+        mjd_members = mjd[members]
+        arc_length = np.maximum.reduceat(mjd_members, starts) - np.minimum.reduceat(mjd_members, starts)
+
+        velocity_ids = velocity_ids[keep]
+        num_obs = num_obs[keep]
+        arc_length = arc_length[keep]
+        members = members[keep[cluster_index]]
+
+        cluster_ids = np.array([str(uuid.uuid4().hex) for i in range(len(velocity_ids))])
+        clusters = pd.DataFrame({
+            "cluster_id" : cluster_ids,
+            "vtheta_x" : vxx[velocity_ids],
+            "vtheta_y" : vyy[velocity_ids],
+            "arc_length" : arc_length
+        })
+        cluster_members = pd.DataFrame({
+            "cluster_id" : np.repeat(cluster_ids, num_obs),
+            "obs_id" : obs_ids[members]
+        })
 
     else:
         cluster_members = pd.DataFrame(columns=["cluster_id", "obs_id"])
         clusters = pd.DataFrame(columns=["cluster_id", "vtheta_x", "vtheta_y", "arc_length"])
 
-
     time_end_restr = time.time()
     logger.info("Restructuring completed in {:.3f} seconds.".format(time_end_restr - time_start_restr))
     logger.info("Found {} clusters.".format(len(clusters)))
@@ -693,6 +698,12 @@ def clusterAndLink(
 
     return clusters, cluster_members
 
+def _mapObservationIDs(df, func):
+    # Return a copy of df with func applied to its observation IDs
+    df = df.copy()
+    df["obs_id"] = func(df["obs_id"].values)
+    return df
+
 def runTHOROrbit(
         preprocessed_observations,
         orbit,
@@ -708,6 +719,15 @@ def runTHOROrbit(
     logger = logging.getLogger("thor")
     logger.setLevel(logging_level)
 
+    # If the observations' IDs have been interned, the original IDs are restored
+    # when writing results and interned again when reading them
+    if isinstance(preprocessed_observations, ObservationStore):
+        internIDs = preprocessed_observations.internIDs
+        restoreIDs = preprocessed_observations.restoreIDs
+    else:
+        internIDs = np.asarray
+        restoreIDs = np.asarray
+
     # Build the configuration class which stores the run parameters
     config = Configuration(
         range_shift_config=range_shift_config,
@@ -831,7 +851,7 @@ def runTHOROrbit(
                 **range_shift_config
             )
             if out_dir is not None:
-                projected_observations.to_csv(
+                _mapObservationIDs(projected_observations, restoreIDs).to_csv(
                     os.path.join(out_dir, "projected_observations.csv"),
                     index=False,
                     float_format="%.15e"
@@ -840,11 +860,14 @@ def runTHOROrbit(
 
         else:
             logger.info("Range and shift completed previously.")
-            projected_observations = pd.read_csv(
-                os.path.join(out_dir, "projected_observations.csv"),
-                index_col=False,
-                dtype={"obs_id" : str},
-                float_precision="round_trip"
+            projected_observations = _mapObservationIDs(
+                pd.read_csv(
+                    os.path.join(out_dir, "projected_observations.csv"),
+                    index_col=False,
+                    dtype={"obs_id" : str},
+                    float_precision="round_trip"
+                ),
+                internIDs
             )
             logger.debug("Read projected_observations.csv.")
 
@@ -867,7 +890,7 @@ def runTHOROrbit(
                 )
                 logger.debug("Saved clusters.csv.")
 
-                cluster_members.to_csv(
+                _mapObservationIDs(cluster_members, restoreIDs).to_csv(
                     os.path.join(out_dir, "cluster_members.csv"),
                     index=False,
                     float_format="%.15e"
@@ -881,11 +904,14 @@ def runTHOROrbit(
             )
             logger.debug("Read clusters.csv.")
 
-            cluster_members = pd.read_csv(
-                os.path.join(out_dir, "cluster_members.csv"),
-                index_col=False,
-                dtype={"obs_id" : str},
-                float_precision="round_trip"
+            cluster_members = _mapObservationIDs(
+                pd.read_csv(
+                    os.path.join(out_dir, "cluster_members.csv"),
+                    index_col=False,
+                    dtype={"obs_id" : str},
+                    float_precision="round_trip"
+                ),
+                internIDs
             )
             logger.debug("Read cluster_members.csv.")
 
@@ -907,7 +933,7 @@ def runTHOROrbit(
                 )
                 logger.debug("Saved iod_orbits.csv.")
 
-                iod_orbit_members.to_csv(
+                _mapObservationIDs(iod_orbit_members, restoreIDs).to_csv(
                     os.path.join(out_dir, "iod_orbit_members.csv"),
                     index=False,
                     float_format="%.15e"
@@ -920,11 +946,14 @@ def runTHOROrbit(
             ).to_df(include_units=False)
             logger.debug("Read iod_orbits.csv.")
 
-            iod_orbit_members = pd.read_csv(
-                os.path.join(out_dir, "iod_orbit_members.csv"),
-                index_col=False,
-                dtype={"obs_id" : str},
-                float_precision="round_trip"
+            iod_orbit_members = _mapObservationIDs(
+                pd.read_csv(
+                    os.path.join(out_dir, "iod_orbit_members.csv"),
+                    index_col=False,
+                    dtype={"obs_id" : str},
+                    float_precision="round_trip"
+                ),
+                internIDs
             )
             logger.debug("Read iod_orbit_members.csv.")
 
@@ -956,7 +985,7 @@ def runTHOROrbit(
                 )
                 logger.debug("Saved od_orbits.csv.")
 
-                od_orbit_members.to_csv(
+                _mapObservationIDs(od_orbit_members, restoreIDs).to_csv(
                     os.path.join(out_dir, "od_orbit_members.csv"),
                     index=False,
                     float_format="%.15e"
@@ -969,11 +998,14 @@ def runTHOROrbit(
             ).to_df(include_units=False)
             logger.debug("Read od_orbits.csv.")
 
-            od_orbit_members = pd.read_csv(
-                os.path.join(out_dir, "od_orbit_members.csv"),
-                index_col=False,
-                dtype={"obs_id" : str},
-                float_precision="round_trip"
+            od_orbit_members = _mapObservationIDs(
+                pd.read_csv(
+                    os.path.join(out_dir, "od_orbit_members.csv"),
+                    index_col=False,
+                    dtype={"obs_id" : str},
+                    float_precision="round_trip"
+                ),
+                internIDs
             )
             logger.debug("Read od_orbit_members.csv.")
 
@@ -1005,7 +1037,7 @@ def runTHOROrbit(
                 )
                 logger.debug("Saved recovered_orbits.csv.")
 
-                recovered_orbit_members.to_csv(
+                _mapObservationIDs(recovered_orbit_members, restoreIDs).to_csv(
                     os.path.join(out_dir, "recovered_orbit_members.csv"),
                     index=False,
                     float_format="%.15e"
@@ -1018,11 +1050,14 @@ def runTHOROrbit(
             ).to_df(include_units=False)
             logger.debug("Read recovered_orbits.csv.")
 
-            recovered_orbit_members = pd.read_csv(
-                os.path.join(out_dir, "recovered_orbit_members.csv"),
-                index_col=False,
-                dtype={"obs_id" : str},
-                float_precision="round_trip"
+            recovered_orbit_members = _mapObservationIDs(
+                pd.read_csv(
+                    os.path.join(out_dir, "recovered_orbit_members.csv"),
+                    index_col=False,
+                    dtype={"obs_id" : str},
+                    float_precision="round_trip"
+                ),
+                internIDs
             )
             logger.debug("Read recovered_orbit_members.csv.")
 
@@ -1040,17 +1075,61 @@ def runTHOROrbit(
         ).to_df(include_units=False)
         logger.debug("Read recovered_orbits.csv.")
 
-        recovered_orbit_members = pd.read_csv(
-            os.path.join(out_dir, "recovered_orbit_members.csv"),
-            index_col=False,
-            dtype={"obs_id" : str},
-            float_precision="round_trip"
+        recovered_orbit_members = _mapObservationIDs(
+            pd.read_csv(
+                os.path.join(out_dir, "recovered_orbit_members.csv"),
+                index_col=False,
+                dtype={"obs_id" : str},
+                float_precision="round_trip"
+            ),
+            internIDs
         )
         logger.debug("Read recovered_orbit_members.csv.")
 
     logger.removeHandler(file_handler)
     return recovered_orbits, recovered_orbit_members
 
+def runTHOROrbit_worker(
+        preprocessed_observations,
+        orbit,
+        range_shift_config,
+        cluster_link_config,
+        iod_config,
+        od_config,
+        odp_config,
+        out_dir=None,
+        if_exists="continue",
+        logging_level=logging.INFO
+    ):
+    """
+    Helper function to process test orbits in parallel. Runs THOR
+    for a single test orbit and times it.
+
+    Returns
+    -------
+    recovered_orbits : `~pandas.DataFrame`
+        Orbits recovered with this test orbit.
+    recovered_orbit_members : `~pandas.DataFrame`
+        The observations that belong to each recovered orbit.
+    processing_time : float
+        Time taken to process the test orbit in seconds.
+    """
+    time_start = time.time()
+    recovered_orbits, recovered_orbit_members = runTHOROrbit(
+        preprocessed_observations,
+        orbit,
+        range_shift_config=range_shift_config,
+        cluster_link_config=cluster_link_config,
+        iod_config=iod_config,
+        od_config=od_config,
+        odp_config=odp_config,
+        out_dir=out_dir,
+        if_exists=if_exists,
+        logging_level=logging_level
+    )
+    time_end = time.time()
+    return recovered_orbits, recovered_orbit_members, time_end - time_start
+
 def runTHOR(
         preprocessed_observations,
         test_orbits,
@@ -1061,8 +1140,39 @@ def runTHOR(
         odp_config=Config.ODP_CONFIG,
         out_dir=None,
         if_exists="continue",
-        logging_level=logger.info
+        logging_level=logger.info,
+        num_jobs=1,
+        parallel_backend="mp",
+        linked_policy="drop"
     ):
+    """
+    Run THOR on each test orbit. Observations linked into orbits by a test orbit
+    are not available to subsequent test orbits.
+
+    Test orbits can be processed concurrently (num_jobs > 1): each worker runs every
+    stage for a single test orbit (with num_jobs set to 1 for each stage) and the results are
+    gathered in test orbit order. Since test orbits that run concurrently cannot see each other's linked
+    observations, all test orbits use the linked observations as of the start of the run.
+    How the results are combined is then set by linked_policy:
+        'snapshot' : keep every recovered orbit even if its observations were also linked
+            by a preceding test orbit.
+        'drop' : discard any recovered orbit that contains an observation linked by a preceding
+            test orbit (in test orbit order). Whole orbits are discarded, so this is lossy: an orbit that
+            the sequential run would have recovered from the remaining observations is not recovered.
+
+    Parameters
+    ----------
+    num_jobs : int, optional
+        Number of test orbits to process concurrently. If 1, test orbits
+        are processed sequentially.
+    parallel_backend : str, optional
+        Which parallelization backend to use {'ray', 'mp', 'cf'} to process test orbits.
+        Defaults to using Python's multiprocessing module ('mp'). Observations are shared
+        with workers via shared memory so ray workers need to run on the same node.
+    linked_policy : str, optional
+        How to combine the linked observations of concurrently processed test orbits
+        {'snapshot', 'drop'}.
+    """
     logger.setLevel(logging_level)
 
     # Connect to ray cluster if enabled
@@ -1244,101 +1354,194 @@ def runTHOR(
         id_offset = len(orbits_completed)
 
     if len(test_orbits_split) != 0:
-        for i, orbit_i in enumerate(test_orbits_split):
-
-            time_start = time.time()
-            orbit_id = "{:08d}".format(i + id_offset)
-
-            logger.info("Processing orbit {} ({}/{})...".format(orbit_id, i + 1 + id_offset, num_orbits))
-
+        # Store the observations once, each test orbit consults the store's bitmap of
+        # linked observations instead of receiving a filtered copy of the observations. Observation
+        # IDs are interned: every stage works on integer IDs (which are also the rows of the store's bitmap)
+        # and the original IDs are restored when results are written
+        observation_store = ObservationStore(preprocessed_observations, intern_ids=True)
+        futures = []
+        try:
+            observation_store.markLinked(observation_store.internIDs(obs_ids_linked))
+
+            orbit_ids = ["{:08d}".format(i + id_offset) for i in range(len(test_orbits_split))]
             if out_dir is not None:
-                orbit_dir = os.path.join(out_dir, "orbit_{}".format(orbit_id))
+                orbit_dirs = [os.path.join(out_dir, "orbit_{}".format(orbit_id)) for orbit_id in orbit_ids]
             else:
-                orbit_dir = None
-
-            linked_mask = (~preprocessed_observations["obs_id"].isin(obs_ids_linked))
-
-            recovered_orbits_i, recovered_orbit_members_i = runTHOROrbit(
-                preprocessed_observations[linked_mask],
-                orbit_i,
-                range_shift_config=range_shift_config,
-                cluster_link_config=cluster_link_config,
-                iod_config=iod_config,
-                od_config=od_config,
-                odp_config=odp_config,
-                out_dir=orbit_dir,
-                if_exists=if_exists_,
-                logging_level=logging_level
-            )
+                orbit_dirs = [None for orbit_id in orbit_ids]
 
-            time_end = time.time()
+            parallel, num_workers = _checkParallel(num_jobs, parallel_backend)
+            if parallel:
+                if linked_policy not in ["snapshot", "drop"]:
+                    err = (
+                        "linked_policy should be one of {'snapshot', 'drop'}."
+                    )
+                    raise ValueError(err)
+
+                # Test orbits are processed concurrently so each stage of each test orbit
+                # runs with a single job
+                stage_configs = []
+                for conf in configs:
+                    conf = conf.copy()
+                    conf["num_jobs"] = 1
+                    stage_configs.append(conf)
+
+                logger.info("Processing {} test orbits with {} workers (linked policy: {})...".format(
+                    len(test_orbits_split),
+                    num_workers,
+                    linked_policy
+                ))
+
+                # Every test orbit sees the linked observations as of the start of the run (the store's bitmap
+                # is only updated once all test orbits have completed).
+                linked = observation_store.linked.copy()
+
+                if parallel_backend == "ray":
+                    import ray
+                    if not ray.is_initialized():
+                        ray.init(address="auto")
+
+                    runTHOROrbit_worker_ray = ray.remote(runTHOROrbit_worker)
+                    runTHOROrbit_worker_ray = runTHOROrbit_worker_ray.options(
+                        num_returns=1,
+                        num_cpus=1
+                    )
 
-            if len(recovered_orbits_i) > 0:
-                recovered_orbits_i.insert(0, "test_orbit_id", orbit_id)
-                recovered_orbit_members_i.insert(0, "test_orbit_id", orbit_id)
-                obs_ids_linked_i = recovered_orbit_members_i["obs_id"].unique()
-                obs_ids_linked = np.concatenate([obs_ids_linked, obs_ids_linked_i])
+                    for orbit_i, orbit_dir in zip(test_orbits_split, orbit_dirs):
+                        futures.append(
+                            runTHOROrbit_worker_ray.remote(
+                                observation_store,
+                                orbit_i,
+                                *stage_configs,
+                                out_dir=orbit_dir,
+                                if_exists=if_exists_,
+                                logging_level=logging_level
+                            )
+                        )
+                    results = (ray.get(future) for future in futures)
+
+                else: # parallel_backend in ["mp", "cf"]
+                    # The process-wide executor is shared by all test orbits
+                    pool = getExecutor(num_workers, parallel_backend)
+                    for orbit_i, orbit_dir in zip(test_orbits_split, orbit_dirs):
+                        futures.append(
+                            pool.apply_async(
+                                runTHOROrbit_worker,
+                                (observation_store, orbit_i, *stage_configs),
+                                dict(
+                                    out_dir=orbit_dir,
+                                    if_exists=if_exists_,
+                                    logging_level=logging_level
+                                )
+                            )
+                        )
+                    results = (future.get() for future in futures)
 
-                orbits_recovered = len(recovered_orbits_i)
-                observations_linked = len(obs_ids_linked_i)
             else:
-                orbits_recovered = 0
-                observations_linked = 0
+                stage_configs = configs
+                results = (
+                    runTHOROrbit_worker(
+                        observation_store,
+                        orbit_i,
+                        *stage_configs,
+                        out_dir=orbit_dir,
+                        if_exists=if_exists_,
+                        logging_level=logging_level
+                    ) for orbit_i, orbit_dir in zip(test_orbits_split, orbit_dirs)
+                )
 
-            test_orbit_i = orbit_i.to_df(include_units=False)
-            test_orbit_i["test_orbit_id"] = orbit_id
-            test_orbit_i["orbits_recovered"] = orbits_recovered
-            test_orbit_i["observations_linked"] = observations_linked
-            test_orbit_i["processing_time"] = time_end - time_start
-            test_orbit_dfs.append(test_orbit_i)
+            # Results are gathered in test orbit order
+            for i, (orbit_i, orbit_id, result) in enumerate(zip(test_orbits_split, orbit_ids, results)):
+
+                recovered_orbits_i, recovered_orbit_members_i, processing_time = result
+
+                if parallel and linked_policy == "drop" and len(recovered_orbits_i) > 0:
+                    # Remove any recovered orbits that contain observations already linked by
+                    # a preceding test orbit
+                    conflicts = linked[recovered_orbit_members_i["obs_id"].values]
+                    orbits_remove = recovered_orbit_members_i[conflicts]["orbit_id"].unique()
+                    if len(orbits_remove) > 0:
+                        logger.info("Removing {} recovered orbits that share observations with preceding test orbits.".format(len(orbits_remove)))
+                        recovered_orbits_i = recovered_orbits_i[~recovered_orbits_i["orbit_id"].isin(orbits_remove)].reset_index(drop=True)
+                        recovered_orbit_members_i = recovered_orbit_members_i[~recovered_orbit_members_i["orbit_id"].isin(orbits_remove)].reset_index(drop=True)
+
+                if len(recovered_orbits_i) > 0:
+                    recovered_orbits_i.insert(0, "test_orbit_id", orbit_id)
+                    recovered_orbit_members_i.insert(0, "test_orbit_id", orbit_id)
+                    obs_ids_linked_i = recovered_orbit_members_i["obs_id"].unique()
+                    if parallel:
+                        linked[obs_ids_linked_i] = True
+                    else:
+                        observation_store.markLinked(obs_ids_linked_i)
+                    recovered_orbit_members_i = _mapObservationIDs(recovered_orbit_members_i, observation_store.restoreIDs)
+
+                    orbits_recovered = len(recovered_orbits_i)
+                    observations_linked = len(obs_ids_linked_i)
+                else:
+                    orbits_recovered = 0
+                    observations_linked = 0
 
-            logger.info("Completed processing orbit {} in {:.3f} seconds.".format(orbit_id, time_end - time_start))
+                test_orbit_i = orbit_i.to_df(include_units=False)
+                test_orbit_i["test_orbit_id"] = orbit_id
+                test_orbit_i["orbits_recovered"] = orbits_recovered
+                test_orbit_i["observations_linked"] = observations_linked
+                test_orbit_i["processing_time"] = processing_time
+                test_orbit_dfs.append(test_orbit_i)
 
-            recovered_orbits_dfs.append(recovered_orbits_i)
-            recovered_orbit_members_dfs.append(recovered_orbit_members_i)
+                logger.info("Completed processing orbit {} ({}/{}) in {:.3f} seconds.".format(orbit_id, i + 1 + id_offset, num_orbits, processing_time))
 
-            test_orbits_df = pd.concat(
-                test_orbit_dfs,
-                ignore_index=True
-            )
-            recovered_orbits = pd.concat(
-                recovered_orbits_dfs,
-                ignore_index=True
-            )
-            recovered_orbit_members = pd.concat(
-                recovered_orbit_members_dfs,
-                ignore_index=True
-            )
+                recovered_orbits_dfs.append(recovered_orbits_i)
+                recovered_orbit_members_dfs.append(recovered_orbit_members_i)
 
-            if out_dir is not None:
-                Orbits.from_df(test_orbits_df).to_csv(
-                    test_orbits_out_file
+                test_orbits_df = pd.concat(
+                    test_orbit_dfs,
+                    ignore_index=True
                 )
-                logger.debug("Saved test_orbits_out.csv.")
-
-                Orbits.from_df(recovered_orbits).to_csv(
-                    os.path.join(out_dir, "recovered_orbits.csv")
+                recovered_orbits = pd.concat(
+                    recovered_orbits_dfs,
+                    ignore_index=True
                 )
-                logger.debug("Saved recovered_orbits.csv.")
-
-                recovered_orbit_members.to_csv(
-                    os.path.join(out_dir, "recovered_orbit_members.csv"),
-                    index=False,
-                    float_format="%.15e"
+                recovered_orbit_members = pd.concat(
+                    recovered_orbit_members_dfs,
+                    ignore_index=True
                 )
-                logger.debug("Saved recovered_orbit_members.csv.")
 
-            orbits_completed = np.concatenate([orbits_completed, np.array([orbit_id])])
-            if out_dir is not None:
-                with open(os.path.join(out_dir, "status.txt"), "w") as status_out:
-                    np.savetxt(
-                        status_out,
-                        orbits_completed,
-                        delimiter="\n",
-                        fmt="%s"
+                if out_dir is not None:
+                    Orbits.from_df(test_orbits_df).to_csv(
+                        test_orbits_out_file
                     )
-                logger.info("Saved status.txt.")
+                    logger.debug("Saved test_orbits_out.csv.")
 
+                    Orbits.from_df(recovered_orbits).to_csv(
+                        os.path.join(out_dir, "recovered_orbits.csv")
+                    )
+                    logger.debug("Saved recovered_orbits.csv.")
+
+                    recovered_orbit_members.to_csv(
+                        os.path.join(out_dir, "recovered_orbit_members.csv"),
+                        index=False,
+                        float_format="%.15e"
+                    )
+                    logger.debug("Saved recovered_orbit_members.csv.")
+
+                orbits_completed = np.concatenate([orbits_completed, np.array([orbit_id])])
+                if out_dir is not None:
+                    with open(os.path.join(out_dir, "status.txt"), "w") as status_out:
+                        np.savetxt(
+                            status_out,
+                            orbits_completed,
+                            delimiter="\n",
+                            fmt="%s"
+                        )
+                    logger.info("Saved status.txt.")
+        finally:
+            # If a test orbit failed, workers processing other test orbits may still be reading
+            # the store's shared memory: wait for every submitted test orbit before releasing it
+            if parallel_backend == "ray" and len(futures) > 0:
+                ray.wait(futures, num_returns=len(futures))
+            else:
+                for future in futures:
+                    future.wait()
+            observation_store.close()
 
     else:
 
@@ -0,0 +1,327 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from multiprocessing import resource_tracker
+
+from .cell import ExposureIndex
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "internObservationIDs",
+    "ObservationStore"
+]
+
+def internObservationIDs(observations):
+    """
+    Replace the observation IDs of observations with dense integer IDs (the
+    row number of each observation).
+
+    Parameters
+    ----------
+    observations : `~pandas.DataFrame`
+        DataFrame containing observations with at least an observation ID column ('obs_id').
+
+    Returns
+    -------
+    observations : `~pandas.DataFrame`
+        Copy of observations with integer observation IDs.
+    obs_ids : `~numpy.ndarray` (N)
+        The original observation IDs, obs_ids[i] is the original ID of the
+        observation with integer ID i.
+    """
+    obs_ids = observations["obs_id"].values
+    observations = observations.copy()
+    observations["obs_id"] = np.arange(len(observations), dtype=np.int64)
+    return observations, obs_ids
+
+class ObservationStore:
+    """
+    ObservationStore: Holds a set of (preprocessed) observations once as contiguous NumPy
+    columns backed by shared memory or by memory-mapped files, together with a boolean bitmap
+    that tracks which observations have already been linked.
+
+    Pickling a store (as done when it is sent to a multiprocessing or ray worker) only
+    pickles the names of the shared memory blocks (or the paths of the memory-mapped files). Workers
+    attach to the same memory without copying the observations.
+
+    Observations are sorted by observatory code and observation time so that
+    each exposure is a contiguous block of rows.
+
+    If intern_ids is True, the observation IDs are replaced with dense integer IDs (the row
+    of each observation in the store) so that every stage that works on the store's observations joins and
+    filters on integers, and the linked bitmap can be indexed directly with observation IDs.
+    The original IDs are kept in the store and can be restored with `restoreIDs`.
+
+    Parameters
+    ----------
+    observations : `~pandas.DataFrame`
+        DataFrame containing preprocessed observations.
+    directory : str, optional
+        If given, columns are stored as memory-mapped .npy files in this directory
+        instead of in shared memory.
+    intern_ids : bool, optional
+        Replace observation IDs with integer IDs.
+
+    Returns
+    -------
+    None
+    """
+    def __init__(self, observations, directory=None, intern_ids=False):
+        observations = observations.sort_values(
+            by=["observatory_code", "mjd_utc"],
+            kind="mergesort",
+            ignore_index=True
+        )
+
+        self.directory = directory
+        self.columns = list(observations.columns)
+        self.intern_ids = intern_ids
+        self._owner = True
+        self._shms = {}
+        self._arrays = {}
+        self._specs = {}
+        self._obs_id_index = None
+
+        if intern_ids:
+            observations, obs_ids = internObservationIDs(observations)
+            self._create("obs_id_original", obs_ids)
+
+        for col in self.columns:
+            self._create(col, observations[col].values)
+        self._create("linked", np.zeros(len(observations), dtype=bool))
+
+        self._exposure_index = None
+        return
+
+    def _create(self, name, values):
+        if values.dtype == object:
+            # Strings (e.g. observation IDs, observatory codes) are stored
+            # as fixed width unicode, other columns keep their dtype
+            values = values.astype(str)
+        spec = (values.dtype.str, values.shape)
+        if self.directory is not None:
+            path = os.path.join(self.directory, "{}.npy".format(name))
+            array = np.lib.format.open_memmap(path, mode="w+", dtype=values.dtype, shape=values.shape)
+            self._specs[name] = (path, ) + spec
+        else:
+            shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            array = np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)
+            self._shms[name] = shm
+            self._specs[name] = (shm.name, ) + spec
+
+        array[:] = values
+        self._arrays[name] = array
+        return
+
+    def _attach(self, name):
+        location, dtype, shape = self._specs[name]
+        if self.directory is not None:
+            array = np.load(location, mmap_mode="r+")
+        else:
+            shm = shared_memory.SharedMemory(name=location)
+            # Only the process that created the shared memory is responsible for
+            # unlinking it, stop this process's resource tracker from unlinking it on exit
+            resource_tracker.unregister(shm._name, "shared_memory")
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+            self._shms[name] = shm
+        self._arrays[name] = array
+        return
+
+    def __getstate__(self):
+        return {
+            "directory" : self.directory,
+            "columns" : self.columns,
+            "intern_ids" : self.intern_ids,
+            "specs" : self._specs,
+        }
+
+    def __setstate__(self, state):
+        self.directory = state["directory"]
+        self.columns = state["columns"]
+        self.intern_ids = state["intern_ids"]
+        self._specs = state["specs"]
+        self._owner = False
+        self._shms = {}
+        self._arrays = {}
+        self._exposure_index = None
+        self._obs_id_index = None
+        for name in self._specs.keys():
+            self._attach(name)
+        return
+
+    def __len__(self):
+        return len(self._arrays["linked"])
+
+    def __getitem__(self, col):
+        return self._arrays[col]
+
+    @property
+    def linked(self):
+        """
+        Boolean bitmap: True for observations that have already been linked.
+        """
+        return self._arrays["linked"]
+
+    @property
+    def exposure_index(self):
+        """
+        Spatial index of the observations in each exposure (built lazily
+        in each process that needs it).
+        """
+        if self._exposure_index is None:
+            # The stored columns are already sorted by observatory code and observation time, so the
+            # index is built on views of them rather than on a copy
+            observations = pd.DataFrame(
+                {col : self._arrays[col] for col in self.columns},
+                copy=False
+            )
+            self._exposure_index = ExposureIndex(observations, sort=False)
+        return self._exposure_index
+
+    def markLinked(self, obs_ids):
+        """
+        Flag the given observations as linked.
+
+        Parameters
+        ----------
+        obs_ids : `~numpy.ndarray`
+            Observation IDs (integer IDs if the store's IDs are interned).
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        KeyError : If the store's IDs are interned and any of the integer IDs are not in the store.
+        """
+        if self.intern_ids:
+            obs_ids = np.asarray(obs_ids, dtype=np.int64)
+            if np.any((obs_ids < 0) | (obs_ids >= len(self.linked))):
+                err = (
+                    "Interned observation IDs must be in the range [0, {}).".format(len(self.linked))
+                )
+                raise KeyError(err)
+            self.linked[obs_ids] = True
+            return
+
+        obs_ids = np.asarray(obs_ids)
+        if self["obs_id"].dtype.kind == "U":
+            obs_ids = obs_ids.astype(str)
+        self.linked[np.isin(self["obs_id"], obs_ids)] = True
+        return
+
+    def internIDs(self, obs_ids):
+        """
+        Map original observation IDs to the store's integer observation IDs. If the
+        store's IDs are not interned, the IDs are returned unchanged.
+
+        Parameters
+        ----------
+        obs_ids : `~numpy.ndarray`
+            Original observation IDs.
+
+        Returns
+        -------
+        obs_ids : `~numpy.ndarray`
+            Integer observation IDs.
+
+        Raises
+        ------
+        KeyError : If any of the observation IDs are not in the store.
+        """
+        if not self.intern_ids:
+            return np.asarray(obs_ids)
+
+        if self._obs_id_index is None:
+            self._obs_id_index = pd.Index(self._arrays["obs_id_original"])
+        obs_ids = np.asarray(obs_ids)
+        if self._arrays["obs_id_original"].dtype.kind == "U":
+            obs_ids = obs_ids.astype(str)
+        obs_ids_interned = self._obs_id_index.get_indexer(obs_ids)
+
+        missing = obs_ids_interned == -1
+        if np.any(missing):
+            err = (
+                "{} observation IDs are not in the store (e.g. {}).".format(
+                    np.sum(missing),
+                    obs_ids[missing][0]
+                )
+            )
+            raise KeyError(err)
+
+        return obs_ids_interned
+
+    def restoreIDs(self, obs_ids):
+        """
+        Map the store's integer observation IDs to the original observation IDs. If the
+        store's IDs are not interned, the IDs are returned unchanged.
+
+        Parameters
+        ----------
+        obs_ids : `~numpy.ndarray`
+            Integer observation IDs.
+
+        Returns
+        -------
+        obs_ids : `~numpy.ndarray`
+            Original observation IDs (with the same dtype as the original IDs, or fixed width unicode
+            if they were strings).
+        """
+        if not self.intern_ids:
+            return np.asarray(obs_ids)
+
+        return self._arrays["obs_id_original"][np.asarray(obs_ids, dtype=np.int64)]
+
+    def toDataFrame(self, unlinked_only=False):
+        """
+        Return the observations as a DataFrame.
+
+        Parameters
+        ----------
+        unlinked_only : bool, optional
+            Only include observations that have not been linked.
+
+        Returns
+        -------
+        observations : `~pandas.DataFrame`
+            Observations (a copy of the stored columns).
+        """
+        if unlinked_only:
+            mask = ~self.linked
+            data = {col : self._arrays[col][mask] for col in self.columns}
+        else:
+            data = {col : np.array(self._arrays[col]) for col in self.columns}
+
+        return pd.DataFrame(data)
+
+    def close(self):
+        """
+        Release this process's view of the stored columns. If this process created the
+        store, the shared memory (or memory-mapped files) are also removed.
+
+        Returns
+        -------
+        None
+        """
+        self._arrays = {}
+        self._exposure_index = None
+        self._obs_id_index = None
+        for shm in self._shms.values():
+            shm.close()
+            if self._owner:
+                # Processes that attached to the store (and that share this process's resource
+                # tracker) may have unregistered the shared memory, register it again so unlinking
+                # it does not raise warnings
+                resource_tracker.register(shm._name, "shared_memory")
+                shm.unlink()
+        self._shms = {}
+
+        if self._owner and self.directory is not None:
+            for location, _, _ in self._specs.values():
+                if os.path.exists(location):
+                    os.remove(location)
+        return
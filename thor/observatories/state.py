@@ -1,19 +1,110 @@
 import numpy as np
 import pandas as pd
 import spiceypy as sp
+from functools import lru_cache
 
 from ..constants import Constants as c
+from ..constants import S_P_DAY
+from ..constants import JD_J2000
 from ..utils import _checkTime
 from ..utils import setupSPICE
+from ..utils.spice import _registerKernelCallback
 from ..utils import readMPCObservatoryCodes
 from ..orbits import getPerturberState
+from ..orbits import findStateTable
 
 __all__ = ["getObserverState"]
 
 R_EARTH = c.R_EARTH
 OMEGA_EARTH = 2 * np.pi / 0.997269675925926
 
-def getObserverState(observatory_codes, observation_times, frame="ecliptic", origin="heliocenter"):
+@lru_cache(maxsize=1)
+def _readObservatoryCodes():
+    # The MPC observatory codes file only needs to be read once per process
+    return readMPCObservatoryCodes()
+
+@lru_cache(maxsize=None)
+def _getObservatoryGeodetics(code):
+    """
+    Get the unit vector from the geocenter to a ground-based observatory in the ITRF93 frame.
+
+    Parameters
+    ----------
+    code : str
+        MPC observatory code.
+
+    Returns
+    -------
+    o_hat_ITRF93 : `~numpy.ndarray` (3)
+        Pointing vector from the geocenter to the observatory (read-only).
+
+    Raises
+    ------
+    ValueError : If the observatory code is unknown or is missing geodetic coordinates.
+    """
+    observatories = _readObservatoryCodes()
+    if code not in observatories.index:
+        err = (
+            "{} is not a known MPC observatory code."
+        )
+        raise ValueError(err.format(code))
+
+    observatory = observatories.loc[code, ["longitude_deg", "cos", "sin"]]
+    if np.any(observatory.isna().values):
+        err = (
+            "{} is missing information on Earth-based geodetic coordinates. The MPC Obs Code\n"
+            "file may be missing this information or the observer is a space-based observatory.\n"
+            "Space observatories are currently not supported.\n"
+        )
+        raise ValueError(err.format(code))
+
+    # Get observer location on Earth
+    longitude = np.radians(observatory["longitude_deg"])
+    sin_phi = observatory["sin"]
+    cos_phi = observatory["cos"]
+
+    # Calculate pointing vector from geocenter to observatory
+    o_hat_ITRF93 = np.array([
+        np.cos(longitude) * cos_phi,
+        np.sin(longitude) * cos_phi,
+        sin_phi
+    ], dtype=float)
+    o_hat_ITRF93.flags.writeable = False
+    return o_hat_ITRF93
+
+@lru_cache(maxsize=65536)
+def _getRotationMatrix(frame_spice, epoch_et):
+    # Rotation matrices are shared by all observatories and are often requested
+    # for the same epochs by different stages, memoize them per epoch
+    rotation_matrix = sp.pxform("ITRF93", frame_spice, epoch_et)
+    rotation_matrix.flags.writeable = False
+    return rotation_matrix
+
+# Cached rotation matrices are only valid for the kernels that were loaded when they
+# were computed
+_registerKernelCallback(_getRotationMatrix.cache_clear)
+
+def _getRotationMatrices(frame_spice, epochs_et):
+    """
+    Get the rotation matrices from ITRF93 to the desired frame at each epoch.
+
+    Parameters
+    ----------
+    frame_spice : {'ECLIPJ2000', 'J2000'}
+        SPICE frame to which to rotate.
+    epochs_et : `~numpy.ndarray` (N)
+        Epochs as ephemeris time (TDB seconds past J2000).
+
+    Returns
+    -------
+    rotation_matrices : `~numpy.ndarray` (N, 3, 3)
+        Rotation matrix for each epoch.
+    """
+    epochs_et_unique, inverse = np.unique(epochs_et, return_inverse=True)
+    rotation_matrices = np.array([_getRotationMatrix(frame_spice, et) for et in epochs_et_unique])
+    return rotation_matrices.reshape(-1, 3, 3)[inverse]
+
+def getObserverState(observatory_codes, observation_times, frame="ecliptic", origin="heliocenter", as_numpy=False):
     """
     Find the heliocentric or barycentric ecliptic or equatorial J2000 state vectors for different observers or observatories at
     the desired epochs. Currently only supports ground-based observers.
@@ -22,7 +113,9 @@ def getObserverState(observatory_codes, observation_times, frame="ecliptic", ori
         - precession (IAU-1976)
         - nutation (IAU-1980 with IERS corrections)
         - polar motion
-    This frame is retrieved through SPICE.
+    This frame is retrieved through SPICE. Rotation matrices are cached per epoch and observatory
+    geodetic coordinates are cached per observatory code. If a state table for an observatory
+    (see `~thor.orbits.useStateTables`) covers all observation times, the table is evaluated instead.
 
     Parameters
     ----------
@@ -34,13 +127,17 @@ def getObserverState(observatory_codes, observation_times, frame="ecliptic", ori
         Return observer state in the equatorial or ecliptic J2000 frames.
     origin : {'barycenter', 'heliocenter'}
         Return observer state with heliocentric or barycentric origin.
+    as_numpy : bool, optional
+        Return the observer states as a `~numpy.ndarray` instead of a DataFrame.
 
     Returns
     -------
-    `~pandas.DataFrame`
+    `~pandas.DataFrame` or `~numpy.ndarray` (len(observatory_codes) * N, 6)
         Pandas DataFrame with a column of observatory codes, MJDs (in UTC), and the J2000
         postion vector in three columns (obs_x, obs_y, obs_z) and J2000
-        velocity in three columns (obs_vx, obs_vy, obs_vg).
+        velocity in three columns (obs_vx, obs_vy, obs_vg). If as_numpy is True, only
+        the state vectors are returned in the same order as the rows of the DataFrame
+        (grouped by observatory code).
     """
     if type(observatory_codes) not in [list, np.ndarray]:
         err = (
@@ -58,47 +155,27 @@ def getObserverState(observatory_codes, observation_times, frame="ecliptic", ori
         )
         raise ValueError(err)
 
-    setupSPICE()
-
     # Check that times is an astropy time object
     _checkTime(observation_times, "observation_times")
 
-    observatories = readMPCObservatoryCodes()
-    positions = {}
-
-    for code in observatory_codes:
-        if np.any(observatories[observatories.index == code][["longitude_deg", "cos", "sin"]].isna().values == True):
-            err = (
-                "{} is missing information on Earth-based geodetic coordinates. The MPC Obs Code\n"
-                "file may be missing this information or the observer is a space-based observatory.\n"
-                "Space observatories are currently not supported.\n"
-            )
-            raise ValueError(err.format(code))
-
-
-        # Get observer location on Earth
-        longitude = observatories[observatories.index == code]["longitude_deg"].values[0]
-        sin_phi = observatories[observatories.index == code]["sin"].values[0]
-        cos_phi = observatories[observatories.index == code]["cos"].values[0]
-        sin_longitude = np.sin(np.radians(longitude))
-        cos_longitude = np.cos(np.radians(longitude))
-
-        # Calculate pointing vector from geocenter to observatory
-        o_hat_ITRF93 = np.array([
-            cos_longitude * cos_phi,
-            sin_longitude * cos_phi,
-            sin_phi
-        ])
+    # Each observatory is only included once
+    observatory_codes = list(dict.fromkeys(observatory_codes))
 
-        # Multiply pointing vector with Earth radius to get actual vector
-        o_vec_ITRF93 = np.dot(R_EARTH, o_hat_ITRF93)
+    # Observatories with a state table that covers the observation
+    # times are evaluated from their tables
+    epochs_tdb = observation_times.tdb
+    mjd_tdb = np.atleast_1d(epochs_tdb.mjd)
+    tables = {code : findStateTable(code, frame, origin, mjd_tdb) for code in observatory_codes}
+
+    if any(table is None for table in tables.values()):
+        setupSPICE()
 
         # Grab earth state vector
         state = getPerturberState("earth", observation_times, frame=frame, origin=origin)
 
-        # Convert MJD epochs in TDB to ET in TDB
-        epochs_tdb = observation_times.tdb
-        epochs_et = np.array([sp.str2et('JD {:.16f} TDB'.format(i)) for i in epochs_tdb.jd])
+        # Convert epochs in TDB to ET (seconds past J2000 in TDB)
+        epochs_et = ((epochs_tdb.jd1 - JD_J2000) + epochs_tdb.jd2) * S_P_DAY
+        epochs_et = np.atleast_1d(epochs_et)
 
         # Grab rotaton matrices from ITRF93 to ecliptic J2000
         # The ITRF93 high accuracy Earth rotation model takes into account:
@@ -106,31 +183,35 @@ def getObserverState(observatory_codes, observation_times, frame="ecliptic", ori
         # Nutation:  1980 IAU model, with IERS corrections due to Herring et al.
         # True sidereal time using accurate values of TAI-UT1
         # Polar motion
-        rotation_matrices = np.array([sp.pxform('ITRF93', frame_spice, i) for i in epochs_et])
-
-        # Add o_vec + r_geo to get r_obs
-        r_obs = np.array([rg + rm @ o_vec_ITRF93 for rg, rm in zip(state[:, :3], rotation_matrices)])
-
-        # Calculate velocity
-        v_obs = np.array([vg + rm @ (- OMEGA_EARTH * R_EARTH * np.cross(o_hat_ITRF93, np.array([0, 0, 1]))) for vg, rm in zip(state[:, 3:], rotation_matrices)])
-
-        # Create table of mjds and positions
-        table = np.empty((len(observation_times), 7))
-        table[:, 0] = observation_times.utc.mjd
-        table[:, 1:4] = r_obs
-        table[:, 4:] = v_obs
-
-        # Add to dictionary
-        positions[code] = table
-
-    # Process dictionary into a clean pandas DataFrame
-    dfs = []
-    for code, table in positions.items():
-        dfi = pd.DataFrame(table, columns=["mjd_utc", "obs_x", "obs_y", "obs_z", "obs_vx", "obs_vy", "obs_vz"])
-        dfi["observatory_code"] = [code for i in range(len(dfi))]
-        dfs.append(dfi)
-
-    df = pd.concat(dfs)
-    df = df[["observatory_code", "mjd_utc", "obs_x", "obs_y", "obs_z", "obs_vx", "obs_vy", "obs_vz"]]
-    df.reset_index(inplace=True, drop=True)
-    return df
\ No newline at end of file
+        rotation_matrices = _getRotationMatrices(frame_spice, epochs_et)
+
+    num_times = len(mjd_tdb)
+    states = np.empty((len(observatory_codes) * num_times, 6))
+    for i, code in enumerate(observatory_codes):
+        states_i = states[i * num_times:(i + 1) * num_times]
+        if tables[code] is not None:
+            states_i[:] = tables[code].evaluate(mjd_tdb)
+            continue
+
+        o_hat_ITRF93 = _getObservatoryGeodetics(code)
+
+        # Multiply pointing vector with Earth radius to get actual vector
+        o_vec_ITRF93 = np.dot(R_EARTH, o_hat_ITRF93)
+
+        # Velocity of the observatory due to the Earth's rotation
+        o_vel_ITRF93 = - OMEGA_EARTH * R_EARTH * np.cross(o_hat_ITRF93, np.array([0, 0, 1]))
+
+        # Add o_vec + r_geo to get r_obs, and o_vel + v_geo to get v_obs
+        states_i[:, :3] = state[:, :3] + rotation_matrices @ o_vec_ITRF93
+        states_i[:, 3:] = state[:, 3:] + rotation_matrices @ o_vel_ITRF93
+
+    if as_numpy:
+        return states
+
+    df = pd.DataFrame(
+        states,
+        columns=["obs_x", "obs_y", "obs_z", "obs_vx", "obs_vy", "obs_vz"]
+    )
+    df.insert(0, "mjd_utc", np.tile(observation_times.utc.mjd, len(observatory_codes)))
+    df.insert(0, "observatory_code", np.repeat(np.asarray(observatory_codes), num_times))
+    return df
@@ -1,6 +1,7 @@
 import os
 from thor.utils.spice import getSPICEKernels
 import pytest
+import numpy as np
 import pandas as pd
 from astropy import units as u
 from astropy.time import Time
@@ -11,6 +12,7 @@ from ...utils import getSPICEKernels
 from ...utils import setupSPICE
 from ...utils import getMPCObservatoryCodes
 from ..state import getObserverState
+from ..state import _getRotationMatrix
 
 DATA_DIR = os.path.join(
     os.path.dirname(os.path.abspath(__file__)),
@@ -113,6 +115,51 @@ def test_getObserverState_barycentric():
         )
     return
 
+def test_getObserverState_as_numpy():
+    """
+    Test that the observer states returned as an array are identical to those returned in the DataFrame
+    and that each observatory is ordered as in the DataFrame.
+    """
+    getSPICEKernels(KERNELS_DE440)
+    setupSPICE(KERNELS_DE440, force=True)
+    getMPCObservatoryCodes()
+
+    times = Time(
+        [59000.0, 59000.5, 59001.0, 59000.5],
+        scale="utc",
+        format="mjd"
+    )
+    observatory_codes = ["I41", "F51", "500"]
+
+    observer_states_df = getObserverState(observatory_codes, times)
+    observer_states = getObserverState(observatory_codes, times, as_numpy=True)
+
+    assert observer_states.shape == (len(observatory_codes) * len(times), 6)
+    np.testing.assert_equal(
+        observer_states,
+        observer_states_df[["obs_x", "obs_y", "obs_z", "obs_vx", "obs_vy", "obs_vz"]].values
+    )
+    np.testing.assert_equal(
+        observer_states_df["observatory_code"].values,
+        np.repeat(observatory_codes, len(times))
+    )
+    return
+
+def test_getObserverState_rotationCache():
+    """
+    Check that rotation matrices cached by getObserverState are discarded when SPICE kernels are reloaded.
+    """
+    getSPICEKernels(KERNELS_DE440)
+    setupSPICE(KERNELS_DE440, force=True)
+
+    times = Time(np.arange(59000, 59010), scale="utc", format="mjd")
+    getObserverState(["I41"], times)
+    assert _getRotationMatrix.cache_info().currsize > 0
+
+    setupSPICE(KERNELS_DE440, force=True)
+    assert _getRotationMatrix.cache_info().currsize == 0
+    return
+
 def test_getObserverState_raises():
 
     times = Time([59000], scale="utc", format="mjd")
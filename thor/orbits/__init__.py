@@ -1,9 +1,11 @@
 from .kepler import *
+from .chebyshev import *
 from .state import *
 from .orbits import *
 from .universal_propagate import *
 from .aberrations import *
 from .universal_ephemeris import *
+from .nbody_propagate import *
 from .propagate import *
 from .ephemeris import *
 from .iterators import *
@@ -1,8 +1,9 @@
 import numpy as np
 from numba import jit
+from numba import prange
 
 from ..constants import Constants as c
-from .universal_propagate import propagateUniversal
+from .universal_propagate import _propagateUniversal
 
 __all__ = [
     "addLightTime",
@@ -12,7 +13,8 @@ __all__ = [
 MU = c.MU
 C = c.C
 
-@jit(["Tuple((f8[:,:], f8[:]))(f8[:,:], f8[:], f8[:,:], f8, f8, i8, f8)"], nopython=True, cache=True)
+# Compiled on first call (see propagateUniversal)
+@jit(nopython=True, parallel=True, cache=True)
 def addLightTime(orbits, t0, observer_positions, lt_tol=1e-10, mu=MU, max_iter=1000, tol=1e-15):
     """
     When generating ephemeris, orbits need to be backwards propagated to the time
@@ -50,18 +52,18 @@ def addLightTime(orbits, t0, observer_positions, lt_tol=1e-10, mu=MU, max_iter=1
     corrected_orbits = np.zeros((len(orbits), 6))
     lts = np.zeros(len(orbits))
     num_orbits = len(orbits)
-    for i in range(num_orbits):
+    for i in prange(num_orbits):
 
         # Set up running variables
-        orbit_i = orbits[i:i+1, :]
-        observer_position_i = observer_positions[i:i+1, :]
-        t0_i = t0[i:i+1]
+        orbit_i = orbits[i, :]
+        observer_position_i = observer_positions[i, :]
         dlt = 1e30
         lt_i = 1e30
+        lt = 0.
 
         while dlt > lt_tol:
             # Calculate topocentric distance
-            rho = np.linalg.norm(orbit_i[:, :3] - observer_position_i)
+            rho = np.linalg.norm(orbit_i[:3] - observer_position_i)
 
             # Calculate initial guess of light time
             lt = rho / C
@@ -71,19 +73,18 @@ def addLightTime(orbits, t0, observer_positions, lt_tol=1e-10, mu=MU, max_iter=1
             dlt = np.abs(lt - lt_i)
 
             # Propagate backwards to new epoch
-            orbit = propagateUniversal(orbits[i:i+1, :], t0[i:i+1], t0[i:i+1] - lt, mu=mu, max_iter=max_iter, tol=tol)
+            orbit_i = _propagateUniversal(orbits[i, :], -lt, mu, max_iter, tol)
 
             # Update running variables
-            t0_i = orbit[:, 1]
-            orbit_i = orbit[:, 2:]
             lt_i = lt
 
-        corrected_orbits[i, :] = orbit[0, 2:]
+        corrected_orbits[i, :] = orbit_i
         lts[i] = lt
 
     return corrected_orbits, lts
 
-@jit(["f8[:,:](f8[:,:], f8[:,:])"], nopython=True, cache=True)
+# Compiled on first call (see propagateUniversal)
+@jit(nopython=True, parallel=True, cache=True)
 def addStellarAberration(orbits, observer_states):
     """
     The motion of the observer in an inertial frame will cause an object
@@ -108,7 +109,7 @@ def addStellarAberration(orbits, observer_states):
     """
     topo_states = orbits - observer_states
     rho_aberrated = topo_states[:, :3].copy()
-    for i in range(len(orbits)):
+    for i in prange(len(orbits)):
         v_obs = observer_states[i, 3:]
         beta = v_obs / C
         gamma_inv = np.sqrt(1 - np.linalg.norm(beta)**2)
@@ -1,13 +1,18 @@
+import os
 import time
+import pickle
 import logging
+import tempfile
 import numpy as np
 import pandas as pd
-import multiprocessing as mp
 from astropy.time import Time
 from functools import partial
-from sklearn.neighbors import BallTree
 
-from ..utils import _initWorker
+from ..constants import Constants as c
+from ..cell import ExposureIndex
+from ..cell import _calcUnitVectors
+from ..backend import MJOLNIR
+from ..utils import getExecutor
 from ..utils import _checkParallel
 from ..utils import yieldChunks
 from ..utils import calcChunkSize
@@ -21,140 +26,337 @@ from .od import differentialCorrection
 
 logger = logging.getLogger(__name__)
 
+C = c.C
+
+# Observation index (and mask) each worker process attributes against, keyed by the
+# file it was read from. Only the most recently used index is kept
+OBSERVATION_INDEXES = {}
+
 __all__ = [
     "attribution_worker",
     "attributeObservations",
     "mergeAndExtendOrbits"
 ]
 
+def _findDirtyOrbits(orbits, orbit_members_prev, orbit_members, rchi2_threshold):
+    """
+    Find the orbits that need to be re-attributed and re-fit in the next iteration
+    of orbit extension. An orbit is clean if differential correction converged (its reduced chi2 is at
+    or below rchi2_threshold) and its members are exactly the observations that were attributed to it (none were
+    flagged as outliers or assigned to another orbit). Every other orbit is dirty.
+
+    Parameters
+    ----------
+    orbits : `~pandas.DataFrame`
+        Orbits after differential correction.
+    orbit_members_prev, orbit_members : `~pandas.DataFrame`
+        Orbit members as attributed and after differential correction.
+    rchi2_threshold : float
+        Reduced chi2 at or below which differential correction has converged.
+
+    Returns
+    -------
+    orbit_ids : `~numpy.ndarray`
+        IDs of the dirty orbits in orbits.
+    """
+    # Orbits that gained or lost at least one member
+    members = set(zip(orbit_members["orbit_id"].values, orbit_members["obs_id"].values))
+    members_prev = set(zip(orbit_members_prev["orbit_id"].values, orbit_members_prev["obs_id"].values))
+    members_changed = np.isin(
+        orbits["orbit_id"].values,
+        np.array([orbit_id for orbit_id, _ in members ^ members_prev], dtype=object)
+    )
+    converged = orbits["rchi2"].values <= rchi2_threshold
+
+    return orbits["orbit_id"].values[members_changed | ~converged]
+
+def _findVisibleExposures(
+        orbits,
+        observation_index,
+        observers,
+        eps,
+        mask=None,
+        prefilter_margin=0.1,
+        prefilter_max_acceleration=1e-6
+    ):
+    """
+    Find the exposures each orbit could land in. Orbits are propagated with a two-body
+    propagator (no light time correction) to each exposure and kept if their coarse predicted
+    position is within the exposure's footprint plus eps plus a conservative bound on the
+    error of the coarse prediction. The bound accounts for the neglected light time and for a
+    perturbing acceleration of up to prefilter_max_acceleration acting over the time since the orbit's epoch.
+
+    Parameters
+    ----------
+    orbits : `~thor.orbits.orbits.Orbits`
+        Orbits.
+    observation_index : `~thor.cell.ExposureIndex`
+        Spatial index of observations.
+    observers : dict
+        A dictionary with observatory codes as keys and exposure times (`~astropy.time.core.Time`) as values.
+    eps : float
+        Maximum angular distance in degrees between a predicted position and an observation.
+    mask : `~numpy.ndarray`, optional
+        Boolean array with the same length as the observations in the index. Observations
+        for which the mask is False are not included in the exposure footprints.
+    prefilter_margin : float, optional
+        Margin in degrees always added to the footprint of each exposure.
+    prefilter_max_acceleration : float, optional
+        Largest perturbing (non two-body) acceleration in au per day squared that the bound
+        on the error of the coarse prediction allows for. The default is about twenty times Jupiter's
+        pull on a main-belt asteroid, and covers the Earth's pull down to a geocentric distance of ~0.03 au.
+
+    Returns
+    -------
+    visible_exposures : list of `~numpy.ndarray`
+        Indices of the exposures in the index each orbit could land in.
+    """
+    ephemeris = MJOLNIR(light_time=False)._generateEphemeris(
+        Orbits(orbits.cartesian, orbits.epochs),
+        observers
+    )
+    orbit_indices = ephemeris["orbit_id"].values.astype(int)
+    exposures = observation_index.findExposures(
+        ephemeris["observatory_code"].values,
+        ephemeris["mjd_utc"].values
+    )
+    centers, radii = observation_index.calcFootprints(mask=mask)
+
+    # Conservative bound on the error of the coarse prediction in degrees
+    delta = ephemeris["delta_au"].values
+    rate = np.sqrt(ephemeris["vRAcosDec"].values**2 + ephemeris["vDec"].values**2)
+    dt = ephemeris["mjd_utc"].values - orbits.epochs.utc.mjd[orbit_indices]
+    margin = (
+        prefilter_margin
+        + rate * delta / C
+        + np.degrees(0.5 * prefilter_max_acceleration * dt**2 / delta)
+    )
+
+    cos_distances = np.sum(_calcUnitVectors(ephemeris[["RA_deg", "Dec_deg"]].values) * centers[exposures], axis=1)
+    distances = np.degrees(np.arccos(np.clip(cos_distances, -1, 1)))
+    visible = (
+        (exposures != -1)
+        & (radii[exposures] >= 0)
+        & (distances <= radii[exposures] + eps + margin)
+    )
+
+    visible_exposures = [np.empty(0, dtype=int) for i in range(len(orbits))]
+    for i in np.unique(orbit_indices[visible]):
+        visible_exposures[i] = np.unique(exposures[visible & (orbit_indices == i)])
+    return visible_exposures
+
+def _loadObservationIndex(index_file):
+    """
+    Load an observation index and its mask from a file written by `attributeObservations`. The index
+    is read the first time a process asks for it and kept for the tasks that follow.
+
+    Parameters
+    ----------
+    index_file : str
+        Path to the pickled observation index and mask.
+
+    Returns
+    -------
+    observation_index : `~thor.cell.ExposureIndex`
+        Spatial index of the observations.
+    mask : {`~numpy.ndarray`, None}
+        Mask of the observations in the index that can be attributed.
+    """
+    if index_file not in OBSERVATION_INDEXES:
+        OBSERVATION_INDEXES.clear()
+        with open(index_file, "rb") as f:
+            OBSERVATION_INDEXES[index_file] = pickle.load(f)
+    return OBSERVATION_INDEXES[index_file]
+
+def _attributionFile_worker(orbits, index_file, **kwargs):
+    # Attribute observations from an index installed in this process (see `_loadObservationIndex`)
+    observation_index, mask = _loadObservationIndex(index_file)
+    return attribution_worker(
+        orbits,
+        observation_index,
+        mask=mask,
+        **kwargs
+    )
+
 def attribution_worker(
         orbits,
         observations,
         eps=1/3600,
         include_probabilistic=True,
         backend="PYOORB",
-        backend_kwargs={}
+        backend_kwargs={},
+        mask=None,
+        prefilter=True,
+        prefilter_margin=0.1,
+        prefilter_max_acceleration=1e-6
     ):
+    """
+    Attribute observations to orbits. Ephemerides are generated for each orbit at every exposure
+    and the observations within eps degrees of each predicted position are found with the
+    per-exposure spatial index of the observations. Each observation is attributed to at most
+    the three orbits whose predicted positions are nearest to it.
+
+    If prefilter is True (and the backend is not MJOLNIR), a two-body ephemeris without light time
+    is first used to find the exposures each orbit could possibly land in. The backend then generates
+    ephemerides in a single call for the orbits that could land in any exposure, at the exposures
+    any of them could land in.
+
+    Parameters
+    ----------
+    orbits : `~thor.orbits.orbits.Orbits`
+        Orbits to which observations should be attributed.
+    observations : `~pandas.DataFrame` or `~thor.cell.ExposureIndex`
+        Observations or a spatial index of observations.
+    eps : float, optional
+        Maximum angular distance in degrees between a predicted position and an observation.
+    include_probabilistic : bool, optional
+        Include the probability and mahalanobis distance of each attribution.
+    backend : {'MJOLNIR', 'PYOORB', 'FINDORB'}, optional
+        Which backend to use to generate ephemerides.
+    backend_kwargs : dict, optional
+        Settings and additional parameters to pass to selected
+        backend.
+    mask : `~numpy.ndarray`, optional
+        Boolean array with the same length as the observations in the index. Observations
+        for which the mask is False are never attributed.
+    prefilter : bool, optional
+        Skip orbits and exposures for which a coarse two-body ephemeris shows that no
+        orbit can land in the exposure.
+    prefilter_margin : float, optional
+        Margin in degrees added to the footprint of each exposure by the prefilter.
+    prefilter_max_acceleration : float, optional
+        Largest perturbing (non two-body) acceleration in au per day squared the prefilter
+        allows for when bounding the error of its two-body ephemerides.
+
+    Returns
+    -------
+    attributions : `~pandas.DataFrame`
+        DataFrame of attributions.
+    """
+    if isinstance(observations, ExposureIndex):
+        observation_index = observations
+    else:
+        observation_index = ExposureIndex(observations)
+    observations = observation_index.observations
+
+    # Only generate ephemerides for exposures that still have observations
+    if mask is None:
+        exposures = np.ones(len(observation_index.exposure_times), dtype=bool)
+    else:
+        exposures = np.logical_or.reduceat(mask, observation_index.offsets[:-1]) if len(mask) > 0 else np.zeros(0, dtype=bool)
+    exposure_codes = observation_index.exposure_codes[exposures]
+    exposure_times = observation_index.exposure_times[exposures]
 
-    # Create observer's dictionary from observations
+    # Create observer's dictionary from the exposures
     observers = {}
-    for observatory_code in observations["observatory_code"].unique():
+    for observatory_code in np.unique(exposure_codes):
         observers[observatory_code] = Time(
-            observations[observations["observatory_code"].isin([observatory_code])]["mjd_utc"].unique(),
+            exposure_times[exposure_codes == observatory_code],
             scale="utc",
             format="mjd"
         )
 
-    # Genereate ephemerides for each orbit at the observation times
-    ephemeris = generateEphemeris(
-        orbits,
-        observers,
-        backend=backend,
-        backend_kwargs=backend_kwargs,
-        num_jobs=1,
-        chunk_size=1
-    )
-
-    # Group the predicted ephemerides and observations by visit / exposure
-    ephemeris_grouped = ephemeris.groupby(by=["observatory_code", "mjd_utc"])
-    ephemeris_visits = [ephemeris_grouped.get_group(g) for g in ephemeris_grouped.groups]
-    observations_grouped = observations.groupby(by=["observatory_code", "mjd_utc"])
-    observations_visits = [observations_grouped.get_group(g) for g in observations_grouped.groups]
-
-    # Loop through each unique exposure and visit, find the nearest observations within
-    # eps (haversine metric)
-    distances = []
-    orbit_ids_associated = []
-    obs_ids_associated = []
-    obs_times_associated = []
-    eps_rad = np.radians(eps)
-    residuals = []
-    stats = []
-    for ephemeris_visit, observations_visit in zip(ephemeris_visits, observations_visits):
-
-        assert len(ephemeris_visit["mjd_utc"].unique()) == 1
-        assert len(observations_visit["mjd_utc"].unique()) == 1
-        assert observations_visit["mjd_utc"].unique()[0] == ephemeris_visit["mjd_utc"].unique()[0]
-
-        obs_ids = observations_visit[["obs_id"]].values
-        obs_times = observations_visit[["mjd_utc"]].values
-        orbit_ids = ephemeris_visit[["orbit_id"]].values
-        coords = observations_visit[["RA_deg", "Dec_deg"]].values
-        coords_latlon = observations_visit[["Dec_deg"]].values
-        coords_predicted = ephemeris_visit[["RA_deg", "Dec_deg"]].values
-        coords_sigma = observations_visit[["RA_sigma_deg", "Dec_sigma_deg"]].values
-
-        # Haversine metric requires latitude first then longitude...
-        coords_latlon = np.radians(observations_visit[["Dec_deg", "RA_deg"]].values)
-        coords_predicted_latlon = np.radians(ephemeris_visit[["Dec_deg", "RA_deg"]].values)
-
-        num_obs = len(coords_predicted)
-        k = np.minimum(3, num_obs)
-
-        # Build BallTree with a haversine metric on predicted ephemeris
-        tree = BallTree(
-            coords_predicted_latlon,
-            metric="haversine"
-        )
-        # Query tree using observed RA, Dec
-        d, i = tree.query(
-            coords_latlon,
-            k=k,
-            return_distance=True,
-            dualtree=True,
-            breadth_first=False,
-            sort_results=False
+    columns = ["orbit_id", "obs_id", "mjd_utc", "distance", "residual_ra_arcsec", "residual_dec_arcsec", "chi2"]
+    if include_probabilistic:
+        columns += ["probability", "mahalanobis_distance"]
+    if len(observers) == 0:
+        return pd.DataFrame(columns=columns)
+
+    if prefilter and not (backend == "MJOLNIR" or isinstance(backend, MJOLNIR)):
+        # Only generate accurate ephemerides for the exposures each orbit could
+        # possibly fall inside of
+        visible_exposures = _findVisibleExposures(
+            orbits,
+            observation_index,
+            observers,
+            eps,
+            mask=mask,
+            prefilter_margin=prefilter_margin,
+            prefilter_max_acceleration=prefilter_max_acceleration
         )
-
-        # Select all observations with distance smaller or equal
-        # to the maximum given distance
-        mask = np.where(d <= eps_rad)
-
-        if len(d[mask]) > 0:
-            orbit_ids_associated.append(orbit_ids[i[mask]])
-            obs_ids_associated.append(obs_ids[mask[0]])
-            obs_times_associated.append(obs_times[mask[0]])
-            distances.append(d[mask].reshape(-1, 1))
-
-            residuals_visit, stats_visit = calcResiduals(
-                coords[mask[0]],
-                coords_predicted[i[mask]],
-                sigmas_actual=coords_sigma[mask[0]],
-                include_probabilistic=True
+        orbits_visible = np.array([i for i, exposures_i in enumerate(visible_exposures) if len(exposures_i) > 0], dtype=int)
+        if len(orbits_visible) == 0:
+            return pd.DataFrame(columns=columns)
+
+        exposures_visible = np.unique(np.concatenate([visible_exposures[i] for i in orbits_visible]))
+        exposure_codes = observation_index.exposure_codes[exposures_visible]
+        exposure_times = observation_index.exposure_times[exposures_visible]
+        observers_visible = {}
+        for observatory_code in np.unique(exposure_codes):
+            observers_visible[observatory_code] = Time(
+                exposure_times[exposure_codes == observatory_code],
+                scale="utc",
+                format="mjd"
             )
-            residuals.append(residuals_visit)
-            stats.append(np.vstack(stats_visit).T)
-
-    if len(distances) > 0:
-        distances = np.degrees(np.vstack(distances))
-        orbit_ids_associated = np.vstack(orbit_ids_associated)
-        obs_ids_associated = np.vstack(obs_ids_associated)
-        obs_times_associated = np.vstack(obs_times_associated)
-        residuals = np.vstack(residuals)
-        stats = np.vstack(stats)
-
-        attributions = {
-            "orbit_id" : orbit_ids_associated[:, 0],
-            "obs_id" : obs_ids_associated[:, 0],
-            "mjd_utc" : obs_times_associated[:, 0],
-            "distance" : distances[:, 0],
-            "residual_ra_arcsec" : residuals[:, 0] * 3600,
-            "residual_dec_arcsec" : residuals[:, 1] * 3600,
-            "chi2" : stats[:, 0]
-        }
-        if include_probabilistic:
-            attributions["probability"] = stats[:, 1]
-            attributions["mahalanobis_distance"] = stats[:, 2]
-
-        attributions = pd.DataFrame(attributions)
 
-    else:
-        columns = ["orbit_id", "obs_id", "mjd_utc", "distance", "residual_ra_arcsec", "residual_dec_arcsec", "chi2"]
-        if include_probabilistic:
-            columns += ["probability", "mahalanobis_distance"]
+        ephemeris = generateEphemeris(
+            orbits[orbits_visible],
+            observers_visible,
+            backend=backend,
+            backend_kwargs=backend_kwargs,
+            num_jobs=1,
+            chunk_size=1
+        )
 
-        attributions = pd.DataFrame(columns=columns)
+    else:
+        # Genereate ephemerides for each orbit at the observation times
+        ephemeris = generateEphemeris(
+            orbits,
+            observers,
+            backend=backend,
+            backend_kwargs=backend_kwargs,
+            num_jobs=1,
+            chunk_size=1
+        )
 
+    # Query the observation index with all predicted positions at once
+    # to find the observations within eps of each prediction
+    ephemeris_indices, obs_indices, distances = observation_index.queryBulk(
+        ephemeris["observatory_code"].values,
+        ephemeris["mjd_utc"].values,
+        ephemeris[["RA_deg", "Dec_deg"]].values,
+        eps,
+        mask=mask
+    )
+    if len(distances) == 0:
+        return pd.DataFrame(columns=columns)
+
+    # Keep only the (up to) three nearest predictions to each observation
+    order = np.lexsort((distances, obs_indices))
+    ephemeris_indices = ephemeris_indices[order]
+    obs_indices = obs_indices[order]
+    distances = distances[order]
+    ranks = np.arange(len(obs_indices))
+    new_obs = np.ones(len(obs_indices), dtype=bool)
+    new_obs[1:] = obs_indices[1:] != obs_indices[:-1]
+    ranks -= np.maximum.accumulate(np.where(new_obs, ranks, 0))
+    keep = ranks < 3
+    ephemeris_indices = ephemeris_indices[keep]
+    obs_indices = obs_indices[keep]
+    distances = distances[keep]
+
+    residuals, stats = calcResiduals(
+        observations[["RA_deg", "Dec_deg"]].values[obs_indices],
+        ephemeris[["RA_deg", "Dec_deg"]].values[ephemeris_indices],
+        sigmas_actual=observations[["RA_sigma_deg", "Dec_sigma_deg"]].values[obs_indices],
+        include_probabilistic=True
+    )
+    stats = np.vstack(stats).T
+
+    attributions = {
+        "orbit_id" : ephemeris["orbit_id"].values[ephemeris_indices],
+        "obs_id" : observations["obs_id"].values[obs_indices],
+        "mjd_utc" : observations["mjd_utc"].values[obs_indices],
+        "distance" : distances,
+        "residual_ra_arcsec" : residuals[:, 0] * 3600,
+        "residual_dec_arcsec" : residuals[:, 1] * 3600,
+        "chi2" : stats[:, 0]
+    }
+    if include_probabilistic:
+        attributions["probability"] = stats[:, 1]
+        attributions["mahalanobis_distance"] = stats[:, 2]
+
+    attributions = pd.DataFrame(attributions)
     return attributions
 
 def attributeObservations(
@@ -167,18 +369,83 @@ def attributeObservations(
         orbits_chunk_size=10,
         observations_chunk_size=100000,
         num_jobs=1,
-        parallel_backend="mp"
+        parallel_backend="mp",
+        mask=None,
+        prefilter=True,
+        prefilter_margin=0.1,
+        prefilter_max_acceleration=1e-6
     ):
+    """
+    Attribute observations to orbits. A spatial index of the observations (per observation chunk)
+    is built once and shared with every worker, each worker then queries it with the predicted
+    positions of its orbits.
+
+    Parameters
+    ----------
+    orbits : `~thor.orbits.orbits.Orbits`
+        Orbits to which observations should be attributed.
+    observations : `~pandas.DataFrame` or `~thor.cell.ExposureIndex`
+        Observations or a prebuilt spatial index of observations. If an index is given
+        it is used as is (observations_chunk_size is ignored).
+    eps : float, optional
+        Maximum angular distance in degrees between a predicted position and an observation.
+    include_probabilistic : bool, optional
+        Include the probability and mahalanobis distance of each attribution.
+    backend : {'MJOLNIR', 'PYOORB', 'FINDORB'}, optional
+        Which backend to use to generate ephemerides.
+    backend_kwargs : dict, optional
+        Settings and additional parameters to pass to selected
+        backend.
+    orbits_chunk_size : int, optional
+        Number of orbits to send to each job.
+    observations_chunk_size : int, optional
+        Number of observations to index and process per batch.
+    num_jobs : int, optional
+        Number of jobs to launch.
+    parallel_backend : str, optional
+        Which parallelization backend to use {'ray', 'mp', 'cf'}. Defaults to using Python's multiprocessing
+        module ('mp').
+    mask : `~numpy.ndarray`, optional
+        Only used if observations is an `~thor.cell.ExposureIndex`. Boolean array with the same length as
+        the observations in the index. Observations for which the mask is False are never attributed.
+    prefilter : bool, optional
+        Skip orbit and exposure pairs for which a coarse two-body ephemeris shows the
+        orbit cannot land in the exposure (see `~thor.orbits.attribution.attribution_worker`).
+    prefilter_margin : float, optional
+        Margin in degrees added to the footprint of each exposure by the prefilter.
+    prefilter_max_acceleration : float, optional
+        Largest perturbing (non two-body) acceleration in au per day squared the prefilter
+        allows for when bounding the error of its two-body ephemerides.
+
+    Returns
+    -------
+    attributions : `~pandas.DataFrame`
+        DataFrame of attributions sorted by orbit ID, observation time and
+        angular distance.
+    """
     logger.info("Running observation attribution...")
     time_start = time.time()
 
     num_orbits = len(orbits)
 
+    # Build the spatial index of each chunk of observations once, every orbit chunk
+    # is then attributed against the same (read-only) indexes
+    if isinstance(observations, ExposureIndex):
+        observation_indexes = [observations]
+        masks = [mask]
+    else:
+        observation_indexes = [ExposureIndex(observations_c) for observations_c in yieldChunks(observations, observations_chunk_size)]
+        masks = [None for i in range(len(observation_indexes))]
+
     attribution_dfs = []
 
     parallel, num_workers = _checkParallel(num_jobs, parallel_backend)
     if num_workers > 1:
 
+        # Build every exposure's tree before the indexes are sent to the workers
+        for observation_index in observation_indexes:
+            observation_index.buildTrees()
+
         if parallel_backend == "ray":
             import ray
             if not ray.is_initialized():
@@ -194,67 +461,78 @@ def attributeObservations(
             chunk_size_ = calcChunkSize(num_orbits, num_workers, orbits_chunk_size, min_chunk_size=1)
             orbits_split = orbits.split(chunk_size_)
 
-            obs_oids = []
-            for observations_c in yieldChunks(observations, observations_chunk_size):
-                obs_oids.append(ray.put(observations_c))
+            index_oids = []
+            for observation_index in observation_indexes:
+                index_oids.append(ray.put(observation_index))
 
             p = []
-            for obs_oid in obs_oids:
+            for index_oid, mask_i in zip(index_oids, masks):
                 for orbit_i in orbits_split:
                     p.append(
                         attribution_worker_ray.remote(
                             orbit_i,
-                            obs_oid,
+                            index_oid,
                             eps=eps,
                             include_probabilistic=include_probabilistic,
                             backend=backend,
-                            backend_kwargs=backend_kwargs
+                            backend_kwargs=backend_kwargs,
+                            mask=mask_i,
+                            prefilter=prefilter,
+                            prefilter_margin=prefilter_margin,
+                            prefilter_max_acceleration=prefilter_max_acceleration
                         )
                     )
 
-                attribution_dfs_i = ray.get(p)
-                attribution_dfs += attribution_dfs_i
+            attribution_dfs += ray.get(p)
 
-        else: # parallel_backend == "mp"
-            p = mp.Pool(
-                processes=num_workers,
-                initializer=_initWorker,
-            )
+        else: # parallel_backend in ["mp", "cf"]
+            p = getExecutor(num_workers, parallel_backend)
 
             # Send up to orbits_chunk_size orbits to each OD worker for processing
             chunk_size_ = calcChunkSize(num_orbits, num_workers, orbits_chunk_size, min_chunk_size=1)
             orbits_split = orbits.split(chunk_size_)
 
-            for observations_c in yieldChunks(observations, observations_chunk_size):
-
-                obs = [observations_c for i in range(len(orbits_split))]
-                attribution_dfs_i = p.starmap(
-                    partial(
-                        attribution_worker,
-                        eps=eps,
-                        include_probabilistic=include_probabilistic,
-                        backend=backend,
-                        backend_kwargs=backend_kwargs
-                    ),
-                    zip(
-                        orbits_split,
-                        obs,
-                    )
-                )
-                attribution_dfs += attribution_dfs_i
+            # Each index is written to disk once and every worker reads it once, tasks
+            # then only carry their chunk of orbits
+            with tempfile.TemporaryDirectory(prefix="thor_attribution_") as temp_dir:
+                for i, (observation_index, mask_i) in enumerate(zip(observation_indexes, masks)):
+
+                    index_file = os.path.join(temp_dir, "observation_index_{}.pkl".format(i))
+                    with open(index_file, "wb") as f:
+                        pickle.dump((observation_index, mask_i), f, protocol=pickle.HIGHEST_PROTOCOL)
 
-            p.close()
+                    attribution_dfs_i = p.starmap(
+                        partial(
+                            _attributionFile_worker,
+                            index_file=index_file,
+                            eps=eps,
+                            include_probabilistic=include_probabilistic,
+                            backend=backend,
+                            backend_kwargs=backend_kwargs,
+                            prefilter=prefilter,
+                            prefilter_margin=prefilter_margin,
+                            prefilter_max_acceleration=prefilter_max_acceleration
+                        ),
+                        zip(
+                            orbits_split,
+                        )
+                    )
+                    attribution_dfs += attribution_dfs_i
 
     else:
-        for observations_c in yieldChunks(observations, observations_chunk_size):
+        for observation_index, mask_i in zip(observation_indexes, masks):
             for orbit_c in orbits.split(orbits_chunk_size):
                 attribution_df_i = attribution_worker(
                     orbit_c,
-                    observations_c,
+                    observation_index,
                     eps=eps,
                     include_probabilistic=include_probabilistic,
                     backend=backend,
-                    backend_kwargs=backend_kwargs
+                    backend_kwargs=backend_kwargs,
+                    mask=mask_i,
+                    prefilter=prefilter,
+                    prefilter_margin=prefilter_margin,
+                    prefilter_max_acceleration=prefilter_max_acceleration
                 )
                 attribution_dfs.append(attribution_df_i)
 
@@ -309,7 +587,7 @@ def mergeAndExtendOrbits(
     num_jobs : int, optional
         Number of jobs to launch.
     parallel_backend : str, optional
-        Which parallelization backend to use {'ray', 'mp'}. Defaults to using Python's multiprocessing
+        Which parallelization backend to use {'ray', 'mp', 'cf'}. Defaults to using Python's multiprocessing
         module ('mp').
     """
     # Disable explicit orbit merging for the time being while we figure out
@@ -327,28 +605,64 @@ def mergeAndExtendOrbits(
     )
     observations_iter = observations.copy()
 
+    # Index the observations once, later iterations mask out the observations
+    # that have already been assigned to a final orbit
+    observation_index = ExposureIndex(observations)
+    observation_index.buildTrees()
+
     iterations = 0
     num_duplicate_obs_prev = 1e10
     odp_orbits_dfs = []
     odp_orbit_members_dfs = []
 
+    # Orbits that did not converge or whose members changed in the previous iteration
+    # are dirty and need to be re-attributed and re-fit. Clean orbits reuse their attributions
+    # and differential correction results from the previous iteration (see _findDirtyOrbits).
+    dirty_orbit_ids = orbits_iter["orbit_id"].values
+    attributions_prev = None
+    od_orbits_prev = None
+    od_orbit_members_prev = None
+
     if len(orbits_iter) > 0:
         converged = False
 
         while not converged:
-            # Run attribution
-            attributions = attributeObservations(
-                Orbits.from_df(orbits_iter),
-                observations_iter,
-                eps=eps,
-                include_probabilistic=True,
-                backend=backend,
-                backend_kwargs=backend_kwargs,
-                orbits_chunk_size=orbits_chunk_size,
-                observations_chunk_size=observations_chunk_size,
-                num_jobs=num_jobs,
-                parallel_backend=parallel_backend
+            dirty = orbits_iter["orbit_id"].isin(dirty_orbit_ids).values
+            logger.info("Re-attributing {} of {} orbits.".format(np.sum(dirty), len(orbits_iter)))
+
+            # Run attribution on the dirty orbits
+            attribution_dfs = []
+            if np.any(dirty):
+                mask = observation_index.observations["obs_id"].isin(observations_iter["obs_id"].values).values
+                attribution_dfs.append(attributeObservations(
+                    Orbits.from_df(orbits_iter[dirty]),
+                    observation_index,
+                    eps=eps,
+                    include_probabilistic=True,
+                    backend=backend,
+                    backend_kwargs=backend_kwargs,
+                    orbits_chunk_size=orbits_chunk_size,
+                    observations_chunk_size=observations_chunk_size,
+                    num_jobs=num_jobs,
+                    parallel_backend=parallel_backend,
+                    mask=mask
+                ))
+
+            # Reuse the attributions of the clean orbits (excluding any observations that
+            # have since been assigned to a final orbit)
+            if not np.all(dirty):
+                attribution_dfs.append(attributions_prev[
+                    attributions_prev["orbit_id"].isin(orbits_iter["orbit_id"].values[~dirty])
+                    & attributions_prev["obs_id"].isin(observations_iter["obs_id"].values)
+                ])
+
+            attributions = pd.concat(attribution_dfs)
+            attributions.sort_values(
+                by=["orbit_id", "mjd_utc", "distance"],
+                inplace=True,
+                ignore_index=True
             )
+            attributions_prev = attributions.copy()
 
             assert np.all(np.isin(orbit_members_iter["obs_id"].unique(), observations_iter["obs_id"].unique()))
 
@@ -366,6 +680,7 @@ def mergeAndExtendOrbits(
             )
             orbit_members_iter = attributions[["orbit_id", "obs_id", "residual_ra_arcsec", "residual_dec_arcsec", "chi2"]]
             orbits_iter = orbits_iter[orbits_iter["orbit_id"].isin(orbit_members_iter["orbit_id"].unique())]
+            orbit_members_attributed = orbit_members_iter[["orbit_id", "obs_id"]].copy()
 
             orbits_iter, orbit_members_iter = sortLinkages(
                 orbits_iter,
@@ -382,7 +697,10 @@ def mergeAndExtendOrbits(
                     observations_iter,
                     linkage_id_col="orbit_id",
                     filter_cols=["num_obs", "arc_length"],
-                    ascending=[False, False]
+                    ascending=[False, False],
+                    chunk_size=orbits_chunk_size,
+                    num_jobs=num_jobs,
+                    parallel_backend=parallel_backend
                 )
                 if len(merged_orbits) > 0:
                     orbits_iter = pd.concat(
@@ -400,12 +718,14 @@ def mergeAndExtendOrbits(
                     observations_iter,
                 )
 
-            # Run differential orbit correction on all orbits
+            # Run differential orbit correction on the dirty orbits
             # with the newly added observations to the orbits
             # that had observations attributed to them
+            orbits_attributed = orbits_iter.copy()
+            dirty = orbits_iter["orbit_id"].isin(dirty_orbit_ids).values
             orbits_iter, orbit_members_iter = differentialCorrection(
-                orbits_iter,
-                orbit_members_iter,
+                orbits_iter[dirty],
+                orbit_members_iter[orbit_members_iter["orbit_id"].isin(orbits_iter["orbit_id"].values[dirty])],
                 observations_iter,
                 rchi2_threshold=rchi2_threshold,
                 min_obs=min_obs,
@@ -421,6 +741,33 @@ def mergeAndExtendOrbits(
                 num_jobs=num_jobs,
                 parallel_backend=parallel_backend
             )
+
+            # Clean orbits converged on the observations attributed to them in the previous iteration, fitting
+            # them again from their converged state would not improve them so their previous fit is reused and
+            # they are saved for output
+            clean_orbit_ids = orbits_attributed["orbit_id"].values[~dirty]
+            if len(clean_orbit_ids) > 0:
+                orbits_clean = od_orbits_prev[od_orbits_prev["orbit_id"].isin(clean_orbit_ids)].copy()
+                orbits_clean["improved"] = False
+                orbit_members_clean = od_orbit_members_prev[od_orbit_members_prev["orbit_id"].isin(clean_orbit_ids)]
+
+                # Concatenating with the empty (object dtype) output of differential correction
+                # would cast every column of the clean orbits to object
+                if len(orbits_iter) > 0:
+                    orbits_iter = pd.concat(
+                        [orbits_iter, orbits_clean],
+                        ignore_index=True
+                    )
+                    orbit_members_iter = pd.concat(
+                        [orbit_members_iter, orbit_members_clean],
+                        ignore_index=True
+                    )
+                else:
+                    orbits_iter = orbits_clean.reset_index(drop=True)
+                    orbit_members_iter = orbit_members_clean.reset_index(drop=True)
+            od_orbits_prev = orbits_iter.copy()
+            od_orbit_members_prev = orbit_members_iter.copy()
+
             orbit_members_iter = orbit_members_iter[orbit_members_iter["outlier"] == 0]
             orbit_members_iter.reset_index(
                 inplace=True,
@@ -470,6 +817,13 @@ def mergeAndExtendOrbits(
             odp_orbits_dfs.append(orbits_out)
             odp_orbit_members_dfs.append(orbit_members_out)
 
+            dirty_orbit_ids = _findDirtyOrbits(
+                orbits_iter,
+                orbit_members_attributed,
+                orbit_members_iter,
+                rchi2_threshold
+            )
+
             iterations += 1
             if len(orbits_iter) == 0:
                 converged = True
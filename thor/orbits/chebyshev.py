@@ -0,0 +1,437 @@
+import os
+import numpy as np
+from numba import jit
+from astropy.time import Time
+
+from ..utils import _checkTime
+
+__all__ = [
+    "evaluateChebyshev",
+    "ChebyshevTable",
+    "buildStateTables",
+    "saveStateTables",
+    "loadStateTables",
+    "useStateTables",
+    "clearStateTables",
+    "findStateTable",
+]
+
+CHEBYSHEV_NUM_COEFFICIENTS = 16
+CHEBYSHEV_SEGMENT_LENGTH = 4.0
+CHEBYSHEV_OBSERVER_SEGMENT_LENGTH = 0.5
+
+# State tables used by getPerturberState and getObserverState, keyed
+# by (name, frame, origin)
+STATE_TABLES = {}
+
+@jit(["f8[:,:](f8[:,:,:], f8, f8, f8[:])"], nopython=True, cache=True)
+def evaluateChebyshev(coefficients, t_start, segment_length, times):
+    """
+    Evaluate piecewise Chebyshev series at the given times using Clenshaw's recurrence.
+    Times outside of the table are evaluated by extrapolating the first or last segment.
+
+    Parameters
+    ----------
+    coefficients : `~numpy.ndarray` (S, K, D)
+        Chebyshev coefficients of each segment for each dimension.
+    t_start : float
+        Start time of the first segment.
+    segment_length : float
+        Length of each segment.
+    times : `~numpy.ndarray` (N)
+        Times at which to evaluate the series.
+
+    Returns
+    -------
+    values : `~numpy.ndarray` (N, D)
+        Series evaluated at each time.
+    """
+    num_segments, num_coefficients, num_dims = coefficients.shape
+    num_times = len(times)
+    values = np.empty((num_times, num_dims))
+    for i in range(num_times):
+        segment = int(np.floor((times[i] - t_start) / segment_length))
+        segment = min(max(segment, 0), num_segments - 1)
+
+        # Map the time to [-1, 1] within its segment
+        x = 2 * (times[i] - t_start - segment * segment_length) / segment_length - 1
+        for d in range(num_dims):
+            b1 = 0.0
+            b2 = 0.0
+            for k in range(num_coefficients - 1, 0, -1):
+                b0 = 2 * x * b1 - b2 + coefficients[segment, k, d]
+                b2 = b1
+                b1 = b0
+            values[i, d] = x * b1 - b2 + coefficients[segment, 0, d]
+
+    return values
+
+class ChebyshevTable:
+    """
+    ChebyshevTable: Piecewise Chebyshev approximation of the state vectors of a body
+    or observatory over a window of time.
+
+    Parameters
+    ----------
+    name : str
+        Name of the body (see `~thor.orbits.getPerturberState`) or MPC observatory code.
+    coefficients : `~numpy.ndarray` (S, K, 6)
+        Chebyshev coefficients of each segment for each component of the state vector.
+    t_start : float
+        Start of the first segment in MJD TDB.
+    segment_length : float
+        Length of each segment in days.
+    frame : {'equatorial', 'ecliptic'}
+        Frame of the state vectors.
+    origin : {'barycenter', 'heliocenter'}
+        Origin of the state vectors.
+
+    Returns
+    -------
+    None
+    """
+    def __init__(self, name, coefficients, t_start, segment_length, frame="ecliptic", origin="heliocenter"):
+        self.name = name
+        self.coefficients = np.ascontiguousarray(coefficients, dtype=np.float64)
+        self.t_start = float(t_start)
+        self.segment_length = float(segment_length)
+        self.frame = frame
+        self.origin = origin
+        return
+
+    def __repr__(self):
+        rep = (
+            "ChebyshevTable: {} ({}, {})\n"
+            "MJD TDB: {} - {}\n"
+            "Segments: {} x {} coefficients\n"
+        )
+        return rep.format(
+            self.name,
+            self.frame,
+            self.origin,
+            self.t_start,
+            self.t_end,
+            self.coefficients.shape[0],
+            self.coefficients.shape[1]
+        )
+
+    @property
+    def t_end(self):
+        """
+        End of the last segment in MJD TDB.
+        """
+        return self.t_start + self.coefficients.shape[0] * self.segment_length
+
+    def covers(self, mjd_tdb):
+        """
+        Check if the table covers the given times.
+
+        Parameters
+        ----------
+        mjd_tdb : `~numpy.ndarray` (N)
+            Times in MJD TDB.
+
+        Returns
+        -------
+        bool
+            True if every time lies within the table.
+        """
+        mjd_tdb = np.atleast_1d(mjd_tdb)
+        return bool(np.all((mjd_tdb >= self.t_start) & (mjd_tdb <= self.t_end)))
+
+    def evaluate(self, mjd_tdb):
+        """
+        Evaluate the state vectors at the given times.
+
+        Parameters
+        ----------
+        mjd_tdb : `~numpy.ndarray` (N)
+            Times in MJD TDB.
+
+        Returns
+        -------
+        states : `~numpy.ndarray` (N, 6)
+            State vectors with position in AU and velocity in AU per day.
+        """
+        return evaluateChebyshev(
+            self.coefficients,
+            self.t_start,
+            self.segment_length,
+            np.ascontiguousarray(np.atleast_1d(mjd_tdb), dtype=np.float64)
+        )
+
+    @staticmethod
+    def fromFunction(
+            name,
+            func,
+            t_start,
+            t_end,
+            segment_length=CHEBYSHEV_SEGMENT_LENGTH,
+            num_coefficients=CHEBYSHEV_NUM_COEFFICIENTS,
+            frame="ecliptic",
+            origin="heliocenter"
+        ):
+        """
+        Fit a table to a function that returns state vectors. The function is called once with
+        the Chebyshev nodes of every segment.
+
+        Parameters
+        ----------
+        name : str
+            Name of the body or MPC observatory code.
+        func : callable
+            Function that takes times in MJD TDB (`~numpy.ndarray` (N)) and returns
+            state vectors (`~numpy.ndarray` (N, 6)).
+        t_start : float
+            Start of the window in MJD TDB.
+        t_end : float
+            End of the window in MJD TDB.
+        segment_length : float, optional
+            Length of each segment in days.
+        num_coefficients : int, optional
+            Number of Chebyshev coefficients per segment.
+        frame : {'equatorial', 'ecliptic'}
+            Frame of the state vectors.
+        origin : {'barycenter', 'heliocenter'}
+            Origin of the state vectors.
+
+        Returns
+        -------
+        table : `~thor.orbits.chebyshev.ChebyshevTable`
+            Fitted table.
+        """
+        num_segments = max(int(np.ceil((t_end - t_start) / segment_length)), 1)
+
+        # Chebyshev nodes of the first kind in each segment
+        theta = np.pi * (np.arange(num_coefficients) + 0.5) / num_coefficients
+        x = np.cos(theta)
+        segment_starts = t_start + np.arange(num_segments) * segment_length
+        nodes = segment_starts[:, np.newaxis] + (x + 1) / 2 * segment_length
+
+        values = np.asarray(func(nodes.ravel()), dtype=np.float64)
+        values = values.reshape(num_segments, num_coefficients, -1)
+
+        # Discrete orthogonality of the Chebyshev polynomials at the nodes
+        T = np.cos(np.outer(np.arange(num_coefficients), theta))
+        coefficients = 2 / num_coefficients * np.einsum("jk,skd->sjd", T, values)
+        coefficients[:, 0, :] /= 2
+
+        return ChebyshevTable(
+            name,
+            coefficients,
+            t_start,
+            segment_length,
+            frame=frame,
+            origin=origin
+        )
+
+def buildStateTables(
+        t_start,
+        t_end,
+        observatory_codes=[],
+        bodies=["sun", "solar system barycenter", "earth"],
+        frame="ecliptic",
+        origins=["heliocenter", "barycenter"],
+        segment_length=CHEBYSHEV_SEGMENT_LENGTH,
+        observer_segment_length=CHEBYSHEV_OBSERVER_SEGMENT_LENGTH,
+        num_coefficients=CHEBYSHEV_NUM_COEFFICIENTS
+    ):
+    """
+    Build state tables for major bodies and observatories over a window of time by querying
+    SPICE (and the MPC observatory codes) once for the Chebyshev nodes of each table.
+
+    Parameters
+    ----------
+    t_start : `~astropy.time.core.Time` (1)
+        Start of the window.
+    t_end : `~astropy.time.core.Time` (1)
+        End of the window.
+    observatory_codes : list, optional
+        MPC observatory codes for which to build tables.
+    bodies : list, optional
+        Major bodies for which to build tables (see `~thor.orbits.getPerturberState`).
+    frame : {'equatorial', 'ecliptic'}
+        Frame of the state vectors.
+    origins : list, optional
+        Origins of the state vectors, a table is built for each origin {'barycenter', 'heliocenter'}.
+    segment_length : float, optional
+        Length of each segment of the major body tables in days.
+    observer_segment_length : float, optional
+        Length of each segment of the observatory tables in days (observatories
+        move with the Earth's rotation).
+    num_coefficients : int, optional
+        Number of Chebyshev coefficients per segment.
+
+    Returns
+    -------
+    tables : list of `~thor.orbits.chebyshev.ChebyshevTable`
+        State tables.
+    """
+    from .state import getPerturberState
+    from ..observatories import getObserverState
+
+    _checkTime(t_start, "t_start")
+    _checkTime(t_end, "t_end")
+    mjd_start = t_start.tdb.mjd
+    mjd_end = t_end.tdb.mjd
+
+    def toTime(mjd_tdb):
+        return Time(mjd_tdb, scale="tdb", format="mjd")
+
+    # Tables are fit to SPICE, not to any tables that are already in use
+    tables_in_use = STATE_TABLES.copy()
+    STATE_TABLES.clear()
+    try:
+        tables = []
+        for origin in origins:
+            for body in bodies:
+                if (body == "sun" and origin == "heliocenter") or (body == "solar system barycenter" and origin == "barycenter"):
+                    continue
+
+                tables.append(ChebyshevTable.fromFunction(
+                    body,
+                    lambda mjd_tdb: getPerturberState(body, toTime(mjd_tdb), frame=frame, origin=origin),
+                    mjd_start,
+                    mjd_end,
+                    segment_length=segment_length,
+                    num_coefficients=num_coefficients,
+                    frame=frame,
+                    origin=origin
+                ))
+
+            for code in observatory_codes:
+                tables.append(ChebyshevTable.fromFunction(
+                    code,
+                    lambda mjd_tdb: getObserverState([code], toTime(mjd_tdb), frame=frame, origin=origin, as_numpy=True),
+                    mjd_start,
+                    mjd_end,
+                    segment_length=observer_segment_length,
+                    num_coefficients=num_coefficients,
+                    frame=frame,
+                    origin=origin
+                ))
+    finally:
+        STATE_TABLES.update(tables_in_use)
+
+    return tables
+
+def saveStateTables(tables, file):
+    """
+    Save state tables to a single .npz file.
+
+    Parameters
+    ----------
+    tables : list of `~thor.orbits.chebyshev.ChebyshevTable`
+        State tables.
+    file : str
+        Path to the file.
+
+    Returns
+    -------
+    None
+    """
+    data = {
+        "names" : np.array([table.name for table in tables], dtype=str),
+        "frames" : np.array([table.frame for table in tables], dtype=str),
+        "origins" : np.array([table.origin for table in tables], dtype=str),
+        "t_start" : np.array([table.t_start for table in tables], dtype=np.float64),
+        "segment_length" : np.array([table.segment_length for table in tables], dtype=np.float64),
+    }
+    for i, table in enumerate(tables):
+        data["coefficients_{}".format(i)] = table.coefficients
+
+    np.savez(file, **data)
+    return
+
+def loadStateTables(file):
+    """
+    Load state tables saved with `saveStateTables`.
+
+    Parameters
+    ----------
+    file : str
+        Path to the file.
+
+    Returns
+    -------
+    tables : list of `~thor.orbits.chebyshev.ChebyshevTable`
+        State tables.
+    """
+    tables = []
+    with np.load(file, allow_pickle=False) as data:
+        for i, name in enumerate(data["names"]):
+            tables.append(ChebyshevTable(
+                str(name),
+                data["coefficients_{}".format(i)],
+                data["t_start"][i],
+                data["segment_length"][i],
+                frame=str(data["frames"][i]),
+                origin=str(data["origins"][i])
+            ))
+
+    return tables
+
+def useStateTables(tables):
+    """
+    Use state tables in this process: `~thor.orbits.getPerturberState` and
+    `~thor.observatories.getObserverState` evaluate a table instead of querying
+    SPICE whenever a table covers all of the requested times.
+
+    If the path to a file is given, it is also stored in the THOR_STATE_TABLES environment
+    variable so that worker processes started afterwards load the same tables from disk.
+
+    Parameters
+    ----------
+    tables : list of `~thor.orbits.chebyshev.ChebyshevTable` or str
+        State tables or the path to a file of state tables saved with `saveStateTables`.
+
+    Returns
+    -------
+    None
+    """
+    if isinstance(tables, str):
+        os.environ["THOR_STATE_TABLES"] = tables
+        tables = loadStateTables(tables)
+
+    for table in tables:
+        STATE_TABLES[(table.name, table.frame, table.origin)] = table
+    return
+
+def clearStateTables():
+    """
+    Stop using any state tables in this process (and in worker
+    processes started afterwards).
+
+    Returns
+    -------
+    None
+    """
+    STATE_TABLES.clear()
+    os.environ.pop("THOR_STATE_TABLES", None)
+    return
+
+def findStateTable(name, frame, origin, mjd_tdb):
+    """
+    Find the state table in use for the given body or observatory
+    that covers the given times.
+
+    Parameters
+    ----------
+    name : str
+        Name of the body or MPC observatory code.
+    frame : {'equatorial', 'ecliptic'}
+        Frame of the state vectors.
+    origin : {'barycenter', 'heliocenter'}
+        Origin of the state vectors.
+    mjd_tdb : `~numpy.ndarray` (N)
+        Times in MJD TDB.
+
+    Returns
+    -------
+    table : `~thor.orbits.chebyshev.ChebyshevTable` or None
+        State table, None if no table covers the times.
+    """
+    table = STATE_TABLES.get((name, frame, origin))
+    if table is not None and table.covers(mjd_tdb):
+        return table
+    return None
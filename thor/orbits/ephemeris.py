@@ -44,7 +44,7 @@ def generateEphemeris(
     num_jobs : int, optional
         Number of jobs to launch.
     parallel_backend : str, optional
-        Which parallelization backend to use {'ray', 'mp'}. Defaults to using Python's multiprocessing
+        Which parallelization backend to use {'ray', 'mp', 'cf'}. Defaults to using Python's multiprocessing
         module ('mp').
 
     Returns
@@ -1,5 +1,4 @@
 import numpy as np
-from numpy import roots
 from numba import jit
 from astropy.time import Time
 
@@ -20,26 +19,36 @@ __all__ = [
     "_calcRhos",
     "_calcFG",
     "calcGauss",
-    "gaussIOD"
+    "gaussIOD",
+    "gaussIODBatch"
 ]
 
 MU = c.MU
 C = c.C
 
+# The following helpers accept either single vectors of shape (3) or arrays of vectors of
+# shape (N, 3) (with scalars or arrays of shape (N) for the remaining arguments), so they
+# can be used for a single triplet or a batch of triplets
+
 def _calcV(rho1_hat, rho2_hat, rho3_hat):
     # Vector triple product that gives the area of
     # the "volume of the parallelepiped" or according to
     # to Milani et al. 2008: 3x volume of the pyramid with vertices q, r1, r2, r3.
     # Note that vector triple product rules apply here.
-    return np.dot(np.cross(rho1_hat, rho2_hat), rho3_hat)
+    return np.einsum("...i,...i->...", np.cross(rho1_hat, rho2_hat), rho3_hat)
 
 def _calcA(q1, q2, q3, rho1_hat, rho3_hat, t31, t32, t21):
     # Equation 21 from Milani et al. 2008
-    return np.linalg.norm(q2)**3 * np.dot(np.cross(rho1_hat, rho3_hat), (t32 * q1 - t31 * q2 + t21 * q3))
+    t31 = np.asarray(t31)[..., np.newaxis]
+    t32 = np.asarray(t32)[..., np.newaxis]
+    t21 = np.asarray(t21)[..., np.newaxis]
+    return np.linalg.norm(q2, axis=-1)**3 * np.einsum("...i,...i->...", np.cross(rho1_hat, rho3_hat), (t32 * q1 - t31 * q2 + t21 * q3))
 
 def _calcB(q1, q3, rho1_hat, rho3_hat, t31, t32, t21, mu=MU):
     # Equation 19 from Milani et al. 2008
-    return mu / 6 * t32 * t21 * np.dot(np.cross(rho1_hat, rho3_hat), ((t31 + t32) * q1 + (t31 + t21) * q3))
+    t1 = np.asarray(t31 + t32)[..., np.newaxis]
+    t3 = np.asarray(t31 + t21)[..., np.newaxis]
+    return mu / 6 * t32 * t21 * np.einsum("...i,...i->...", np.cross(rho1_hat, rho3_hat), (t1 * q1 + t3 * q3))
 
 def _calcLambdas(r2_mag, t31, t32, t21, mu=MU):
     # Equations 16 and 17 from Milani et al. 2008
@@ -51,13 +60,13 @@ def _calcRhos(lambda1, lambda3, q1, q2, q3, rho1_hat, rho2_hat, rho3_hat, V):
     # This can be derived by taking a series of scalar products of the coplanarity condition equation
     # with cross products of unit vectors in the direction of the observer, in particular, see Chapter 9 in
     # Milani's book on the theory of orbit determination
-    numerator = -lambda1 * q1 + q2 - lambda3 * q3
-    rho1_mag = np.dot(numerator, np.cross(rho2_hat, rho3_hat)) / (lambda1 * V)
-    rho2_mag = np.dot(numerator, np.cross(rho1_hat, rho3_hat)) / V
-    rho3_mag = np.dot(numerator, np.cross(rho1_hat, rho2_hat)) / (lambda3 * V)
-    rho1 = np.dot(rho1_mag, rho1_hat)
-    rho2 = np.dot(rho2_mag, rho2_hat)
-    rho3 = np.dot(rho3_mag, rho3_hat)
+    numerator = -np.asarray(lambda1)[..., np.newaxis] * q1 + q2 - np.asarray(lambda3)[..., np.newaxis] * q3
+    rho1_mag = np.einsum("...i,...i->...", numerator, np.cross(rho2_hat, rho3_hat)) / (lambda1 * V)
+    rho2_mag = np.einsum("...i,...i->...", numerator, np.cross(rho1_hat, rho3_hat)) / V
+    rho3_mag = np.einsum("...i,...i->...", numerator, np.cross(rho1_hat, rho2_hat)) / (lambda3 * V)
+    rho1 = np.asarray(rho1_mag)[..., np.newaxis] * rho1_hat
+    rho2 = np.asarray(rho2_mag)[..., np.newaxis] * rho2_hat
+    rho3 = np.asarray(rho3_mag)[..., np.newaxis] * rho3_hat
     return rho1, rho2, rho3
 
 def _calcFG(r2_mag, t32, t21, mu=MU):
@@ -168,133 +177,192 @@ def gaussIOD(coords,
     orbits : `~numpy.ndarray` ((<3, 6) or (0))
         Up to three preliminary orbits (as cartesian state vectors).
     """
-    coords = np.array([np.ones(len(coords)), coords[:, 0], coords[:, 1]]).T.copy()
+    _, iod_orbits = gaussIODBatch(
+        coords[np.newaxis, :, :],
+        np.asarray(observation_times)[np.newaxis, :],
+        coords_obs[np.newaxis, :, :3],
+        velocity_method=velocity_method,
+        light_time=light_time,
+        iterate=iterate,
+        iterator=iterator,
+        mu=mu,
+        max_iter=max_iter,
+        tol=tol
+    )
+    return iod_orbits
+
+def gaussIODBatch(coords,
+                  observation_times,
+                  coords_obs,
+                  velocity_method="gibbs",
+                  light_time=True,
+                  iterate=True,
+                  iterator="state transition",
+                  mu=MU,
+                  max_iter=10,
+                  tol=1e-15):
+    """
+    Compute up to three intial orbits for each of K triplets of observations in angular
+    equatorial coordinates. The eighth order polynomials of all triplets are solved at once
+    as the eigenvalues of a stack of companion matrices.
+
+    Parameters
+    ----------
+    coords : `~numpy.ndarray` (K, 3, 2)
+        RA and Dec of the three observations of each triplet in units of degrees.
+    observation_times : `~numpy.ndarray` (K, 3)
+        Times of the three observations of each triplet in units of decimal days (MJD or JD for example).
+    coords_obs : `~numpy.ndarray` (K, 3, 3)
+        Heliocentric position vector of the observer at the time of each observation in units of AU.
+    velocity_method : {'gauss', gibbs', 'herrick+gibbs'}, optional
+        Which method to use for calculating the velocity at the second observation.
+        [Default = 'gibbs']
+    light_time : bool, optional
+        Correct for light travel time.
+        [Default = True]
+    iterate : bool, optional
+        Iterate initial orbit using universal anomaly to better approximate the
+        Lagrange coefficients.
+    mu : float, optional
+        Gravitational parameter (GM) of the attracting body in units of
+        AU**3 / d**2.
+    max_iter : int, optional
+        Maximum number of iterations over which to converge to solution.
+    tol : float, optional
+        Numerical tolerance to which to compute chi using the Newtown-Raphson
+        method.
+
+    Returns
+    -------
+    triplet_indices : `~numpy.ndarray` (M)
+        Index of the triplet from which each preliminary orbit was calculated (sorted
+        in ascending order).
+    iod_orbits : `~thor.orbits.orbits.Orbits` (M)
+        Preliminary orbits (up to three per triplet).
+    """
+    if velocity_method not in ["gauss", "gibbs", "herrick+gibbs"]:
+        raise ValueError("velocity_method should be one of {'gauss', 'gibbs', 'herrick+gibbs'}")
+
+    num_triplets = len(coords)
+    coords = np.stack([np.ones((num_triplets, 3)), coords[:, :, 0], coords[:, :, 1]], axis=2).reshape(-1, 3)
     rho = transformCoordinates(
         coords,
         "equatorial",
         "ecliptic",
         representation_in="spherical",
         representation_out="cartesian"
-    )
-    rho1_hat = rho[0, :]
-    rho2_hat = rho[1, :]
-    rho3_hat = rho[2, :]
-    q1 = coords_obs[0,:]
-    q2 = coords_obs[1,:]
-    q3 = coords_obs[2,:]
-    q2_mag = np.linalg.norm(q2)
+    ).reshape(num_triplets, 3, 3)
 
     # Make sure rhohats are unit vectors
-    rho1_hat = rho1_hat / np.linalg.norm(rho1_hat)
-    rho2_hat = rho2_hat / np.linalg.norm(rho2_hat)
-    rho3_hat = rho3_hat / np.linalg.norm(rho3_hat)
-
-    t1 = observation_times[0]
-    t2 = observation_times[1]
-    t3 = observation_times[2]
+    rho_hat = rho / np.linalg.norm(rho, axis=2, keepdims=True)
+    rho1_hat = rho_hat[:, 0, :]
+    rho2_hat = rho_hat[:, 1, :]
+    rho3_hat = rho_hat[:, 2, :]
+    q1 = coords_obs[:, 0, :]
+    q2 = coords_obs[:, 1, :]
+    q3 = coords_obs[:, 2, :]
+    q2_mag = np.linalg.norm(q2, axis=1)
+
+    t1 = observation_times[:, 0]
+    t2 = observation_times[:, 1]
+    t3 = observation_times[:, 2]
     t31 = t3 - t1
     t21 = t2 - t1
     t32 = t3 - t2
 
     A = _calcA(q1, q2, q3, rho1_hat, rho3_hat, t31, t32, t21)
-    B = _calcB(q1, q3, rho1_hat, rho3_hat, t31, t32, t21)
+    B = _calcB(q1, q3, rho1_hat, rho3_hat, t31, t32, t21, mu=mu)
     V = _calcV(rho1_hat, rho2_hat, rho3_hat)
-    coseps2 = np.dot(q2, rho2_hat) / q2_mag
-    C0 = V * t31 * q2_mag**4 / B
-    h0 = - A / B
-
-    if np.isnan(C0) or np.isnan(h0):
-        return np.array([])
-
-    # Find roots to eighth order polynomial
-    all_roots = roots([
-        C0**2,
-        0,
-        -q2_mag**2 * (h0**2 + 2 * C0 * h0 * coseps2 + C0**2),
-        0,
-        0,
-        2 * q2_mag**5 * (h0 + C0 * coseps2),
-        0,
-        0,
-        -q2_mag**8
-    ])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        coseps2 = np.einsum("ij,ij->i", q2, rho2_hat) / q2_mag
+        C0 = V * t31 * q2_mag**4 / B
+        h0 = - A / B
+
+    # Find roots to the eighth order polynomial of each triplet as the eigenvalues
+    # of its companion matrix
+    coeffs = np.zeros((num_triplets, 9))
+    coeffs[:, 0] = C0**2
+    coeffs[:, 2] = -q2_mag**2 * (h0**2 + 2 * C0 * h0 * coseps2 + C0**2)
+    coeffs[:, 5] = 2 * q2_mag**5 * (h0 + C0 * coseps2)
+    coeffs[:, 8] = -q2_mag**8
+    solvable = np.all(np.isfinite(coeffs), axis=1) & (coeffs[:, 0] != 0)
+
+    companion = np.zeros((np.sum(solvable), 8, 8))
+    companion[:, 0, :] = -coeffs[solvable, 1:] / coeffs[solvable, 0:1]
+    companion[:, np.arange(1, 8), np.arange(0, 7)] = 1
+    all_roots = np.full((num_triplets, 8), np.nan, dtype=complex)
+    if len(companion) > 0:
+        all_roots[solvable] = np.linalg.eigvals(companion)
 
     # Keep only positive real roots (which should at most be 3)
-    r2_mags = np.real(all_roots[np.isreal(all_roots) & (np.real(all_roots) >= 0)])
-    num_solutions = len(r2_mags)
-    if num_solutions == 0:
-        return np.array([])
-
-    orbits = []
-    epochs = []
-    for r2_mag in r2_mags:
-        lambda1, lambda3 = _calcLambdas(r2_mag, t31, t32, t21)
-        rho1, rho2, rho3 = _calcRhos(lambda1, lambda3, q1, q2, q3, rho1_hat, rho2_hat, rho3_hat, V)
-
-        if np.dot(rho2, rho2_hat) < 0:
-            continue
+    real = np.isreal(all_roots) & (np.real(all_roots) >= 0)
+    indices, _ = np.where(real)
+    r2_mag = np.real(all_roots[real])
+
+    # Calculate the distance to the object at each observation for every root
+    lambda1, lambda3 = _calcLambdas(r2_mag, t31[indices], t32[indices], t21[indices], mu=mu)
+    rho1, rho2, rho3 = _calcRhos(
+        lambda1,
+        lambda3,
+        q1[indices],
+        q2[indices],
+        q3[indices],
+        rho1_hat[indices],
+        rho2_hat[indices],
+        rho3_hat[indices],
+        V[indices]
+    )
 
-        # Test if we get the same rho2 as using equation 22 in Milani et al. 2008
-        rho2_mag = (h0 - q2_mag**3 / r2_mag**3) * q2_mag / C0
-        #np.testing.assert_almost_equal(np.dot(rho2_mag, rho2_hat), rho2)
+    keep = np.einsum("ij,ij->i", rho2, rho2_hat[indices]) >= 0
+    indices = indices[keep]
+    rho1 = rho1[keep]
+    rho2 = rho2[keep]
+    rho3 = rho3[keep]
 
-        r1 = q1 + rho1
-        r2 = q2 + rho2
-        r3 = q3 + rho3
+    r1 = q1[indices] + rho1
+    r2 = q2[indices] + rho2
+    r3 = q3[indices] + rho3
 
+    orbits = np.zeros((len(indices), 6))
+    orbits[:, :3] = r2
+    for i, k in enumerate(indices):
         if velocity_method == "gauss":
-            v2 = calcGauss(r1, r2, r3, t1, t2, t3)
+            orbits[i, 3:] = calcGauss(r1[i], r2[i], r3[i], t1[k], t2[k], t3[k])
         elif velocity_method == "gibbs":
-            v2 = calcGibbs(r1, r2, r3)
-        elif velocity_method == "herrick+gibbs":
-            v2 = calcHerrickGibbs(r1, r2, r3, t1, t2, t3)
+            orbits[i, 3:] = calcGibbs(r1[i], r2[i], r3[i])
         else:
-            raise ValueError("velocity_method should be one of {'gauss', 'gibbs', 'herrick+gibbs'}")
-
-        epoch = t2
-        orbit = np.concatenate([r2, v2])
+            orbits[i, 3:] = calcHerrickGibbs(r1[i], r2[i], r3[i], t1[k], t2[k], t3[k])
 
         if iterate == True:
             if iterator == "state transition":
-                orbit = iterateStateTransition(
-                    orbit, t21, t32,
-                    q1, q2, q3,
-                    rho1, rho2, rho3,
+                orbits[i] = iterateStateTransition(
+                    orbits[i], t21[k], t32[k],
+                    q1[k], q2[k], q3[k],
+                    rho1[i], rho2[i], rho3[i],
                     light_time=light_time,
                     mu=mu,
                     max_iter=max_iter,
                     tol=tol
                 )
 
-        if light_time == True:
-            rho2_mag = np.linalg.norm(orbit[:3] - q2)
-            lt = rho2_mag / C
-            epoch -= lt
-
-        if np.linalg.norm(orbit[3:]) >= C:
-            continue
-
-        if (np.linalg.norm(orbit[:3]) > 300.) or (np.linalg.norm(orbit[3:]) > 1.):
-            # Orbits that crash PYOORB:
-            # 58366.84446725786 : 9.5544354809296721e+01  1.4093228616761269e+01 -6.6700146960148423e+00 -6.2618123281073522e+01 -9.4167879481188717e+00  4.4421501034359023e+0
-            continue
-
-        orbits.append(orbit)
-        epochs.append(epoch)
+    epochs = t2[indices].copy()
+    if light_time == True:
+        lt = np.linalg.norm(orbits[:, :3] - q2[indices], axis=1) / C
+        epochs -= lt
 
-    epochs = np.array(epochs)
-    orbits = np.array(orbits)
-    if len(orbits) > 0:
-        epochs = epochs[~np.isnan(orbits).any(axis=1)]
-        orbits = orbits[~np.isnan(orbits).any(axis=1)]
+    # Orbits that crash PYOORB:
+    # 58366.84446725786 : 9.5544354809296721e+01  1.4093228616761269e+01 -6.6700146960148423e+00 -6.2618123281073522e+01 -9.4167879481188717e+00  4.4421501034359023e+0
+    r_mag = np.linalg.norm(orbits[:, :3], axis=1)
+    v_mag = np.linalg.norm(orbits[:, 3:], axis=1)
+    keep = (v_mag < C) & (r_mag <= 300.) & (v_mag <= 1.) & ~np.isnan(orbits).any(axis=1)
 
     iod_orbits = Orbits(
-        orbits,
+        orbits[keep],
         Time(
-            epochs,
+            epochs[keep],
             format="mjd",
             scale="utc"
         ),
         orbit_type="cartesian"
     )
-    return iod_orbits
\ No newline at end of file
+    return indices[keep], iod_orbits
@@ -1,14 +1,14 @@
 import time
 import uuid
+import heapq
 import logging
 import numpy as np
 import pandas as pd
-import multiprocessing as mp
 from astropy.time import Time
-from itertools import combinations
+from itertools import islice
 from functools import partial
 
-from ..utils import _initWorker
+from ..utils import getExecutor
 from ..utils import _checkParallel
 from ..utils import yieldChunks
 from ..utils import calcChunkSize
@@ -16,21 +16,105 @@ from ..utils import sortLinkages
 from ..utils import identifySubsetLinkages
 from ..backend import MJOLNIR
 from ..backend import PYOORB
-from .gauss import gaussIOD
+from .orbits import Orbits
+from .gauss import gaussIODBatch
 from .residuals import calcResiduals
 
 logger = logging.getLogger(__name__)
 
 __all__ = [
+    "yieldTriplets",
     "selectObservations",
+    "calcGaussSolutions",
     "iod",
     "iod_worker",
     "initialOrbitDetermination"
 ]
 
+def yieldTriplets(times):
+    """
+    Yield every combination of three observations with unique observation times, sorted by
+    descending arc length and then by ascending time of the second observation from the midpoint
+    of the first and third observations (ties are yielded in the order of the observations).
+
+    Triplets are generated lazily: pairs of first and third observations are visited in order
+    of descending arc length with a heap, and the middle observations of a pair are only
+    ranked once that pair's arc length is reached. Time and memory are bounded by the number
+    of triplets consumed rather than by the number of possible combinations.
+
+    For observation times sorted in ascending order, this is the order in which
+    every combination of three observations was previously sorted.
+
+    Parameters
+    ----------
+    times : `~numpy.ndarray` (N)
+        Observation times.
+
+    Yields
+    ------
+    triplet : tuple
+        Indices of the three observations in ascending order.
+    """
+    times = np.asarray(times)
+    order = np.argsort(times, kind="stable")
+    times_sorted = times[order]
+    num_obs = len(times)
+    if num_obs < 3:
+        return
+
+    def middles(i, k):
+        # Rank the observations between the i-th and k-th (sorted) observations whose times are strictly
+        # between both by their time from the midpoint of the pair
+        lo = np.searchsorted(times_sorted, times_sorted[i], side="right")
+        hi = np.searchsorted(times_sorted, times_sorted[k], side="left")
+        j = order[lo:hi]
+        time_from_mid = np.abs((times[order[k]] + times[order[i]]) / 2 - times[j])
+        indices = np.sort(np.vstack([np.full(len(j), order[i]), j, np.full(len(j), order[k])]).T, axis=1)
+        rank = np.lexsort((indices[:, 2], indices[:, 1], indices[:, 0], time_from_mid))
+        return time_from_mid[rank], indices[rank]
+
+    # Heap of pairs of (sorted) first and third observations keyed on descending
+    # arc length, starting with the pair with the longest arc
+    pairs = [(-(times_sorted[-1] - times_sorted[0]), 0, num_obs - 1)]
+    visited = {(0, num_obs - 1)}
+    # Heap of the next best triplet of each pair that has been reached
+    triplets = []
+    while len(pairs) > 0 or len(triplets) > 0:
+
+        # Reach every pair with an arc length at least as long as the best triplet's so
+        # that triplets from pairs with equal arc lengths are ranked together
+        while len(pairs) > 0 and (len(triplets) == 0 or pairs[0][0] <= triplets[0][0]):
+            neg_arc_length, i, k = heapq.heappop(pairs)
+            time_from_mid, indices = middles(i, k)
+            if len(indices) > 0:
+                heapq.heappush(
+                    triplets,
+                    (neg_arc_length, time_from_mid[0], tuple(indices[0]), 0, time_from_mid, indices)
+                )
+
+            for i_, k_ in [(i + 1, k), (i, k - 1)]:
+                if k_ - i_ >= 2 and (i_, k_) not in visited:
+                    visited.add((i_, k_))
+                    heapq.heappush(pairs, (-(times_sorted[k_] - times_sorted[i_]), i_, k_))
+
+        if len(triplets) == 0:
+            break
+
+        neg_arc_length, _, triplet, n, time_from_mid, indices = heapq.heappop(triplets)
+        yield triplet
+
+        if n + 1 < len(indices):
+            heapq.heappush(
+                triplets,
+                (neg_arc_length, time_from_mid[n + 1], tuple(indices[n + 1]), n + 1, time_from_mid, indices)
+            )
+
+    return
+
 def selectObservations(
         observations,
-        method="combinations"
+        method="combinations",
+        num_triplets=None
     ):
     """
     Selects which three observations to use for IOD depending on the method.
@@ -39,7 +123,7 @@ def selectObservations(
         'first+middle+last' : Grab the first, middle and last observations in time.
         'thirds' : Grab the middle observation in the first third, second third, and final third.
         'combinations' : Return the observation IDs corresponding to every possible combination of three observations with
-            non-coinciding observation times.
+            non-coinciding observation times (sorted by descending arc length, see `~thor.orbits.iod.yieldTriplets`).
 
     Parameters
     ----------
@@ -49,6 +133,9 @@ def selectObservations(
     method : {'first+middle+last', 'thirds', 'combinations'}, optional
         Which method to use to select observations.
         [Default = 'combinations']
+    num_triplets : int, optional
+        Maximum number of combinations to return (only used if method is 'combinations'). Only
+        this many combinations are generated. If None, all combinations are returned.
 
     Returns
     -------
@@ -60,7 +147,6 @@ def selectObservations(
     if len(obs_ids) < 3:
         return np.array([])
 
-    indexes = np.arange(0, len(obs_ids))
     times = observations["mjd_utc"].values
 
     if method == "first+middle+last":
@@ -78,18 +164,12 @@ def selectObservations(
         selected_index = np.array([selected_index])
 
     elif method == "combinations":
-        # Make all possible combinations of 3 observations
-        selected_index = np.array([np.array(index) for index in combinations(indexes, 3)])
-
-        # Calculate arc length
-        arc_length = times[selected_index][:, 2] - times[selected_index][:, 0]
-
-        # Calculate distance of second observation from middle point (last + first) / 2
-        time_from_mid = np.abs((times[selected_index][:, 2] + times[selected_index][:, 0])/2 - times[selected_index][:, 1])
-
-        # Sort by descending arc length and ascending time from midpoint
-        sort = np.lexsort((time_from_mid, -arc_length))
-        selected_index = selected_index[sort]
+        # Generate the best combinations of 3 observations with unique times (sorted by descending
+        # arc length and ascending time from midpoint)
+        selected_index = np.array(list(islice(yieldTriplets(times), num_triplets)), dtype=int)
+        if len(selected_index) == 0:
+            return np.array([])
+        return obs_ids[selected_index]
 
     else:
         raise ValueError("method should be one of {'first+middle+last', 'thirds'}")
@@ -110,6 +190,91 @@ def selectObservations(
 
     return obs_ids[selected_index]
 
+def _selectTriplets(
+        observations,
+        min_obs=6,
+        contamination_percentage=0.0,
+        observation_selection_method="combinations"
+    ):
+    # Select the triplets of observation IDs that IOD may use for a linkage, enough
+    # triplets are kept to account for the maximum number of outliers
+    num_obs = len(observations)
+    num_outliers = int(num_obs * contamination_percentage / 100.)
+    num_outliers = np.maximum(np.minimum(num_obs - min_obs, num_outliers), 0)
+
+    obs_ids = selectObservations(
+        observations,
+        method=observation_selection_method,
+        num_triplets=(3 * (num_outliers + 1))
+    )
+    return obs_ids[:(3 * (num_outliers + 1))]
+
+def calcGaussSolutions(
+        observations_list,
+        triplets_list,
+        light_time=True,
+        iterate=False
+    ):
+    """
+    Run Gauss IOD on the triplets of observations selected for many linkages in a single
+    call to `~thor.orbits.gauss.gaussIODBatch`.
+
+    Parameters
+    ----------
+    observations_list : list of `~pandas.DataFrame`
+        Observations of each linkage (see `~thor.orbits.iod.iod` for the required columns).
+    triplets_list : list of `~numpy.ndarray` (N, 3)
+        Observation IDs of the selected triplets of each linkage.
+    light_time : bool, optional
+        Correct preliminary orbits for light travel time.
+    iterate : bool, optional
+        Iterate the preliminary orbit solutions using the state transition iterator.
+
+    Returns
+    -------
+    gauss_solutions : list of lists of `~thor.orbits.orbits.Orbits`
+        For each linkage and each of its triplets, the preliminary orbits (up to three).
+    """
+    coords = []
+    times = []
+    coords_obs = []
+    linkage_indices = []
+    for i, (observations, triplets) in enumerate(zip(observations_list, triplets_list)):
+        if len(triplets) == 0:
+            continue
+
+        # Observations in each triplet are ordered as they are in the linkage's observations
+        indices = pd.Index(observations["obs_id"].values).get_indexer(np.asarray(triplets).ravel()).reshape(-1, 3)
+        indices.sort(axis=1)
+        coords.append(observations[["RA_deg", "Dec_deg"]].values[indices])
+        times.append(observations["mjd_utc"].values[indices])
+        coords_obs.append(observations[["obs_x", "obs_y", "obs_z"]].values[indices])
+        linkage_indices.append(np.full(len(indices), i))
+
+    gauss_solutions = [[] for i in range(len(observations_list))]
+    if len(coords) == 0:
+        return gauss_solutions
+
+    linkage_indices = np.concatenate(linkage_indices)
+    solution_indices, iod_orbits = gaussIODBatch(
+        np.concatenate(coords),
+        np.concatenate(times),
+        np.concatenate(coords_obs),
+        light_time=light_time,
+        iterate=iterate,
+        max_iter=100,
+        tol=1e-15
+    )
+
+    # Orbits are sorted by the triplet they were calculated from, split them
+    # into one set of orbits per triplet
+    starts = np.searchsorted(solution_indices, np.arange(len(linkage_indices)), side="left")
+    ends = np.searchsorted(solution_indices, np.arange(len(linkage_indices)), side="right")
+    for i, start, end in zip(linkage_indices, starts, ends):
+        gauss_solutions[i].append(iod_orbits[start:end])
+
+    return gauss_solutions
+
 def iod_worker(
         observations_list,
         observation_selection_method="combinations",
@@ -125,7 +290,24 @@ def iod_worker(
     ):
     iod_orbits_dfs = []
     iod_orbit_members_dfs = []
-    for observations in observations_list:
+
+    # Select triplets for every linkage and calculate all of their Gauss solutions at once
+    triplets_list = [
+        _selectTriplets(
+            observations,
+            min_obs=min_obs,
+            contamination_percentage=contamination_percentage,
+            observation_selection_method=observation_selection_method
+        ) for observations in observations_list
+    ]
+    gauss_solutions_list = calcGaussSolutions(
+        observations_list,
+        triplets_list,
+        light_time=light_time,
+        iterate=iterate
+    )
+
+    for observations, triplets, gauss_solutions in zip(observations_list, triplets_list, gauss_solutions_list):
         assert np.all(sorted(observations["mjd_utc"].values) == observations["mjd_utc"].values)
 
         time_start = time.time()
@@ -142,7 +324,8 @@ def iod_worker(
             iterate=iterate,
             light_time=light_time,
             backend=backend,
-            backend_kwargs=backend_kwargs
+            backend_kwargs=backend_kwargs,
+            gauss_solutions=(triplets, gauss_solutions)
         )
         if len(iod_orbit) > 0:
             iod_orbit.insert(1, linkage_id_col, linkage_id)
@@ -164,6 +347,37 @@ def iod_worker(
     )
     return iod_orbits, iod_orbit_members
 
+def _scoreCandidates(
+        candidates,
+        backend,
+        observers,
+        coords,
+        sigmas
+    ):
+    # Generate ephemerides for every candidate orbit with a single backend call, then
+    # calculate the residuals and chi2 of all candidates at once. Ephemerides are
+    # returned grouped by orbit (in the order of the observers) so they are
+    # regrouped by candidate and reshaped to (n_candidates, n_obs, 2)
+    num_candidates = len(candidates)
+    num_obs = len(coords)
+    ephemeris = backend._generateEphemeris(
+        candidates,
+        observers
+    )
+    candidate_index = pd.Index(candidates.ids).get_indexer(ephemeris["orbit_id"].values)
+    order = np.argsort(candidate_index, kind="stable")
+    coords_predicted = ephemeris[["RA_deg", "Dec_deg"]].values[order]
+
+    residuals, stats = calcResiduals(
+        np.tile(coords, (num_candidates, 1)),
+        coords_predicted,
+        sigmas_actual=np.tile(sigmas, (num_candidates, 1)),
+        include_probabilistic=False
+    )
+    residuals = residuals.reshape(num_candidates, num_obs, 2)
+    chi2 = stats[0].reshape(num_candidates, num_obs)
+    return residuals, chi2
+
 def iod(
         observations,
         min_obs=6,
@@ -174,7 +388,8 @@ def iod(
         iterate=False,
         light_time=True,
         backend="PYOORB",
-        backend_kwargs={}
+        backend_kwargs={},
+        gauss_solutions=None
     ):
     """
     Run initial orbit determination on a set of observations believed to belong to a single
@@ -222,6 +437,10 @@ def iod(
     backend_kwargs : dict, optional
         Settings and additional parameters to pass to selected
         backend.
+    gauss_solutions : tuple, optional
+        The selected triplets of observation IDs (N, 3) and a list with the preliminary orbits of each triplet
+        (as returned by `~thor.orbits.iod.calcGaussSolutions`). If None, triplets are selected and their
+        preliminary orbits calculated here.
 
     Returns
     -------
@@ -264,16 +483,12 @@ def iod(
     ra_err_col = "RA_sigma_deg"
     dec_err_col = "Dec_sigma_deg"
     obs_code_col = "observatory_code"
-    obs_x_col = "obs_x"
-    obs_y_col = "obs_y"
-    obs_z_col = "obs_z"
 
     # Extract observation IDs, sky-plane positions, sky-plane position uncertainties, times of observation,
     # and the location of the observer at each time
     obs_ids_all = observations[obs_id_col].values
     coords_all = observations[[ra_col, dec_col]].values
     sigmas_all = observations[[ra_err_col, dec_err_col]].values
-    coords_obs_all = observations[[obs_x_col, obs_y_col, obs_z_col]].values
     times_all = observations[time_col].values
     times_all = Time(times_all, scale="utc", format="mjd")
 
@@ -317,87 +532,92 @@ def iod(
     num_outliers = int(num_obs * contamination_percentage / 100.)
     num_outliers = np.maximum(np.minimum(num_obs - min_obs, num_outliers), 0)
 
-    # Select observation IDs to use for IOD
-    obs_ids = selectObservations(
-        observations,
-        method=observation_selection_method,
-    )
-    obs_ids = obs_ids[:(3 * (num_outliers + 1))]
+    # Select observation IDs to use for IOD and calculate the preliminary
+    # orbits of every selected triplet
+    if gauss_solutions is None:
+        obs_ids = _selectTriplets(
+            observations,
+            min_obs=min_obs,
+            contamination_percentage=contamination_percentage,
+            observation_selection_method=observation_selection_method
+        )
+        gauss_solutions = calcGaussSolutions(
+            [observations],
+            [obs_ids],
+            light_time=light_time,
+            iterate=iterate
+        )[0]
+    else:
+        obs_ids, gauss_solutions = gauss_solutions
 
     if len(obs_ids) == 0:
         processable = False
 
-    j = 0
-    while not converged and processable:
-        if j == len(obs_ids):
-            break
-
-        ids = obs_ids[j]
-        mask = np.isin(obs_ids_all, ids)
-
-        # Grab sky-plane positions of the selected observations, the heliocentric ecliptic position of the observer,
-        # and the times at which the observations occur
-        coords = coords_all[mask, :]
-        coords_obs = coords_obs_all[mask, :]
-        times = times_all[mask]
-
-        # Run IOD
-        iod_orbits = gaussIOD(
-            coords,
-            times.utc.mjd,
-            coords_obs,
-            light_time=light_time,
-            iterate=iterate,
-            max_iter=100,
-            tol=1e-15
+    if processable:
+        # Collect the preliminary orbits of every selected triplet into a single block of candidates. If no
+        # outliers are allowed, only the first triplet with a preliminary orbit can yield a solution (outlier
+        # rejection cannot improve a poor fit) so only that triplet's orbits are scored
+        triplet_indices = [j for j in range(len(obs_ids)) if len(gauss_solutions[j]) > 0]
+        if num_outliers == 0:
+            triplet_indices = triplet_indices[:1]
+
+        if len(triplet_indices) == 0:
+            processable = False
+
+    if processable:
+        candidate_triplets = np.concatenate([
+            np.full(len(gauss_solutions[j]), j) for j in triplet_indices
+        ])
+        candidates = Orbits(
+            np.vstack([gauss_solutions[j].cartesian for j in triplet_indices]),
+            Time(
+                np.concatenate([gauss_solutions[j].epochs.tdb.mjd for j in triplet_indices]),
+                scale="tdb",
+                format="mjd"
+            )
         )
-        if len(iod_orbits) == 0:
-            j += 1
-            continue
 
-        # Propagate initial orbit to all observation times
-        ephemeris = backend._generateEphemeris(
-            iod_orbits,
-            observers
+        # Generate ephemerides for every candidate orbit with a single call to the backend
+        # and calculate the residuals and chi2 of each candidate at once
+        residuals_candidates, chi2_candidates = _scoreCandidates(
+            candidates,
+            backend,
+            observers,
+            coords_all,
+            sigmas_all
         )
+        chi2_total_candidates = np.sum(chi2_candidates, axis=1)
+        rchi2_candidates = chi2_total_candidates / (2 * num_obs - 6)
 
-        # For each unique initial orbit calculate residuals and chi-squared
-        # Find the orbit which yields the lowest chi-squared
-        orbit_ids = iod_orbits.ids
-        for i, orbit_id in enumerate(orbit_ids):
-            orbit_name = str(uuid.uuid4().hex)
-            iod_orbits.ids[i] = orbit_name
-
-            ephemeris_orbit = ephemeris[ephemeris["orbit_id"] == orbit_id]
-
-            # Calculate residuals and chi2
-            residuals, stats = calcResiduals(
-                coords_all,
-                ephemeris_orbit[["RA_deg", "Dec_deg"]].values,
-                sigmas_actual=sigmas_all,
-                include_probabilistic=False
-            )
-            chi2 = stats[0]
-            chi2_total = np.sum(chi2)
-            rchi2 = chi2_total / (2 * num_obs - 6)
+        if num_outliers == 0:
+            # Accept the first candidate with a reduced chi2 below the threshold
+            accepted = np.flatnonzero(rchi2_candidates <= rchi2_threshold)
+            candidate_order = accepted[:1]
+        else:
+            candidate_order = np.arange(len(candidates))
 
-            # The reduced chi2 is above the threshold and no outliers are
-            # allowed, this cannot be improved by outlier rejection
-            # so continue to the next IOD orbit
-            if rchi2 > rchi2_threshold and num_outliers == 0:
-                # If we have iterated through all iod orbits and no outliers
-                # are allowed for this linkage then no other combination of
-                # observations will make it acceptable, so exit here.
-                if (i + 1) == len(iod_orbits):
-                    processable = False
-                    break
+        triplet_sol = None
+        for i in candidate_order:
+            j = candidate_triplets[i]
 
-                continue
+            # A solution found by outlier rejection may still be replaced by one of the remaining
+            # orbits of the same triplet, but the orbits of later triplets are not tested
+            if converged and j != triplet_sol:
+                break
+
+            ids = obs_ids[j]
+            mask = np.isin(obs_ids_all, ids)
+            residuals = residuals_candidates[i]
+            chi2 = chi2_candidates[i]
+            chi2_total = chi2_total_candidates[i]
+            # The number of observations is reduced if a previous orbit of this triplet
+            # was accepted after removing outliers
+            rchi2 = chi2_total / (2 * num_obs - 6)
 
             # If the total reduced chi2 is less than the threshold accept the orbit
-            elif rchi2 <= rchi2_threshold:
+            if rchi2 <= rchi2_threshold:
                 logger.debug("Potential solution orbit has been found.")
-                orbit_sol = iod_orbits[i:i+1]
+                orbit_sol = candidates[i:i+1]
                 obs_ids_sol = ids
                 chi2_total_sol = chi2_total
                 chi2_sol = chi2
@@ -412,48 +632,45 @@ def iod(
             # anticipate that we get to this stage if the three selected observations
             # belonging to one object yield a good initial orbit but the presence of outlier
             # observations is skewing the sum total of the residuals and chi2
-            elif num_outliers > 0:
-
-                logger.debug("Attempting to identify possible outliers.")
-                for o in range(num_outliers):
-                    # Select i highest observations that contribute to
-                    # chi2 (and thereby the residuals)
-                    remove = chi2[~mask].argsort()[-(o+1):]
-
-                    # Grab the obs_ids for these outliers
-                    obs_id_outlier = obs_ids_all[~mask][remove]
-                    logger.debug("Possible outlier(s): {}".format(obs_id_outlier))
-
-                    # Subtract the outlier's chi2 contribution
-                    # from the total chi2
-                    # Then recalculate the reduced chi2
-                    chi2_new = chi2_total - np.sum(chi2[~mask][remove])
-                    num_obs_new = len(observations) - len(remove)
-                    rchi2_new = chi2_new / (2 * num_obs_new - 6)
-
-                    ids_mask = np.isin(obs_ids_all, obs_id_outlier, invert=True)
+            logger.debug("Attempting to identify possible outliers.")
+            for o in range(num_outliers):
+                # Select i highest observations that contribute to
+                # chi2 (and thereby the residuals)
+                remove = chi2[~mask].argsort()[-(o+1):]
+
+                # Grab the obs_ids for these outliers
+                obs_id_outlier = obs_ids_all[~mask][remove]
+                logger.debug("Possible outlier(s): {}".format(obs_id_outlier))
+
+                # Subtract the outlier's chi2 contribution
+                # from the total chi2
+                # Then recalculate the reduced chi2
+                chi2_new = chi2_total - np.sum(chi2[~mask][remove])
+                num_obs_new = len(observations) - len(remove)
+                rchi2_new = chi2_new / (2 * num_obs_new - 6)
+
+                ids_mask = np.isin(obs_ids_all, obs_id_outlier, invert=True)
+                arc_length = times_all[ids_mask].utc.mjd.max() - times_all[ids_mask].utc.mjd.min()
+
+                # If the updated reduced chi2 total is lower than our desired
+                # threshold, accept the soluton. If not, keep going.
+                if rchi2_new <= rchi2_threshold and arc_length >= min_arc_length:
+                    orbit_sol = candidates[i:i+1]
+                    obs_ids_sol = ids
+                    chi2_total_sol = chi2_new
+                    rchi2_sol = rchi2_new
+                    residuals_sol = residuals
+                    outliers = obs_id_outlier
+                    num_obs = num_obs_new
+                    ids_mask = np.isin(obs_ids_all, outliers, invert=True)
                     arc_length = times_all[ids_mask].utc.mjd.max() - times_all[ids_mask].utc.mjd.min()
+                    chi2_sol = chi2
+                    triplet_sol = j
+                    converged = True
+                    break
 
-                    # If the updated reduced chi2 total is lower than our desired
-                    # threshold, accept the soluton. If not, keep going.
-                    if rchi2_new <= rchi2_threshold and arc_length >= min_arc_length:
-                        orbit_sol = iod_orbits[i:i+1]
-                        obs_ids_sol = ids
-                        chi2_total_sol = chi2_new
-                        rchi2_sol = rchi2_new
-                        residuals_sol = residuals
-                        outliers = obs_id_outlier
-                        num_obs = num_obs_new
-                        ids_mask = np.isin(obs_ids_all, outliers, invert=True)
-                        arc_length = times_all[ids_mask].utc.mjd.max() - times_all[ids_mask].utc.mjd.min()
-                        chi2_sol = chi2
-                        converged = True
-                        break
-
-            else:
-                continue
-
-        j += 1
+        if converged:
+            orbit_sol.ids[0] = str(uuid.uuid4().hex)
 
     if not converged or not processable:
 
@@ -581,7 +798,7 @@ def initialOrbitDetermination(
     num_jobs : int, optional
         Number of jobs to launch.
     parallel_backend : str, optional
-        Which parallelization backend to use {'ray', 'mp'}. Defaults to using Python's multiprocessing
+        Which parallelization backend to use {'ray', 'mp', 'cf'}. Defaults to using Python's multiprocessing
         module ('mp').
 
     Returns
@@ -692,15 +909,12 @@ def initialOrbitDetermination(
                 iod_orbits_dfs = ray.get(iod_orbits_oids)
                 iod_orbit_members_dfs = ray.get(iod_orbit_members_oids)
 
-            else: # parallel_backend == "mp"
+            else: # parallel_backend in ["mp", "cf"]
 
                 chunk_size_ = calcChunkSize(num_linkages, num_workers, chunk_size, min_chunk_size=1)
                 logger.info(f"Distributing linkages in chunks of {chunk_size_} to {num_workers} workers.")
 
-                p = mp.Pool(
-                    processes=num_workers,
-                    initializer=_initWorker,
-                )
+                p = getExecutor(num_workers, parallel_backend)
 
                 results = p.starmap(
                     partial(
@@ -718,7 +932,6 @@ def initialOrbitDetermination(
                     ),
                     zip(yieldChunks(observations_split, chunk_size_)),
                 )
-                p.close()
 
                 results = list(zip(*results))
                 iod_orbits_dfs = results[0]
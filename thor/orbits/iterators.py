@@ -7,6 +7,7 @@ from .universal_propagate import calcChi
 __all__ = [
     "_calcM",
     "_calcStateTransitionMatrix",
+    "calcPositionPartials",
     "iterateStateTransition"
 ]
 
@@ -71,6 +72,110 @@ def _calcStateTransitionMatrix(M, r0, v0, f, g, f_dot, g_dot, r, v):
     ])
     return phi
 
+def calcPositionPartials(orbit, t0, t1, mu=MU, max_iter=100, tol=1e-15):
+    """
+    Propagate an orbit to each of the given times using the universal anomaly formalism and
+    calculate the partial derivatives of the propagated position with respect to the
+    initial state (the position rows of the state transition matrix) at each time.
+
+    The position is r = f * r0 + g * v0, the partials follow from differentiating the
+    Lagrange coefficients f and g. They depend on the initial state through r0_mag, sigma0 = r0.v0 / sqrt(mu),
+    alpha and the universal anomaly chi, whose partials are found by implicitly
+    differentiating the universal Kepler equation (the derivative of which with respect to chi is r_mag).
+    The derivatives of the Stumpff functions are dc_k / dpsi = (k * c_k+2 - c_k+1) / 2.
+
+    Parameters
+    ----------
+    orbit : `~numpy.ndarray` (6)
+        Orbital state vector (X_0) with position in units of AU and velocity in units of AU per day.
+    t0 : float
+        Epoch in MJD at which the orbit is defined.
+    t1 : `~numpy.ndarray` (M)
+        Epochs in MJD to which to propagate the orbit.
+    mu : float, optional
+        Gravitational parameter (GM) of the attracting body in units of
+        AU**3 / d**2.
+    max_iter : int, optional
+        Maximum number of iterations over which to converge. If number of iterations is
+        exceeded, will use the value of the universal anomaly at the last iteration.
+    tol : float, optional
+        Numerical tolerance to which to compute chi using the Newtown-Raphson
+        method.
+
+    Returns
+    -------
+    states : `~numpy.ndarray` (M, 6)
+        Orbit propagated to each epoch with position in units of AU and velocity in units of AU per day.
+    partials : `~numpy.ndarray` (M, 3, 6)
+        Partial derivatives of the position at each epoch with respect to the state at
+        the initial epoch.
+    """
+    sqrt_mu = np.sqrt(mu)
+    r0 = orbit[:3]
+    v0 = orbit[3:]
+    r0_mag = np.linalg.norm(r0)
+    v0_mag = np.linalg.norm(v0)
+    sigma0 = np.dot(r0, v0) / sqrt_mu
+    alpha = -v0_mag**2 / mu + 2 / r0_mag
+
+    # Partial derivatives of r0_mag, sigma0 and alpha with respect to the initial state
+    d_r0_mag = np.concatenate([r0 / r0_mag, np.zeros(3)])
+    d_sigma0 = np.concatenate([v0, r0]) / sqrt_mu
+    d_alpha = np.concatenate([-2 * r0 / r0_mag**3, -2 * v0 / mu])
+
+    I = np.identity(3)
+    states = np.zeros((len(t1), 6))
+    partials = np.zeros((len(t1), 3, 6))
+    for i, dt in enumerate(t1 - t0):
+        chi = calcChi(orbit, dt, mu=mu, max_iter=max_iter, tol=tol)
+        chi2 = chi**2
+        chi3 = chi**3
+
+        psi = alpha * chi2
+        c0, c1, c2, c3, c4, c5 = calcStumpff(psi)
+        dc2 = (2 * c4 - c3) / 2
+        dc3 = (3 * c5 - c4) / 2
+
+        # Calculate the Lagrange coefficients
+        # and the corresponding state vector
+        f = 1 - chi2 / r0_mag * c2
+        g = dt - 1 / sqrt_mu * chi3 * c3
+
+        r = f * r0 + g * v0
+        r_mag = np.linalg.norm(r)
+
+        f_dot = sqrt_mu / (r0_mag * r_mag) * (alpha * chi3 * c3 - chi)
+        g_dot = 1 - chi2 / r_mag * c2
+
+        v = f_dot * r0 + g_dot * v0
+        states[i, :3] = r
+        states[i, 3:] = v
+
+        # Partial derivatives of chi from the universal Kepler equation:
+        # sigma0 * chi**2 * c2 + (1 - alpha * r0_mag) * chi**3 * c3 + r0_mag * chi = sqrt(mu) * dt
+        d_chi = -(
+            chi2 * c2 * d_sigma0
+            + (chi - alpha * chi3 * c3) * d_r0_mag
+            + (chi2 * (sigma0 * chi2 * dc2 + (1 - alpha * r0_mag) * chi3 * dc3) - r0_mag * chi3 * c3) * d_alpha
+        ) / r_mag
+
+        # Partial derivatives of the Lagrange coefficients
+        d_f = (
+            -(2 * chi * c2 + 2 * alpha * chi3 * dc2) / r0_mag * d_chi
+            - chi2**2 * dc2 / r0_mag * d_alpha
+            + chi2 * c2 / r0_mag**2 * d_r0_mag
+        )
+        d_g = (
+            -(3 * chi2 * c3 + 2 * alpha * chi2**2 * dc3) / sqrt_mu * d_chi
+            - chi**5 * dc3 / sqrt_mu * d_alpha
+        )
+
+        partials[i] = np.outer(r0, d_f) + np.outer(v0, d_g)
+        partials[i, :, :3] += f * I
+        partials[i, :, 3:] += g * I
+
+    return states, partials
+
 def iterateStateTransition(orbit, t21, t32, q1, q2, q3, rho1, rho2, rho3, light_time=True, mu=MU, max_iter=10, tol=1e-15):
     """
     Improve an initial orbit by iteratively solving for improved Langrange coefficients and minimizing the phi error vector
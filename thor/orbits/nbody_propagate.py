@@ -0,0 +1,393 @@
+import numpy as np
+from numba import jit
+from numba import prange
+from astropy.time import Time
+
+from ..constants import Constants as c
+from ..constants import KM_P_AU
+from ..constants import S_P_DAY
+from .chebyshev import ChebyshevTable
+from .chebyshev import findStateTable
+from .state import getPerturberState
+
+__all__ = [
+    "NBODY_PERTURBERS",
+    "propagateNBody",
+]
+
+MU = c.MU
+C = c.C
+NBODY_TOL = 1e-13
+NBODY_MAX_STEPS = 1000000
+
+# Standard gravitational parameters of the major bodies (km**3 / s**2 -- DE430/DE431)
+# converted to au**3 / d**2. The Sun is the central body, its gravitational
+# parameter is given by mu.
+NBODY_PERTURBERS = {
+    name : gm / KM_P_AU**3 * S_P_DAY**2 for name, gm in {
+        "mercury barycenter" : 22031.780000,
+        "venus barycenter" : 324858.592000,
+        "earth" : 398600.435436,
+        "moon" : 4902.800066,
+        "mars barycenter" : 42828.375214,
+        "jupiter barycenter" : 126712764.800000,
+        "saturn barycenter" : 37940585.200000,
+        "uranus barycenter" : 5794548.600000,
+        "neptune barycenter" : 6836527.100580,
+    }.items()
+}
+
+# Dormand-Prince 5(4) coefficients (Hairer, Norsett & Wanner 1993)
+C2, C3, C4, C5 = 1/5, 3/10, 4/5, 8/9
+A21 = 1/5
+A31, A32 = 3/40, 9/40
+A41, A42, A43 = 44/45, -56/15, 32/9
+A51, A52, A53, A54 = 19372/6561, -25360/2187, 64448/6561, -212/729
+A61, A62, A63, A64, A65 = 9017/3168, -355/33, 46732/5247, 49/176, -5103/18656
+A71, A73, A74, A75, A76 = 35/384, 500/1113, 125/192, -2187/6784, 11/84
+E1, E3, E4, E5, E6, E7 = 71/57600, -71/16695, 71/1920, -17253/339200, 22/525, -1/40
+# Dense output coefficients
+D1, D3, D4, D5, D6, D7 = (
+    -12715105075/11282082432,
+    87487479700/32700410799,
+    -10690763975/1880347072,
+    701980252875/199316789632,
+    -1453857185/822651844,
+    69997945/29380423
+)
+
+@jit(["void(f8, f8[:], f8[:], f8[:,:,:,:], f8[:], f8[:], i8[:], f8, f8[:])"], nopython=True, cache=True)
+def _calcDerivatives(t, state, gms, coefficients, t_starts, segment_lengths, num_segments, gr, derivatives):
+    """
+    Calculate the time derivatives of a barycentric state vector of a test particle
+    attracted by the Sun and the perturbers. The first body is the Sun, its relativistic
+    correction (1PN, Schwarzschild) is added if gr is not zero.
+
+    Parameters
+    ----------
+    t : float
+        Time in MJD TDB.
+    state : `~numpy.ndarray` (6)
+        Barycentric state vector with position in units of AU and velocity in units of AU per day.
+    gms : `~numpy.ndarray` (B)
+        Gravitational parameters of each body in units of AU**3 / d**2.
+    coefficients : `~numpy.ndarray` (B, S, K, 6)
+        Chebyshev coefficients of the barycentric state vector of each body.
+    t_starts : `~numpy.ndarray` (B)
+        Start time of the first segment of each body's table.
+    segment_lengths : `~numpy.ndarray` (B)
+        Length of the segments of each body's table.
+    num_segments : `~numpy.ndarray` (B)
+        Number of segments of each body's table.
+    gr : float
+        Inverse of the square of the speed of light in units of d**2 / AU**2 (0 to
+        ignore the relativistic correction).
+    derivatives : `~numpy.ndarray` (6)
+        Array in which to store the velocity and acceleration.
+
+    Returns
+    -------
+    None
+    """
+    num_coefficients = coefficients.shape[2]
+    ax = 0.0
+    ay = 0.0
+    az = 0.0
+    for b in range(len(gms)):
+        segment = int(np.floor((t - t_starts[b]) / segment_lengths[b]))
+        segment = min(max(segment, 0), num_segments[b] - 1)
+        x = 2 * (t - t_starts[b] - segment * segment_lengths[b]) / segment_lengths[b] - 1
+
+        # Evaluate the position of the body (Clenshaw's recurrence)
+        bx1, by1, bz1 = 0.0, 0.0, 0.0
+        bx2, by2, bz2 = 0.0, 0.0, 0.0
+        for k in range(num_coefficients - 1, 0, -1):
+            bx1, bx2 = 2 * x * bx1 - bx2 + coefficients[b, segment, k, 0], bx1
+            by1, by2 = 2 * x * by1 - by2 + coefficients[b, segment, k, 1], by1
+            bz1, bz2 = 2 * x * bz1 - bz2 + coefficients[b, segment, k, 2], bz1
+
+        dx = state[0] - (x * bx1 - bx2 + coefficients[b, segment, 0, 0])
+        dy = state[1] - (x * by1 - by2 + coefficients[b, segment, 0, 1])
+        dz = state[2] - (x * bz1 - bz2 + coefficients[b, segment, 0, 2])
+        r = np.sqrt(dx**2 + dy**2 + dz**2)
+        gm_r3 = gms[b] / r**3
+        ax -= gm_r3 * dx
+        ay -= gm_r3 * dy
+        az -= gm_r3 * dz
+
+        if b == 0 and gr != 0:
+            bx1, by1, bz1 = 0.0, 0.0, 0.0
+            bx2, by2, bz2 = 0.0, 0.0, 0.0
+            for k in range(num_coefficients - 1, 0, -1):
+                bx1, bx2 = 2 * x * bx1 - bx2 + coefficients[b, segment, k, 3], bx1
+                by1, by2 = 2 * x * by1 - by2 + coefficients[b, segment, k, 4], by1
+                bz1, bz2 = 2 * x * bz1 - bz2 + coefficients[b, segment, k, 5], bz1
+
+            dvx = state[3] - (x * bx1 - bx2 + coefficients[b, segment, 0, 3])
+            dvy = state[4] - (x * by1 - by2 + coefficients[b, segment, 0, 4])
+            dvz = state[5] - (x * bz1 - bz2 + coefficients[b, segment, 0, 5])
+            v2 = dvx**2 + dvy**2 + dvz**2
+            rv = dx * dvx + dy * dvy + dz * dvz
+            gr_r3 = gr * gm_r3
+            gr_r = 4 * gms[b] / r - v2
+            ax += gr_r3 * (gr_r * dx + 4 * rv * dvx)
+            ay += gr_r3 * (gr_r * dy + 4 * rv * dvy)
+            az += gr_r3 * (gr_r * dz + 4 * rv * dvz)
+
+    derivatives[0] = state[3]
+    derivatives[1] = state[4]
+    derivatives[2] = state[5]
+    derivatives[3] = ax
+    derivatives[4] = ay
+    derivatives[5] = az
+    return
+
+@jit(["void(f8[:], f8, f8[:], f8[:], f8[:,:,:,:], f8[:], f8[:], i8[:], f8, f8, f8[:,:])"], nopython=True, cache=True)
+def _integrateNBody(state, t0, t1, gms, coefficients, t_starts, segment_lengths, num_segments, gr, tol, states):
+    """
+    Integrate a single test particle from t0 through each time in t1 with the Dormand-Prince 5(4)
+    method. Steps are chosen adaptively, the states at each time in t1 are interpolated within the
+    step that contains them (dense output) so that a single integration serves all times.
+
+    Parameters
+    ----------
+    state : `~numpy.ndarray` (6)
+        Barycentric state vector at t0 with position in units of AU and velocity in units of AU per day.
+    t0 : float
+        Epoch in MJD TDB at which the state is defined.
+    t1 : `~numpy.ndarray` (M)
+        Times in MJD TDB ordered away from t0 (ascending if after t0, descending if before t0).
+    gms, coefficients, t_starts, segment_lengths, num_segments, gr :
+        Sun and perturbers (see `_calcDerivatives`).
+    tol : float
+        Relative and absolute error tolerance per step.
+    states : `~numpy.ndarray` (M, 6)
+        Array in which to store the state vectors at each time in t1. If the maximum number of
+        steps is exceeded, the remaining states are set to NaN.
+
+    Returns
+    -------
+    None
+    """
+    num_times = len(t1)
+    j = 0
+    while j < num_times and t1[j] == t0:
+        states[j] = state
+        j += 1
+    if j == num_times:
+        return
+
+    direction = 1.0 if t1[num_times - 1] > t0 else -1.0
+    t_end = t1[num_times - 1]
+
+    k = np.empty((7, 6))
+    y = state.copy()
+    y_stage = np.empty(6)
+    y_new = np.empty(6)
+    _calcDerivatives(t0, y, gms, coefficients, t_starts, segment_lengths, num_segments, gr, k[0])
+
+    # Start with a small fraction of the particle's dynamical time scale
+    r = np.sqrt(y[0]**2 + y[1]**2 + y[2]**2)
+    v = np.sqrt(y[3]**2 + y[4]**2 + y[5]**2)
+    h = direction * min(1e-2 * r / v, abs(t_end - t0))
+
+    t = t0
+    num_steps = 0
+    while j < num_times:
+        if num_steps >= NBODY_MAX_STEPS:
+            states[j:] = np.nan
+            return
+        num_steps += 1
+
+        last = direction * (t + h - t_end) >= 0
+        if last:
+            h = t_end - t
+
+        for i in range(6):
+            y_stage[i] = y[i] + h * A21 * k[0, i]
+        _calcDerivatives(t + C2 * h, y_stage, gms, coefficients, t_starts, segment_lengths, num_segments, gr, k[1])
+        for i in range(6):
+            y_stage[i] = y[i] + h * (A31 * k[0, i] + A32 * k[1, i])
+        _calcDerivatives(t + C3 * h, y_stage, gms, coefficients, t_starts, segment_lengths, num_segments, gr, k[2])
+        for i in range(6):
+            y_stage[i] = y[i] + h * (A41 * k[0, i] + A42 * k[1, i] + A43 * k[2, i])
+        _calcDerivatives(t + C4 * h, y_stage, gms, coefficients, t_starts, segment_lengths, num_segments, gr, k[3])
+        for i in range(6):
+            y_stage[i] = y[i] + h * (A51 * k[0, i] + A52 * k[1, i] + A53 * k[2, i] + A54 * k[3, i])
+        _calcDerivatives(t + C5 * h, y_stage, gms, coefficients, t_starts, segment_lengths, num_segments, gr, k[4])
+        for i in range(6):
+            y_stage[i] = y[i] + h * (A61 * k[0, i] + A62 * k[1, i] + A63 * k[2, i] + A64 * k[3, i] + A65 * k[4, i])
+        t_new = t_end if last else t + h
+        _calcDerivatives(t_new, y_stage, gms, coefficients, t_starts, segment_lengths, num_segments, gr, k[5])
+        for i in range(6):
+            y_new[i] = y[i] + h * (A71 * k[0, i] + A73 * k[2, i] + A74 * k[3, i] + A75 * k[4, i] + A76 * k[5, i])
+        _calcDerivatives(t_new, y_new, gms, coefficients, t_starts, segment_lengths, num_segments, gr, k[6])
+
+        # Root mean square of the error estimate scaled by the tolerance
+        err = 0.0
+        for i in range(6):
+            e = h * (E1 * k[0, i] + E3 * k[2, i] + E4 * k[3, i] + E5 * k[4, i] + E6 * k[5, i] + E7 * k[6, i])
+            scale = tol + tol * max(abs(y[i]), abs(y_new[i]))
+            err += (e / scale)**2
+        err = np.sqrt(err / 6)
+
+        if err <= 1.0:
+            # Interpolate the states at any times within this step
+            while j < num_times and direction * (t1[j] - t_new) <= 0:
+                theta = (t1[j] - t) / h
+                for i in range(6):
+                    dy = y_new[i] - y[i]
+                    bspl = h * k[0, i] - dy
+                    states[j, i] = y[i] + theta * (dy + (1 - theta) * (
+                        bspl + theta * (dy - h * k[6, i] - bspl + (1 - theta) * h * (
+                            D1 * k[0, i] + D3 * k[2, i] + D4 * k[3, i] + D5 * k[4, i] + D6 * k[5, i] + D7 * k[6, i]
+                        ))
+                    ))
+                j += 1
+
+            t = t_new
+            y[:] = y_new
+            k[0] = k[6]
+            factor = 5.0 if err == 0 else min(5.0, max(0.2, 0.9 * err**-0.2))
+        else:
+            factor = max(0.2, 0.9 * err**-0.2)
+
+        h = h * factor
+
+    return
+
+# Compiled on first call (see propagateUniversal)
+@jit(nopython=True, parallel=True, cache=True)
+def _propagateNBody(orbits, t0, t1, gms, coefficients, t_starts, segment_lengths, num_segments, gr, tol):
+    """
+    Integrate each orbit forwards and backwards from its epoch through the sorted times in t1.
+    Each orbit is integrated independently so all orbits are integrated in parallel.
+
+    Returns
+    -------
+    states : `~numpy.ndarray` (N, M, 6)
+        Barycentric state vectors of each orbit at each time in t1.
+    """
+    num_orbits = orbits.shape[0]
+    num_times = len(t1)
+    states = np.empty((num_orbits, num_times, 6))
+    for i in prange(num_orbits):
+        idx = np.searchsorted(t1, t0[i])
+        _integrateNBody(
+            orbits[i], t0[i], t1[idx:], gms, coefficients, t_starts, segment_lengths, num_segments, gr, tol, states[i, idx:]
+        )
+        _integrateNBody(
+            orbits[i], t0[i], t1[:idx][::-1], gms, coefficients, t_starts, segment_lengths, num_segments, gr, tol, states[i, :idx][::-1]
+        )
+
+    return states
+
+def _getPerturberTables(bodies, mjd_start, mjd_end):
+    """
+    Get barycentric ecliptic state tables for each body that cover the given window. Tables in use
+    (see `~thor.orbits.useStateTables`) are used if they cover the window, otherwise a table
+    is fit to the states queried from SPICE.
+    """
+    def toTime(mjd_tdb):
+        return Time(mjd_tdb, scale="tdb", format="mjd")
+
+    window = np.array([mjd_start, mjd_end])
+    tables = []
+    for body in bodies:
+        table = findStateTable(body, "ecliptic", "barycenter", window)
+        if table is None:
+            table = ChebyshevTable.fromFunction(
+                body,
+                lambda mjd_tdb: getPerturberState(body, toTime(mjd_tdb), frame="ecliptic", origin="barycenter"),
+                mjd_start,
+                mjd_end,
+                origin="barycenter"
+            )
+        tables.append(table)
+
+    return tables
+
+def propagateNBody(orbits, t0, t1, perturbers=NBODY_PERTURBERS, mu=MU, relativity=True, tol=NBODY_TOL):
+    """
+    Propagate orbits as test particles attracted by the Sun (including its relativistic
+    correction) and the major planets. Orbits are
+    integrated in the barycentric frame with an adaptive Dormand-Prince 5(4) integrator, the states
+    at each time in t1 are interpolated from the steps that contain them so each orbit is
+    integrated only once (forwards and backwards from its epoch) no matter how many times are requested.
+
+    The positions of the Sun and perturbers are evaluated from state tables in use (see
+    `~thor.orbits.useStateTables`) if they cover the propagation window, otherwise tables are fit to
+    the states queried from SPICE.
+
+    Parameters
+    ----------
+    orbits : `~numpy.ndarray` (N, 6)
+        Heliocentric ecliptic orbital state vectors (X_0) with position in units of AU and velocity in
+        units of AU per day.
+    t0 : `~numpy.ndarray` (N)
+        Epoch in MJD TDB at which orbits are defined.
+    t1 : `~numpy.ndarray` (M)
+        Epochs in MJD TDB to which to propagate each orbit.
+    perturbers : dict, optional
+        Perturbing bodies (see `~thor.orbits.getPerturberState`) and their gravitational
+        parameters in units of AU**3 / d**2.
+    mu : float, optional
+        Gravitational parameter (GM) of the Sun in units of AU**3 / d**2.
+    relativity : bool, optional
+        Include the Sun's relativistic correction.
+    tol : float, optional
+        Relative and absolute error tolerance of each integration step.
+
+    Returns
+    -------
+    orbits : `~numpy.ndarray` (N*M, 8)
+        Orbits propagated to each MJD with position in units of AU and velocity in units of AU per day.
+        The first two columns are the orbit ID (a zero-based integer value assigned to each unique input orbit)
+        and the MJD of each propagated state.
+    """
+    orbits = np.ascontiguousarray(orbits, dtype=np.float64)
+    t0 = np.ascontiguousarray(t0, dtype=np.float64)
+    t1 = np.ascontiguousarray(t1, dtype=np.float64)
+    t1_unique, t1_idx = np.unique(t1, return_inverse=True)
+
+    bodies = ["sun"] + list(perturbers.keys())
+    gms = np.array([mu] + list(perturbers.values()), dtype=np.float64)
+    tables = _getPerturberTables(
+        bodies,
+        min(t0.min(), t1_unique.min()),
+        max(t0.max(), t1_unique.max())
+    )
+
+    # Stack the coefficients of each table, padding tables with
+    # fewer segments or coefficients with zeros
+    num_segments = np.array([table.coefficients.shape[0] for table in tables], dtype=np.int64)
+    num_coefficients = max([table.coefficients.shape[1] for table in tables])
+    coefficients = np.zeros((len(tables), num_segments.max(), num_coefficients, 6))
+    for i, table in enumerate(tables):
+        coefficients[i, :table.coefficients.shape[0], :table.coefficients.shape[1]] = table.coefficients
+    t_starts = np.array([table.t_start for table in tables], dtype=np.float64)
+    segment_lengths = np.array([table.segment_length for table in tables], dtype=np.float64)
+
+    # Shift orbits to the barycenter, integrate and shift back
+    sun = tables[0]
+    states = _propagateNBody(
+        orbits + sun.evaluate(t0),
+        t0,
+        t1_unique,
+        gms,
+        coefficients,
+        t_starts,
+        segment_lengths,
+        num_segments,
+        1 / C**2 if relativity else 0.0,
+        tol
+    )
+    states -= sun.evaluate(t1_unique)[np.newaxis, :, :]
+
+    num_orbits = len(orbits)
+    num_times = len(t1)
+    propagated = np.empty((num_orbits * num_times, 8))
+    propagated[:, 0] = np.repeat(np.arange(num_orbits), num_times)
+    propagated[:, 1] = np.tile(t1, num_orbits)
+    propagated[:, 2:] = states[:, t1_idx, :].reshape(-1, 6)
+    return propagated
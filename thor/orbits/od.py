@@ -4,12 +4,12 @@ import copy
 import logging
 import numpy as np
 import pandas as pd
-import multiprocessing as mp
 from scipy.linalg import solve
 from functools import partial
 from astropy.time import Time
 
-from ..utils import _initWorker
+from ..constants import Constants as c
+from ..utils import getExecutor
 from ..utils import _checkParallel
 from ..utils import yieldChunks
 from ..utils import calcChunkSize
@@ -17,6 +17,7 @@ from ..utils import sortLinkages
 from ..backend import PYOORB
 from ..backend import MJOLNIR
 from .orbits import Orbits
+from .iterators import calcPositionPartials
 from .residuals import calcResiduals
 
 os.environ["OPENBLAS_NUM_THREADS"] = "1"
@@ -30,6 +31,86 @@ __all__ = [
     "differentialCorrection"
 ]
 
+C = c.C
+TRANSFORM_EC2EQ = c.TRANSFORM_EC2EQ
+
+def _calcAnalyticPartials(orbit, ephemeris, num_params, light_time=True, mu=c.MU, max_iter=100, tol=1e-15):
+    """
+    Calculate the partial derivatives of the predicted RA (multiplied by cos(Dec)) and Dec
+    with respect to the orbit's state (and epoch if num_params is 7) for two-body dynamics. The position
+    rows of the state transition matrix to each light-time corrected epoch are combined
+    with the derivative of the topocentric projection.
+
+    Parameters
+    ----------
+    orbit : `~thor.orbits.orbits.Orbits`
+        Single orbit.
+    ephemeris : `~pandas.DataFrame`
+        Ephemeris of the orbit as generated by MJOLNIR.
+    num_params : {6, 7}
+        Number of fitted parameters.
+    light_time : bool, optional
+        Include the dependence of the light time on the orbit's state.
+    mu : float, optional
+        Gravitational parameter (GM) of the attracting body in units of
+        AU**3 / d**2.
+    max_iter : int, optional
+        Maximum number of iterations over which to converge the universal anomaly.
+    tol : float, optional
+        Numerical tolerance to which to compute the universal anomaly.
+
+    Returns
+    -------
+    A : `~numpy.ndarray` (N, 2, num_params)
+        Partial derivatives in degrees per unit of each parameter.
+    """
+    times = Time(
+        ephemeris["mjd_utc"].values,
+        scale="utc",
+        format="mjd"
+    )
+    t1 = times.tdb.mjd - ephemeris["light_time"].values
+    states, partials = calcPositionPartials(
+        orbit.cartesian[0],
+        orbit.epochs.tdb.mjd[0],
+        t1,
+        mu=mu,
+        max_iter=max_iter,
+        tol=tol
+    )
+    if num_params == 7:
+        # Moving the epoch forward is equivalent to propagating the orbit backwards
+        partials = np.concatenate([partials, -states[:, 3:, np.newaxis]], axis=2)
+
+    ra = np.radians(ephemeris["RA_deg"].values)
+    dec = np.radians(ephemeris["Dec_deg"].values)
+    delta = ephemeris["delta_au"].values
+
+    # Topocentric unit vector in ecliptic coordinates
+    rho_hat = np.array([
+        np.cos(dec) * np.cos(ra),
+        np.cos(dec) * np.sin(ra),
+        np.sin(dec)
+    ]).T @ TRANSFORM_EC2EQ
+
+    if light_time:
+        # The light time depends on the topocentric distance:
+        # d_rho = d_r - v * (rho_hat . d_r) / (C + rho_hat . v)
+        v = states[:, 3:]
+        d_lt = np.einsum("nk,nkj->nj", rho_hat, partials) / (C + np.sum(rho_hat * v, axis=1))[:, np.newaxis]
+        partials = partials - v[:, :, np.newaxis] * d_lt[:, np.newaxis, :]
+
+    # Derivatives of RA * cos(Dec) and Dec with respect to the equatorial
+    # topocentric position, rotated into the ecliptic frame
+    zeros = np.zeros_like(ra)
+    projection = np.stack([
+        np.stack([-np.sin(ra), np.cos(ra), zeros], axis=1),
+        np.stack([-np.sin(dec) * np.cos(ra), -np.sin(dec) * np.sin(ra), np.cos(dec)], axis=1),
+    ], axis=1) / delta[:, np.newaxis, np.newaxis]
+    projection = projection @ TRANSFORM_EC2EQ
+
+    return np.degrees(np.einsum("nij,njk->nik", projection, partials))
+
 def od_worker(
         orbits_list,
         observations_list,
@@ -120,9 +201,15 @@ def od(
         )
         raise ValueError(err)
 
-    if method not in ["central", "finite"]:
+    if method not in ["central", "finite", "analytic"]:
         err = (
-            "method should be one of 'central' or 'finite'."
+            "method should be one of 'central', 'finite' or 'analytic'."
+        )
+        raise ValueError(err)
+
+    if method == "analytic" and not isinstance(backend, MJOLNIR):
+        err = (
+            "method 'analytic' is only supported by the MJOLNIR backend."
         )
         raise ValueError(err)
 
@@ -240,96 +327,77 @@ def od(
         else:
             num_params = 6
 
-        A = np.zeros((coords.shape[1], num_params, num_obs))
-        ATWA = np.zeros((num_params, num_params, num_obs))
-        ATWb = np.zeros((num_params, 1, num_obs))
-
-        # Generate ephemeris with current nominal orbit
-        ephemeris_nom = backend._generateEphemeris(
-            orbit_prev,
-            observers
-        )
-        coords_nom = ephemeris_nom[observables].values
-
-        # Modify each component of the state by a small delta
-        d = np.zeros((1, 7))
-        for i in range(num_params):
-
-            # zero the delta vector
-            d *= 0.0
+        if method == "analytic":
+            # Generate ephemeris with current nominal orbit and calculate the
+            # partial derivatives directly from the state transition matrix
+            ephemeris_nom = backend._generateEphemeris(
+                orbit_prev,
+                observers
+            )
+            A = _calcAnalyticPartials(
+                orbit_prev,
+                ephemeris_nom,
+                num_params,
+                light_time=backend.light_time,
+                mu=backend.mu,
+                max_iter=backend.max_iter,
+                tol=backend.tol
+            )[ids_mask]
 
+        else:
+            # Modify each component of the state by a small delta
             # x, y, z [au]: 0, 1, 2
             # vx, vy, vz [au per day]: 3, 4, 5
             # time [days] : 6
-            if i < 3:
-                delta_iter = delta_prev
-
-                d[0, i] = orbit_prev.cartesian[0, i] * delta_iter
-            elif i < 6:
-                delta_iter = delta_prev
-
-                d[0, i] = orbit_prev.cartesian[0, i] * delta_iter
+            d = np.zeros((num_params, 7))
+            d[np.arange(6), np.arange(6)] = orbit_prev.cartesian[0, :6] * delta_prev
+            if num_params == 7:
+                d[6, 6] = delta_prev/100000
+            delta_denom = d[np.arange(num_params), np.arange(num_params)]
+
+            # Stack the nominal orbit and all modified orbits into a single
+            # set of orbits so that the backend is only called once per iteration
+            if method == "central":
+                d_stacked = np.vstack([np.zeros((1, 7)), d, -d])
+                delta_denom = 2 * delta_denom
             else:
-                delta_iter = delta_prev/100000
+                d_stacked = np.vstack([np.zeros((1, 7)), d])
 
-                d[0, i] = delta_iter
-
-            # Modify component i of the orbit by a small delta
-            orbit_iter_p = Orbits(
-                orbit_prev.cartesian + d[0, :6],
-                orbit_prev.epochs + d[0, 6],
+            orbits_iter = Orbits(
+                orbit_prev.cartesian + d_stacked[:, :6],
+                orbit_prev.epochs + d_stacked[:, 6],
                 orbit_type=orbit_prev.orbit_type
             )
 
-            # Calculate the modified ephemerides
-            ephemeris_mod_p = backend._generateEphemeris(
-                orbit_iter_p,
+            # Calculate the nominal and modified ephemerides, ephemerides are sorted
+            # by orbit so each orbit's ephemeris is a contiguous block of rows
+            ephemeris_iter = backend._generateEphemeris(
+                orbits_iter,
                 observers
             )
-            coords_mod_p = ephemeris_mod_p[observables].values
-
-            delta_denom = d[0, i]
+            coords_iter = ephemeris_iter[observables].values.reshape(len(d_stacked), -1, coords.shape[1])
+            coords_nom = coords_iter[0]
+            coords_mod_p = coords_iter[1:num_params + 1]
             if method == "central":
-
-                # Modify component i of the orbit by a small delta
-                orbit_iter_n = Orbits(
-                    orbit_prev.cartesian - d[0, :6],
-                    orbit_prev.epochs - d[0, 6],
-                    orbit_type=orbit_prev.orbit_type
-                )
-
-                # Calculate the modified ephemerides
-                ephemeris_mod_n = backend._generateEphemeris(
-                    orbit_iter_n,
-                    observers
-                )
-                coords_mod_n = ephemeris_mod_n[observables].values
-
-                delta_denom *= 2
-
+                coords_mod_n = coords_iter[num_params + 1:]
             else:
-                coords_mod_n = coords_nom
+                coords_mod_n = np.repeat(coords_nom[np.newaxis, :, :], num_params, axis=0)
 
             residuals_mod, _ = calcResiduals(
-                coords_mod_p,
-                coords_mod_n,
+                coords_mod_p.reshape(-1, coords.shape[1]),
+                coords_mod_n.reshape(-1, coords.shape[1]),
                 sigmas_actual=None,
                 include_probabilistic=False
             )
+            residuals_mod = residuals_mod.reshape(num_params, -1, coords.shape[1])
 
-            for n in range(num_obs):
-                try:
-                    A[:, i:i+1, n] = residuals_mod[ids_mask][n:n+1].T / delta_denom
-                except RuntimeError:
-                    print(orbit_prev.ids)
+            # Partial derivatives matrix (num_obs, num_coords, num_params)
+            A = np.transpose(residuals_mod[:, ids_mask, :] / delta_denom[:, np.newaxis, np.newaxis], (1, 2, 0))
 
-        for n in range(num_obs):
-            W = np.diag(1 / coords_sigma[n]**2)
-            ATWA[:, :, n] = A[:, :, n].T @ W @ A[:, :, n]
-            ATWb[:, :, n] = A[:, :, n].T @ W @ residuals_prev[n:n+1].T
-
-        ATWA = np.sum(ATWA, axis=2)
-        ATWb = np.sum(ATWb, axis=2)
+        # Weights are the diagonal of each observation's weight matrix
+        W = 1 / coords_sigma[ids_mask]**2
+        ATWA = np.einsum("nki,nk,nkj->ij", A, W, A)
+        ATWb = np.einsum("nki,nk,nk->i", A, W, residuals_prev[ids_mask])[:, np.newaxis]
 
         ATWA_condition = np.linalg.cond(ATWA)
         ATWb_condition = np.linalg.cond(ATWb)
@@ -582,7 +650,7 @@ def differentialCorrection(
     num_jobs : int, optional
         Number of jobs to launch.
     parallel_backend : str, optional
-        Which parallelization backend to use {'ray', 'mp'}. Defaults to using Python's multiprocessing
+        Which parallelization backend to use {'ray', 'mp', 'cf'}. Defaults to using Python's multiprocessing
         module ('mp').
     """
     logger.info("Running differential correction...")
@@ -666,15 +734,12 @@ def differentialCorrection(
                 od_orbits_dfs = ray.get(od_orbits_oids)
                 od_orbit_members_dfs = ray.get(od_orbit_members_oids)
 
-            else: # parallel_backend == "mp"
+            else: # parallel_backend in ["mp", "cf"]
 
                 chunk_size_ = calcChunkSize(num_orbits, num_workers, chunk_size, min_chunk_size=1)
                 logger.info(f"Distributing linkages in chunks of {chunk_size_} to {num_workers} workers.")
 
-                p = mp.Pool(
-                    processes=num_workers,
-                    initializer=_initWorker,
-                )
+                p = getExecutor(num_workers, parallel_backend)
                 results = p.starmap(
                     partial(
                         od_worker,
@@ -695,7 +760,6 @@ def differentialCorrection(
                         yieldChunks(observations_split, chunk_size_)
                     )
                 )
-                p.close()
 
                 results = list(zip(*results))
                 od_orbits_dfs = results[0]
@@ -1,6 +1,5 @@
 import numpy as np
 from scipy.stats import chi2
-from scipy.spatial.distance import mahalanobis
 
 __all__ = [
     "calcResiduals",
@@ -33,7 +32,7 @@ def calcResiduals(
     sigmas_actual : `~numpy.ndarray` (N, M), optional
         The 1-sigma uncertainties of the actual coordinates. Can be
         None, in which case chi2 will be return as a NaN.
-    covariances_actual : list of N `~numpy.ndarray`s (M, M)
+    covariances_actual : list of N `~numpy.ndarray`s (M, M) or `~numpy.ndarray` (N, M, M)
         The covariance matrix in M dimensions for each
         actual observation if available.
     include_probabilistic : bool, optional
@@ -57,13 +56,13 @@ def calcResiduals(
             coordinates.
     """
     if covariances_actual is None and sigmas_actual is not None and include_probabilistic:
-        covariances_actual_ = [np.diag(i**2) for i in sigmas_actual]
+        # Uncertainties are uncorrelated, the probabilistic residuals are calculated
+        # directly from the 1-sigma uncertainties
+        covariances_actual_ = None
         sigmas_actual_ = sigmas_actual
     elif covariances_actual is not None and sigmas_actual is None:
-        sigmas_actual_ = np.zeros_like(coords_actual)
-        for i in range(len(coords_actual)):
-            sigmas_actual_[i] = np.diagonal(covariances_actual[i])
-        sigmas_actual_ = np.sqrt(sigmas_actual_)
+        covariances_actual_ = np.asarray(covariances_actual).reshape(-1, coords_actual.shape[1], coords_actual.shape[1])
+        sigmas_actual_ = np.sqrt(np.diagonal(covariances_actual_, axis1=1, axis2=2))
     else:
         covariances_actual_ = covariances_actual
         sigmas_actual_ = sigmas_actual
@@ -78,7 +77,8 @@ def calcResiduals(
         p, d = calcProbabilisticResiduals(
             coords_actual,
             coords_desired,
-            covariances_actual_
+            covariances_actual=covariances_actual_,
+            sigmas_actual=sigmas_actual_
         )
         stats = (chi2, p, d)
     else:
@@ -148,10 +148,13 @@ def calcSimpleResiduals(
 def calcProbabilisticResiduals(
         coords_actual,
         coords_desired,
-        covariances_actual
+        covariances_actual=None,
+        sigmas_actual=None
     ):
     """
-    Calculate the probabilistic residual.
+    Calculate the probabilistic residual. If only the 1-sigma uncertainties of the actual
+    coordinates are given (uncorrelated uncertainties) then the Mahalanobis distance is
+    calculated directly from them without constructing any covariance matrices.
 
     Parameters
     ----------
@@ -159,11 +162,12 @@ def calcProbabilisticResiduals(
         Actual N coordinates in M dimensions.
     coords_desired : `~numpy.ndarray` (N, M)
         The desired N coordinates in M dimensions.
-    sigmas_actual : `~numpy.ndarray` (N, M)
-        The 1-sigma uncertainties of the actual coordinates.
-    covariances_actual : list of N `~numpy.ndarray`s (M, M)
+    covariances_actual : list of N `~numpy.ndarray`s (M, M) or `~numpy.ndarray` (N, M, M), optional
         The covariance matrix in M dimensions for each
         actual observation if available.
+    sigmas_actual : `~numpy.ndarray` (N, M), optional
+        The 1-sigma uncertainties of the actual coordinates. Only used if
+        covariances_actual is None.
 
     Returns
     -------
@@ -174,27 +178,40 @@ def calcProbabilisticResiduals(
     d : `~numpy.ndarray` (N)
         The Mahalanobis distance of each coordinate compared to the desired
         coordinates.
-    """
-    d = np.zeros(len(coords_actual))
-    p = np.zeros(len(coords_actual))
 
-    for i, (actual, desired, covar) in enumerate(zip(coords_actual, coords_desired, covariances_actual)):
-        # Calculate the degrees of freedom
-        k = len(actual)
+    Raises
+    ------
+    ValueError : If neither covariances_actual nor sigmas_actual are given.
+    """
+    coords_actual = np.asarray(coords_actual, dtype=np.float64)
+    coords_desired = np.asarray(coords_desired, dtype=np.float64)
+    N, k = coords_actual.shape
+    delta = coords_actual - coords_desired
 
+    if covariances_actual is not None:
+        covariances_actual = np.asarray(covariances_actual, dtype=np.float64).reshape(N, k, k)
         # Calculate the mahalanobis distance between the two coordinates
-        d_i = mahalanobis(
-            actual,
-            desired,
-            np.linalg.inv(covar)
-        )
+        # by solving each covariance matrix for the coordinate difference
+        # (equivalent to multiplying by the inverse covariance matrix)
+        if N > 0:
+            x = np.linalg.solve(covariances_actual, delta[:, :, np.newaxis])[:, :, 0]
+        else:
+            x = np.zeros_like(delta)
+        d = np.sqrt(np.einsum("ij,ij->i", delta, x))
+
+    elif sigmas_actual is not None:
+        # Diagonal covariance matrices: the mahalanobis distance is the
+        # quadrature sum of each coordinate's difference in units of sigma
+        d = np.sqrt(np.sum((delta / sigmas_actual)**2, axis=1))
 
-        # Calculate the probability that both sets of coordinates are drawn from
-        # the same multivariate normal
-        p_i = 1 - chi2.cdf(d_i, k)
+    else:
+        err = (
+            "Either covariances_actual or sigmas_actual should be given."
+        )
+        raise ValueError(err)
 
-        # Append results
-        d[i] = d_i
-        p[i] = p_i
+    # Calculate the probability that both sets of coordinates are drawn from
+    # the same multivariate normal
+    p = 1 - chi2.cdf(d, k)
 
     return p, d
@@ -3,8 +3,10 @@ import spiceypy as sp
 
 from ..constants import KM_P_AU
 from ..constants import S_P_DAY
+from ..constants import JD_J2000
 from ..utils import setupSPICE
 from ..utils import _checkTime
+from .chebyshev import findStateTable
 
 NAIF_MAPPING = {
     "solar system barycenter" : 0,
@@ -31,7 +33,8 @@ __all__ = [
 
 def getPerturberState(body_name, times, frame="ecliptic", origin="heliocenter"):
     """
-    Query the JPL ephemeris files loaded in SPICE for the state vectors of desired perturbers.
+    Query the JPL ephemeris files loaded in SPICE for the state vectors of desired perturbers. If a state
+    table for the body (see `~thor.orbits.useStateTables`) covers all times, the table is evaluated instead.
 
     Major bodies and dynamical centers available:
         'solar system barycenter', 'sun',
@@ -74,15 +77,21 @@ def getPerturberState(body_name, times, frame="ecliptic", origin="heliocenter"):
         )
         raise ValueError(err)
 
-    # Make sure SPICE is ready to roll
-    setupSPICE()
-
     # Check that times is an astropy time object
     _checkTime(times, "times")
 
-    # Convert MJD epochs in TDB to ET in TDB
+    # If a state table for this body covers the times, evaluate
+    # it instead of querying SPICE
     epochs_tdb = times.tdb
-    epochs_et = np.array([sp.str2et('JD {:.16f} TDB'.format(i)) for i in epochs_tdb.jd])
+    table = findStateTable(body_name.lower(), frame, origin, epochs_tdb.mjd)
+    if table is not None:
+        return table.evaluate(epochs_tdb.mjd)
+
+    # Make sure SPICE is ready to roll
+    setupSPICE()
+
+    # Convert MJD epochs in TDB to ET in TDB (seconds past J2000)
+    epochs_et = np.atleast_1d(((epochs_tdb.jd1 - JD_J2000) + epochs_tdb.jd2) * S_P_DAY)
 
     # Get position of the body in heliocentric ecliptic J2000 coordinates
     states = []
@@ -0,0 +1,228 @@
+import os
+import numpy as np
+import pandas as pd
+from astropy.time import Time
+
+from ..orbits import Orbits
+from .. import attribution
+from ..attribution import attributeObservations
+from ..attribution import mergeAndExtendOrbits
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "../../testing/data"
+)
+
+def test_attributeObservations_prefilter():
+    """
+    Read the test dataset for the initial state vectors of each (bound) target and the
+    observations of those targets, then attribute the observations to the orbits with
+    and without the 2-body prefilter. Both should find exactly the same attributions.
+    """
+    vectors_df = pd.read_csv(
+        os.path.join(DATA_DIR, "vectors.csv")
+    )
+    # Limit vectors to elliptical orbits only
+    elliptical_vectors = (
+        (~vectors_df["orbit_class"].str.contains("Hyperbolic"))
+        & (~vectors_df["orbit_class"].str.contains("Parabolic"))
+    )
+    vectors_df = vectors_df[elliptical_vectors]
+    observations = pd.read_csv(
+        os.path.join(DATA_DIR, "observations.csv"),
+        index_col=False,
+        dtype={"obs_id" : str}
+    )
+    observations = observations[observations["mjd_utc"] <= observations["mjd_utc"].min() + 5]
+
+    orbits = Orbits(
+        vectors_df[["x", "y", "z", "vx", "vy", "vz"]].values,
+        Time(
+            vectors_df["mjd_tdb"].values,
+            scale="tdb",
+            format="mjd"
+        ),
+        ids=vectors_df["targetname"].values
+    )
+
+    attributions_prefilter = attributeObservations(
+        orbits,
+        observations,
+        backend="PYOORB",
+        prefilter=True
+    )
+    attributions = attributeObservations(
+        orbits,
+        observations,
+        backend="PYOORB",
+        prefilter=False
+    )
+
+    assert len(attributions) > 0
+    pd.testing.assert_frame_equal(attributions_prefilter, attributions)
+
+def test_mergeAndExtendOrbits_cleanOrbits(monkeypatch):
+    """
+    Read the test dataset for the initial state vectors of each (bound) target, the
+    observations of those targets and their associations. Seed an orbit for each target with
+    its first few days of observations and then extend them. Orbits that converged without their members
+    changing should not be attributed or fit again in the next iteration, and skipping them should find the
+    same orbits as re-attributing and re-fitting every orbit in every iteration.
+    """
+    vectors_df = pd.read_csv(
+        os.path.join(DATA_DIR, "vectors.csv")
+    )
+    # Limit vectors to elliptical orbits only
+    elliptical_vectors = (
+        (~vectors_df["orbit_class"].str.contains("Hyperbolic"))
+        & (~vectors_df["orbit_class"].str.contains("Parabolic"))
+    )
+    vectors_df = vectors_df[elliptical_vectors]
+    observations = pd.read_csv(
+        os.path.join(DATA_DIR, "observations.csv"),
+        index_col=False,
+        dtype={"obs_id" : str}
+    )
+    associations = pd.read_csv(
+        os.path.join(DATA_DIR, "associations.csv"),
+        index_col=False,
+        dtype={"obs_id" : str}
+    )
+
+    orbits = vectors_df[["targetname", "mjd_tdb", "x", "y", "z", "vx", "vy", "vz"]].copy()
+    orbits.columns = ["orbit_id", "epoch", "x", "y", "z", "vx", "vy", "vz"]
+    orbits.reset_index(
+        inplace=True,
+        drop=True
+    )
+
+    orbit_members = associations.merge(observations[["obs_id", "mjd_utc"]], on="obs_id")
+    orbit_members = orbit_members[
+        orbit_members["obj_id"].isin(orbits["orbit_id"].values)
+        & (orbit_members["mjd_utc"] <= observations["mjd_utc"].min() + 5)
+    ]
+    orbit_members = orbit_members.rename(columns={"obj_id" : "orbit_id"})[["orbit_id", "obs_id"]]
+
+    kwargs = dict(
+        backend="MJOLNIR",
+        num_jobs=1
+    )
+
+    # Record the orbits that are attributed, fit and found to be clean in each iteration
+    attributed = {}
+    fit = {}
+    clean = []
+    attributeObservations = attribution.attributeObservations
+    differentialCorrection = attribution.differentialCorrection
+    findDirtyOrbits = attribution._findDirtyOrbits
+
+    def recordAttribution(orbits, *args, **kwargs):
+        attributed[len(clean)] = set(orbits.ids)
+        return attributeObservations(orbits, *args, **kwargs)
+
+    def recordFit(orbits, *args, **kwargs):
+        fit[len(clean)] = set(orbits["orbit_id"].values)
+        return differentialCorrection(orbits, *args, **kwargs)
+
+    def recordClean(orbits, *args):
+        dirty_orbit_ids = findDirtyOrbits(orbits, *args)
+        clean.append(set(orbits["orbit_id"].values) - set(dirty_orbit_ids))
+        return dirty_orbit_ids
+
+    monkeypatch.setattr(attribution, "attributeObservations", recordAttribution)
+    monkeypatch.setattr(attribution, "differentialCorrection", recordFit)
+    monkeypatch.setattr(attribution, "_findDirtyOrbits", recordClean)
+    orbits_extended, orbit_members_extended = mergeAndExtendOrbits(
+        orbits,
+        orbit_members,
+        observations,
+        **kwargs
+    )
+    assert len(orbits_extended) > 0
+
+    # Clean orbits should be skipped by attribution and differential correction in the next
+    # iteration and then saved for output
+    assert sum(len(clean_i) for clean_i in clean) > 0
+    for i, clean_i in enumerate(clean[:-1]):
+        assert len(clean_i & attributed.get(i + 1, set())) == 0
+        assert len(clean_i & fit.get(i + 1, set())) == 0
+        assert clean_i.issubset(orbits_extended["orbit_id"].values)
+
+    # Treat every orbit as dirty so each iteration re-attributes and re-fits all of them
+    monkeypatch.setattr(
+        attribution,
+        "_findDirtyOrbits",
+        lambda orbits, orbit_members_prev, orbit_members, rchi2_threshold: orbits["orbit_id"].values
+    )
+    orbits_full, orbit_members_full = mergeAndExtendOrbits(
+        orbits,
+        orbit_members,
+        observations,
+        **kwargs
+    )
+
+    # Skipping clean orbits should recover the same orbits and members, the only difference
+    # being the extra differential correction iterations run on converged orbits
+    orbits_extended = orbits_extended.sort_values(by=["orbit_id"], ignore_index=True)
+    orbits_full = orbits_full.sort_values(by=["orbit_id"], ignore_index=True)
+    pd.testing.assert_series_equal(orbits_extended["orbit_id"], orbits_full["orbit_id"])
+    pd.testing.assert_series_equal(orbits_extended["num_obs"], orbits_full["num_obs"])
+    np.testing.assert_allclose(
+        orbits_extended[["x", "y", "z", "vx", "vy", "vz"]].values,
+        orbits_full[["x", "y", "z", "vx", "vy", "vz"]].values,
+        rtol=1e-3
+    )
+    assert set(zip(orbit_members_extended["orbit_id"], orbit_members_extended["obs_id"])) == \
+        set(zip(orbit_members_full["orbit_id"], orbit_members_full["obs_id"]))
+
+def test_attributeObservations_parallel():
+    """
+    Read the test dataset for the initial state vectors of each (bound) target and the
+    observations of those targets, then attribute the observations to the orbits serially and
+    with each parallel backend (which read the observation index from disk once per worker).
+    All should find exactly the same attributions.
+    """
+    vectors_df = pd.read_csv(
+        os.path.join(DATA_DIR, "vectors.csv")
+    )
+    # Limit vectors to elliptical orbits only
+    elliptical_vectors = (
+        (~vectors_df["orbit_class"].str.contains("Hyperbolic"))
+        & (~vectors_df["orbit_class"].str.contains("Parabolic"))
+    )
+    vectors_df = vectors_df[elliptical_vectors]
+    observations = pd.read_csv(
+        os.path.join(DATA_DIR, "observations.csv"),
+        index_col=False,
+        dtype={"obs_id" : str}
+    )
+
+    orbits = Orbits(
+        vectors_df[["x", "y", "z", "vx", "vy", "vz"]].values,
+        Time(
+            vectors_df["mjd_tdb"].values,
+            scale="tdb",
+            format="mjd"
+        ),
+        ids=vectors_df["targetname"].values
+    )
+
+    attributions = attributeObservations(
+        orbits,
+        observations,
+        backend="MJOLNIR",
+        orbits_chunk_size=2,
+        num_jobs=1
+    )
+    assert len(attributions) > 0
+
+    for parallel_backend in ["mp", "cf"]:
+        attributions_parallel = attributeObservations(
+            orbits,
+            observations,
+            backend="MJOLNIR",
+            orbits_chunk_size=2,
+            num_jobs=2,
+            parallel_backend=parallel_backend
+        )
+        pd.testing.assert_frame_equal(attributions_parallel, attributions)
@@ -0,0 +1,143 @@
+import numpy as np
+from astropy import units as u
+from astropy.time import Time
+
+from ...utils import KERNELS_DE440
+from ...utils import setupSPICE
+from ...utils import getSPICEKernels
+from ...utils import getMPCObservatoryCodes
+from ...testing import testOrbits
+from ...observatories import getObserverState
+from ..state import getPerturberState
+from ..chebyshev import ChebyshevTable
+from ..chebyshev import buildStateTables
+from ..chebyshev import saveStateTables
+from ..chebyshev import loadStateTables
+from ..chebyshev import useStateTables
+from ..chebyshev import clearStateTables
+from ..chebyshev import findStateTable
+
+def wobblingOrbit(t):
+    # Circular 1 au orbit with a 27 day wobble (similar to
+    # the Earth's motion about the Earth-Moon barycenter)
+    n = 2 * np.pi / 365.25
+    m = 2 * np.pi / 27.3
+    a = 3e-5
+    t = t - 59000.0
+    states = np.zeros((len(t), 6))
+    states[:, 0] = np.cos(n * t) + a * np.cos(m * t)
+    states[:, 1] = np.sin(n * t) + a * np.sin(m * t)
+    states[:, 2] = a * np.sin(m * t)
+    states[:, 3] = -n * np.sin(n * t) - a * m * np.sin(m * t)
+    states[:, 4] = n * np.cos(n * t) + a * m * np.cos(m * t)
+    states[:, 5] = a * m * np.cos(m * t)
+    return states
+
+def test_ChebyshevTable():
+    t_start = 59000.0
+    t_end = 59030.0
+    table = ChebyshevTable.fromFunction(
+        "earth",
+        wobblingOrbit,
+        t_start,
+        t_end,
+    )
+    assert table.t_end >= t_end
+
+    rng = np.random.default_rng(42)
+    t = np.concatenate([
+        rng.uniform(t_start, t_end, 1000),
+        # Segment boundaries and the ends of the table
+        t_start + np.arange(table.coefficients.shape[0] + 1) * table.segment_length
+    ])
+    # Times in MJD are resolved to ~1e-11 days, which limits the accuracy
+    # of the positions to ~1e-13 au (about 1.5 cm)
+    states = table.evaluate(t)
+    states_desired = wobblingOrbit(t)
+    np.testing.assert_allclose(states[:, :3], states_desired[:, :3], rtol=0, atol=1e-13)
+    np.testing.assert_allclose(states[:, 3:], states_desired[:, 3:], rtol=0, atol=1e-14)
+
+    assert table.covers(t)
+    assert not table.covers(np.array([t_start - 1.0]))
+    assert not table.covers(np.array([table.t_end + 1.0]))
+
+def test_saveStateTables(tmp_path):
+    tables = [
+        ChebyshevTable.fromFunction("earth", wobblingOrbit, 59000.0, 59010.0),
+        ChebyshevTable.fromFunction("I11", wobblingOrbit, 59000.0, 59010.0, segment_length=0.5, origin="barycenter"),
+    ]
+    file = str(tmp_path / "tables.npz")
+    saveStateTables(tables, file)
+    tables_loaded = loadStateTables(file)
+
+    assert len(tables_loaded) == len(tables)
+    t = np.linspace(59000.0, 59010.0, 100)
+    for table, table_loaded in zip(tables, tables_loaded):
+        assert table_loaded.name == table.name
+        assert table_loaded.frame == table.frame
+        assert table_loaded.origin == table.origin
+        np.testing.assert_equal(table_loaded.evaluate(t), table.evaluate(t))
+
+    # Tables in use are found by name, frame and origin if they cover the times
+    useStateTables(file)
+    try:
+        assert findStateTable("I11", "ecliptic", "barycenter", t) is not None
+        assert findStateTable("I11", "ecliptic", "heliocenter", t) is None
+        assert findStateTable("earth", "ecliptic", "heliocenter", t + 20) is None
+    finally:
+        clearStateTables()
+
+def test_buildStateTables():
+    """
+    Build state tables for the major bodies and an observatory and compare the states evaluated
+    from the tables with those queried directly from SPICE.
+    """
+    getSPICEKernels(KERNELS_DE440)
+    setupSPICE(KERNELS_DE440, force=True)
+    getMPCObservatoryCodes()
+
+    t_start = Time(59000.0, scale="tdb", format="mjd")
+    t_end = Time(59060.0, scale="tdb", format="mjd")
+    rng = np.random.default_rng(42)
+    times = Time(
+        np.sort(rng.uniform(59000.0, 59060.0, 500)),
+        scale="tdb",
+        format="mjd"
+    )
+
+    clearStateTables()
+    tables = buildStateTables(t_start, t_end, observatory_codes=["I11", "500"])
+
+    for origin in ["heliocenter", "barycenter"]:
+        states_spice = {}
+        for body in ["sun", "solar system barycenter", "earth"]:
+            states_spice[body] = getPerturberState(body, times, origin=origin)
+        for code in ["I11", "500"]:
+            states_spice[code] = getObserverState([code], times, origin=origin, as_numpy=True)
+
+        useStateTables(tables)
+        try:
+            for body in ["sun", "solar system barycenter", "earth"]:
+                states_table = getPerturberState(body, times, origin=origin)
+                testOrbits(
+                    states_table,
+                    states_spice[body],
+                    orbit_type="cartesian",
+                    position_tol=10*u.cm,
+                    velocity_tol=(1*u.mm/u.s),
+                    magnitude=True
+                )
+
+            for code in ["I11", "500"]:
+                assert findStateTable(code, "ecliptic", origin, times.tdb.mjd) is not None
+                states_table = getObserverState([code], times, origin=origin, as_numpy=True)
+                testOrbits(
+                    states_table,
+                    states_spice[code],
+                    orbit_type="cartesian",
+                    position_tol=10*u.cm,
+                    velocity_tol=(1*u.mm/u.s),
+                    magnitude=True
+                )
+        finally:
+            clearStateTables()
@@ -1,4 +1,5 @@
 import os
+import pytest
 import pandas as pd
 from astropy.time import Time
 from astropy import units as u
@@ -12,12 +13,19 @@ DATA_DIR = os.path.join(
     "../../testing/data"
 )
 
-def test_generateEphemeris():
+@pytest.mark.parametrize(
+    "backend, backend_kwargs",
+    [
+        ("PYOORB", {}),
+        ("MJOLNIR", {"dynamical_model" : "N"}),
+    ]
+)
+def test_generateEphemeris(backend, backend_kwargs):
     """
     Read the test data set for initial state vectors of each target at t0, and read the test data set
-    for ephemerides for each target as observed by each observatory at t1. Use PYOORB backend to
-    generate ephemerides for each target as observed by each observatory at t1 using the initial state vectors.
-    Compare the resulting ephemerides and test how well they agree with the ones pulled from Horizons.
+    for ephemerides for each target as observed by each observatory at t1. Use PYOORB's and MJOLNIR's N-body
+    backends to generate ephemerides for each target as observed by each observatory at t1 using the initial
+    state vectors. Compare the resulting ephemerides and test how well they agree with the ones pulled from Horizons.
     """
     # Read vectors from test data set
     vectors_df = pd.read_csv(
@@ -71,19 +79,20 @@ def test_generateEphemeris():
         )
     ephemeris = ephemeris_df[["RA", "DEC"]].values
 
-    # Use PYOORB to generate ephemeris for each target observed by
+    # Generate ephemeris for each target observed by
     # each observer
-    ephemeris_pyoorb = generateEphemeris(
+    ephemeris_backend = generateEphemeris(
         orbits,
         observers,
-        backend="PYOORB",
+        backend=backend,
+        backend_kwargs=backend_kwargs
     )
-    ephemeris_pyoorb = ephemeris_pyoorb[["RA_deg", "Dec_deg"]].values
+    ephemeris_backend = ephemeris_backend[["RA_deg", "Dec_deg"]].values
 
-    # pyoorb's ephemerides agree with Horizons' ephemerides
+    # The backend's ephemerides agree with Horizons' ephemerides
     # to within the tolerance below.
     testEphemeris(
-        ephemeris_pyoorb,
+        ephemeris_backend,
         ephemeris,
         angle_tol=(10*u.milliarcsecond),
         magnitude=True
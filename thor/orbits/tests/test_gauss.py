@@ -9,9 +9,12 @@ from ...utils import KERNELS_DE430
 from ...utils import getSPICEKernels
 from ...utils import setupSPICE
 from ...testing import testOrbits
+from ...coordinates import transformCoordinates
 from ..orbits import Orbits
 from ..ephemeris import generateEphemeris
+from ..universal_propagate import propagateUniversal
 from ..gauss import gaussIOD
+from ..gauss import gaussIODBatch
 
 TARGETS = [
     "Ivezic",
@@ -138,4 +141,68 @@ def test_gaussIOD():
                     velocity_tol=(1*u.mm/u.s),
                     raise_error=False
                 )
-    return
\ No newline at end of file
+    return
+
+
+def test_gaussIODBatch():
+    # Create triplets of observations of a few orbits from an observer on a circular
+    # orbit at 1 au (without light time)
+    orbits = np.array([
+        [2.1, 0.3, 0.05, -0.002, 0.0105, 0.0008],
+        [-1.5, 1.9, -0.1, -0.0085, -0.0065, 0.0003],
+        [0.2, -2.8, 0.3, 0.0101, 0.0004, -0.0012],
+    ])
+    t0 = np.array([59000.0 for i in range(len(orbits))])
+    times = np.array([[59000.0, 59003.0, 59007.0], [59001.0, 59002.5, 59004.0]])
+    n = 2 * np.pi / 365.25
+
+    coords = []
+    coords_obs = []
+    observation_times = []
+    for t in times:
+        observer = np.zeros((3, 3))
+        observer[:, 0] = np.cos(n * (t - 59000.0))
+        observer[:, 1] = np.sin(n * (t - 59000.0))
+        states = propagateUniversal(orbits, t0, t, c.MU, 1000, 1e-15)[:, 2:5].reshape(len(orbits), 3, 3)
+        for i in range(len(orbits)):
+            spherical = transformCoordinates(
+                states[i] - observer,
+                "ecliptic",
+                "equatorial",
+                representation_in="cartesian",
+                representation_out="spherical"
+            )
+            coords.append(spherical[:, 1:3])
+            coords_obs.append(observer)
+            observation_times.append(t)
+    coords = np.array(coords)
+    coords_obs = np.array(coords_obs)
+    observation_times = np.array(observation_times)
+
+    triplet_indices, iod_orbits = gaussIODBatch(
+        coords,
+        observation_times,
+        coords_obs,
+        light_time=False,
+        iterate=True,
+        max_iter=100
+    )
+    assert np.all(np.diff(triplet_indices) >= 0)
+
+    for k in range(len(coords)):
+        # Each triplet should give the same orbits in a batch as on its own
+        iod_orbits_k = gaussIOD(
+            coords[k],
+            observation_times[k],
+            coords_obs[k],
+            light_time=False,
+            iterate=True,
+            max_iter=100
+        )
+        np.testing.assert_allclose(iod_orbits.cartesian[triplet_indices == k], iod_orbits_k.cartesian, rtol=1e-8, atol=1e-12)
+
+        # One of the preliminary orbits should be the true orbit at the time of the
+        # second observation
+        truth = propagateUniversal(orbits[k % len(orbits):k % len(orbits) + 1], t0[:1], observation_times[k, 1:2], c.MU, 1000, 1e-15)[:, 2:]
+        best = np.argmin(np.linalg.norm(iod_orbits.cartesian[triplet_indices == k, :3] - truth[:, :3], axis=1))
+        np.testing.assert_allclose(iod_orbits.cartesian[triplet_indices == k][best], truth[0], rtol=1e-6, atol=1e-10)
@@ -1,11 +1,24 @@
+import os
 import numpy as np
 import pandas as pd
 from astropy.time import Time
+from itertools import combinations
 
 from ...data_processing import preprocessObservations
+from ...backend import MJOLNIR
 from ..orbits import Orbits
 from ..ephemeris import generateEphemeris
+from ..iod import yieldTriplets
+from ..iod import selectObservations
+from ..iod import iod
 from ..iod import initialOrbitDetermination
+from ..iod import _scoreCandidates
+from ..residuals import calcResiduals
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "../../testing/data"
+)
 
 TARGETS = [
     "Ivezic",
@@ -160,3 +173,217 @@ def test_initialOrbitDetermination_outlier_rejection():
     assert np.all(iod_orbit_members[iod_orbit_members["obs_id"].str.contains("obs")]["outlier"] == 0)
 
     return
+
+def test_yieldTriplets():
+    """
+    Compare the triplets yielded lazily to every combination of three observations sorted by
+    descending arc length and ascending time from midpoint.
+    """
+    rng = np.random.default_rng(42)
+    for times in [
+            np.sort(rng.uniform(0, 15, 12)),
+            # Repeated times (multiple observations in the same exposure)
+            np.sort(rng.integers(0, 6, 14).astype(float)),
+            np.array([0.0, 0.0, 1.0, 1.0]),
+            np.array([0.0, 1.0]),
+        ]:
+
+        indices = np.array(list(combinations(range(len(times)), 3)), dtype=int).reshape(-1, 3)
+        arc_length = times[indices][:, 2] - times[indices][:, 0]
+        time_from_mid = np.abs((times[indices][:, 2] + times[indices][:, 0]) / 2 - times[indices][:, 1])
+        indices = indices[np.lexsort((time_from_mid, -arc_length))]
+        unique = (times[indices][:, 0] != times[indices][:, 1]) & (times[indices][:, 1] != times[indices][:, 2])
+        indices = indices[unique]
+
+        triplets = np.array(list(yieldTriplets(times)), dtype=int).reshape(-1, 3)
+        np.testing.assert_equal(triplets, indices)
+
+        # Selecting only the first few triplets should return the best ranked triplets
+        observations = pd.DataFrame({
+            "obs_id" : ["obs{:02d}".format(i) for i in range(len(times))],
+            "mjd_utc" : times,
+        })
+        obs_ids = selectObservations(observations, method="combinations", num_triplets=5)
+        if len(indices) == 0:
+            assert len(obs_ids) == 0
+        else:
+            np.testing.assert_equal(obs_ids, observations["obs_id"].values[indices[:5]])
+
+def test__scoreCandidates():
+    """
+    Score a few candidate orbits (a target's orbit and offset versions of it) against noiseless observations
+    of the target and compare the residuals, chi2, RMS and selected candidates to those of scoring each
+    candidate individually.
+    """
+    vectors_df = pd.read_csv(
+        os.path.join(DATA_DIR, "vectors.csv")
+    )
+    # Limit vectors to elliptical orbits only
+    elliptical_vectors = (
+        (~vectors_df["orbit_class"].str.contains("Hyperbolic"))
+        & (~vectors_df["orbit_class"].str.contains("Parabolic"))
+    )
+    vectors_df = vectors_df[elliptical_vectors].iloc[:1]
+    vectors = vectors_df[["x", "y", "z", "vx", "vy", "vz"]].values
+    t0 = Time(
+        vectors_df["mjd_tdb"].values,
+        scale="tdb",
+        format="mjd"
+    )
+
+    # Candidates are ordered so that their IDs are not sorted, the two offset orbits
+    # come first and the last candidate is the target's orbit
+    rng = np.random.default_rng(42)
+    vectors_candidates = np.vstack([vectors, vectors, vectors])
+    vectors_candidates[:2, :3] += rng.normal(0, 1e-5, (2, 3))
+    vectors_candidates[:2, 3:] += rng.normal(0, 1e-6, (2, 3))
+    candidates = Orbits(
+        vectors_candidates[[1, 0, 2]],
+        Time(
+            np.repeat(t0.tdb.mjd, 3),
+            scale="tdb",
+            format="mjd"
+        ),
+        ids=np.array(["c", "b", "a"])
+    )
+
+    observers = {
+        "I41" : Time(
+            t0[0].utc.mjd + np.arange(0, 15, 2),
+            scale="utc",
+            format="mjd"
+        )
+    }
+    backend = MJOLNIR()
+    observations = backend._generateEphemeris(
+        Orbits(vectors, t0),
+        observers
+    )
+    coords = observations[["RA_deg", "Dec_deg"]].values
+    sigmas = np.full_like(coords, 0.1 / 3600)
+
+    residuals, chi2 = _scoreCandidates(
+        candidates,
+        backend,
+        observers,
+        coords,
+        sigmas
+    )
+    assert residuals.shape == (3, len(coords), 2)
+    assert chi2.shape == (3, len(coords))
+
+    # Score each candidate individually
+    ephemeris = backend._generateEphemeris(
+        candidates,
+        observers
+    )
+    residuals_expected = []
+    chi2_expected = []
+    for orbit_id in candidates.ids:
+        ephemeris_orbit = ephemeris[ephemeris["orbit_id"] == orbit_id]
+        residuals_i, stats_i = calcResiduals(
+            coords,
+            ephemeris_orbit[["RA_deg", "Dec_deg"]].values,
+            sigmas_actual=sigmas,
+            include_probabilistic=False
+        )
+        residuals_expected.append(residuals_i)
+        chi2_expected.append(stats_i[0])
+    residuals_expected = np.array(residuals_expected)
+    chi2_expected = np.array(chi2_expected)
+
+    np.testing.assert_allclose(residuals, residuals_expected, rtol=0, atol=1e-14)
+    np.testing.assert_allclose(chi2, chi2_expected, rtol=1e-12)
+
+    rms = np.sqrt(np.mean(residuals**2, axis=1))
+    rms_expected = np.sqrt(np.mean(residuals_expected**2, axis=1))
+    np.testing.assert_allclose(rms, rms_expected, rtol=1e-12)
+
+    # Only the target's orbit fits the observations, it should be the first candidate
+    # accepted and the one with the lowest reduced chi2
+    rchi2 = np.sum(chi2, axis=1) / (2 * len(coords) - 6)
+    rchi2_expected = np.sum(chi2_expected, axis=1) / (2 * len(coords) - 6)
+    rchi2_threshold = 10
+    np.testing.assert_equal(
+        np.flatnonzero(rchi2 <= rchi2_threshold),
+        np.flatnonzero(rchi2_expected <= rchi2_threshold)
+    )
+    assert np.flatnonzero(rchi2 <= rchi2_threshold)[0] == 2
+    assert np.argmin(rchi2) == np.argmin(rchi2_expected) == 2
+    return
+
+def test_iod_outlier_solution():
+    """
+    Run IOD on observations of a target with one outlier, where both preliminary orbits of the first triplet
+    are only accepted after removing the outlier. The last of them should be the solution (a solution found by
+    outlier rejection can be replaced by a later orbit of the same triplet) and the orbit of the second triplet
+    should not be tested.
+    """
+    vectors_df = pd.read_csv(
+        os.path.join(DATA_DIR, "vectors.csv")
+    )
+    # Limit vectors to elliptical orbits only
+    elliptical_vectors = (
+        (~vectors_df["orbit_class"].str.contains("Hyperbolic"))
+        & (~vectors_df["orbit_class"].str.contains("Parabolic"))
+    )
+    vectors_df = vectors_df[elliptical_vectors].iloc[:1]
+    vectors = vectors_df[["x", "y", "z", "vx", "vy", "vz"]].values
+    t0 = Time(
+        vectors_df["mjd_tdb"].values,
+        scale="tdb",
+        format="mjd"
+    )
+
+    observers = {
+        "I41" : Time(
+            t0[0].utc.mjd + np.arange(0, 15, 2),
+            scale="utc",
+            format="mjd"
+        )
+    }
+    observations = MJOLNIR()._generateEphemeris(
+        Orbits(vectors, t0),
+        observers
+    )
+    observations = observations[["observatory_code", "mjd_utc", "RA_deg", "Dec_deg"]].copy()
+    observations.insert(0, "obs_id", ["obs{:02d}".format(i) for i in range(len(observations))])
+    observations["RA_sigma_deg"] = 0.1 / 3600
+    observations["Dec_sigma_deg"] = 0.1 / 3600
+    observations.loc[5, "Dec_deg"] += 10 / 3600
+
+    # Preliminary orbits are the target's orbit offset by a few hundred meters so that
+    # each of them can be told apart
+    rng = np.random.default_rng(42)
+    vectors_candidates = np.vstack([vectors, vectors, vectors])
+    vectors_candidates[:, :3] += rng.normal(0, 1e-9, (3, 3))
+    triplets = np.array([
+        ["obs00", "obs03", "obs07"],
+        ["obs01", "obs04", "obs06"]
+    ])
+    gauss_solutions = [
+        Orbits(vectors_candidates[:2], Time(np.repeat(t0.tdb.mjd, 2), scale="tdb", format="mjd")),
+        Orbits(vectors_candidates[2:], t0)
+    ]
+
+    iod_orbit, iod_orbit_members = iod(
+        observations,
+        min_obs=6,
+        contamination_percentage=20.0,
+        rchi2_threshold=10,
+        light_time=True,
+        backend="MJOLNIR",
+        backend_kwargs={},
+        gauss_solutions=(triplets, gauss_solutions)
+    )
+    assert len(iod_orbit) == 1
+    np.testing.assert_equal(
+        iod_orbit[["x", "y", "z", "vx", "vy", "vz"]].values,
+        vectors_candidates[1:2]
+    )
+    np.testing.assert_equal(
+        iod_orbit_members[iod_orbit_members["outlier"] == 1]["obs_id"].values,
+        np.array(["obs05"])
+    )
+    assert iod_orbit["num_obs"].values[0] == len(observations) - 1
+    return
@@ -0,0 +1,35 @@
+import numpy as np
+
+from ...constants import Constants as c
+from ..universal_propagate import propagateUniversal
+from ..iterators import calcPositionPartials
+
+MU = c.MU
+
+def test_calcPositionPartials():
+    """
+    Compare the analytic partial derivatives of the propagated position with respect
+    to the initial state to those calculated with central differences.
+    """
+    orbit = np.array([2.1, 0.3, 0.05, -0.002, 0.0105, 0.0008])
+    t0 = 59000.0
+    t1 = np.array([59000.0, 59001.5, 59010.0, 58990.0, 59030.0])
+
+    states, partials = calcPositionPartials(orbit, t0, t1, mu=MU, max_iter=100, tol=1e-15)
+    assert states.shape == (len(t1), 6)
+    assert partials.shape == (len(t1), 3, 6)
+
+    # Propagated states should match the propagator
+    propagated = propagateUniversal(orbit.reshape(1, -1), np.array([t0]), t1, MU, 100, 1e-15)
+    np.testing.assert_allclose(states, propagated[:, 2:], rtol=0, atol=1e-14)
+
+    h = 1e-6
+    partials_fd = np.zeros_like(partials)
+    for i in range(6):
+        d = np.zeros(6)
+        d[i] = h
+        propagated_p = propagateUniversal((orbit + d).reshape(1, -1), np.array([t0]), t1, MU, 100, 1e-15)
+        propagated_n = propagateUniversal((orbit - d).reshape(1, -1), np.array([t0]), t1, MU, 100, 1e-15)
+        partials_fd[:, :, i] = (propagated_p[:, 2:5] - propagated_n[:, 2:5]) / (2 * h)
+
+    np.testing.assert_allclose(partials, partials_fd, rtol=0, atol=1e-9)
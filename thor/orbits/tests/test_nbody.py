@@ -0,0 +1,111 @@
+import os
+import numpy as np
+import pandas as pd
+from astropy.time import Time
+from astropy import units as u
+
+from ...constants import Constants as c
+from ...testing import testOrbits
+from ..chebyshev import ChebyshevTable
+from ..chebyshev import useStateTables
+from ..chebyshev import clearStateTables
+from ..universal_propagate import propagateUniversal
+from ..nbody_propagate import propagateNBody
+
+MU = c.MU
+DT = np.arange(-1000, 1000, 5)
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "../../testing/data"
+)
+
+def inertialSun(t):
+    # The Sun moving uniformly relative to the barycenter: heliocentric
+    # motion about it is 2-body motion
+    states = np.zeros((len(t), 6))
+    states[:, 0] = 0.005 + 1e-6 * (t - 58000.0)
+    states[:, 1] = -0.002
+    states[:, 3] = 1e-6
+    return states
+
+def test_propagateNBody():
+    """
+    Read the test dataset for the initial state vectors of each target at t0, then propagate
+    those states to all t1 (in no particular order) with the N-body propagator without perturbers
+    and with THOR's 2-body propagator. Compare the resulting states and test how well they agree.
+    """
+    vectors_df = pd.read_csv(
+        os.path.join(DATA_DIR, "vectors.csv")
+    )
+    t0 = Time(
+        vectors_df["mjd_tdb"].values,
+        scale="tdb",
+        format="mjd"
+    )
+    vectors = vectors_df[["x", "y", "z", "vx", "vy", "vz"]].values
+
+    rng = np.random.default_rng(42)
+    t1 = t0[0] + rng.permutation(DT)
+
+    useStateTables([
+        ChebyshevTable.fromFunction("sun", inertialSun, 56000.0, 60000.0, origin="barycenter")
+    ])
+    try:
+        states_nbody = propagateNBody(
+            vectors,
+            t0.tdb.mjd,
+            t1.tdb.mjd,
+            perturbers={},
+            relativity=False
+        )
+
+        # A perturber that moves with the Sun adds its mass to the Sun's
+        perturbers = {"jupiter barycenter" : 1e-5}
+        useStateTables([
+            ChebyshevTable.fromFunction("jupiter barycenter", inertialSun, 56000.0, 60000.0, segment_length=10.0, origin="barycenter")
+        ])
+        states_nbody_perturbed = propagateNBody(
+            vectors,
+            t0.tdb.mjd,
+            t1.tdb.mjd,
+            perturbers=perturbers,
+            relativity=False
+        )
+    finally:
+        clearStateTables()
+
+    states_universal = propagateUniversal(
+        vectors,
+        t0.tdb.mjd,
+        t1.tdb.mjd,
+        mu=MU,
+        max_iter=1000,
+        tol=1e-15
+    )
+    states_universal_perturbed = propagateUniversal(
+        vectors,
+        t0.tdb.mjd,
+        t1.tdb.mjd,
+        mu=MU + perturbers["jupiter barycenter"],
+        max_iter=1000,
+        tol=1e-15
+    )
+
+    np.testing.assert_equal(states_nbody[:, :2], states_universal[:, :2])
+    testOrbits(
+       states_nbody[:, 2:],
+       states_universal[:, 2:],
+       orbit_type="cartesian",
+       position_tol=100*u.m,
+       velocity_tol=(1*u.mm/u.s),
+       magnitude=True
+    )
+    testOrbits(
+       states_nbody_perturbed[:, 2:],
+       states_universal_perturbed[:, 2:],
+       orbit_type="cartesian",
+       position_tol=100*u.m,
+       velocity_tol=(1*u.mm/u.s),
+       magnitude=True
+    )
+    return
@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import pandas as pd
+from astropy.time import Time
+
+from ..orbits import Orbits
+from ..ephemeris import generateEphemeris
+from ..od import od
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "../../testing/data"
+)
+
+def test_od_analytic():
+    """
+    Read the test dataset for the initial state vectors of a few (bound) targets, generate noiseless
+    observations of them with MJOLNIR and then differentially correct offset initial states with analytic
+    partials and with central differences. Both should recover the targets' orbits.
+    """
+    vectors_df = pd.read_csv(
+        os.path.join(DATA_DIR, "vectors.csv")
+    )
+    # Limit vectors to elliptical orbits only
+    elliptical_vectors = (
+        (~vectors_df["orbit_class"].str.contains("Hyperbolic"))
+        & (~vectors_df["orbit_class"].str.contains("Parabolic"))
+    )
+    vectors_df = vectors_df[elliptical_vectors].iloc[:5]
+
+    t0 = Time(
+        vectors_df["mjd_tdb"].values,
+        scale="tdb",
+        format="mjd"
+    )
+    vectors = vectors_df[["x", "y", "z", "vx", "vy", "vz"]].values
+    orbits = Orbits(
+        vectors,
+        t0,
+        ids=vectors_df["targetname"].values
+    )
+
+    observation_times = Time(
+        t0[0].utc.mjd + np.arange(0, 20, 2),
+        scale="utc",
+        format="mjd"
+    )
+    ephemeris = generateEphemeris(
+        orbits,
+        {"I41" : observation_times},
+        backend="MJOLNIR",
+        num_jobs=1
+    )
+
+    # Offset the initial states by ~150 km in position and ~1 m/s in velocity
+    rng = np.random.default_rng(42)
+    vectors_offset = vectors.copy()
+    vectors_offset[:, :3] += rng.normal(0, 1e-6, (len(vectors), 3))
+    vectors_offset[:, 3:] += rng.normal(0, 5e-7, (len(vectors), 3))
+
+    for i, orbit_id in enumerate(orbits.ids):
+        observations = ephemeris[ephemeris["orbit_id"] == orbit_id][["mjd_utc", "RA_deg", "Dec_deg", "observatory_code"]].copy()
+        observations.insert(0, "obs_id", ["obs{:02d}".format(j) for j in range(len(observations))])
+        observations["RA_sigma_deg"] = 0.1 / 3600
+        observations["Dec_sigma_deg"] = 0.1 / 3600
+        observations.reset_index(
+            inplace=True,
+            drop=True
+        )
+
+        orbit = Orbits(
+            vectors_offset[i:i+1],
+            t0[i:i+1],
+            ids=orbits.ids[i:i+1]
+        )
+        od_orbits = {}
+        for method in ["central", "analytic"]:
+            od_orbit, od_orbit_members = od(
+                orbit,
+                observations,
+                rchi2_threshold=1e-6,
+                min_obs=5,
+                min_arc_length=1.0,
+                delta=1e-8,
+                method=method,
+                max_iter=10,
+                backend="MJOLNIR"
+            )
+            od_orbits[method] = od_orbit
+            assert od_orbit["rchi2"].values[0] < 1e-6
+
+        # Both methods should recover the targets' states (to within ~3 km in position, the
+        # range of a short arc from a single site is only loosely constrained) and agree with each other
+        for method, od_orbit in od_orbits.items():
+            np.testing.assert_allclose(
+                od_orbit[["x", "y", "z"]].values[0],
+                vectors[i, :3],
+                rtol=0,
+                atol=2e-8
+            )
+            np.testing.assert_allclose(
+                od_orbit[["vx", "vy", "vz"]].values[0],
+                vectors[i, 3:],
+                rtol=0,
+                atol=1e-9
+            )
+        np.testing.assert_allclose(
+            od_orbits["analytic"][["x", "y", "z", "vx", "vy", "vz"]].values,
+            od_orbits["central"][["x", "y", "z", "vx", "vy", "vz"]].values,
+            rtol=0,
+            atol=2e-9
+        )
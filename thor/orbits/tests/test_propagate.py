@@ -1,10 +1,13 @@
 import os
+import pickle
 import numpy as np
 import pandas as pd
 from astropy.time import Time
 from astropy import units as u
 
 from ...testing import testOrbits
+from ...backend import PYOORB
+from ...backend.pyoorb import oo
 from ..orbits import Orbits
 from ..propagate import propagateOrbits
 
@@ -80,3 +83,140 @@ def test_propagateOrbits():
        magnitude=True
     )
     return
+
+def test_propagateStates():
+    """
+    Propagate the test dataset's initial state vectors to epochs before and after t0 (in no
+    particular order) with PYOORB's chained propagation, and compare the resulting states to those
+    propagated with THOR's 2-body propagator.
+    """
+    vectors_df = pd.read_csv(
+        os.path.join(DATA_DIR, "vectors.csv")
+    )
+    targets = vectors_df["targetname"].unique()
+    t0 = Time(
+        vectors_df["mjd_tdb"].values,
+        scale="tdb",
+        format="mjd"
+    )
+    vectors = vectors_df[["x", "y", "z", "vx", "vy", "vz"]].values
+    orbits = Orbits(
+        vectors,
+        t0,
+        ids=targets
+    )
+
+    # Shuffle the epochs so that the chains have to be mapped back to t1's order
+    rng = np.random.default_rng(42)
+    t1 = t0[0] + rng.permutation(DT)
+
+    states_mjolnir = propagateOrbits(
+        orbits,
+        t1,
+        backend="MJOLNIR",
+        backend_kwargs={},
+        num_jobs=1,
+        chunk_size=1
+    )
+
+    backend = PYOORB(dynamical_model="2")
+    for num_jobs in [1, 2]:
+        states_pyoorb = backend.propagateStates(
+            orbits,
+            t1,
+            chunk_size=1,
+            num_jobs=num_jobs
+        )
+        assert states_pyoorb.shape == (len(orbits), len(t1), 6)
+
+        testOrbits(
+           states_mjolnir[["x", "y", "z", "vx", "vy", "vz"]].values,
+           states_pyoorb.reshape(-1, 6),
+           orbit_type="cartesian",
+           position_tol=200*u.m,
+           velocity_tol=(1*u.cm/u.s),
+           magnitude=True
+        )
+    return
+
+def test_propagateStates_epochs(monkeypatch):
+    """
+    Propagate the test dataset's initial state vectors, each defined at a different epoch between the same
+    two epochs in t1, with PYOORB's chained propagation. All orbits should share a single forward and a single
+    backward chain (one call to PYOORB per epoch) and the resulting states should agree with those propagated
+    with THOR's 2-body propagator.
+    """
+    vectors_df = pd.read_csv(
+        os.path.join(DATA_DIR, "vectors.csv")
+    )
+    targets = vectors_df["targetname"].unique()
+    rng = np.random.default_rng(42)
+    t0 = Time(
+        vectors_df["mjd_tdb"].values + rng.uniform(0.5, 4.5, len(vectors_df)),
+        scale="tdb",
+        format="mjd"
+    )
+    vectors = vectors_df[["x", "y", "z", "vx", "vy", "vz"]].values
+    orbits = Orbits(
+        vectors,
+        t0,
+        ids=targets
+    )
+    t1 = Time(
+        vectors_df["mjd_tdb"].values[0] + DT,
+        scale="tdb",
+        format="mjd"
+    )
+
+    states_mjolnir = propagateOrbits(
+        orbits,
+        t1,
+        backend="MJOLNIR",
+        backend_kwargs={},
+        num_jobs=1,
+        chunk_size=1
+    )
+
+    num_calls = []
+    oorb_propagation = oo.pyoorb.oorb_propagation
+    def countPropagations(**kwargs):
+        num_calls.append(len(kwargs["in_orbits"]))
+        return oorb_propagation(**kwargs)
+    monkeypatch.setattr(oo.pyoorb, "oorb_propagation", countPropagations)
+
+    backend = PYOORB(dynamical_model="2")
+    states_pyoorb = backend.propagateStates(
+        orbits,
+        t1,
+        chunk_size=len(orbits),
+        num_jobs=1
+    )
+    assert len(num_calls) == len(t1)
+    assert np.all(np.array(num_calls) == len(orbits))
+
+    testOrbits(
+       states_mjolnir[["x", "y", "z", "vx", "vy", "vz"]].values,
+       states_pyoorb.reshape(-1, 6),
+       orbit_type="cartesian",
+       position_tol=200*u.m,
+       velocity_tol=(1*u.cm/u.s),
+       magnitude=True
+    )
+    return
+
+def test_PYOORB_pickle():
+    """
+    Set up PYOORB and copy it as a worker would receive it. The copy should
+    initialize PYOORB again with its own ephemeris file.
+    """
+    backend = PYOORB()
+    backend.setup()
+    assert backend.is_setup
+
+    backend_copy = pickle.loads(pickle.dumps(backend))
+    assert not backend_copy.is_setup
+    assert backend_copy.ephemeris_file == backend.ephemeris_file
+
+    backend_copy.setup()
+    assert backend_copy.is_setup
+    return
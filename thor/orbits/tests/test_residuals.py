@@ -0,0 +1,90 @@
+import numpy as np
+from scipy.stats import chi2
+from scipy.spatial.distance import mahalanobis
+
+from ..residuals import calcResiduals
+from ..residuals import calcProbabilisticResiduals
+
+def createCoordinates(num_coords=100, seed=42):
+    rng = np.random.default_rng(seed)
+    coords_desired = np.vstack([
+        rng.uniform(0, 360, num_coords),
+        rng.uniform(-80, 80, num_coords)
+    ]).T
+    sigmas = rng.uniform(0.05, 1.0, (num_coords, 2)) / 3600
+    coords_actual = coords_desired + rng.normal(0, 1, (num_coords, 2)) * sigmas * 2
+    return coords_actual, coords_desired, sigmas
+
+def calcProbabilisticResidualsLoop(coords_actual, coords_desired, covariances_actual):
+    # Calculate the probabilistic residuals one coordinate at a time
+    d = np.zeros(len(coords_actual))
+    p = np.zeros(len(coords_actual))
+    for i, (actual, desired, covar) in enumerate(zip(coords_actual, coords_desired, covariances_actual)):
+        d[i] = mahalanobis(actual, desired, np.linalg.inv(covar))
+        p[i] = 1 - chi2.cdf(d[i], len(actual))
+    return p, d
+
+def test_calcProbabilisticResiduals():
+    coords_actual, coords_desired, sigmas = createCoordinates()
+
+    # Correlated uncertainties
+    rng = np.random.default_rng(1)
+    rho = rng.uniform(-0.9, 0.9, len(sigmas))
+    covariances = np.zeros((len(sigmas), 2, 2))
+    covariances[:, 0, 0] = sigmas[:, 0]**2
+    covariances[:, 1, 1] = sigmas[:, 1]**2
+    covariances[:, 0, 1] = rho * sigmas[:, 0] * sigmas[:, 1]
+    covariances[:, 1, 0] = covariances[:, 0, 1]
+
+    p_desired, d_desired = calcProbabilisticResidualsLoop(coords_actual, coords_desired, covariances)
+    for covariances_actual in [covariances, list(covariances)]:
+        p, d = calcProbabilisticResiduals(
+            coords_actual,
+            coords_desired,
+            covariances_actual=covariances_actual
+        )
+        np.testing.assert_allclose(d, d_desired, rtol=1e-10)
+        np.testing.assert_allclose(p, p_desired, rtol=1e-10, atol=1e-14)
+
+    # Uncorrelated uncertainties should not need covariance matrices
+    covariances_diag = [np.diag(i**2) for i in sigmas]
+    p_desired, d_desired = calcProbabilisticResidualsLoop(coords_actual, coords_desired, covariances_diag)
+    p, d = calcProbabilisticResiduals(
+        coords_actual,
+        coords_desired,
+        sigmas_actual=sigmas
+    )
+    np.testing.assert_allclose(d, d_desired, rtol=1e-10)
+    np.testing.assert_allclose(p, p_desired, rtol=1e-10, atol=1e-14)
+
+def test_calcResiduals():
+    coords_actual, coords_desired, sigmas = createCoordinates()
+    covariances = np.array([np.diag(i**2) for i in sigmas])
+
+    residuals, (chi2_sigmas, p_sigmas, d_sigmas) = calcResiduals(
+        coords_actual,
+        coords_desired,
+        sigmas_actual=sigmas,
+        include_probabilistic=True
+    )
+    residuals_cov, (chi2_cov, p_cov, d_cov) = calcResiduals(
+        coords_actual,
+        coords_desired,
+        covariances_actual=covariances,
+        include_probabilistic=True
+    )
+    np.testing.assert_equal(residuals, residuals_cov)
+    np.testing.assert_allclose(chi2_sigmas, chi2_cov, rtol=1e-12)
+    np.testing.assert_allclose(d_sigmas, d_cov, rtol=1e-10)
+    np.testing.assert_allclose(p_sigmas, p_cov, rtol=1e-10, atol=1e-14)
+
+    # No observations
+    residuals, (chi2_empty, p, d) = calcResiduals(
+        np.zeros((0, 2)),
+        np.zeros((0, 2)),
+        sigmas_actual=np.zeros((0, 2)),
+        include_probabilistic=True
+    )
+    assert residuals.shape == (0, 2)
+    assert len(p) == 0
+    assert len(d) == 0
@@ -124,13 +124,49 @@ def generateEphemerisUniversal(
         tol=tol
     )
 
+    return _generateEphemerisFromStates(
+        propagated_orbits_helio,
+        len(orbits),
+        observer_states,
+        observation_times,
+        light_time=light_time,
+        lt_tol=lt_tol,
+        stellar_aberration=stellar_aberration,
+        mu=mu,
+        max_iter=max_iter,
+        tol=tol
+    )
+
+def _generateEphemerisFromStates(
+        propagated_orbits_helio,
+        num_orbits,
+        observer_states,
+        observation_times,
+        light_time=True,
+        lt_tol=1e-10,
+        stellar_aberration=False,
+        mu=MU,
+        max_iter=1000,
+        tol=1e-15
+    ):
+    """
+    Generate ephemeris from orbits already propagated to each observation time (see
+    `generateEphemerisUniversal` for the parameters and returned columns).
+
+    Parameters
+    ----------
+    propagated_orbits_helio : `~numpy.ndarray` (N * M, 8)
+        Orbits propagated to each observation time as returned by `~thor.orbits.propagateUniversal`.
+    num_orbits : int
+        Number of orbits (N).
+    """
     # Stack observation times and observer states (so we can add/subtract arrays later instead of looping)
     observation_times_stacked = Time(
-        np.hstack([observation_times.utc.mjd for i in range(len(orbits))]),
+        np.hstack([observation_times.utc.mjd for i in range(num_orbits)]),
         scale="utc",
         format="mjd"
     )
-    observer_states_stacked_ = np.vstack([observer_states for i in range(len(orbits))])
+    observer_states_stacked_ = np.vstack([observer_states for i in range(num_orbits)])
 
     # Check observer_states to see if velocities have been passed
     if observer_states_stacked_.shape[1] == 3:
@@ -191,7 +227,7 @@ def generateEphemerisUniversal(
     )
 
     # Output results
-    ephemeris = np.zeros((len(orbits) * len(observation_times), 21))
+    ephemeris = np.zeros((num_orbits * len(observation_times), 21))
     ephemeris[:, 0] = propagated_orbits_helio[:, 0]
     ephemeris[:, 1] = observation_times_stacked.utc.mjd
     ephemeris[:, 2] = state_spherical[:, 1]
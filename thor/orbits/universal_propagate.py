@@ -1,5 +1,6 @@
 import numpy as np
 from numba import jit
+from numba import prange
 
 from ..constants import Constants as c
 from .stumpff import calcStumpff
@@ -71,10 +72,68 @@ def calcChi(orbit, dt, mu=MU, max_iter=100, tol=1e-16):
 
     return chi
 
-@jit(["f8[:,:](f8[:,:], f8[:], f8[:], f8, i8, f8)"], nopython=True, cache=True)
+@jit(["f8[:](f8[:], f8, f8, i8, f8)"], nopython=True, cache=True)
+def _propagateUniversal(orbit, dt, mu=MU, max_iter=100, tol=1e-14):
+    """
+    Propagate a single orbit by dt using the universal anomaly formalism.
+
+    Parameters
+    ----------
+    orbit : `~numpy.ndarray` (6)
+        Orbital state vector (X_0) with position in units of AU and velocity in units of AU per day.
+    dt : float
+        Time from epoch to which to propagate the orbit in units of decimal days.
+    mu : float, optional
+        Gravitational parameter (GM) of the attracting body in units of
+        AU**3 / d**2.
+    max_iter : int, optional
+        Maximum number of iterations over which to converge. If number of iterations is
+        exceeded, will use the value of the universal anomaly at the last iteration.
+    tol : float, optional
+        Numerical tolerance to which to compute universal anomaly using the Newtown-Raphson
+        method.
+
+    Returns
+    -------
+    orbit : `~numpy.ndarray` (6)
+        Propagated orbital state vector with position in units of AU and velocity in units of AU per day.
+    """
+    sqrt_mu = np.sqrt(mu)
+    chi = calcChi(orbit, dt, mu=mu, max_iter=max_iter, tol=tol)
+
+    r = orbit[:3]
+    v = orbit[3:]
+    v_mag = np.linalg.norm(v)
+    r_mag = np.linalg.norm(r)
+    chi2 = chi**2
+
+    alpha = -v_mag**2 / mu + 2 / r_mag
+    psi = alpha * chi2
+    c0, c1, c2, c3, c4, c5 = calcStumpff(psi)
+
+    f = 1 - chi**2 / r_mag * c2
+    g = dt - 1 / sqrt_mu * chi**3 * c3
+
+    r_new = f * r + g * v
+    r_new_mag = np.linalg.norm(r_new)
+
+    f_dot = sqrt_mu / (r_mag * r_new_mag) * (alpha * chi**3 * c3 - chi)
+    g_dot = 1 - chi2 / r_new_mag * c2
+
+    v_new = f_dot * r + g_dot * v
+
+    orbit_new = np.empty(6)
+    orbit_new[:3] = r_new
+    orbit_new[3:] = v_new
+    return orbit_new
+
+# Parallel kernels are compiled on their first call rather than at import: compiling
+# starts numba's threading layer, which does not survive worker processes being forked
+@jit(nopython=True, parallel=True, cache=True)
 def propagateUniversal(orbits, t0, t1, mu=MU, max_iter=100, tol=1e-14):
     """
-    Propagate orbits using the universal anomaly formalism.
+    Propagate orbits using the universal anomaly formalism. Each (orbit, epoch) pair
+    converges independently so all pairs are propagated in parallel.
 
     Parameters
     ----------
@@ -102,36 +161,15 @@ def propagateUniversal(orbits, t0, t1, mu=MU, max_iter=100, tol=1e-14):
         The first two columns are the orbit ID (a zero-based integer value assigned to each unique input orbit)
         and the MJD of each propagated state.
     """
-    new_orbits = []
     num_orbits = orbits.shape[0]
-    sqrt_mu = np.sqrt(mu)
-
-    for i in range(num_orbits):
-        for j, t in enumerate(t1):
-            dt = t - t0[i]
-            chi = calcChi(orbits[i,:], dt, mu=mu, max_iter=max_iter, tol=tol)
-
-            r = orbits[i, :3]
-            v = orbits[i, 3:]
-            v_mag = np.linalg.norm(v)
-            r_mag = np.linalg.norm(r)
-            chi2 = chi**2
-
-            alpha = -v_mag**2 / mu + 2 / r_mag
-            psi = alpha * chi2
-            c0, c1, c2, c3, c4, c5 = calcStumpff(psi)
-
-            f = 1 - chi**2 / r_mag * c2
-            g = dt - 1 / sqrt_mu * chi**3 * c3
-
-            r_new = f * r + g * v
-            r_new_mag = np.linalg.norm(r_new)
-
-            f_dot = sqrt_mu / (r_mag * r_new_mag) * (alpha * chi**3 * c3 - chi)
-            g_dot = 1 - chi2 / r_new_mag * c2
-
-            v_new = f_dot * r + g_dot * v
+    num_times = len(t1)
+    new_orbits = np.empty((num_orbits * num_times, 8))
 
-            new_orbits.append([i, t, r_new[0], r_new[1], r_new[2], v_new[0], v_new[1], v_new[2]])
+    for k in prange(num_orbits * num_times):
+        i = k // num_times
+        j = k % num_times
+        new_orbits[k, 0] = i
+        new_orbits[k, 1] = t1[j]
+        new_orbits[k, 2:] = _propagateUniversal(orbits[i], t1[j] - t0[i], mu, max_iter, tol)
 
-    return np.array(new_orbits)
\ No newline at end of file
+    return new_orbits
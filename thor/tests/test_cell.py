@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+from ..cell import Cell
+from ..cell import ExposureIndex
+
+def createObservations(num_obs_per_exposure=500, seed=42):
+    # Create two observatories each with a few exposures of randomly
+    # placed observations
+    rng = np.random.default_rng(seed)
+    dfs = []
+    for code, times in zip(["I11", "F51"], [[59000.1, 59000.2, 59001.1], [59000.15, 59001.1]]):
+        for mjd_utc in times:
+            dfs.append(pd.DataFrame({
+                "mjd_utc" : mjd_utc,
+                "RA_deg" : rng.uniform(350, 370, num_obs_per_exposure) % 360,
+                "Dec_deg" : rng.uniform(-10, 10, num_obs_per_exposure),
+                "observatory_code" : code,
+            }))
+
+    observations = pd.concat(dfs, ignore_index=True)
+    # Shuffle so the index has to sort the observations by exposure
+    observations = observations.sample(frac=1, random_state=seed).reset_index(drop=True)
+    observations.insert(0, "obs_id", ["obs{:05d}".format(i) for i in range(len(observations))])
+    return observations
+
+def test_ExposureIndex_offsets():
+    observations = createObservations()
+    index = ExposureIndex(observations)
+
+    assert len(index) == len(observations)
+    assert len(index.offsets) == len(index.exposure_times) + 1
+    for i, (code, mjd_utc) in enumerate(zip(index.exposure_codes, index.exposure_times)):
+        exposure = index.observations.iloc[index.offsets[i]:index.offsets[i + 1]]
+        assert np.all(exposure["observatory_code"].values == code)
+        assert np.all(exposure["mjd_utc"].values == mjd_utc)
+
+    assert index.findExposure("I11", 59000.2) != -1
+    assert index.findExposure("I11", 59000.2 + 1e-6) == index.findExposure("I11", 59000.2)
+    assert index.findExposure("I11", 59000.15) == -1
+    assert index.findExposure("500", 59000.2) == -1
+
+def test_ExposureIndex_query():
+    observations = createObservations()
+    index = ExposureIndex(observations)
+
+    area = 10
+    radius = np.sqrt(area / np.pi)
+    for code, mjd_utc, center in [
+            ("I11", 59000.1, np.array([0.5, 1.0])),
+            ("I11", 59001.1, np.array([359.0, -2.0])),
+            ("F51", 59000.15, np.array([5.0, 8.0]))
+        ]:
+
+        # Compare to the observations found by the cell
+        cell = Cell(center, mjd_utc, area=area)
+        cell.getObservations(observations[observations["observatory_code"] == code])
+
+        indices = index.query(code, mjd_utc, center, radius)
+        np.testing.assert_equal(
+            np.sort(index.observations["obs_id"].values[indices]),
+            np.sort(cell.observations["obs_id"].values)
+        )
+
+def test_ExposureIndex_query_mask():
+    observations = createObservations()
+    index = ExposureIndex(observations)
+
+    center = np.array([0.5, 1.0])
+    indices = index.query("I11", 59000.1, center, 2.0)
+    assert len(indices) > 0
+
+    # Masked observations should never be returned
+    mask = np.ones(len(index), dtype=bool)
+    mask[indices[::2]] = False
+    indices_masked = index.query("I11", 59000.1, center, 2.0, mask=mask)
+    np.testing.assert_equal(indices_masked, indices[1::2])
+
+    # Exposures that do not exist should return no observations
+    assert len(index.query("I11", 59002.0, center, 2.0)) == 0
+
+def test_ExposureIndex_queryBulk():
+    observations = createObservations()
+    index = ExposureIndex(observations)
+
+    rng = np.random.default_rng(1)
+    codes = np.array(["I11", "I11", "F51", "F51", "I11", "500"])
+    times = np.array([59000.1, 59001.1, 59000.15, 59001.1, 59002.0, 59000.1])
+    coords = np.vstack([
+        rng.uniform(355, 365, len(codes)) % 360,
+        rng.uniform(-5, 5, len(codes))
+    ]).T
+    mask = rng.uniform(size=len(index)) > 0.2
+
+    radius = 2.0
+    query_indices, indices, distances = index.queryBulk(codes, times, coords, radius, mask=mask)
+    assert len(indices) > 0
+    assert np.all(distances <= radius)
+
+    # Each position should return the same observations as a single cone search
+    for i, (code, mjd_utc, center) in enumerate(zip(codes, times, coords)):
+        np.testing.assert_equal(
+            np.sort(indices[query_indices == i]),
+            index.query(code, mjd_utc, center, radius, mask=mask)
+        )
+
+def test_ExposureIndex_findExposures():
+    observations = createObservations()
+    index = ExposureIndex(observations)
+
+    codes = np.array(["I11", "I11", "F51", "I11", "500"])
+    times = np.array([59000.2, 59000.2 + 1e-6, 59001.1, 59000.15, 59000.2])
+    exposures = index.findExposures(codes, times)
+    np.testing.assert_equal(
+        exposures,
+        [index.findExposure(code, mjd_utc) for code, mjd_utc in zip(codes, times)]
+    )
+
+def test_ExposureIndex_calcFootprints():
+    observations = createObservations()
+    index = ExposureIndex(observations)
+
+    mask = np.ones(len(index), dtype=bool)
+    mask[index.offsets[0]:index.offsets[1]] = False
+    for mask_i in [None, mask]:
+        centers, radii = index.calcFootprints(mask=mask_i)
+        assert centers.shape == (len(index.exposure_times), 3)
+
+        # Every (unmasked) observation should lie inside its exposure's footprint
+        for i in range(len(index.exposure_times)):
+            vectors = index.unit_vectors[index.offsets[i]:index.offsets[i + 1]]
+            if mask_i is not None:
+                vectors = vectors[mask_i[index.offsets[i]:index.offsets[i + 1]]]
+            if len(vectors) == 0:
+                assert radii[i] == -1
+                continue
+            np.testing.assert_allclose(np.linalg.norm(centers[i]), 1.0)
+            distances = np.degrees(np.arccos(np.clip(vectors @ centers[i], -1, 1)))
+            assert np.all(distances <= radii[i] + 1e-10)
+            np.testing.assert_allclose(distances.max(), radii[i])
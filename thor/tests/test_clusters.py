@@ -2,12 +2,17 @@ import pytest
 import numpy as np
 
 from ..clusters import (
+    find_clusters,
+    filter_clusters_by_length,
+    find_clusters_velocities,
     _find_runs,
     _adjust_labels,
     _build_label_aliases,
     _sort_order_2d,
     _extend_2d_array,
-    _label_clusters
+    _label_clusters,
+    _extend_1d_array,
+    _is_valid_cluster
 )
 
 
@@ -195,3 +200,63 @@ def test_label_clusters():
     )
     labels = _label_clusters(hits, points)
     np.testing.assert_array_equal(expected, labels)
+
+def test_extend_1d_array():
+    src = np.array([1, 2, 3], dtype=np.int64)
+    dst = _extend_1d_array(src, 6)
+
+    assert dst.shape == (6,)
+    assert (dst[:3] == src).all()
+
+def test_is_valid_cluster():
+    dt = np.array([0.0, 0.5, 1.0, 1.0, 2.0])
+
+    assert _is_valid_cluster(np.array([0, 1, 2, 4]), dt, 3, 1.0)
+    # Two observations at the same time
+    assert not _is_valid_cluster(np.array([0, 2, 3]), dt, 3, 1.0)
+    # Too few observations
+    assert not _is_valid_cluster(np.array([0, 4]), dt, 3, 1.0)
+    # Arc length too short
+    assert not _is_valid_cluster(np.array([0, 1, 2]), dt, 3, 1.5)
+
+@pytest.mark.parametrize("alg", ["hotspot_2d", "dbscan"])
+def test_find_clusters_velocities(alg):
+    # Build two linear tracks moving at different velocities on top
+    # of uniform background noise
+    rng = np.random.default_rng(42)
+    dt = np.repeat(np.arange(0, 5, dtype=np.float64), 20)
+    x = rng.uniform(-1, 1, len(dt))
+    y = rng.uniform(-1, 1, len(dt))
+    x[::20] = 0.1 + 0.02 * dt[::20]
+    y[::20] = -0.2 - 0.01 * dt[::20]
+    x[1::20] = -0.3 - 0.05 * dt[1::20]
+    y[1::20] = 0.4 + 0.03 * dt[1::20]
+
+    vx = np.array([0.02, 0.0, -0.05, 0.01])
+    vy = np.array([-0.01, 0.0, 0.03, 0.01])
+    eps = 0.005
+    min_samples = 5
+    min_arc_length = 1.0
+
+    velocity_ids, offsets, members = find_clusters_velocities(
+        x, y, dt, vx, vy, eps, min_samples, min_arc_length, alg=alg
+    )
+    assert len(offsets) == len(velocity_ids) + 1
+    assert offsets[-1] == len(members)
+
+    # Results should match clustering each velocity individually
+    for i, (vxi, vyi) in enumerate(zip(vx, vy)):
+        points = np.stack((x - vxi * dt, y - vyi * dt), 1)
+        expected = find_clusters(points, eps, min_samples, alg=alg)
+        expected = filter_clusters_by_length(expected, dt, min_samples, min_arc_length)
+
+        found = [
+            members[offsets[k]:offsets[k + 1]] for k in np.where(velocity_ids == i)[0]
+        ]
+        assert len(found) == len(expected)
+        for cluster_found, cluster_expected in zip(found, expected):
+            np.testing.assert_equal(cluster_found, cluster_expected)
+
+    # The two tracks should each be recovered at their velocity
+    assert 0 in velocity_ids
+    assert 2 in velocity_ids
@@ -59,6 +59,7 @@ def test_configuration_clusterAndLink():
         "min_obs",
         "min_arc_length",
         "alg",
+        "chunk_size",
         "num_jobs",
         "parallel_backend"
     ]
@@ -1,9 +1,14 @@
 import os
+import logging
+import pytest
 import numpy as np
 import pandas as pd
+from astropy.time import Time
 
+from .. import main
 from ..main import rangeAndShift
 from ..main import clusterAndLink
+from ..main import runTHOR
 from ..orbits import Orbits
 
 DATA_DIR = os.path.join(
@@ -113,4 +118,327 @@ def test_clusterAndLink():
         obs_ids = preprocessed_associations[preprocessed_associations["obj_id"].isin([orbit.ids[0]])]["obs_id"].values
         assert np.all(np.in1d(obs_ids, analyis_cluster_members["obs_id"].values))
 
-    return
\ No newline at end of file
+    return
+
+def restructureClustersReference(observations, vxx, vyy, velocity_ids, offsets, members):
+    # Restructure clusters into the clusters and cluster_members DataFrames by stacking
+    # ragged lists of observation IDs (the implementation clusterAndLink used previously)
+    obs_ids = observations["obs_id"].values
+    possible_clusters = [np.NaN for i in range(len(vxx))]
+    for velocity_id, start, end in zip(velocity_ids, offsets[:-1], offsets[1:]):
+        if not isinstance(possible_clusters[velocity_id], list):
+            possible_clusters[velocity_id] = []
+        possible_clusters[velocity_id].append(obs_ids[members[start:end]])
+
+    possible_clusters = pd.DataFrame({"clusters": possible_clusters})
+    possible_clusters = possible_clusters[~possible_clusters["clusters"].isna()]
+
+    cluster_velocities = pd.DataFrame({"vtheta_x": vxx, "vtheta_y": vyy})
+    cluster_velocities.index.set_names("velocity_id", inplace=True)
+
+    possible_clusters = pd.DataFrame(
+        possible_clusters["clusters"].values.tolist(),
+        index=possible_clusters.index
+    )
+    possible_clusters = pd.DataFrame(possible_clusters.stack())
+    possible_clusters.rename(
+        columns={0: "obs_ids"},
+        inplace=True
+    )
+    possible_clusters = pd.DataFrame(possible_clusters["obs_ids"].values.tolist(), index=possible_clusters.index)
+    possible_clusters.drop_duplicates(inplace=True)
+    possible_clusters.index.set_names(["velocity_id", "cluster_id"], inplace=True)
+    possible_clusters.reset_index(
+        "cluster_id",
+        drop=True,
+        inplace=True
+    )
+    possible_clusters["cluster_id"] = ["cluster{:02d}".format(i) for i in range(len(possible_clusters))]
+
+    clusters = possible_clusters.join(cluster_velocities)
+    clusters.reset_index(drop=True, inplace=True)
+    clusters = clusters[["cluster_id", "vtheta_x", "vtheta_y"]]
+
+    cluster_members = possible_clusters.reset_index(drop=True).copy()
+    cluster_members.index = cluster_members["cluster_id"]
+    cluster_members.drop("cluster_id", axis=1, inplace=True)
+    cluster_members = pd.DataFrame(cluster_members.stack())
+    cluster_members.rename(columns={0: "obs_id"}, inplace=True)
+    cluster_members.reset_index(inplace=True)
+    cluster_members.drop("level_1", axis=1, inplace=True)
+
+    cluster_members_time = cluster_members.merge(
+        observations[["obs_id", "mjd_utc"]],
+        on="obs_id",
+        how="left"
+    )
+    clusters_time = cluster_members_time.groupby(
+        by=["cluster_id"])["mjd_utc"].apply(lambda x: x.max() - x.min()).to_frame()
+    clusters_time.reset_index(
+        inplace=True
+    )
+    clusters_time.rename(
+        columns={"mjd_utc" : "arc_length"},
+        inplace=True
+    )
+    clusters = clusters.merge(
+        clusters_time[["cluster_id", "arc_length"]],
+        on="cluster_id",
+        how="left",
+    )
+    return clusters, cluster_members
+
+def summarizeClusters(clusters, cluster_members):
+    # Describe each cluster by its set of members, velocity and arc length so that
+    # clusters can be compared independently of their (random) cluster IDs
+    members = cluster_members.groupby("cluster_id")["obs_id"].apply(frozenset)
+    return sorted(
+        [
+            (members[cluster_id], vtheta_x, vtheta_y, arc_length)
+            for cluster_id, vtheta_x, vtheta_y, arc_length in clusters[["cluster_id", "vtheta_x", "vtheta_y", "arc_length"]].values
+        ],
+        key=lambda x: (sorted(x[0]), x[1], x[2])
+    )
+
+@pytest.mark.parametrize("alg", ["dbscan", "hotspot_2d"])
+def test_clusterAndLink_restructure(alg):
+    """
+    Cluster a small set of projected observations at velocities that find the same clusters more than once,
+    and make sure the clusters, their members and their arc lengths match those of the previous implementation
+    with duplicate clusters removed.
+    """
+    rng = np.random.default_rng(seed=42)
+    mjd = 59000.0 + np.arange(6)
+    # Two stationary objects with 6 and 5 observations, one object moving at 0.01 deg/day in x
+    # and 20 randomly placed noise observations
+    theta_x = np.concatenate([
+        np.zeros(6),
+        np.full(5, 0.5),
+        0.01 * (mjd - mjd[0]) - 0.5,
+        rng.uniform(-1, 1, 20)
+    ])
+    theta_y = np.concatenate([
+        np.zeros(6),
+        np.full(5, 0.5),
+        np.full(6, -0.5),
+        rng.uniform(-1, 1, 20)
+    ])
+    theta_x[:17] += rng.normal(0, 0.1 / 3600, 17)
+    theta_y[:17] += rng.normal(0, 0.1 / 3600, 17)
+    observations = pd.DataFrame({
+        "obs_id" : ["obs{:02d}".format(i) for i in range(37)],
+        "mjd_utc" : np.concatenate([mjd, mjd[:5], mjd, rng.choice(mjd, 20)]),
+        "theta_x_deg" : theta_x,
+        "theta_y_deg" : theta_y,
+    })
+
+    # Both stationary objects are found at each of the first three velocities, and the moving
+    # object at each of the last two
+    vx_values = np.array([0.0, 0.0, 1e-6, 0.01, 0.01])
+    vy_values = np.array([0.0, 0.0, 0.0, 0.0, 1e-6])
+    kwargs = {
+        "eps" : 5 / 3600,
+        "min_obs" : 5,
+        "min_arc_length" : 1.0,
+        "alg" : alg,
+    }
+    clusters, cluster_members = clusterAndLink(
+        observations,
+        vx_values=vx_values,
+        vy_values=vy_values,
+        num_jobs=1,
+        **kwargs
+    )
+
+    velocity_ids, offsets, members = main.clusterVelocity_worker(
+        vx_values,
+        vy_values,
+        x=observations["theta_x_deg"].values,
+        y=observations["theta_y_deg"].values,
+        dt=observations["mjd_utc"].values - observations["mjd_utc"].values.min(),
+        **kwargs
+    )
+    clusters_ref, cluster_members_ref = restructureClustersReference(
+        observations,
+        vx_values,
+        vy_values,
+        velocity_ids,
+        offsets,
+        members
+    )
+
+    # Each object should be recovered once
+    assert len(velocity_ids) == 8
+    assert len(clusters) == 3
+    assert len(cluster_members) == 17
+    assert summarizeClusters(clusters, cluster_members) == summarizeClusters(clusters_ref, cluster_members_ref)
+
+    return
+
+class InProcessResult:
+
+    def __init__(self, func, args, kwds):
+        self.waited = False
+        try:
+            self.result = func(*args, **kwds)
+            self.error = None
+        except Exception as e:
+            self.result = None
+            self.error = e
+
+    def get(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def wait(self, timeout=None):
+        self.waited = True
+        return
+
+class InProcessPool:
+    # Runs submitted test orbits immediately in this process: every test orbit is submitted
+    # before any result is gathered, so each sees the linked observations as of the start of the run
+    # just as concurrently processed test orbits do
+    def __init__(self):
+        self.results = []
+
+    def apply_async(self, func, args=(), kwds={}):
+        result = InProcessResult(func, args, kwds)
+        self.results.append(result)
+        return result
+
+def createLinkedPolicyDataset():
+    # Two objects with 10 observations each, and three test orbits: the first two test orbits
+    # recover the first object and the last test orbit recovers the second object
+    observations = pd.DataFrame({
+        "obs_id" : ["obs{:02d}".format(i) for i in range(20)],
+        "mjd_utc" : np.tile(59000.0 + np.arange(10), 2),
+        "RA_deg" : np.concatenate([np.linspace(10, 11, 10), np.linspace(20, 21, 10)]),
+        "Dec_deg" : np.concatenate([np.linspace(-5, -4, 10), np.linspace(5, 6, 10)]),
+        "RA_sigma_deg" : 0.1 / 3600,
+        "Dec_sigma_deg" : 0.1 / 3600,
+        "observatory_code" : "I41",
+    })
+    test_orbits = Orbits(
+        np.array([
+            [2.5, 0.0, 0.0, 0.0, 0.0109, 0.0],
+            [2.5, 0.0, 0.0, 0.0, 0.0109, 0.0],
+            [3.0, 0.0, 0.0, 0.0, 0.0099, 0.0],
+        ]),
+        Time(np.full(3, 59000.0), scale="tdb", format="mjd"),
+        ids=["a0", "a1", "b0"]
+    )
+    objects = {
+        "a0" : observations["obs_id"].values[:10],
+        "a1" : observations["obs_id"].values[:10],
+        "b0" : observations["obs_id"].values[10:],
+    }
+    return observations, test_orbits, objects
+
+def createRunTHOROrbit_worker(objects, fail=None):
+    # Stand-in for THOR on a single test orbit: recover the test orbit's object from
+    # those of its observations that have not been linked yet
+    def runTHOROrbit_worker(observation_store, orbit, *configs, out_dir=None, if_exists="continue", logging_level=None):
+        test_orbit_id = orbit.ids[0]
+        if test_orbit_id == fail:
+            raise RuntimeError("Test orbit {} failed.".format(test_orbit_id))
+
+        obs_ids = observation_store.internIDs(objects[test_orbit_id])
+        obs_ids = obs_ids[~observation_store.linked[obs_ids]]
+        if len(obs_ids) < 5:
+            return pd.DataFrame({"orbit_id" : []}), pd.DataFrame({"orbit_id" : [], "obs_id" : []}), 0.0
+
+        orbit_id = "orbit_{}".format(test_orbit_id)
+        recovered_orbits = pd.DataFrame({"orbit_id" : [orbit_id]})
+        recovered_orbit_members = pd.DataFrame({
+            "orbit_id" : orbit_id,
+            "obs_id" : obs_ids,
+        })
+        return recovered_orbits, recovered_orbit_members, 0.0
+
+    return runTHOROrbit_worker
+
+def test_runTHOR_linkedPolicy(monkeypatch):
+    """
+    Process test orbits sequentially and concurrently with each linked observations policy. Concurrent test orbits
+    do not see each other's linked observations: with 'snapshot' the first object is recovered by both of its test
+    orbits, with 'drop' the second recovery is discarded and the results match those of the sequential run.
+    """
+    observations, test_orbits, objects = createLinkedPolicyDataset()
+    monkeypatch.setattr(main, "runTHOROrbit_worker", createRunTHOROrbit_worker(objects))
+    monkeypatch.setattr(main, "getExecutor", lambda num_workers, parallel_backend="mp": InProcessPool())
+
+    results = {}
+    for num_jobs, linked_policy in [(1, "drop"), (2, "drop"), (2, "snapshot")]:
+        test_orbits_df, recovered_orbits, recovered_orbit_members = runTHOR(
+            observations,
+            test_orbits,
+            num_jobs=num_jobs,
+            linked_policy=linked_policy,
+            logging_level=logging.INFO
+        )
+        results[(num_jobs, linked_policy)] = (test_orbits_df, recovered_orbits, recovered_orbit_members)
+
+    test_orbits_df, recovered_orbits, recovered_orbit_members = results[(1, "drop")]
+    np.testing.assert_equal(test_orbits_df["orbits_recovered"].values, [1, 0, 1])
+    np.testing.assert_equal(test_orbits_df["observations_linked"].values, [10, 0, 10])
+    np.testing.assert_equal(recovered_orbits["orbit_id"].values, ["orbit_a0", "orbit_b0"])
+    np.testing.assert_equal(
+        np.sort(recovered_orbit_members["obs_id"].values),
+        observations["obs_id"].values
+    )
+
+    # Dropping recovered orbits that share observations with preceding test orbits reproduces
+    # the sequential run
+    for result, result_sequential in zip(results[(2, "drop")], results[(1, "drop")]):
+        pd.testing.assert_frame_equal(
+            result.drop(columns=["processing_time"], errors="ignore"),
+            result_sequential.drop(columns=["processing_time"], errors="ignore")
+        )
+
+    # Keeping every recovered orbit recovers the first object twice
+    test_orbits_df, recovered_orbits, recovered_orbit_members = results[(2, "snapshot")]
+    np.testing.assert_equal(test_orbits_df["orbits_recovered"].values, [1, 1, 1])
+    np.testing.assert_equal(recovered_orbits["orbit_id"].values, ["orbit_a0", "orbit_a1", "orbit_b0"])
+    np.testing.assert_equal(
+        recovered_orbit_members[recovered_orbit_members["orbit_id"] == "orbit_a1"]["obs_id"].values,
+        objects["a1"]
+    )
+
+    with pytest.raises(ValueError):
+        runTHOR(
+            observations,
+            test_orbits,
+            num_jobs=2,
+            linked_policy="merge",
+            logging_level=logging.INFO
+        )
+    return
+
+def test_runTHOR_parallelFailure(monkeypatch):
+    """
+    If a concurrently processed test orbit fails, every other submitted test orbit should be waited for
+    before the observation store is closed.
+    """
+    observations, test_orbits, objects = createLinkedPolicyDataset()
+    pool = InProcessPool()
+    closed = []
+    close = main.ObservationStore.close
+    def closeStore(observation_store):
+        closed.append([result.waited for result in pool.results])
+        close(observation_store)
+        return
+
+    monkeypatch.setattr(main, "runTHOROrbit_worker", createRunTHOROrbit_worker(objects, fail="a0"))
+    monkeypatch.setattr(main, "getExecutor", lambda num_workers, parallel_backend="mp": pool)
+    monkeypatch.setattr(main.ObservationStore, "close", closeStore)
+
+    with pytest.raises(RuntimeError):
+        runTHOR(
+            observations,
+            test_orbits,
+            num_jobs=2,
+            logging_level=logging.INFO
+        )
+    assert closed == [[True, True, True]]
+    return
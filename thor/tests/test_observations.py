@@ -0,0 +1,155 @@
+import pickle
+import pytest
+import numpy as np
+import pandas as pd
+
+from ..observations import internObservationIDs
+from ..observations import ObservationStore
+from ..cell import ExposureIndex
+
+def createObservations(num_obs=100, seed=42):
+    rng = np.random.default_rng(seed)
+    observations = pd.DataFrame({
+        "obs_id" : ["obs{:05d}".format(i) for i in range(num_obs)],
+        "mjd_utc" : rng.choice([59000.1, 59000.2, 59001.1], num_obs),
+        "RA_deg" : rng.uniform(0, 10, num_obs),
+        "Dec_deg" : rng.uniform(-5, 5, num_obs),
+        "RA_sigma_deg" : np.full(num_obs, 1/3600),
+        "Dec_sigma_deg" : np.full(num_obs, 1/3600),
+        "observatory_code" : rng.choice(["I11", "F51"], num_obs),
+    })
+    return observations
+
+def assertStoreEqual(store, observations):
+    observations_store = store.toDataFrame()
+    observations_sorted = observations.sort_values(
+        by=["observatory_code", "mjd_utc"],
+        kind="mergesort",
+        ignore_index=True
+    )
+    pd.testing.assert_frame_equal(observations_store, observations_sorted)
+
+def test_ObservationStore_shared_memory():
+    observations = createObservations()
+    store = ObservationStore(observations)
+    assert len(store) == len(observations)
+    assertStoreEqual(store, observations)
+
+    # A pickled store should attach to the same memory
+    store_attached = pickle.loads(pickle.dumps(store))
+    assertStoreEqual(store_attached, observations)
+
+    store_attached.markLinked(["obs00001", "obs00010"])
+    assert store.linked.sum() == 2
+    np.testing.assert_equal(
+        np.sort(store["obs_id"][store.linked]),
+        np.array(["obs00001", "obs00010"])
+    )
+
+    unlinked = store.toDataFrame(unlinked_only=True)
+    assert len(unlinked) == len(observations) - 2
+    assert not unlinked["obs_id"].isin(["obs00001", "obs00010"]).any()
+
+    store_attached.close()
+    store.close()
+
+def test_ObservationStore_memmap(tmp_path):
+    observations = createObservations()
+    store = ObservationStore(observations, directory=str(tmp_path))
+    assertStoreEqual(store, observations)
+
+    store_attached = pickle.loads(pickle.dumps(store))
+    store_attached.markLinked(["obs00003"])
+    store_attached.close()
+    assert store.linked.sum() == 1
+
+    store.close()
+    assert len(list(tmp_path.iterdir())) == 0
+
+def test_internObservationIDs():
+    observations = createObservations()
+    observations_interned, obs_ids = internObservationIDs(observations)
+
+    np.testing.assert_equal(observations_interned["obs_id"].values, np.arange(len(observations)))
+    np.testing.assert_equal(obs_ids[observations_interned["obs_id"].values], observations["obs_id"].values)
+    pd.testing.assert_frame_equal(
+        observations_interned.drop(columns=["obs_id"]),
+        observations.drop(columns=["obs_id"])
+    )
+
+def test_ObservationStore_intern_ids():
+    observations = createObservations()
+    store = ObservationStore(observations, intern_ids=True)
+
+    # Observation IDs are the rows of the store
+    observations_store = store.toDataFrame()
+    assert observations_store["obs_id"].dtype == np.int64
+    np.testing.assert_equal(observations_store["obs_id"].values, np.arange(len(observations)))
+
+    # Restoring the IDs should give back the original observations
+    observations_store["obs_id"] = store.restoreIDs(observations_store["obs_id"].values)
+    observations_sorted = observations.sort_values(
+        by=["observatory_code", "mjd_utc"],
+        kind="mergesort",
+        ignore_index=True
+    )
+    pd.testing.assert_frame_equal(observations_store, observations_sorted)
+
+    store_attached = pickle.loads(pickle.dumps(store))
+    obs_ids = store_attached.internIDs(["obs00001", "obs00010"])
+    np.testing.assert_equal(store_attached.restoreIDs(obs_ids), ["obs00001", "obs00010"])
+    with pytest.raises(KeyError):
+        store_attached.internIDs(["obs00001", "missing"])
+
+    with pytest.raises(KeyError):
+        store_attached.markLinked([-1])
+
+    store_attached.markLinked(obs_ids)
+    assert store.linked.sum() == 2
+    np.testing.assert_equal(np.sort(np.where(store.linked)[0]), np.sort(obs_ids))
+
+    store_attached.close()
+    store.close()
+
+def test_ObservationStore_intern_ids_int():
+    # Integer observation IDs should be restored as integers
+    observations = createObservations()
+    observations["obs_id"] = np.random.default_rng(42).permutation(len(observations)) + 1000
+    store = ObservationStore(observations, intern_ids=True)
+    store_attached = pickle.loads(pickle.dumps(store))
+
+    obs_ids = store_attached.restoreIDs(store_attached["obs_id"])
+    assert obs_ids.dtype == np.int64
+    observations_sorted = observations.sort_values(
+        by=["observatory_code", "mjd_utc"],
+        kind="mergesort",
+        ignore_index=True
+    )
+    np.testing.assert_equal(obs_ids, observations_sorted["obs_id"].values)
+
+    obs_ids = store_attached.internIDs(np.array([1001, 1010]))
+    np.testing.assert_equal(store_attached.restoreIDs(obs_ids), np.array([1001, 1010]))
+    with pytest.raises(KeyError):
+        store_attached.internIDs([1001, 99])
+
+    store_attached.close()
+    store.close()
+
+def test_ObservationStore_exposure_index():
+    observations = createObservations()
+    store = ObservationStore(observations)
+    store_attached = pickle.loads(pickle.dumps(store))
+
+    # The index should match one built from the observations, without copying the stored columns
+    exposure_index = ExposureIndex(observations)
+    exposure_index_store = store_attached.exposure_index
+    assert np.shares_memory(exposure_index_store.observations["RA_deg"].values, store_attached["RA_deg"])
+    pd.testing.assert_frame_equal(exposure_index_store.observations, exposure_index.observations)
+    np.testing.assert_equal(exposure_index_store.offsets, exposure_index.offsets)
+    np.testing.assert_equal(exposure_index_store.exposure_codes, exposure_index.exposure_codes)
+    np.testing.assert_equal(exposure_index_store.exposure_times, exposure_index.exposure_times)
+    np.testing.assert_equal(exposure_index_store.unit_vectors, exposure_index.unit_vectors)
+
+    del exposure_index_store
+    store_attached.close()
+    store.close()
@@ -1,8 +1,15 @@
 import time
 import uuid
+import numba
 import logging
 import numpy as np
 import pandas as pd
+from functools import partial
+
+from .multiprocessing import getExecutor
+from .multiprocessing import _checkParallel
+from .multiprocessing import yieldChunks
+from .multiprocessing import calcChunkSize
 
 __all__ = [
     "generateCombinations",
@@ -145,84 +152,308 @@ def sortLinkages(
     logger.debug(f"Linkages verified in {duration:.3f}s.")
     return linkages_verified, linkage_members_verified
 
-def identifySubsetLinkages(
-        all_linkages,
-        linkage_members,
-        linkage_id_col="orbit_id"
-    ):
+def _expandRanges(starts, lengths):
+    # For each range defined by its start and its length return the index of the
+    # range and the indices it spans
+    lengths = np.asarray(lengths, dtype=np.int64)
+    group = np.repeat(np.arange(len(lengths)), lengths)
+    offsets = np.cumsum(lengths) - lengths
+    indices = np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths)
+    return group, indices
+
+def _encodeLinkages(linkage_idx, obs_ids, num_linkages):
     """
-    Identify each linkage that is a subset of a larger linkage.
+    Encode each linkage as a sorted set of integer observation IDs.
 
     Parameters
     ----------
-    all_linkages :
+    linkage_idx : `~numpy.ndarray` (N)
+        Index of the linkage of each linkage member (-1 for members that should be ignored).
+    obs_ids : `~numpy.ndarray` (N)
+        Observation ID of each linkage member.
+    num_linkages : int
+        Number of linkages.
+
+    Returns
+    -------
+    offsets : `~numpy.ndarray` (num_linkages + 1)
+        Linkage i's observations are codes[offsets[i]:offsets[i + 1]].
+    codes : `~numpy.ndarray` (M)
+        Integer observation IDs sorted by linkage and then by ID (each
+        observation is only present once per linkage).
+    num_codes : int
+        Number of unique observation IDs.
+    """
+    obs_codes, obs_uniques = pd.factorize(obs_ids)
+    num_codes = max(len(obs_uniques), 1)
+
+    linkage_idx = np.asarray(linkage_idx, dtype=np.int64)
+    keep = linkage_idx >= 0
+    keys = np.unique(linkage_idx[keep] * num_codes + obs_codes[keep])
+    sizes = np.bincount(keys // num_codes, minlength=num_linkages)
+
+    offsets = np.zeros(num_linkages + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(sizes)
+    codes = keys % num_codes
+    return offsets, codes, num_codes
+
+def _hashLinkages(offsets, codes):
+    # Calculate a 64-bit hash of each linkage's set of observations as the
+    # (wrapping) sum of a 64-bit mix (splitmix64) of each observation's code
+    z = codes.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+
+    hashes = np.zeros(len(offsets) - 1, dtype=np.uint64)
+    non_empty = np.diff(offsets) > 0
+    if np.any(non_empty):
+        hashes[non_empty] = np.add.reduceat(z, offsets[:-1][non_empty])
+    return hashes
+
+def _findDuplicateLinkages(offsets, codes):
+    """
+    Find linkages with identical sets of observations using 64-bit set hashes.
 
+    Parameters
+    ----------
+    offsets : `~numpy.ndarray` (L + 1)
+        Offsets of each linkage's observations (as returned by `_encodeLinkages`).
+    codes : `~numpy.ndarray` (M)
+        Integer observation IDs (as returned by `_encodeLinkages`).
 
+    Returns
+    -------
+    duplicate_of : `~numpy.ndarray` (L)
+        Index of the first linkage with the same observations as each linkage
+        (the linkage's own index if no earlier linkage has the same observations).
+    """
+    num_linkages = len(offsets) - 1
+    sizes = np.diff(offsets)
+    hashes = _hashLinkages(offsets, codes)
+
+    # Group linkages by size and hash, within each group the first linkage
+    # is the representative of the others
+    order = np.lexsort((np.arange(num_linkages), hashes, sizes))
+    new_group = np.ones(num_linkages, dtype=bool)
+    new_group[1:] = (sizes[order][1:] != sizes[order][:-1]) | (hashes[order][1:] != hashes[order][:-1])
+    group_start = np.maximum.accumulate(np.where(new_group, np.arange(num_linkages), 0))
+
+    duplicate_of = np.arange(num_linkages)
+    duplicate_of[order] = order[group_start]
+
+    # Verify each duplicate observation by observation (guards against
+    # hash collisions)
+    duplicates = np.where(duplicate_of != np.arange(num_linkages))[0]
+    if len(duplicates) > 0:
+        pair, rows = _expandRanges(offsets[duplicates], sizes[duplicates])
+        rows_first = rows - offsets[duplicates][pair] + offsets[duplicate_of[duplicates]][pair]
+        mismatches = np.bincount(pair, weights=(codes[rows] != codes[rows_first]), minlength=len(duplicates))
+        duplicate_of[duplicates[mismatches > 0]] = duplicates[mismatches > 0]
+
+    return duplicate_of
+
+def _findSupersetLinkages(offsets, codes, num_codes):
+    """
+    For each linkage find the largest linkage that contains all of its observations. Candidate
+    supersets are found with an inverted index from each observation to the linkages that contain it:
+    only the linkages containing a linkage's least common observation (and that are at least as large) need
+    to be checked.
 
+    Parameters
+    ----------
+    offsets : `~numpy.ndarray` (L + 1)
+        Offsets of each linkage's observations (as returned by `_encodeLinkages`).
+    codes : `~numpy.ndarray` (M)
+        Integer observation IDs (as returned by `_encodeLinkages`).
+    num_codes : int
+        Number of unique observation IDs.
 
+    Returns
+    -------
+    superset_of : `~numpy.ndarray` (L)
+        Index of the largest linkage (the first one if several are equally large) that
+        contains every observation of each linkage, -1 if there is none. Linkages with identical
+        observations are supersets of the linkages with the same observations that follow them.
+    """
+    num_linkages = len(offsets) - 1
+    sizes = np.diff(offsets)
+    linkage_idx = np.repeat(np.arange(num_linkages), sizes)
+    superset_of = np.full(num_linkages, -1, dtype=np.int64)
+
+    # Inverted index: the linkages that contain each observation
+    occurences = np.bincount(codes, minlength=num_codes)
+    inverted_offsets = np.zeros(num_codes + 1, dtype=np.int64)
+    inverted_offsets[1:] = np.cumsum(occurences)
+    inverted_linkages = linkage_idx[np.argsort(codes, kind="stable")]
+
+    # A linkage can only be a subset of another if each of its observations belongs to
+    # at least one other linkage, find each linkage's least common observation
+    member_occurences = occurences[codes]
+    order = np.lexsort((member_occurences, linkage_idx))
+    non_empty = np.where(sizes > 0)[0]
+    rarest = order[offsets[:-1][non_empty]]
+    candidates = non_empty[member_occurences[rarest] > 1]
+    rarest = codes[order[offsets[:-1][candidates]]]
+    if len(candidates) == 0:
+        return superset_of
+
+    # Pair each candidate subset with the other linkages containing its least common observation
+    pair, rows = _expandRanges(inverted_offsets[rarest], occurences[rarest])
+    subset = candidates[pair]
+    superset = inverted_linkages[rows]
+    keep = (
+        (superset != subset)
+        & ((sizes[superset] > sizes[subset]) | ((sizes[superset] == sizes[subset]) & (superset < subset)))
+    )
+    subset = subset[keep]
+    superset = superset[keep]
+    if len(subset) == 0:
+        return superset_of
+
+    # Verify that every observation of the subset is in the superset
+    member_keys = linkage_idx * num_codes + codes
+    pair, rows = _expandRanges(offsets[subset], sizes[subset])
+    keys = superset[pair] * num_codes + codes[rows]
+    found = member_keys[np.minimum(np.searchsorted(member_keys, keys), len(member_keys) - 1)] == keys
+    is_subset = np.bincount(pair, weights=found, minlength=len(subset)) == sizes[subset]
+    subset = subset[is_subset]
+    superset = superset[is_subset]
+
+    # Select the largest superset of each subset
+    order = np.lexsort((superset, -sizes[superset], subset))
+    subset = subset[order]
+    superset = superset[order]
+    first = np.ones(len(subset), dtype=bool)
+    first[1:] = subset[1:] != subset[:-1]
+    superset_of[subset[first]] = superset[first]
+    return superset_of
 
+def identifySubsetLinkages(
+        all_linkages,
+        linkage_members,
+        linkage_id_col="orbit_id"
+    ):
     """
+    Identify each linkage that is a subset of a larger linkage. Each subset linkage is flagged
+    as a subset of the largest linkage that contains all of its observations (if several linkages
+    are equally large, the first in all_linkages). Of linkages with identical observations, the first
+    is kept and the others are flagged as its subsets.
 
+    Parameters
+    ----------
+    all_linkages : `~pandas.DataFrame`
+        DataFrame containing at least the linkage ID.
+    linkage_members : `~pandas.DataFrame`
+        Dataframe containing the linkage ID and the observation ID for each of the linkage's
+        constituent observations. Each observation ID should be in a single row.
+    linkage_id_col : str, optional
+        Linkage ID column name (must be the same in both DataFrames).
 
+    Returns
+    -------
+    all_linkages : `~pandas.DataFrame`
+        Copy of all_linkages with a "subset_of" column added: the linkage ID of the linkage
+        each linkage is a subset of (None if it is not a subset).
+    linkage_members : `~pandas.DataFrame`
+        Copy of linkage_members.
+    """
     linkage_members_merged = linkage_members.copy()
     all_linkages_merged = all_linkages.copy()
-    all_linkages_merged["subset_of"] = None
-
-    counts = linkage_members["obs_id"].value_counts()
-    duplicate_obs_ids = counts.index[counts.values > 1].values
-
-    subset_linkages = []
-    obs_ids_analyzed = set()
-    i = 0
-    while len(obs_ids_analyzed) != len(duplicate_obs_ids):
-
-        obs_id = duplicate_obs_ids[i]
 
-        if obs_id not in obs_ids_analyzed:
-
-            # Find all linkages that contain this observation (that have not already been identified as a subset)
-            linkage_ids = linkage_members_merged[linkage_members_merged["obs_id"].isin([obs_id])][linkage_id_col].values
-
-            # Count the occurences of these linkages (the number of observations in each linkage)
-            linkage_id_counts = linkage_members_merged[(
-                linkage_members_merged[linkage_id_col].isin(linkage_ids)
-                & (~linkage_members_merged[linkage_id_col].isin(subset_linkages))
-            )][linkage_id_col].value_counts()
-            linkage_ids = linkage_id_counts.index.values
-
-            for linkage_id_i in linkage_ids:
-
-                # Has linkage i already been identified as a subset? If not, see if it has any subset linkages
-                is_subset_i = all_linkages_merged[all_linkages_merged[linkage_id_col].isin([linkage_id_i])]["subset_of"].values[0]
-                if not is_subset_i:
-
-                    # Grab linkage i's observation IDs
-                    obs_ids_i = linkage_members_merged[linkage_members_merged[linkage_id_col].isin([linkage_id_i])]["obs_id"].values
-
-                    for linkage_id_j in linkage_ids[np.where(linkage_ids != linkage_id_i)]:
-
-                        # If this linkage has not already been marked as a subset of another, check to see
-                        # if it is a subset
-                        is_subset_j = all_linkages_merged[all_linkages_merged[linkage_id_col].isin([linkage_id_j])]["subset_of"].values[0]
-                        if not is_subset_j:
-
-                            # Grab linkage j's observation IDs
-                            obs_ids_j = linkage_members_merged[linkage_members_merged[linkage_id_col].isin([linkage_id_j])]["obs_id"].values
-
-                            # If linkage j is a subset of linkage i, flag it as such
-                            if set(obs_ids_j).issubset(set(obs_ids_i)):
-                                all_linkages_merged.loc[all_linkages_merged[linkage_id_col].isin([linkage_id_j]), "subset_of"] = linkage_id_i
+    linkage_ids = all_linkages_merged[linkage_id_col].values
+    offsets, codes, num_codes = _encodeLinkages(
+        pd.Index(linkage_ids).get_indexer(linkage_members_merged[linkage_id_col].values),
+        linkage_members_merged["obs_id"].values,
+        len(linkage_ids)
+    )
+    superset_of = _findSupersetLinkages(offsets, codes, num_codes)
 
-                                subset_linkages.append(linkage_id_j)
-                                for j in obs_ids_j:
-                                    obs_ids_analyzed.add(j)
+    subset_of = np.full(len(linkage_ids), None, dtype=object)
+    is_subset = superset_of != -1
+    subset_of[is_subset] = linkage_ids[superset_of[is_subset]]
+    all_linkages_merged["subset_of"] = subset_of
 
+    return all_linkages_merged, linkage_members_merged
 
-            obs_ids_analyzed.add(obs_id)
+@numba.njit
+def _findComponents(nodes_a, nodes_b, num_nodes):
+    """
+    Find the connected components of a graph defined by its edges (nodes_a[i], nodes_b[i])
+    using union-find (with path halving and union by size).
 
-        i += 1
+    Returns the label (the root node) of each node's component.
+    """
+    parent = np.arange(num_nodes)
+    size = np.ones(num_nodes, dtype=np.int64)
+    for i in range(len(nodes_a)):
+        x = nodes_a[i]
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        y = nodes_b[i]
+        while parent[y] != y:
+            parent[y] = parent[parent[y]]
+            y = parent[y]
+        if x == y:
+            continue
+        if size[x] < size[y]:
+            x, y = y, x
+        parent[y] = x
+        size[x] += size[y]
+
+    labels = np.empty(num_nodes, dtype=np.int64)
+    for i in range(num_nodes):
+        x = i
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        labels[i] = x
+    return labels
+
+def _mergeComponents(components):
+    # Create the merged linkages of each group (connected component) of linkages that share
+    # observations. Each component is given as the index of the linkage whose properties the merged
+    # linkages inherit, the IDs of the component's linkages, and the IDs and times of its observations. Returns
+    # for each merged linkage its new ID and the index of the linkage it inherits from, for each
+    # merged linkage member its linkage's new ID, observation ID and time, and for each merged linkage the
+    # IDs of the linkages it was merged from.
+    new_linkage_ids = []
+    linkage_indices = []
+    member_linkage_ids = []
+    member_obs_ids = []
+    member_times = []
+    merged_from_ids = []
+    merged_from = []
+    for linkage_index, linkage_ids_i, obs_ids, times in components:
 
-    return all_linkages_merged, linkage_members_merged
+        sort = np.argsort(times, kind="stable")
+        obs_ids = obs_ids[sort]
+        times = times[sort]
+        for combination in generateCombinations(times):
+            new_linkage_id = str(uuid.uuid4().hex)
+            new_linkage_ids.append(new_linkage_id)
+            linkage_indices.append(linkage_index)
+
+            member_linkage_ids.append(np.full(len(combination), new_linkage_id, dtype=object))
+            member_obs_ids.append(obs_ids[combination])
+            member_times.append(times[combination])
+
+            merged_from_ids.append(np.full(len(linkage_ids_i), new_linkage_id, dtype=object))
+            merged_from.append(linkage_ids_i)
+
+    if len(new_linkage_ids) == 0:
+        return None
+
+    return (
+        np.array(new_linkage_ids, dtype=object),
+        np.array(linkage_indices, dtype=np.int64),
+        np.concatenate(member_linkage_ids),
+        np.concatenate(member_obs_ids),
+        np.concatenate(member_times),
+        np.concatenate(merged_from_ids),
+        np.concatenate(merged_from)
+    )
 
 def mergeLinkages(
         linkages,
@@ -230,11 +461,16 @@ def mergeLinkages(
         observations,
         linkage_id_col="orbit_id",
         filter_cols=["num_obs", "arc_length"],
-        ascending=[False, False]
+        ascending=[False, False],
+        chunk_size=100,
+        num_jobs=1,
+        parallel_backend="mp"
     ):
     """
-    Merge any observations that share observations into one larger linkage. The larger
-    linkage will be given the linkage properties of the linkage that when sorted using
+    Merge any linkages that share observations into one larger linkage. Linkages are grouped
+    into the connected components of the graph of linkages and their observations (found with union-find), so
+    linkages that share observations with a linkage that shares observations with another linkage are merged as well.
+    The larger linkage will be given the linkage properties of the linkage that when sorted using
     filter_cols is first. Linkages that when merged may have different observations occur at the same
     time will be split into every possible comibination of unique observation IDs and observation times.
 
@@ -254,6 +490,13 @@ def mergeLinkages(
         List of column names to use to sort the linkages.
     ascending : list, optional
         Sort the filter_cols in ascending or descending order.
+    chunk_size : int, optional
+        Number of groups of linkages to send to each job.
+    num_jobs : int, optional
+        Number of jobs to launch.
+    parallel_backend : str, optional
+        Which parallelization backend to use {'ray', 'mp', 'cf'}. Defaults to using Python's multiprocessing
+        module ('mp').
 
     Returns
     -------
@@ -267,51 +510,113 @@ def mergeLinkages(
     """
     assert "mjd_utc" not in linkage_members.columns
 
-    obs_id_occurences = linkage_members["obs_id"].value_counts()
-    duplicate_obs_ids = obs_id_occurences.index.values[obs_id_occurences.values > 1]
-    linkage_members_ = linkage_members.merge(observations[["obs_id", "mjd_utc"]], on="obs_id")
-
     if linkage_id_col == "orbit_id":
         columns = ["orbit_id", "epoch", "x", "y", "z", "vx", "vy", "vz"]
     else:
         columns = ["cluster_id", "vtheta_x_deg", "vtheta_y_deg"]
 
-    merged_linkages = []
-    merged_linkage_members = []
-    merged_from = []
-    while len(duplicate_obs_ids) > 0:
+    # Build the bipartite graph of linkages and observations: linkages are nodes 0 to L - 1
+    # and observations are nodes L to L + O - 1, each linkage member is an edge
+    linkage_ids = linkages[linkage_id_col].values
+    num_linkages = len(linkage_ids)
+    linkage_idx = pd.Index(linkage_ids).get_indexer(linkage_members[linkage_id_col].values)
+    obs_codes, obs_ids = pd.factorize(linkage_members["obs_id"].values)
+    obs_index = pd.Index(observations["obs_id"].values).get_indexer(obs_ids)
+    obs_times = observations["mjd_utc"].values[obs_index]
+    keep = (linkage_idx >= 0) & (obs_index[obs_codes] >= 0)
+    linkage_idx = linkage_idx[keep].astype(np.int64)
+    obs_codes = obs_codes[keep].astype(np.int64)
+
+    labels = _findComponents(linkage_idx, obs_codes + num_linkages, num_linkages + len(obs_ids))
+
+    # Only components with more than one linkage need to be merged
+    linkage_labels = labels[:num_linkages]
+    label_counts = np.bincount(linkage_labels, minlength=len(labels))
+    merge_labels = np.where(label_counts > 1)[0]
+
+    components = []
+    if len(merge_labels) > 0:
+        # Rank the linkages using the filter columns, each merged linkage is given the
+        # properties of the best ranked linkage in its component
+        rank = np.empty(num_linkages, dtype=np.int64)
+        rank[linkages.reset_index(drop=True).sort_values(by=filter_cols, ascending=ascending, kind="mergesort").index.values] = np.arange(num_linkages)
+
+        linkage_order = np.lexsort((rank, linkage_labels))
+        linkage_order = linkage_order[label_counts[linkage_labels[linkage_order]] > 1]
+        linkage_offsets = np.concatenate([[0], np.cumsum(label_counts[merge_labels])])
+
+        # Unique observations of each component
+        keys = np.unique(labels[linkage_idx] * len(obs_ids) + obs_codes)
+        keys = keys[label_counts[keys // len(obs_ids)] > 1]
+        obs_offsets = np.concatenate([[0], np.cumsum(np.bincount(
+            np.searchsorted(merge_labels, keys // len(obs_ids)),
+            minlength=len(merge_labels)
+        ))])
+        component_obs = keys % len(obs_ids)
+
+        for i in range(len(merge_labels)):
+            linkages_i = linkage_order[linkage_offsets[i]:linkage_offsets[i + 1]]
+            obs_i = component_obs[obs_offsets[i]:obs_offsets[i + 1]]
+            components.append((
+                linkages_i[0],
+                np.sort(linkage_ids[linkages_i]),
+                obs_ids[obs_i],
+                obs_times[obs_i]
+            ))
+
+    results = []
+    if len(components) > 0:
+        parallel, num_workers = _checkParallel(num_jobs, parallel_backend)
+        if parallel:
+            chunk_size_ = calcChunkSize(len(components), num_workers, chunk_size, min_chunk_size=1)
+
+            if parallel_backend == "ray":
+
+                import ray
+                if not ray.is_initialized():
+                    ray.init(address="auto")
+
+                _mergeComponents_ray = ray.remote(_mergeComponents)
+                _mergeComponents_ray = _mergeComponents_ray.options(
+                    num_returns=1,
+                    num_cpus=1
+                )
 
-        duplicate_obs_id = duplicate_obs_ids[0]
-        linkage_ids_i = linkage_members_[linkage_members_["obs_id"].isin([duplicate_obs_id])][linkage_id_col].unique()
-        obs_ids = linkage_members_[linkage_members_[linkage_id_col].isin(linkage_ids_i)]["obs_id"].unique()
-        times = linkage_members_[linkage_members_["obs_id"].isin(obs_ids)].drop_duplicates(subset=["obs_id"])["mjd_utc"].values
+                oids = []
+                for components_i in yieldChunks(components, chunk_size_):
+                    oids.append(_mergeComponents_ray.remote(components_i))
+                results = ray.get(oids)
 
-        obs_ids = obs_ids[np.argsort(times)]
-        times = times[np.argsort(times)]
-        for combination in generateCombinations(times):
+            else: # parallel_backend in ["mp", "cf"]
 
-            new_possible_linkages = linkages[linkages[linkage_id_col].isin(linkage_ids_i)].copy()
-            new_linkage = new_possible_linkages.sort_values(
-                by=filter_cols,
-                ascending=ascending
-            )[:1]
-            new_linkage_id = str(uuid.uuid4().hex)
-            new_linkage[linkage_id_col] = new_linkage_id
-
-            new_linkage_members = {
-                linkage_id_col : [new_linkage_id for i in range(len(obs_ids[combination]))],
-                "obs_id" : obs_ids[combination],
-                "mjd_utc" : times[combination]
-            }
-            merged_from_i = {
-                linkage_id_col : [new_linkage_id for i in range(len(linkage_ids_i))],
-                "merged_from" : linkage_ids_i
-            }
-            merged_linkages.append(new_linkage)
-            merged_linkage_members.append(pd.DataFrame(new_linkage_members))
-            merged_from.append(pd.DataFrame(merged_from_i))
-
-        duplicate_obs_ids = np.delete(duplicate_obs_ids, np.isin(duplicate_obs_ids, obs_ids))
+                p = getExecutor(num_workers, parallel_backend)
+                results = p.starmap(
+                    _mergeComponents,
+                    zip(yieldChunks(components, chunk_size_)),
+                )
+
+        else:
+            results = [_mergeComponents(components_i) for components_i in yieldChunks(components, chunk_size)]
+
+    results = [r for r in results if r is not None]
+    merged_linkages = []
+    merged_linkage_members = []
+    merged_from = []
+    if len(results) > 0:
+        results = [np.concatenate(r) for r in zip(*results)]
+        new_linkage_ids, linkage_indices, member_linkage_ids, member_obs_ids, member_times, merged_from_ids, merged_from_ = results
+
+        merged_linkages = [linkages.iloc[linkage_indices].copy()]
+        merged_linkages[0][linkage_id_col] = new_linkage_ids
+        merged_linkage_members = [pd.DataFrame({
+            linkage_id_col : member_linkage_ids,
+            "obs_id" : member_obs_ids,
+            "mjd_utc" : member_times
+        })]
+        merged_from = [pd.DataFrame({
+            linkage_id_col : merged_from_ids,
+            "merged_from" : merged_from_
+        })]
 
     if len(merged_linkages) > 0:
         merged_linkages = pd.concat(merged_linkages)
@@ -381,10 +686,16 @@ def removeDuplicateLinkages(
     linkages_ = linkages.copy()
     linkage_members_ = linkage_members.copy()
 
-    # Expand observation IDs into columns, then remove duplicates using pandas functionality
-    expanded = linkage_members_[[linkage_id_col, "obs_id"]].groupby(by=[linkage_id_col])["obs_id"].apply(list).to_frame(name="obs_ids")
-    expanded = expanded["obs_ids"].apply(pd.Series)
-    linkage_ids = expanded.drop_duplicates().index.values
+    # Encode each linkage as a set of integer observation IDs (sorted by linkage ID), then
+    # keep the first linkage of each set of linkages with identical observations
+    linkage_idx, linkage_ids = pd.factorize(linkage_members_[linkage_id_col].values, sort=True)
+    offsets, codes, num_codes = _encodeLinkages(
+        linkage_idx,
+        linkage_members_["obs_id"].values,
+        len(linkage_ids)
+    )
+    duplicate_of = _findDuplicateLinkages(offsets, codes)
+    linkage_ids = linkage_ids[duplicate_of == np.arange(len(linkage_ids))]
 
     linkages_ = linkages_[linkages_[linkage_id_col].isin(linkage_ids)]
     linkage_members_ = linkage_members_[linkage_members_[linkage_id_col].isin(linkage_ids)]
@@ -433,32 +744,38 @@ def removeDuplicateObservations(
     linkage_members : `~pandas.DataFrame`
         DataFrame with duplicate observations removed.
     """
-    linkages_ = linkages.copy()
-    linkage_members_ = linkage_members.copy()
-
-    linkages_.sort_values(
+    linkages_ = linkages.sort_values(
         by=filter_cols,
         ascending=ascending,
-        inplace=True,
         ignore_index=True
     )
 
-    linkages_.set_index(linkage_id_col, inplace=True)
-    linkage_members_.set_index(linkage_id_col, inplace=True)
-    linkage_members_ = linkage_members_.loc[linkages_.index.values]
-    linkage_members_.reset_index(inplace=True)
-
-    linkage_members_ = linkage_members_.drop_duplicates(subset=["obs_id"], keep="first")
-    linkage_occurences = linkage_members_[linkage_id_col].value_counts()
-    linkages_to_keep = linkage_occurences.index.values[linkage_occurences.values >= min_obs]
-    linkages_ = linkages_[linkages_.index.isin(linkages_to_keep)]
-    linkage_members_ = linkage_members_[linkage_members_[linkage_id_col].isin(linkages_to_keep)]
-
-    linkages_.reset_index(inplace=True)
-    linkage_members_.reset_index(
-        inplace=True,
-        drop=True
-    )
+    # Order linkage members by the rank of their linkage, then keep the
+    # first instance of each observation
+    linkage_ids = linkages_[linkage_id_col].values
+    linkage_idx = pd.Index(linkage_ids).get_indexer(linkage_members[linkage_id_col].values)
+    order = np.argsort(linkage_idx, kind="stable")
+    order = order[linkage_idx[order] >= 0]
+    obs_codes, _ = pd.factorize(linkage_members["obs_id"].values[order])
+    _, first = np.unique(obs_codes, return_index=True)
+    order = order[np.sort(first)]
+
+    # Remove linkages with fewer than min_obs remaining observations
+    num_obs = np.bincount(linkage_idx[order], minlength=len(linkage_ids))
+    keep_linkages = num_obs >= min_obs
+    order = order[keep_linkages[linkage_idx[order]]]
+
+    columns = [linkage_id_col] + [col for col in linkages_.columns if col != linkage_id_col]
+    linkages_ = linkages_.loc[keep_linkages, columns]
+    columns = [linkage_id_col] + [col for col in linkage_members.columns if col != linkage_id_col]
+    linkage_members_ = linkage_members[columns].iloc[order]
+
+    for df in [linkages_, linkage_members_]:
+        df.reset_index(
+            inplace=True,
+            drop=True
+        )
+
     return linkages_, linkage_members_
 
 def calcDeltas(
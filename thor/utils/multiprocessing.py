@@ -1,19 +1,28 @@
+import os
+import atexit
 import signal
 import logging
+import numba
 import numpy as np
 import pandas as pd
 import multiprocessing as mp
+import concurrent.futures as cf
 
 __all__ = [
     "Timeout",
     "yieldChunks",
     "calcChunkSize",
+    "getExecutor",
+    "shutdownExecutors",
     "_initWorker",
     "_checkParallel"
 ]
 
 logger = logging.getLogger(__name__)
 
+# Process-wide executors keyed by (parallel_backend, num_workers)
+EXECUTORS = {}
+
 class Timeout:
     ### Taken from https://stackoverflow.com/a/22348885
     def __init__(self, seconds=30, error_message='Timeout'):
@@ -86,19 +95,192 @@ def calcChunkSize(n, num_workers, max_chunk_size, min_chunk_size=1):
     chunk_size = np.minimum(c, max_chunk_size)
     return chunk_size
 
-def _initWorker():
+class FuturesPool:
+    """
+    Wraps a `~concurrent.futures.ProcessPoolExecutor` so that it can be used
+    in the same way as a `~multiprocessing.Pool`.
+
+    Parameters
+    ----------
+    num_workers : int
+        Number of worker processes.
+    initializer : callable, optional
+        Function each worker process calls when it starts.
+    initargs : tuple, optional
+        Arguments passed to the initializer.
+    mp_context : `~multiprocessing.context.BaseContext`, optional
+        Context used to start the worker processes.
+    """
+    def __init__(self, num_workers, initializer=None, initargs=(), mp_context=None):
+        self.executor = cf.ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=mp_context,
+            initializer=initializer,
+            initargs=initargs
+        )
+        return
+
+    def starmap(self, func, iterable):
+        futures = [self.executor.submit(func, *args) for args in iterable]
+        return [future.result() for future in futures]
+
+    def apply_async(self, func, args=(), kwds={}):
+        future = self.executor.submit(func, *args, **kwds)
+        # Match the interface of multiprocessing's AsyncResult
+        future.get = future.result
+        future.wait = lambda timeout=None: cf.wait([future], timeout=timeout)
+        return future
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        return
+
+    def join(self):
+        self.executor.shutdown(wait=True)
+        return
+
+def getExecutor(num_workers, parallel_backend="mp", warm_start=True):
+    """
+    Get the process-wide executor (pool of worker processes) for the given parallelization
+    backend and number of workers. The executor is created the first time it is requested and is then
+    reused by every subsequent caller so that the cost of starting worker processes and warming them up
+    (loading SPICE kernels, initializing PYOORB and loading numba's cached functions) is paid once.
+
+    Returned executors support starmap and apply_async in the same way
+    as `~multiprocessing.Pool`. Callers should not close them, use
+    `shutdownExecutors` instead.
+
+    Worker processes are spawned rather than forked: once a parallel numba kernel has
+    started numba's threading layer (TBB), a process that forks hangs when it exits. Workers
+    therefore do not inherit the parent's in-memory state, state tables are only shared when
+    they were loaded from a file (see `~thor.orbits.useStateTables`).
+
+    Parameters
+    ----------
+    num_workers : int
+        Number of worker processes.
+    parallel_backend : str, optional
+        Name of the backend. Should be one of {'mp', 'cf'}. Ray manages its own
+        persistent workers.
+    warm_start : bool, optional
+        Prepare each worker (SPICE, state tables, PYOORB and numba) when it starts. Only
+        applies when the executor is created, an existing executor is returned as is.
+
+    Returns
+    -------
+    executor : {`~multiprocessing.Pool`, `~thor.utils.multiprocessing.FuturesPool`}
+        Pool of worker processes.
+
+    Raises
+    ------
+    ValueError : If parallel_backend is not one of {'mp', 'cf'}.
+    """
+    key = (parallel_backend, num_workers)
+    if key not in EXECUTORS:
+        logger.debug("Starting {} executor with {} workers...".format(parallel_backend, num_workers))
+        context = mp.get_context("spawn")
+        if parallel_backend == "mp":
+            executor = context.Pool(
+                processes=num_workers,
+                initializer=_initWorker,
+                initargs=(warm_start, )
+            )
+        elif parallel_backend == "cf":
+            executor = FuturesPool(
+                num_workers,
+                initializer=_initWorker,
+                initargs=(warm_start, ),
+                mp_context=context
+            )
+        else:
+            err = (
+                "parallel_backend should be one of {'mp', 'cf'}"
+            )
+            raise ValueError(err)
+
+        EXECUTORS[key] = executor
+
+    return EXECUTORS[key]
+
+def shutdownExecutors():
+    """
+    Shut down all process-wide executors.
+
+    Returns
+    -------
+    None
+    """
+    for key in list(EXECUTORS.keys()):
+        executor = EXECUTORS.pop(key)
+        executor.close()
+        executor.join()
+    return
+
+atexit.register(shutdownExecutors)
+
+def _warmStartWorker():
+    """
+    Prepare a worker process: set up SPICE, load state tables (if the parent process
+    uses tables saved to disk), initialize PYOORB and load numba's cached functions by
+    running a single propagation. A step that fails is logged as a warning and the worker
+    is left to set it up when a task first needs it.
+    """
+    try:
+        from .spice import setupSPICE
+        setupSPICE()
+    except Exception as e:
+        logger.warning("Could not set up SPICE: {}".format(e))
+
+    try:
+        if "THOR_STATE_TABLES" in os.environ.keys():
+            from ..orbits import useStateTables
+            useStateTables(os.environ["THOR_STATE_TABLES"])
+    except Exception as e:
+        logger.warning("Could not load state tables: {}".format(e))
+
+    try:
+        from ..backend import PYOORB
+        PYOORB().setup()
+    except Exception as e:
+        logger.warning("Could not set up PYOORB: {}".format(e))
+
+    try:
+        from ..constants import Constants as c
+        from ..orbits.universal_propagate import propagateUniversal
+        propagateUniversal(
+            np.array([[1., 0., 0., 0., 0.0172, 0.]]),
+            np.array([59000.]),
+            np.array([59001.]),
+            c.MU,
+            100,
+            1e-14
+        )
+    except Exception as e:
+        logger.warning("Could not load cached numba functions: {}".format(e))
+
+    return
+
+def _initWorker(warm_start=False):
     """
     Tell multiprocessing worker to ignore signals, will only
-    listen to parent process.
+    listen to parent process. If warm_start is True, also prepare
+    the worker (SPICE, PYOORB, numba) so that the first task does
+    not pay those costs.
     """
     signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Workers already run in parallel, so numba's parallel loops
+    # should not spawn additional threads within each worker
+    numba.set_num_threads(1)
+    if warm_start:
+        _warmStartWorker()
     return
 
 def _checkParallel(num_jobs, parallel_backend):
     """
     Helper function to determine how many workers (jobs) should be submitted.
-    If the parallelization backend is Python's multiprocessing ('mp') and num_jobs
-    is either "auto" or None, then mp.cpu_count() will be used to determine the number
+    If the parallelization backend is Python's multiprocessing ('mp') or concurrent.futures ('cf')
+    and num_jobs is either "auto" or None, then mp.cpu_count() will be used to determine the number
     of jobs. If num_jobs is not "auto" or None, then that number will be used instead.
     If the parallelization backend is ray, then the number of resources on the cluster will
     determine the number of workers, and num_jobs is ignored.
@@ -108,7 +290,7 @@ def _checkParallel(num_jobs, parallel_backend):
     num_jobs : {None, "auto", int}
         Number of jobs to launch.
     parallel_backend : str
-        Name of backend. Should be one of {'ray', 'mp'}.
+        Name of backend. Should be one of {'ray', 'mp', 'cf'}.
 
     Returns
     -------
@@ -119,15 +301,15 @@ def _checkParallel(num_jobs, parallel_backend):
 
     Raises
     ------
-    ValueError : If parallel_backend is not one of {'ray', 'mp'}.
+    ValueError : If parallel_backend is not one of {'ray', 'mp', 'cf'}.
     """
     if isinstance(num_jobs, str) or (num_jobs is None) or (num_jobs > 1):
 
         # Check that pareallel_backend is one of the support types
-        backends = ["ray", "mp"]
+        backends = ["ray", "mp", "cf"]
         if parallel_backend not in backends:
             err = (
-                "parallel_backend should be one of {'ray', 'mp'}"
+                "parallel_backend should be one of {'ray', 'mp', 'cf'}"
             )
             raise ValueError(err)
 
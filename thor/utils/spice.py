@@ -79,6 +79,28 @@ def getSPICEKernels(
         _downloadFile(os.path.join(os.path.dirname(__file__), "..", "data"), url)
     return
 
+# Functions called whenever kernels are (re)loaded, used by modules that cache
+# quantities computed from the loaded kernels to invalidate those caches
+_KERNEL_CALLBACKS = []
+
+def _registerKernelCallback(callback):
+    """
+    Register a function to be called without arguments each time SPICE kernels are (re)loaded
+    by `~thor.utils.setupSPICE`.
+
+    Parameters
+    ----------
+    callback : callable
+        Function to call after kernels are loaded.
+
+    Returns
+    -------
+    None
+    """
+    if callback not in _KERNEL_CALLBACKS:
+        _KERNEL_CALLBACKS.append(callback)
+    return
+
 def setupSPICE(
         kernels=KERNELS_DE430,
         force=False
@@ -138,6 +160,8 @@ def setupSPICE(
             raise ValueError(err)
 
         os.environ[var_name] = ephemeris_file
+        for callback in _KERNEL_CALLBACKS:
+            callback()
         logger.info("SPICE enabled.")
     return
 
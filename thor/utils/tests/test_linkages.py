@@ -3,6 +3,10 @@ import numpy as np
 import pandas as pd
 
 from ..linkages import sortLinkages
+from ..linkages import identifySubsetLinkages
+from ..linkages import mergeLinkages
+from ..linkages import removeDuplicateLinkages
+from ..linkages import removeDuplicateObservations
 from ..linkages import calcDeltas
 
 ### Create test data set
@@ -138,4 +142,135 @@ def test_calcDeltas_missingColumn():
             OBSERVATIONS[["obs_id"]],
             groupby_cols=["linkage_id"],
             delta_cols=["mjd_utc"]
-        )
\ No newline at end of file
+        )
+
+def createOverlappingLinkages():
+    # Linkages d and f are identical, e is a subset of both, g is a subset of b
+    # and h shares observations with b and c but is not a subset of either
+    linkage_obs = {
+        "a" : ["o00", "o01", "o02", "o03"],
+        "b" : ["o04", "o05", "o06", "o07", "o08"],
+        "c" : ["o08", "o09", "o10", "o11"],
+        "d" : ["o12", "o13", "o14", "o15", "o16"],
+        "e" : ["o13", "o15", "o16"],
+        "f" : ["o16", "o15", "o14", "o13", "o12"],
+        "g" : ["o05", "o07"],
+        "h" : ["o07", "o08", "o09"],
+    }
+    linkages = pd.DataFrame({
+        "linkage_id" : list(linkage_obs.keys()),
+        "num_obs" : [len(v) for v in linkage_obs.values()],
+        "arc_length" : np.arange(len(linkage_obs), dtype=float),
+    })
+    linkage_members = pd.DataFrame({
+        "linkage_id" : [k for k, v in linkage_obs.items() for o in v],
+        "obs_id" : [o for v in linkage_obs.values() for o in v],
+    })
+    return linkages, linkage_members
+
+def test_identifySubsetLinkages():
+    linkages, linkage_members = createOverlappingLinkages()
+    linkages_subsets, linkage_members_subsets = identifySubsetLinkages(
+        linkages,
+        linkage_members,
+        linkage_id_col="linkage_id"
+    )
+
+    np.testing.assert_equal(
+        linkages_subsets["subset_of"].values,
+        np.array([None, None, None, None, "d", "d", "b", None], dtype=object)
+    )
+    pd.testing.assert_frame_equal(linkages, linkages_subsets.drop(columns=["subset_of"]))
+    pd.testing.assert_frame_equal(linkage_members, linkage_members_subsets)
+
+def test_removeDuplicateLinkages():
+    linkages, linkage_members = createOverlappingLinkages()
+    linkages_unique, linkage_members_unique = removeDuplicateLinkages(
+        linkages,
+        linkage_members,
+        linkage_id_col="linkage_id"
+    )
+
+    # Linkage f has the same observations as linkage d
+    np.testing.assert_equal(linkages_unique["linkage_id"].values, ["a", "b", "c", "d", "e", "g", "h"])
+    pd.testing.assert_frame_equal(
+        linkage_members_unique,
+        linkage_members[linkage_members["linkage_id"] != "f"].reset_index(drop=True)
+    )
+
+def test_removeDuplicateObservations():
+    linkages, linkage_members = createOverlappingLinkages()
+    linkages_unique, linkage_members_unique = removeDuplicateObservations(
+        linkages,
+        linkage_members,
+        min_obs=3,
+        linkage_id_col="linkage_id",
+        filter_cols=["num_obs", "arc_length"],
+        ascending=[False, False]
+    )
+
+    # Linkages are kept in order of descending number of observations and arc length: f, d, b, c, a, h, e, g.
+    # Each observation should only belong to the first linkage that contains it
+    np.testing.assert_equal(linkages_unique["linkage_id"].values, ["f", "b", "c", "a"])
+    np.testing.assert_equal(
+        linkage_members_unique["linkage_id"].values,
+        ["f"] * 5 + ["b"] * 5 + ["c"] * 3 + ["a"] * 4
+    )
+    np.testing.assert_equal(
+        linkage_members_unique["obs_id"].values,
+        ["o16", "o15", "o14", "o13", "o12", "o04", "o05", "o06", "o07", "o08", "o09", "o10", "o11", "o00", "o01", "o02", "o03"]
+    )
+    assert len(np.unique(linkage_members_unique["obs_id"].values)) == len(linkage_members_unique)
+
+def test_mergeLinkages():
+    # Linkages a, b and c are connected through shared observations (a and c share no
+    # observations but both share observations with b), d shares no observations with any other linkage.
+    # Observations o04 and o05 occur at the same time
+    linkage_obs = {
+        "a" : ["o00", "o01", "o02"],
+        "b" : ["o02", "o03", "o04"],
+        "c" : ["o04", "o05", "o06"],
+        "d" : ["o07", "o08", "o09"],
+    }
+    observations = pd.DataFrame({
+        "obs_id" : [f"o{i:02d}" for i in range(10)],
+        "mjd_utc" : [59000.0, 59001.0, 59002.0, 59003.0, 59004.0, 59004.0, 59006.0, 59007.0, 59008.0, 59009.0],
+    })
+    linkages = pd.DataFrame({
+        "cluster_id" : list(linkage_obs.keys()),
+        "vtheta_x_deg" : [0.1, 0.2, 0.3, 0.4],
+        "vtheta_y_deg" : [0.0, 0.0, 0.0, 0.0],
+        "num_obs" : [3, 3, 3, 3],
+        "arc_length" : [2.0, 2.0, 3.0, 2.0],
+    })
+    linkage_members = pd.DataFrame({
+        "cluster_id" : [k for k, v in linkage_obs.items() for o in v],
+        "obs_id" : [o for v in linkage_obs.values() for o in v],
+    })
+
+    for num_jobs in [1, 2]:
+        merged_linkages, merged_linkage_members, merged_from = mergeLinkages(
+            linkages,
+            linkage_members,
+            observations,
+            linkage_id_col="cluster_id",
+            num_jobs=num_jobs,
+            parallel_backend="mp"
+        )
+
+        # One merged linkage for each choice of observation at 59004.0, both
+        # with the properties of linkage c (the longest arc)
+        assert len(merged_linkages) == 2
+        np.testing.assert_equal(merged_linkages["vtheta_x_deg"].values, [0.3, 0.3])
+        for linkage_id in merged_linkages["cluster_id"].values:
+            np.testing.assert_equal(
+                np.sort(merged_from[merged_from["cluster_id"] == linkage_id]["merged_from"].values),
+                ["a", "b", "c"]
+            )
+
+        obs_ids = [
+            set(merged_linkage_members[merged_linkage_members["cluster_id"] == linkage_id]["obs_id"].values)
+            for linkage_id in merged_linkages["cluster_id"].values
+        ]
+        obs_ids_expected = set(["o00", "o01", "o02", "o03", "o06"])
+        assert sorted(obs_ids, key=sorted) == [obs_ids_expected | set(["o04"]), obs_ids_expected | set(["o05"])]
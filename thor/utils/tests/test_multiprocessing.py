@@ -1,9 +1,16 @@
+import sys
 import pytest
+import subprocess
 import numpy as np
 import pandas as pd
 
 from ..multiprocessing import yieldChunks
 from ..multiprocessing import calcChunkSize
+from ..multiprocessing import getExecutor
+from ..multiprocessing import shutdownExecutors
+from ..multiprocessing import _checkParallel
+from ..multiprocessing import _warmStartWorker
+from .. import spice
 
 def test_yieldChunks_list():
     # Create list of data
@@ -356,4 +363,78 @@ def test_calcChunkSize():
     # the chunk_size should be 10000/100 = 100
     chunk_size = calcChunkSize(n, num_workers, max_chunk_size, min_chunk_size=min_chunk_size)
     assert chunk_size == 100
-    return
\ No newline at end of file
+    return
+
+def test__checkParallel():
+    for parallel_backend in ["mp", "cf"]:
+        parallel, num_workers = _checkParallel(2, parallel_backend)
+        assert parallel is True
+        assert num_workers == 2
+
+    parallel, num_workers = _checkParallel(1, "cf")
+    assert parallel is False
+    assert num_workers == 1
+
+    with pytest.raises(ValueError):
+        _checkParallel(2, "threads")
+
+@pytest.mark.parametrize("parallel_backend", ["mp", "cf"])
+def test_getExecutor(parallel_backend):
+    # Executors should persist across calls
+    executor = getExecutor(2, parallel_backend)
+    assert getExecutor(2, parallel_backend) is executor
+
+    results = executor.starmap(pow, zip(range(5), [2 for i in range(5)]))
+    assert list(results) == [0, 1, 4, 9, 16]
+
+    future = executor.apply_async(pow, (3, 2))
+    assert future.get() == 9
+
+    # Shutting down the executors means a new executor is created on the next call
+    shutdownExecutors()
+    executor_new = getExecutor(2, parallel_backend)
+    assert executor_new is not executor
+    shutdownExecutors()
+
+def test_getExecutor_warm_start():
+    # Workers started without a warm start should run tasks all the same
+    executor = getExecutor(2, "mp", warm_start=False)
+    assert executor.starmap(pow, [(2, 2), (3, 2)]) == [4, 9]
+    shutdownExecutors()
+
+def test__warmStartWorker(monkeypatch, caplog):
+    # A step of the warm start that fails should be reported as a warning
+    def setupSPICE():
+        raise FileNotFoundError("de440.bsp not found.")
+    monkeypatch.setattr(spice, "setupSPICE", setupSPICE)
+
+    _warmStartWorker()
+    assert any(
+        (record.levelname == "WARNING") and ("Could not set up SPICE" in record.getMessage())
+        for record in caplog.records
+    )
+
+def test_getExecutor_errors():
+    with pytest.raises(ValueError):
+        getExecutor(2, "ray")
+
+def test_getExecutor_threadingLayer():
+    # Once a parallel kernel has started numba's threading layer, a process that forks hangs on exit.
+    # A process that runs a parallel kernel and then starts a pool of workers should run tasks and exit cleanly
+    code = (
+        "import numpy as np\n"
+        "import thor\n"
+        "from thor.constants import Constants as c\n"
+        "from thor.orbits.universal_propagate import propagateUniversal\n"
+        "from thor.utils import getExecutor\n"
+        "propagateUniversal(np.array([[1., 0., 0., 0., 0.0172, 0.]]), np.array([59000.]), np.array([59001., 59002.]), c.MU, 100, 1e-14)\n"
+        "for parallel_backend in ['mp', 'cf']:\n"
+        "    executor = getExecutor(2, parallel_backend)\n"
+        "    assert executor.starmap(pow, [(2, 2), (3, 2)]) == [4, 9]\n"
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", code],
+        timeout=300,
+        capture_output=True
+    )
+    assert process.returncode == 0, process.stderr.decode()